@@ -66,6 +66,26 @@ def delete_file_from_s3(file_key):
         # print(f"Error occurred: {e}")
         return False
 
+
+# Delete many files, 1,000 keys per request; returns the keys that were not deleted
+def delete_files_from_s3(file_keys):
+    file_keys = list(file_keys)
+    if s3 is None or bucketName is None:
+        print("Warning: S3 not configured - cannot delete files")
+        return file_keys
+    failed = []
+    for start in range(0, len(file_keys), 1000):
+        batch = file_keys[start:start + 1000]
+        try:
+            response = s3.delete_objects(
+                Bucket=bucketName,
+                Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+            )
+            failed += [error['Key'] for error in response.get('Errors', [])]
+        except (NoCredentialsError, ClientError):
+            failed += batch
+    return failed
+
 def get_image(file_key):
     if s3 is None or bucketName is None:
         print("Warning: S3 not configured - cannot get image")
@@ -92,3 +112,78 @@ def download_s3_file(file_key, file_path):
     
 
 
+
+
+def stream_s3_file(file_key, file_path, chunk_size=1024 * 1024):
+    """Download an object in fixed-size pieces so memory stays at one piece."""
+    if s3 is None or bucketName is None:
+        print("Warning: S3 not configured - cannot download file")
+        return False
+    try:
+        body = s3.get_object(Bucket=bucketName, Key=file_key)['Body']
+        with open(file_path, 'wb') as destination:
+            for chunk in body.iter_chunks(chunk_size):
+                destination.write(chunk)
+        return True
+    except Exception as e:
+        return False
+
+
+# ---- Presigned multipart uploads (clients send bytes straight to S3) ----
+
+def create_multipart_upload(file_key, content_type):
+    """Start a multipart upload; returns its UploadId, or None on failure."""
+    if s3 is None or bucketName is None:
+        print("Warning: S3 not configured - cannot start upload")
+        return None
+    try:
+        response = s3.create_multipart_upload(Bucket=bucketName, Key=file_key, ContentType=content_type)
+        return response['UploadId']
+    except Exception as e:
+        return None
+
+
+def presign_upload_parts(file_key, upload_id, part_count, expires_in=3600):
+    """One presigned PUT URL per part, numbered from 1."""
+    return [
+        s3.generate_presigned_url(
+            'upload_part',
+            Params={'Bucket': bucketName, 'Key': file_key, 'UploadId': upload_id, 'PartNumber': part_number},
+            ExpiresIn=expires_in
+        )
+        for part_number in range(1, part_count + 1)
+    ]
+
+
+def complete_multipart_upload(file_key, upload_id, parts):
+    """Assemble uploaded parts ([{'PartNumber': 1, 'ETag': '...'}, ...]); returns True on success."""
+    if s3 is None or bucketName is None:
+        return False
+    try:
+        s3.complete_multipart_upload(
+            Bucket=bucketName, Key=file_key, UploadId=upload_id,
+            MultipartUpload={'Parts': sorted(parts, key=lambda part: part['PartNumber'])}
+        )
+        return True
+    except Exception as e:
+        return False
+
+
+def abort_multipart_upload(file_key, upload_id):
+    if s3 is None or bucketName is None:
+        return False
+    try:
+        s3.abort_multipart_upload(Bucket=bucketName, Key=file_key, UploadId=upload_id)
+        return True
+    except Exception as e:
+        return False
+
+
+def get_object_size(file_key):
+    """Size in bytes from a HEAD request, or None if the object is missing."""
+    if s3 is None or bucketName is None:
+        return None
+    try:
+        return s3.head_object(Bucket=bucketName, Key=file_key)['ContentLength']
+    except Exception as e:
+        return None
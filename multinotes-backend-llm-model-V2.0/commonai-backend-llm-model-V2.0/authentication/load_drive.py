@@ -17,6 +17,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from .awsservice import getImageUrl, get_image, delete_file_from_s3
 from coreapp.models import UserContent, Folder, StorageUsage, Document
 from coreapp.models import Share
+from coreapp.services.folder_tree import folder_tree
 from coreapp.serializers import (FolderListSerializer, ShareContentFolderSerializer, 
                                  ContentLibrarySerializer, ShareContentFileSerializer)
 import io
@@ -164,7 +165,7 @@ def create_google_drive_folder(service, title, parent_id=None):
 
 # def upload_folder_structure_to_drive(user, service, folder_data, parent_id=None):
 def upload_folder_structure_to_drive(user, service, folder_data, folder_list, parent_id=None):
-    from coreapp.views import get_files, get_documents
+    from coreapp.views_legacy import get_files, get_documents
     """
     Recursively uploads folders to Google Drive while maintaining the structure.
     """
@@ -221,25 +222,10 @@ def upload_folder_structure_to_drive(user, service, folder_data, folder_list, pa
     return folder_list
 
 
-# Get file size for all subfolder file.
-def get_sub_folder_file_size(user, folder_data, root_file_size):
-    from coreapp.views import get_folder_file_size
-    for folder in folder_data:
-        files_size = get_folder_file_size(user, folder['id'])
-
-        root_file_size += files_size
-        
-        # Recursively create subfolders
-        if folder['subfolders']:
-            root_file_size += get_sub_folder_file_size(user, folder['subfolders'], 0)
-
-    return root_file_size
-
-
 class UploadDataToGoogleDriveView(APIView):
     def post(self, request):
         from .tasks import upload_data_file_at_drive, upload_data_folder_at_drive
-        from coreapp.views import get_folder_detail, get_folder_file_size
+        from coreapp.views_legacy import get_folder_detail
         # s3_file_key = request.data.get('fileKey', None)
         folderId = request.data.get('folderId', None)
         fileId = request.data.get('fileId', None)
@@ -353,14 +339,11 @@ class UploadDataToGoogleDriveView(APIView):
 
             # files = get_files(user, folderId)
 
-            folder_file_size = get_folder_file_size(user, folderId)
-
-
             # root_file_size = 0
             # for file in files:
             #     root_file_size += file['fileSize']
             
-            total_file_size = get_sub_folder_file_size(user, folder_data, folder_file_size)
+            total_file_size = folder_tree.subtree_file_size(user, folderId)
 
 
             if available_space < total_file_size + 1000:
@@ -421,7 +404,7 @@ class UploadDataToGoogleDriveView(APIView):
 class UploadCompleteDataToDriveView(APIView):
     def post(self, request):
         from .tasks import upload_data_file_at_drive, upload_data_folder_at_drive
-        from coreapp.views import get_folder_detail, get_folder_file_size
+        from coreapp.views_legacy import get_folder_detail
 
         user = request.user
 
@@ -509,14 +492,7 @@ class UploadCompleteDataToDriveView(APIView):
             total_data_size = 0
             # total_folder_data_size = 0
             for user_folder in user_folders:
-                folderName, folder_data = get_folder_detail(user, user_folder['id'])
-
-                folder_file_size = get_folder_file_size(user, user_folder['id'])
-
-                
-                total_file_size = get_sub_folder_file_size(user, folder_data, folder_file_size)
-
-                total_data_size += total_file_size
+                total_data_size += folder_tree.subtree_file_size(user, user_folder['id'])
 
             for user_file in user_files:
                 total_data_size += int(user_file['fileSize'])
@@ -530,10 +506,6 @@ class UploadCompleteDataToDriveView(APIView):
             for idx, user_folder in enumerate(user_folders):
                 folderName, folder_data = get_folder_detail(user, user_folder['id'])
 
-                folder_file_size = get_folder_file_size(user, user_folder['id'])
-        
-                total_file_size = get_sub_folder_file_size(user, folder_data, folder_file_size)
-
                 if idx == len(user_folders) - 1:
                     share_email = True
                 upload_data_folder_at_drive.delay(user.id, user_folder['id'], creds.to_json(), folder_data, folderName, share_email=share_email)
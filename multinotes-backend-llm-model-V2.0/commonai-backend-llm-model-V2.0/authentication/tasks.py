@@ -18,6 +18,7 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from .load_drive import create_google_drive_folder, upload_folder_structure_to_drive
 import io
+import itertools
 import json
 from coreapp.utils import aiTogetherProcess, aiGeminiProcess, aiOpenAIProcess, extract_text_from_image
 import yt_dlp
@@ -1622,7 +1623,7 @@ def upload_data_file_at_drive(userId, fileId, creds_json, share_email):
 
 @shared_task
 def upload_data_folder_at_drive(userId, folderId, creds_json, folder_data, folderName, share_email):
-    from coreapp.views import get_folder_detail, get_files, get_documents, get_folder_file_size
+    from coreapp.views_legacy import get_folder_detail, get_files, get_documents, get_folder_file_size
     user = CustomUser.objects.get(pk=userId)
 
     creds = Credentials.from_authorized_user_info(json.loads(creds_json))
@@ -1677,190 +1678,114 @@ def upload_data_folder_at_drive(userId, folderId, creds_json, folder_data, folde
     if share_email:
         upload_folder_data_email(user.email)
 
-@shared_task()
-def aiprocess_data(userId, contentId, fileType):
-    try:
-        from coreapp.views import (
-                            convert_mp4_to_mp3, convert_audio_into_text,      
-                            download_video, extract_text_from_pdf,
-                            extract_text_from_excel, extract_text_from_docx,
-                            extract_text_from_doc
-                        )
-        # print("userId is ----> ", userId)
-        # print("contentId is ----> ", contentId)
-        # print("uploadFile is ----> ", uploadFile)
-
-        output_path = settings.BASE_DIR
-
-        user = CustomUser.objects.get(pk=userId)
-        content = AiProcess.objects.get(pk=contentId)
-
-        text = None
-
-        # upload_folder_data_email(user.email, 2)
-        if int(fileType) == 1:
-            # upload_folder_data_email(user.email, 3)
-            local_path = output_path/f"user_file_{userId}.mp4"
-
-            # Download the file
-            result = download_s3_file(content.url, local_path)
-
-            # upload_folder_data_email(user.email, 4)
-            if result:
-                # print(f"File downloaded successfully from S3 to {local_path}")
-
-                input_video = local_path
-                output_audio = output_path/f"user_audio_file_{userId}.mp3"
-
-                # upload_folder_data_email(user.email, 5)
-                result = convert_mp4_to_mp3(input_video, output_audio)
+@shared_task(bind=True)
+def aiprocess_data(self, userId, contentId, fileType):
+    """
+    Run an AiProcess workflow over an uploaded file.
+
+    The file is fetched into a private workspace and read page by page into
+    token-sized chunks. Each workflow step runs over the chunks in parallel
+    and merges the partial results, so large files never sit in memory
+    whole. Stage progress goes to the user's TaskNotificationConsumer group.
+    """
+    from coreapp.services.file_ingestion import (
+        IngestionError, IngestionWorkspace, MapReduceRunner, TokenChunker, extract_blocks,
+    )
+    from coreapp.tasks.task_notifications import TaskProgressTracker
 
-                # upload_folder_data_email(user.email, 6)
+    user = CustomUser.objects.get(pk=userId)
+    content = AiProcess.objects.get(pk=contentId)
 
-                os.remove(local_path)
+    try:
+        workflows = json.loads(content.workflow)
+        maxOutput = settings.AI_INGEST_OUTPUT_MAX_CHARS
 
-                if result:
-                    # upload_folder_data_email(user.email, 7)
-                    text = convert_audio_into_text(output_audio, user)
+        tracker = TaskProgressTracker(self, user_id=userId)
+        tracker.start(total=len(workflows) + 1, message='Downloading file')
 
+        def report(stage, data):
+            if stage == 'reduce':
+                message = f"Merging {data['parts']} partial results"
             else:
-                # # print("There is an error in file downloading.")
-                # return Response({"message": f"There is an error in file downloading."}, status=status.HTTP_400_BAD_REQUEST)
-                text = "There is an error in file downloading."
-                ai_process_text_email(user.email, text)
-        
-        elif int(fileType) == 2:
-            local_path = output_path/f"user_file_{userId}.mp3"
+                message = f"Processed {data['chunks_done']} chunks"
+            tracker.update(message=message, metadata={'stage': stage, **data})
 
-            # Download the file
-            result = download_s3_file(content.url, local_path)
+        chunker = TokenChunker()
+        runner = MapReduceRunner(chunker)
 
-            if result:
-                text = convert_audio_into_text(local_path, user)
-        
-        elif int(fileType) == 3:
+        failure = None
+        with IngestionWorkspace(userId, contentId) as workspace:
             try:
-                audio_file_path = download_video(content.url, output_path, userId)
-            except yt_dlp.utils.DownloadError as e:
-                # return Response({"message": e.msg})
-                ai_process_text_email(user.email, e.msg)
-            except Exception as e:
-                # return Response({"message": "error occured"})
-                ai_process_text_email(user.email, "Error Occured")
-            
-            text = convert_audio_into_text(audio_file_path, user)
-
-        elif int(fileType) == 4:
-            local_path = output_path/f"user_file_{userId}.pdf"
-
-            # Download the file
-            result = download_s3_file(content.url, local_path)
-
-            if result:
-                text = extract_text_from_pdf(local_path)
-                # print("Text is ---> ", text)
-
-
-        elif int(fileType) == 5:
-            local_path = output_path/f"user_file_{userId}.xlsx"
+                blocks = extract_blocks(fileType, content.url, workspace, user)
+            except IngestionError as e:
+                # Reported once below, in place of the "no data" message
+                failure = str(e)
+                blocks = iter(())
+
+            chunks = chunker.chunks(workspace.spool(blocks))
+            firstChunk = next(chunks, None)
+            tracker.update(current=1, message='Extracting text', metadata={'stage': 'extract'})
+
+            text = None
+            if firstChunk is not None:
+                ai_chunks = itertools.chain([firstChunk], chunks)
+                ai_text = None
+                for step, workflow in enumerate(workflows):
+                    model = workflow['modelName']
+                    prompt = workflow['action']
+
+                    try:
+                        llm_instance = LLM.objects.get(name=model, is_enabled=True, is_delete=False, test_status="connected")
+                        model_string = llm_instance.model_string
+                    except LLM.DoesNotExist:
+                        raise ValueError(f'Model "{model}" not available or not connected')
+
+                    if llm_instance.source==2 and llm_instance.text:
+                        aiProcess = aiTogetherProcess
+                    elif llm_instance.source==3 and llm_instance.text:
+                        aiProcess = aiGeminiProcess
+                    elif llm_instance.source==4 and llm_instance.text:
+                        aiProcess = aiOpenAIProcess
+                    else:
+                        raise ValueError('Please provide proper model for text generation.')
+
+                    ai_response = runner.run(
+                        ai_chunks, prompt,
+                        lambda chunk, chunkPrompt: aiProcess(model_string, chunk, chunkPrompt, user),
+                        on_progress=report,
+                    )
+
+                    # The first step reads the file; later steps the previous output
+                    workflow['input'] = ai_text if step else workspace.read_spool(maxOutput)
+                    workflow['ouput'] = ai_response
+                    workflow['status'] = "done"
+
+                    content.workflow = json.dumps(workflows)
+                    content.save()
+                    ai_text = ai_response
+                    ai_chunks = chunker.chunks([ai_response])
+                    ai_process_text_email(user.email, ai_response)
+                    tracker.update(current=step + 2, message=f'Step {step + 1} of {len(workflows)} done',
+                                   metadata={'stage': 'workflow', 'step': step + 1})
+
+                if not workflows:
+                    for _ in ai_chunks:
+                        pass
+                text = workspace.read_spool(maxOutput)
 
-            # Download the file
-            result = download_s3_file(content.url, local_path)
-
-            if result:
-                text = extract_text_from_excel(local_path)
-
-
-        elif int(fileType) == 6:
-            # local_path = output_path/f"user_file_{userId}.docx"
-
-            # # Download the file
-            # result = download_s3_file(content.url, local_path)
-
-            # if result:
-            #     text = extract_text_from_docx(local_path)
-
-            if content.url.split('.')[-1] == "docx":
-                local_path = output_path/f"user_file_{userId}.docx"
-
-                # Download the file
-                result = download_s3_file(content.url, local_path)
-
-                # text = extract_text_from_doc(local_path)
-
-                if result:
-                    text = extract_text_from_docx(local_path)
-            else:
-                local_path = output_path/f"user_file_{userId}.doc"
-                # Download the file
-                result = download_s3_file(content.url, local_path)
-
-                if result:
-                    text = extract_text_from_doc(local_path)
-
-        elif int(fileType) == 7:
-            ext = content.url.split('.')[-1]
-            local_path = output_path/f"user_file_{userId}.{ext}"
-
-            # Download the file
-            result = download_s3_file(content.url, local_path)
-
-            if result:
-                text = extract_text_from_image(local_path)
-
-
-        workflows = json.loads(content.workflow)
-
-        # upload_folder_data_email(user.email, 7)
-        # print("Text is ----> ", text)
         if text:
-            # ai_process_text_email(user.email, text)
-            ai_text = text
-            for workflow in workflows:
-                model = workflow['modelName']
-                prompt = workflow['action']
-
-                try:
-                    llm_instance = LLM.objects.get(name=model, is_enabled=True, is_delete=False, test_status="connected")
-                    model_string = llm_instance.model_string
-                except LLM.DoesNotExist:
-                    # return Response({'message': f'Model "{model}" not available or not connected',
-                    # }, status=status.HTTP_400_BAD_REQUEST)
-                    ai_process_text_email(user.email, f'Model "{model}" not available or not connected')
-                
-                if llm_instance.source==2 and llm_instance.text:
-                    ai_response = aiTogetherProcess(model_string, ai_text, prompt, user)
-                    
-                elif llm_instance.source==3 and llm_instance.text:
-                    ai_response = aiGeminiProcess(model_string, ai_text, prompt, user)
-                    
-                elif llm_instance.source==4 and llm_instance.text:
-                    ai_response = aiOpenAIProcess(model_string, ai_text, prompt, user)
-                    
-                else:
-                    # return Response({'message': 'Please provide proper model for text generation.'}, status=status.HTTP_400_BAD_REQUEST)
-                    ai_process_text_email(user.email, 'Please provide proper model for text generation.')
-                    
-
-                workflow['input'] = ai_text
-                workflow['ouput'] = ai_response
-                workflow['status'] = "done"
-
-                content.workflow = json.dumps(workflows)
-                content.save()
-                ai_text = ai_response
-                ai_process_text_email(user.email, ai_response)
-
             content.url_status = "done"
             content.url_output = text
             content.save()
         else:
-            text = "There is no data available in file. Please check again."
+            text = failure or "There is no data available in file. Please check again."
             ai_process_text_email(user.email, text)    
             content.url_status = "done"
             content.url_output = text
             content.save()
 
+        tracker.complete(message='Done')
+
     except Exception as e:
         # Handle failures: mark the process as failed and notify the user
 
@@ -1872,4 +1797,3 @@ def aiprocess_data(userId, contentId, fileType):
         content.save()
 
         raise  # Re-raise exception so Celery marks the task as failed
-    
@@ -17,11 +17,12 @@ from typing import Optional, List, Dict, Any, Tuple
 from enum import Enum
 from collections import defaultdict
 
-from django.db import models
-from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
+from backend.rate_limiting import Limit, rate_limiter
+from coreapp.models import AbuseLog, BlockedIP
+
 logger = logging.getLogger(__name__)
 
 
@@ -62,86 +63,6 @@ class AbuseSeverity(Enum):
     CRITICAL = 4
 
 
-# =============================================================================
-# Abuse Log Model
-# =============================================================================
-
-class AbuseLog(models.Model):
-    """Log of detected abuse incidents."""
-
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name='abuse_logs'
-    )
-    ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
-
-    abuse_type = models.CharField(max_length=50)
-    severity = models.IntegerField(default=1)
-    description = models.TextField()
-    metadata = models.JSONField(default=dict)
-
-    action_taken = models.CharField(max_length=50, default='log_only')
-    is_resolved = models.BooleanField(default=False)
-    resolved_at = models.DateTimeField(null=True, blank=True)
-    resolved_by = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name='resolved_abuse_logs'
-    )
-
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    class Meta:
-        db_table = 'abuse_logs'
-        indexes = [
-            models.Index(fields=['user', '-created_at']),
-            models.Index(fields=['ip_address', '-created_at']),
-            models.Index(fields=['abuse_type', '-created_at']),
-            models.Index(fields=['is_resolved', '-created_at']),
-        ]
-        ordering = ['-created_at']
-
-    def __str__(self):
-        return f"{self.abuse_type} - {self.ip_address or self.user}"
-
-
-class BlockedIP(models.Model):
-    """Blocked IP addresses."""
-
-    ip_address = models.GenericIPAddressField(unique=True)
-    reason = models.TextField()
-    blocked_until = models.DateTimeField(null=True, blank=True)
-    is_permanent = models.BooleanField(default=False)
-
-    blocked_by = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True
-    )
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    class Meta:
-        db_table = 'blocked_ips'
-
-    def __str__(self):
-        return f"{self.ip_address} - {'Permanent' if self.is_permanent else 'Temporary'}"
-
-    @property
-    def is_active(self) -> bool:
-        if self.is_permanent:
-            return True
-        if self.blocked_until:
-            return timezone.now() < self.blocked_until
-        return False
-
-
 # =============================================================================
 # Abuse Detection Configuration
 # =============================================================================
@@ -258,14 +179,11 @@ class AbuseDetectionService:
         if not config:
             return True, -1
 
-        cache_key = f"{self.cache_prefix}rate:{limit_type}:{identifier}"
-        window = config['window']
-        limit = config['limit']
-
-        # Get current count
-        current = cache.get(cache_key, 0)
+        decision = rate_limiter.check(
+            Limit(f"{self.cache_prefix}rate:{limit_type}:{identifier}", config['limit'], config['window'])
+        )
 
-        if current >= limit:
+        if not decision.allowed:
             # Rate limit exceeded
             if request:
                 self._log_abuse(
@@ -277,13 +195,7 @@ class AbuseDetectionService:
                 )
             return False, 0
 
-        # Increment counter
-        if current == 0:
-            cache.set(cache_key, 1, window)
-        else:
-            cache.incr(cache_key)
-
-        return True, limit - current - 1
+        return True, decision.remaining
 
     # -------------------------------------------------------------------------
     # Login Monitoring
@@ -9,106 +9,22 @@ This module provides:
 """
 
 import logging
+import math
 import secrets
 import hashlib
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 
-from django.db import models
-from django.conf import settings
 from django.utils import timezone
 from django.core.cache import cache
 
-logger = logging.getLogger(__name__)
-
-
-# =============================================================================
-# API Key Model
-# =============================================================================
-
-class UserAPIKey(models.Model):
-    """User API key for external integrations."""
-
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.CASCADE,
-        related_name='api_keys'
-    )
-
-    # Key identification
-    name = models.CharField(max_length=100)
-    prefix = models.CharField(max_length=8, db_index=True)  # First 8 chars for lookup
-    key_hash = models.CharField(max_length=64, unique=True)  # SHA-256 hash
-
-    # Permissions
-    scopes = models.JSONField(default=list)  # ['read', 'write', 'generate']
-    rate_limit = models.IntegerField(default=1000)  # Requests per hour
-
-    # Metadata
-    last_used_at = models.DateTimeField(null=True, blank=True)
-    last_used_ip = models.GenericIPAddressField(null=True, blank=True)
-    total_requests = models.IntegerField(default=0)
-
-    # Validity
-    is_active = models.BooleanField(default=True)
-    expires_at = models.DateTimeField(null=True, blank=True)
-
-    # Timestamps
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    class Meta:
-        db_table = 'user_api_keys'
-        indexes = [
-            models.Index(fields=['user', 'is_active']),
-            models.Index(fields=['prefix']),
-            models.Index(fields=['-created_at']),
-        ]
-        ordering = ['-created_at']
-
-    def __str__(self):
-        return f"{self.user.email} - {self.name} ({self.prefix}...)"
-
-    @property
-    def is_valid(self) -> bool:
-        """Check if key is valid."""
-        if not self.is_active:
-            return False
-        if self.expires_at and timezone.now() > self.expires_at:
-            return False
-        return True
-
-    @property
-    def is_expired(self) -> bool:
-        """Check if key is expired."""
-        if self.expires_at and timezone.now() > self.expires_at:
-            return True
-        return False
-
+from backend.rate_limiting import Limit, rate_limiter
+from coreapp.models import UserAPIKey, APIKeyUsageLog
 
-class APIKeyUsageLog(models.Model):
-    """Log API key usage for analytics."""
-
-    api_key = models.ForeignKey(
-        UserAPIKey,
-        on_delete=models.CASCADE,
-        related_name='usage_logs'
-    )
-    endpoint = models.CharField(max_length=200)
-    method = models.CharField(max_length=10)
-    status_code = models.IntegerField()
-    ip_address = models.GenericIPAddressField(null=True, blank=True)
-    response_time_ms = models.IntegerField(null=True, blank=True)
-
-    created_at = models.DateTimeField(auto_now_add=True)
+logger = logging.getLogger(__name__)
 
-    class Meta:
-        db_table = 'api_key_usage_logs'
-        indexes = [
-            models.Index(fields=['api_key', '-created_at']),
-            models.Index(fields=['-created_at']),
-        ]
-        ordering = ['-created_at']
+# Rate limits on API keys are per hour (UserAPIKey.rate_limit requests)
+RATE_LIMIT_WINDOW = 3600
 
 
 # =============================================================================
@@ -372,7 +288,11 @@ class APIKeyService:
 
     def check_rate_limit(self, api_key: UserAPIKey) -> tuple:
         """
-        Check if API key is within rate limits.
+        Count a request against the API key's hourly limit.
+
+        The check and the increment are one atomic step in the shared
+        rate-limit engine, so concurrent requests cannot overshoot the
+        limit; a refused request is not counted.
 
         Args:
             api_key: The API key
@@ -380,25 +300,12 @@ class APIKeyService:
         Returns:
             Tuple of (is_allowed, remaining, reset_time)
         """
-        cache_key = f"{self.CACHE_PREFIX}ratelimit:{api_key.id}"
-        current_count = cache.get(cache_key, 0)
-
-        if current_count >= api_key.rate_limit:
-            # Get TTL for reset time
-            ttl = cache.ttl(cache_key) or 3600
-            return False, 0, ttl
-
-        return True, api_key.rate_limit - current_count - 1, 3600
-
-    def increment_usage(self, api_key: UserAPIKey):
-        """Increment API key usage counter."""
-        cache_key = f"{self.CACHE_PREFIX}ratelimit:{api_key.id}"
-        current = cache.get(cache_key, 0)
-
-        if current == 0:
-            cache.set(cache_key, 1, 3600)  # 1 hour window
-        else:
-            cache.incr(cache_key)
+        decision = rate_limiter.check(
+            Limit(f"{self.CACHE_PREFIX}{api_key.id}", api_key.rate_limit, RATE_LIMIT_WINDOW)
+        )
+        if not decision.allowed:
+            return False, 0, math.ceil(decision.retry_after)
+        return True, decision.remaining, math.ceil(decision.reset_after)
 
     # -------------------------------------------------------------------------
     # Usage Logging
@@ -524,14 +431,11 @@ class APIKeyAuthentication:
             from rest_framework.exceptions import AuthenticationFailed
             raise AuthenticationFailed('Invalid API key')
 
-        # Check rate limit
+        # Check and count against the rate limit
         is_allowed, remaining, reset = api_key_service.check_rate_limit(api_key)
         if not is_allowed:
             from rest_framework.exceptions import Throttled
-            raise Throttled(detail='API key rate limit exceeded')
-
-        # Increment usage
-        api_key_service.increment_usage(api_key)
+            raise Throttled(wait=reset, detail='API key rate limit exceeded')
 
         # Attach api_key to request for later use
         request.api_key = api_key
@@ -6,6 +6,9 @@ This module provides:
 - Request/Response logging
 - User activity audit trail
 - Compliance logging
+
+Audit and request log rows are queued on the buffered log writer
+(backend.log_writer) and written in batches off the request path.
 """
 
 import json
@@ -20,6 +23,8 @@ from django.conf import settings
 from django.utils import timezone
 from django.http import HttpRequest, HttpResponse
 
+from backend.log_writer import log_writer, measure_response
+
 logger = logging.getLogger(__name__)
 
 
@@ -243,6 +248,8 @@ class AuditLogger:
         """
         Create an audit log entry.
 
+        The entry is queued on the log writer rather than saved here.
+
         Args:
             event_type: Type of event (from AuditEventType)
             description: Human-readable description
@@ -255,7 +262,7 @@ class AuditLogger:
             error_message: Error message if failed
 
         Returns:
-            Created AuditLog instance
+            The queued AuditLog instance
         """
         # Extract category from event type
         category = event_type.split('.')[0] if '.' in event_type else 'general'
@@ -282,8 +289,8 @@ class AuditLogger:
         # Sanitize details
         sanitized_details = self._sanitize_data(details or {})
 
-        # Create log entry
-        audit_log = AuditLog.objects.create(
+        # Queue log entry
+        audit_log = AuditLog(
             event_id=AuditLog.generate_event_id(),
             event_type=event_type,
             event_category=category,
@@ -301,6 +308,7 @@ class AuditLogger:
             success=success,
             error_message=error_message,
         )
+        log_writer.append(audit_log)
 
         # Also log to standard logger for real-time monitoring
         log_level = logging.INFO if success else logging.WARNING
@@ -426,6 +434,10 @@ class RequestLoggingMiddleware:
     """
     Middleware for logging HTTP requests and responses.
 
+    One RequestLog row per request is queued on the log writer once the
+    response is done (for streaming responses, once the stream ends), so
+    logging adds no database round-trips to the request.
+
     Add to MIDDLEWARE in settings.py:
         'backend.audit_logging.RequestLoggingMiddleware',
     """
@@ -461,19 +473,20 @@ class RequestLoggingMiddleware:
         # Record start time
         start_time = timezone.now()
 
-        # Create request log entry
-        request_log = self._create_request_log(request, start_time)
-
         # Process request
         response = self.get_response(request)
 
-        # Update log with response info
-        self._update_request_log(request_log, response, start_time)
+        # Build the log entry (user is known once authentication has run)
+        request_log = self._build_request_log(request, start_time)
+        request_log.response_status = response.status_code
 
         # Add request ID to response headers
         response['X-Request-ID'] = request.request_id
 
-        return response
+        # Queue it once the body size is known
+        return measure_response(
+            response, lambda size: self._complete_request_log(request_log, size, start_time)
+        )
 
     def _should_log(self, request) -> bool:
         """Determine if request should be logged."""
@@ -492,8 +505,8 @@ class RequestLoggingMiddleware:
         # Log all API requests
         return path.startswith('/api/')
 
-    def _create_request_log(self, request, start_time) -> RequestLog:
-        """Create initial request log entry."""
+    def _build_request_log(self, request, start_time) -> RequestLog:
+        """Build an unsaved request log entry."""
         # Sanitize headers
         headers = {}
         for key, value in request.META.items():
@@ -502,29 +515,37 @@ class RequestLoggingMiddleware:
                 if 'AUTHORIZATION' not in key and 'COOKIE' not in key:
                     headers[header_name] = value[:200]
 
-        return RequestLog.objects.create(
+        user = getattr(request, 'user', None)
+
+        return RequestLog(
             request_id=request.request_id,
             method=request.method,
             path=request.path[:500],
             query_string=request.META.get('QUERY_STRING', '')[:1000],
-            user=request.user if request.user.is_authenticated else None,
+            user=user if user is not None and user.is_authenticated else None,
             ip_address=self._get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
             request_headers=headers,
-            request_body_size=len(request.body) if hasattr(request, 'body') else 0,
+            request_body_size=self._get_body_size(request),
             started_at=start_time,
         )
 
-    def _update_request_log(self, request_log, response, start_time):
-        """Update request log with response info."""
+    def _complete_request_log(self, request_log, response_size, start_time):
+        """Fill in response info and queue the entry."""
         end_time = timezone.now()
         duration = (end_time - start_time).total_seconds() * 1000
 
-        request_log.response_status = response.status_code
-        request_log.response_size = len(response.content) if hasattr(response, 'content') else 0
+        request_log.response_size = response_size
         request_log.completed_at = end_time
         request_log.duration_ms = int(duration)
-        request_log.save()
+        log_writer.append(request_log)
+
+    def _get_body_size(self, request) -> int:
+        """Request body size from Content-Length (reading the body would buffer uploads)."""
+        try:
+            return int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return 0
 
     def _get_client_ip(self, request) -> str:
         """Extract client IP from request."""
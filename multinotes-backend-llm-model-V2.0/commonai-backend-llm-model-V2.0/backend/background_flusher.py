@@ -0,0 +1,84 @@
+"""
+Background Flusher for MultinotesAI.
+
+This module provides:
+- A base class for in-process buffers drained by a daemon thread
+- A flush every ``flush_interval`` seconds, or sooner when woken
+- A final flush at interpreter exit
+
+Subclasses own their buffer and implement flush(). They call
+_ensure_running() from the request path to start the thread lazily, and
+_wakeup.set() to flush early when the buffer fills up.
+"""
+
+import atexit
+import logging
+import threading
+
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Background Flusher
+# =============================================================================
+
+class BackgroundFlusher:
+    """
+    Periodically call flush() from a daemon thread.
+
+    Usage:
+        class MyBuffer(BackgroundFlusher):
+            thread_name = 'my-buffer'
+
+            def flush(self) -> int:
+                ...
+    """
+
+    thread_name = 'background-flusher'
+
+    def __init__(self, flush_interval: float, background: bool = True):
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._running = False
+
+    def flush(self) -> int:
+        raise NotImplementedError
+
+    def _ensure_running(self):
+        if self._running:
+            return
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._flush_loop, name=self.thread_name, daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def _flush_loop(self):
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"{self.thread_name} flush failed: {e}")
+            finally:
+                close_old_connections()
+
+    def stop(self):
+        """Stop the flusher and flush what is left."""
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
@@ -7,14 +7,20 @@ This module provides centralized caching functionality for:
 - Folder hierarchies
 - Category data
 - Session data
+- LLM responses (opt-in, with an in-process LRU tier)
 """
 
 from django.core.cache import cache
 from django.conf import settings
+from collections import OrderedDict
 from functools import wraps
 import hashlib
 import json
 import logging
+import threading
+import time
+
+from backend.monitoring import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +42,7 @@ class CacheKeys:
     PLAN_LIST = "plan_list"
     CONTENT = "content"
     SHARE = "share"
+    LLM_RESPONSE = "llm_response"
 
     @classmethod
     def llm_model(cls, model_id: int) -> str:
@@ -92,6 +99,13 @@ class CacheKeys:
         """Cache key for shared content."""
         return f"{cls.SHARE}:{share_code}"
 
+    @classmethod
+    def llm_response(cls, fingerprint: str, user_id: int = None) -> str:
+        """Cache key for an LLM response, per user or global."""
+        if user_id:
+            return f"{cls.LLM_RESPONSE}:user:{user_id}:{fingerprint}"
+        return f"{cls.LLM_RESPONSE}:global:{fingerprint}"
+
 
 # =============================================================================
 # Cache Timeouts (in seconds)
@@ -117,6 +131,63 @@ class CacheTimeout:
     PLANS = DAY
     CONTENT = MEDIUM
     SHARE = LONG
+    LLM_RESPONSE = getattr(settings, 'LLM_RESPONSE_CACHE_TIMEOUT', LONG)
+
+
+# Who may be served a cached LLM response
+LLM_CACHE_SCOPE_USER = 'user'
+LLM_CACHE_SCOPE_GLOBAL = 'global'
+LLM_CACHE_SCOPES = (LLM_CACHE_SCOPE_USER, LLM_CACHE_SCOPE_GLOBAL)
+
+
+# =============================================================================
+# Local LRU Tier
+# =============================================================================
+
+class LRUCache:
+    """
+    Small thread-safe in-process LRU with per-entry expiry.
+
+    Sits in front of the shared cache for values that are read far more
+    often than they change, so repeated hits skip the network round trip.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: int):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
 
 
 # =============================================================================
@@ -143,6 +214,7 @@ class CacheService:
     def __init__(self):
         self.cache = cache
         self.enabled = getattr(settings, 'CACHE_ENABLED', True)
+        self.llm_responses = LRUCache(getattr(settings, 'LLM_RESPONSE_CACHE_LOCAL_ENTRIES', 512))
 
     # -------------------------------------------------------------------------
     # Generic Methods
@@ -353,6 +425,77 @@ class CacheService:
         """Invalidate share cache."""
         return self.delete(CacheKeys.share(share_code))
 
+    # -------------------------------------------------------------------------
+    # LLM Response Methods
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def llm_response_fingerprint(model: str, messages, params: dict = None) -> str:
+        """
+        Hash a generation request into a cache fingerprint.
+
+        Messages are normalised (line endings, trailing whitespace) so that
+        prompts differing only in formatting noise share an entry; params
+        with a None value are ignored.
+        """
+        if isinstance(messages, str):
+            messages = [{'role': 'user', 'content': messages}]
+        normalized = [
+            {
+                'role': (message.get('role') or 'user').lower(),
+                'content': '\n'.join(
+                    line.rstrip() for line in (message.get('content') or '').replace('\r\n', '\n').strip().split('\n')
+                ),
+            }
+            for message in messages
+        ]
+        payload = json.dumps({
+            'model': model,
+            'messages': normalized,
+            'params': {k: v for k, v in (params or {}).items() if v is not None},
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_llm_response(self, fingerprint: str, user_id: int = None):
+        """
+        Get a cached LLM response.
+
+        Checks the in-process LRU first, then the shared cache (refreshing
+        the entry's TTL on a hit so popular responses stay cached).
+        """
+        key = CacheKeys.llm_response(fingerprint, user_id)
+        data = self.llm_responses.get(key) if self.enabled else None
+
+        if data is None:
+            data = self.get(key)
+            if data is not None:
+                self.llm_responses.set(key, data, CacheTimeout.LLM_RESPONSE)
+                try:
+                    self.cache.touch(key, CacheTimeout.LLM_RESPONSE)
+                except Exception as e:
+                    logger.warning(f"Cache touch error for key {key}: {e}")
+
+        if data is None:
+            metrics.counter('cache_misses_total', labels={'cache': CacheKeys.LLM_RESPONSE})
+        else:
+            metrics.counter('cache_hits_total', labels={'cache': CacheKeys.LLM_RESPONSE})
+        return data
+
+    def set_llm_response(self, fingerprint: str, data, user_id: int = None,
+                         timeout: int = None):
+        """Cache an LLM response in both tiers."""
+        key = CacheKeys.llm_response(fingerprint, user_id)
+        timeout = timeout or CacheTimeout.LLM_RESPONSE
+        if self.enabled:
+            self.llm_responses.set(key, data, timeout)
+        return self.set(key, data, timeout)
+
+    def invalidate_llm_response(self, fingerprint: str, user_id: int = None):
+        """Invalidate a cached LLM response."""
+        key = CacheKeys.llm_response(fingerprint, user_id)
+        self.llm_responses.delete(key)
+        return self.delete(key)
+
     # -------------------------------------------------------------------------
     # User-level Invalidation
     # -------------------------------------------------------------------------
@@ -60,6 +60,36 @@ CELERY_BEAT_SCHEDULE = {
         'options': {'queue': 'payments'},
     },
 
+    'release-expired-token-reservations': {
+        'task': 'coreapp.tasks.release_expired_token_reservations',
+        'schedule': timedelta(minutes=5),  # Every 5 minutes
+        'options': {'queue': 'subscriptions'},
+    },
+
+    'release-expired-upload-reservations': {
+        'task': 'coreapp.tasks.release_expired_upload_reservations',
+        'schedule': timedelta(minutes=30),  # Every 30 minutes
+        'options': {'queue': 'maintenance'},
+    },
+
+    'dispatch-due-scheduled-generations': {
+        'task': 'coreapp.tasks.dispatch_due_scheduled_generations',
+        'schedule': timedelta(minutes=1),  # Every minute
+        'options': {'queue': 'default'},
+    },
+
+    'recover-stalled-batch-jobs': {
+        'task': 'coreapp.tasks.recover_stalled_batch_jobs',
+        'schedule': timedelta(minutes=10),  # Every 10 minutes
+        'options': {'queue': 'default'},
+    },
+
+    'process-webhook-retries': {
+        'task': 'coreapp.tasks.process_webhook_retries',
+        'schedule': timedelta(minutes=1),  # Every minute
+        'options': {'queue': 'default'},
+    },
+
     'send-subscription-reminders': {
         'task': 'planandsubscription.tasks.send_subscription_reminders',
         'schedule': crontab(hour=10, minute=0),  # 10:00 AM daily
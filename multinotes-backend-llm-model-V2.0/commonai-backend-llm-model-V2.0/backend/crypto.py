@@ -3,9 +3,10 @@ Encryption Utilities for MultinotesAI.
 
 This module provides:
 - AES-256-GCM encryption for API keys
-- Secure key derivation
+- A keyring of versioned keys, each derived once per process
 - Token hashing
-- Data encryption/decryption
+- Data encryption/decryption, including a bulk path for whole columns
+- Lazy key rotation driven by a key-version header on the ciphertext
 
 Usage:
     from backend.crypto import encrypt_api_key, decrypt_api_key, hash_token
@@ -26,10 +27,13 @@ import hashlib
 import hmac
 import secrets
 import logging
-from typing import Optional, Tuple
-from functools import lru_cache
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from django.conf import settings
+from django.db import models
+from django.db.models import TextField, Value
+from django.db.models.functions import Cast
 
 logger = logging.getLogger(__name__)
 
@@ -60,28 +64,79 @@ ENCRYPTION_SALT = getattr(
 # Number of iterations for PBKDF2
 PBKDF2_ITERATIONS = getattr(settings, 'PBKDF2_ITERATIONS', 100000)
 
+# AES-GCM nonce length in bytes
+NONCE_SIZE = 12
+
 
 # =============================================================================
-# Key Derivation
+# Keyring
 # =============================================================================
 
-@lru_cache(maxsize=1)
-def _get_encryption_key() -> bytes:
+class Keyring:
     """
-    Derive encryption key from Django SECRET_KEY.
+    Versioned encryption keys, each derived once per process.
 
-    Uses PBKDF2 with SHA256 to derive a 256-bit key.
-    Result is cached for performance.
+    Version 1 is derived from SECRET_KEY; settings.ENCRYPTION_KEYS adds
+    further versions ({version: secret}) and settings.ENCRYPTION_KEY_VERSION
+    picks the one new ciphertext is written with (default: the highest).
+    Old versions stay readable until KeyRotator has moved their rows on.
 
-    Returns:
-        32-byte encryption key
+    Usage:
+        cipher = keyring.cipher(keyring.current_version)
     """
+
+    def __init__(self):
+        self._keys: Dict[int, bytes] = {}
+        self._ciphers: Dict[int, object] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def secrets(self) -> Dict[int, str]:
+        versions = {1: settings.SECRET_KEY}
+        versions.update(getattr(settings, 'ENCRYPTION_KEYS', {}) or {})
+        return versions
+
+    @property
+    def current_version(self) -> int:
+        return getattr(settings, 'ENCRYPTION_KEY_VERSION', None) or max(self.secrets)
+
+    def key(self, version: int) -> bytes:
+        """32-byte key for ``version`` (PBKDF2 runs on first use only)."""
+        key = self._keys.get(version)
+        if key is None:
+            with self._lock:
+                key = self._keys.get(version)
+                if key is None:
+                    secret = self.secrets.get(version)
+                    if secret is None:
+                        raise KeyError(f"Unknown encryption key version: {version}")
+                    key = self._keys[version] = _derive_key(secret)
+        return key
+
+    def cipher(self, version: int):
+        """Reusable AESGCM instance for ``version``."""
+        cipher = self._ciphers.get(version)
+        if cipher is None:
+            cipher = self._ciphers[version] = AESGCM(self.key(version))
+        return cipher
+
+    def clear(self):
+        """Forget derived keys (after the key settings change)."""
+        with self._lock:
+            self._keys.clear()
+            self._ciphers.clear()
+
+
+def _derive_key(secret: str) -> bytes:
+    """PBKDF2-SHA256 a 256-bit key from ``secret``."""
+    salt = ENCRYPTION_SALT if isinstance(ENCRYPTION_SALT, bytes) else ENCRYPTION_SALT.encode()
+
     if not CRYPTOGRAPHY_AVAILABLE:
         # Fallback: use hashlib
         return hashlib.pbkdf2_hmac(
             'sha256',
-            settings.SECRET_KEY.encode(),
-            ENCRYPTION_SALT,
+            secret.encode(),
+            salt,
             PBKDF2_ITERATIONS,
             dklen=32
         )
@@ -89,12 +144,25 @@ def _get_encryption_key() -> bytes:
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
         length=32,
-        salt=ENCRYPTION_SALT,
+        salt=salt,
         iterations=PBKDF2_ITERATIONS,
         backend=default_backend()
     )
 
-    return kdf.derive(settings.SECRET_KEY.encode())
+    return kdf.derive(secret.encode())
+
+
+def _get_encryption_key() -> bytes:
+    """
+    Current encryption key, derived from the configured secrets.
+
+    Uses PBKDF2 with SHA256 to derive a 256-bit key.
+    Result is cached by the keyring.
+
+    Returns:
+        32-byte encryption key
+    """
+    return keyring.key(keyring.current_version)
 
 
 def _get_fernet_key() -> bytes:
@@ -108,37 +176,64 @@ def _get_fernet_key() -> bytes:
     return base64.urlsafe_b64encode(raw_key)
 
 
+# =============================================================================
+# Ciphertext Header
+# =============================================================================
+
+def _add_header(version: int, payload: str) -> str:
+    """Prefix ciphertext with its key version: ``v<version>:<base64>``."""
+    return f"v{version}:{payload}"
+
+
+def _split_header(ciphertext: str) -> Tuple[int, str]:
+    """
+    Key version and base64 payload of a ciphertext.
+
+    Ciphertext written before versioning has no header and uses version 1
+    (the ':' never appears in urlsafe base64, so the two cannot be confused).
+    """
+    if ciphertext.startswith('v'):
+        version, sep, payload = ciphertext[1:].partition(':')
+        if sep and version.isdigit():
+            return int(version), payload
+    return 1, ciphertext
+
+
+def key_version(ciphertext: str) -> int:
+    """Key version a ciphertext was written with."""
+    return _split_header(ciphertext)[0]
+
+
 # =============================================================================
 # AES-GCM Encryption (Preferred)
 # =============================================================================
 
 def encrypt_aes_gcm(plaintext: str) -> str:
     """
-    Encrypt plaintext using AES-256-GCM.
+    Encrypt plaintext using AES-256-GCM with the current key version.
 
     Args:
         plaintext: String to encrypt
 
     Returns:
-        Base64-encoded ciphertext (format: nonce||ciphertext||tag)
+        Versioned ciphertext (format: v<version>:base64(nonce||ciphertext||tag))
     """
     if not CRYPTOGRAPHY_AVAILABLE:
         return encrypt_fernet_fallback(plaintext)
 
     try:
-        key = _get_encryption_key()
-        aesgcm = AESGCM(key)
+        version = keyring.current_version
 
         # Generate random 96-bit nonce
-        nonce = os.urandom(12)
+        nonce = os.urandom(NONCE_SIZE)
 
         # Encrypt
-        ciphertext = aesgcm.encrypt(nonce, plaintext.encode(), None)
+        ciphertext = keyring.cipher(version).encrypt(nonce, plaintext.encode(), None)
 
         # Combine nonce and ciphertext
         encrypted = nonce + ciphertext
 
-        return base64.urlsafe_b64encode(encrypted).decode()
+        return _add_header(version, base64.urlsafe_b64encode(encrypted).decode())
 
     except Exception as e:
         logger.error(f"Encryption failed: {e}")
@@ -147,10 +242,10 @@ def encrypt_aes_gcm(plaintext: str) -> str:
 
 def decrypt_aes_gcm(ciphertext: str) -> str:
     """
-    Decrypt AES-256-GCM encrypted ciphertext.
+    Decrypt AES-256-GCM encrypted ciphertext written with any key version.
 
     Args:
-        ciphertext: Base64-encoded encrypted data
+        ciphertext: Versioned (or legacy, unversioned) encrypted data
 
     Returns:
         Decrypted plaintext
@@ -159,24 +254,72 @@ def decrypt_aes_gcm(ciphertext: str) -> str:
         return decrypt_fernet_fallback(ciphertext)
 
     try:
-        key = _get_encryption_key()
-        aesgcm = AESGCM(key)
+        return _decrypt(ciphertext)
 
-        # Decode base64
-        encrypted = base64.urlsafe_b64decode(ciphertext)
+    except Exception as e:
+        logger.error(f"Decryption failed: {e}")
+        raise
 
-        # Extract nonce and ciphertext
-        nonce = encrypted[:12]
-        ciphertext_bytes = encrypted[12:]
 
-        # Decrypt
-        plaintext = aesgcm.decrypt(nonce, ciphertext_bytes, None)
+def _decrypt(ciphertext: str) -> str:
+    version, payload = _split_header(ciphertext)
 
-        return plaintext.decode()
+    # Decode base64
+    encrypted = base64.urlsafe_b64decode(payload)
 
-    except Exception as e:
-        logger.error(f"Decryption failed: {e}")
-        raise
+    # Extract nonce and ciphertext, then decrypt
+    plaintext = keyring.cipher(version).decrypt(encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], None)
+
+    return plaintext.decode()
+
+
+def decrypt_many(ciphertexts: Iterable[Optional[str]], strict: bool = False) -> List[Optional[str]]:
+    """
+    Decrypt a column of values in one pass.
+
+    Empty values pass through. Values that fail to decrypt are returned
+    as-is (legacy plaintext), or raise when ``strict``.
+
+    Args:
+        ciphertexts: Encrypted values, in any key version
+
+    Returns:
+        Plaintexts in the same order
+    """
+    if not CRYPTOGRAPHY_AVAILABLE:
+        return [decrypt_fernet_fallback(value) if value else value for value in ciphertexts]
+
+    results = []
+    failures = 0
+    for value in ciphertexts:
+        if not value:
+            results.append(value)
+            continue
+        try:
+            results.append(_decrypt(value))
+        except Exception:
+            if strict:
+                raise
+            failures += 1
+            results.append(value)
+
+    if failures:
+        logger.warning(f"{failures} values could not be decrypted and were returned as stored")
+    return results
+
+
+def decrypt_column(queryset, field_name: str) -> Dict[Any, Optional[str]]:
+    """
+    Decrypt one column of a queryset: {pk: plaintext}.
+
+    Reads the stored ciphertext directly (bypassing any per-row field
+    conversion) and decrypts it with decrypt_many.
+    """
+    rows = list(queryset.annotate(
+        _ciphertext=Cast(field_name, output_field=TextField())
+    ).values_list('pk', '_ciphertext'))
+
+    return dict(zip((pk for pk, _ in rows), decrypt_many(value for _, value in rows)))
 
 
 # =============================================================================
@@ -470,6 +613,9 @@ class EncryptedFieldMixin:
     """
     Mixin for Django model fields that should be encrypted.
 
+    Values are written with the current key version; rows written with an
+    older version are still read and move to the current one when saved.
+
     Usage:
         class MyModel(models.Model):
             api_key = EncryptedCharField(max_length=500)
@@ -492,6 +638,14 @@ class EncryptedFieldMixin:
         return encrypt_api_key(value)
 
 
+class EncryptedCharField(EncryptedFieldMixin, models.CharField):
+    """CharField stored encrypted (size max_length for the ciphertext)."""
+
+
+class EncryptedTextField(EncryptedFieldMixin, models.TextField):
+    """TextField stored encrypted."""
+
+
 # =============================================================================
 # Key Rotation
 # =============================================================================
@@ -500,14 +654,76 @@ class KeyRotator:
     """
     Handle encryption key rotation.
 
+    Rotation is lazy: after a new key version is configured, rows keep
+    decrypting with their own version and are re-encrypted whenever they
+    are saved. rotate() sweeps the rows still on an older version.
+
     Usage:
         rotator = KeyRotator()
-        rotator.rotate_key(old_key, new_key, Model, 'encrypted_field')
+        rotator.rotate(Model, 'encrypted_field')
     """
 
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
+    def needs_rotation(self, ciphertext: str) -> bool:
+        """True if the ciphertext was written with an older key version."""
+        return bool(ciphertext) and key_version(ciphertext) != keyring.current_version
+
+    def rotate(
+        self,
+        model_class,
+        field_name: str,
+        batch_size: int = 500
+    ) -> Tuple[int, int]:
+        """
+        Re-encrypt every row of ``field_name`` not on the current key version.
+
+        Only stale rows are read (filtered on the stored header), each batch
+        is decrypted in one pass and written back with one bulk_update.
+
+        Returns:
+            Tuple of (success_count, error_count)
+        """
+        if not CRYPTOGRAPHY_AVAILABLE:
+            raise RuntimeError("cryptography package required for key rotation")
+
+        success = 0
+        errors = 0
+
+        stale = model_class.objects.annotate(
+            _ciphertext=Cast(field_name, output_field=TextField())
+        ).exclude(_ciphertext__isnull=True).exclude(_ciphertext='').exclude(
+            _ciphertext__startswith=_add_header(keyring.current_version, '')
+        ).order_by('pk').values_list('pk', '_ciphertext')
+
+        last_pk = None
+        while True:
+            batch = list((stale.filter(pk__gt=last_pk) if last_pk is not None else stale)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+
+            updated = []
+            for pk, ciphertext in batch:
+                try:
+                    new_ciphertext = encrypt_aes_gcm(_decrypt(ciphertext))
+                except Exception as e:
+                    self.logger.error(f"Failed to rotate key for {pk}: {e}")
+                    errors += 1
+                    continue
+
+                obj = model_class(pk=pk)
+                # Stored as-is, bypassing the field's own encryption
+                setattr(obj, field_name, Value(new_ciphertext, output_field=TextField()))
+                updated.append(obj)
+
+            model_class.objects.bulk_update(updated, [field_name])
+            success += len(updated)
+
+        self.logger.info(f"Key rotation complete: {success} success, {errors} errors")
+        return success, errors
+
     def rotate_key(
         self,
         old_key: bytes,
@@ -567,9 +783,9 @@ class KeyRotator:
             raise RuntimeError("cryptography package required for key rotation")
 
         aesgcm = AESGCM(key)
-        encrypted = base64.urlsafe_b64decode(ciphertext)
-        nonce = encrypted[:12]
-        ciphertext_bytes = encrypted[12:]
+        encrypted = base64.urlsafe_b64decode(_split_header(ciphertext)[1])
+        nonce = encrypted[:NONCE_SIZE]
+        ciphertext_bytes = encrypted[NONCE_SIZE:]
         plaintext = aesgcm.decrypt(nonce, ciphertext_bytes, None)
         return plaintext.decode()
 
@@ -579,7 +795,7 @@ class KeyRotator:
             raise RuntimeError("cryptography package required for key rotation")
 
         aesgcm = AESGCM(key)
-        nonce = os.urandom(12)
+        nonce = os.urandom(NONCE_SIZE)
         ciphertext = aesgcm.encrypt(nonce, plaintext.encode(), None)
         encrypted = nonce + ciphertext
         return base64.urlsafe_b64encode(encrypted).decode()
@@ -589,4 +805,5 @@ class KeyRotator:
 # Singleton Instances
 # =============================================================================
 
+keyring = Keyring()
 key_rotator = KeyRotator()
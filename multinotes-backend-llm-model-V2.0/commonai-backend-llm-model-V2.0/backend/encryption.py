@@ -10,6 +10,7 @@ This module provides encryption/decryption functions for:
 import base64
 import hashlib
 import secrets
+from functools import lru_cache
 from typing import Optional
 from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
@@ -24,9 +25,10 @@ logger = logging.getLogger(__name__)
 # Key Derivation
 # =============================================================================
 
+@lru_cache(maxsize=1)
 def get_encryption_key() -> bytes:
     """
-    Derive an encryption key from Django's SECRET_KEY.
+    Derive an encryption key from Django's SECRET_KEY (once per process).
 
     Returns:
         bytes: 32-byte encryption key suitable for Fernet
@@ -44,8 +46,9 @@ def get_encryption_key() -> bytes:
     return key
 
 
+@lru_cache(maxsize=1)
 def get_fernet() -> Fernet:
-    """Get a Fernet instance with the derived key."""
+    """Get the (shared) Fernet instance for the derived key."""
     return Fernet(get_encryption_key())
 
 
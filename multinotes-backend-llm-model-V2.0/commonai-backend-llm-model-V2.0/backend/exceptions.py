@@ -69,6 +69,7 @@ class ErrorCodes:
     RES_INVALID_DATA = 'RES_003'
     RES_FILE_TOO_LARGE = 'RES_004'
     RES_INVALID_FILE_TYPE = 'RES_005'
+    RES_UPLOAD_FAILED = 'RES_006'
 
     # Server Errors (SRV_xxx)
     SRV_INTERNAL_ERROR = 'SRV_001'
@@ -212,6 +213,14 @@ class InvalidFileTypeError(BaseAPIException):
     error_code = ErrorCodes.RES_INVALID_FILE_TYPE
 
 
+class UploadFailedError(BaseAPIException):
+    """Raised when a direct-to-storage upload cannot be started or completed."""
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = 'The file upload could not be completed. Please try again.'
+    default_code = 'upload_failed'
+    error_code = ErrorCodes.RES_UPLOAD_FAILED
+
+
 # =============================================================================
 # CUSTOM EXCEPTION HANDLER
 # =============================================================================
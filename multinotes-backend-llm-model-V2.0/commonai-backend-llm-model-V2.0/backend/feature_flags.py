@@ -6,43 +6,28 @@ This module provides:
 - A/B testing support
 - Gradual rollout
 - User targeting
+
+Flags are evaluated in memory against a FlagSnapshot (backend.flag_engine)
+holding every flag and override. Each process reloads its snapshot only
+when the shared flag version changes, which saves to flags or overrides
+bump after commit.
 """
 
 import logging
-import random
-import hashlib
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Union
-from enum import Enum
+import time
+from threading import Lock
+from typing import Optional, List, Dict
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.conf import settings
 from django.utils import timezone
 from django.core.cache import cache
 
-logger = logging.getLogger(__name__)
-
-
-# =============================================================================
-# Feature Flag Types
-# =============================================================================
+from backend.flag_engine import CONTROL, FlagSnapshot, FlagStatus, FlagType
 
-class FlagType(Enum):
-    """Types of feature flags."""
-    BOOLEAN = 'boolean'  # Simple on/off
-    PERCENTAGE = 'percentage'  # Percentage rollout
-    USER_LIST = 'user_list'  # Specific users
-    SUBSCRIPTION = 'subscription'  # Based on subscription plan
-    DATE_RANGE = 'date_range'  # Time-based
-    AB_TEST = 'ab_test'  # A/B testing
-
-
-class FlagStatus(Enum):
-    """Feature flag status."""
-    ACTIVE = 'active'
-    INACTIVE = 'inactive'
-    SCHEDULED = 'scheduled'
-    ARCHIVED = 'archived'
+logger = logging.getLogger(__name__)
 
 
 # =============================================================================
@@ -175,10 +160,22 @@ class FeatureFlagService:
         variant = flags.get_variant('checkout_flow', user=user)
         if variant == 'variant_a':
             show_new_checkout()
+
+        # Every live flag at once
+        flags.evaluate_all(user)
     """
 
     CACHE_PREFIX = 'feature_flag:'
     CACHE_TIMEOUT = 60  # 1 minute
+    VERSION_KEY = f'{CACHE_PREFIX}version'
+    MAX_RECORDED_ASSIGNMENTS = 100000
+
+    def __init__(self, refresh_interval: float = None):
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[FlagSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = Lock()
+        self._recorded = set()
 
     def is_enabled(
         self,
@@ -194,41 +191,22 @@ class FeatureFlagService:
             flag_key: Feature flag key
             user: User to evaluate for
             default: Default value if flag not found
-            context: Additional context for evaluation
+            context: Additional context for evaluation; an 'identifier'
+                buckets anonymous users deterministically
 
         Returns:
             True if enabled, False otherwise
         """
-        flag = self._get_flag(flag_key)
-
-        if not flag:
-            return default
-
-        # Check status
-        if flag.status != FlagStatus.ACTIVE.value:
-            if flag.status == FlagStatus.SCHEDULED.value:
-                if not self._is_in_schedule(flag):
-                    return default
-            else:
-                return default
-
-        # Check user override first
-        if user:
-            override = self._get_override(flag, user)
-            if override is not None:
-                return override
-
-        # Evaluate based on flag type
-        return self._evaluate_flag(flag, user, context)
+        return self.snapshot().is_enabled(flag_key, user=user, default=default, context=context)
 
     def get_variant(
         self,
         flag_key: str,
         user=None,
-        default: str = 'control'
+        default: str = CONTROL
     ) -> str:
         """
-        Get A/B test variant for user.
+        Get A/B test variant for user, recording the assignment.
 
         Args:
             flag_key: Feature flag key
@@ -238,182 +216,135 @@ class FeatureFlagService:
         Returns:
             Variant name
         """
-        flag = self._get_flag(flag_key)
-
-        if not flag or flag.flag_type != FlagType.AB_TEST.value:
-            return default
-
-        if flag.status != FlagStatus.ACTIVE.value:
-            return default
-
-        # Check for override
-        if user:
-            override = FeatureFlagOverride.objects.filter(
-                flag=flag,
-                user=user
-            ).first()
-            if override and override.variant:
-                return override.variant
-
-        # Assign variant
-        return self._assign_variant(flag, user)
-
-    def _get_flag(self, key: str) -> Optional[FeatureFlag]:
-        """Get feature flag by key (with caching)."""
-        cache_key = f"{self.CACHE_PREFIX}{key}"
-        flag = cache.get(cache_key)
-
-        if flag is None:
-            try:
-                flag = FeatureFlag.objects.get(key=key)
-                cache.set(cache_key, flag, self.CACHE_TIMEOUT)
-            except FeatureFlag.DoesNotExist:
-                return None
-
-        return flag
-
-    def _get_override(self, flag: FeatureFlag, user) -> Optional[bool]:
-        """Get user-specific override."""
-        try:
-            override = FeatureFlagOverride.objects.get(flag=flag, user=user)
-            return override.value
-        except FeatureFlagOverride.DoesNotExist:
-            return None
-
-    def _evaluate_flag(
-        self,
-        flag: FeatureFlag,
-        user=None,
-        context: Dict = None
-    ) -> bool:
-        """Evaluate flag based on its type."""
-        flag_type = flag.flag_type
-        config = flag.config or {}
-
-        if flag_type == FlagType.BOOLEAN.value:
-            return flag.default_value
-
-        elif flag_type == FlagType.PERCENTAGE.value:
-            percentage = config.get('percentage', 0)
-            return self._check_percentage(flag.key, user, percentage)
-
-        elif flag_type == FlagType.USER_LIST.value:
-            if not user:
-                return flag.default_value
-            user_ids = config.get('user_ids', [])
-            user_emails = config.get('user_emails', [])
-            return user.id in user_ids or user.email in user_emails
-
-        elif flag_type == FlagType.SUBSCRIPTION.value:
-            if not user:
-                return flag.default_value
-            allowed_plans = config.get('plans', [])
-            return self._check_subscription(user, allowed_plans)
-
-        elif flag_type == FlagType.DATE_RANGE.value:
-            return self._is_in_schedule(flag)
-
-        elif flag_type == FlagType.AB_TEST.value:
-            # For A/B tests, is_enabled returns True if user gets any variant
-            variant = self._assign_variant(flag, user)
-            return variant != 'control'
-
-        return flag.default_value
-
-    def _check_percentage(
-        self,
-        flag_key: str,
-        user,
-        percentage: int
-    ) -> bool:
-        """Check percentage-based rollout."""
-        # Use deterministic hash for consistent user experience
-        if user:
-            identifier = f"{flag_key}:{user.id}"
-        else:
-            identifier = f"{flag_key}:{random.random()}"
-
-        hash_value = int(hashlib.md5(identifier.encode()).hexdigest(), 16)
-        user_percentage = hash_value % 100
+        snapshot = self.snapshot()
+        variant = snapshot.get_variant(flag_key, user=user, default=default)
 
-        return user_percentage < percentage
+        flag = snapshot.flags.get(flag_key)
+        if user and flag and flag.flag_type == FlagType.AB_TEST.value and flag.status == FlagStatus.ACTIVE.value:
+            override = snapshot.override(flag, user)
+            if not (override and override[1]):
+                self._record_variant_assignment(flag.flag_id, user, variant)
 
-    def _check_subscription(self, user, allowed_plans: List[str]) -> bool:
-        """Check if user's subscription plan is allowed."""
-        try:
-            from planandsubscription.models import Subscription
-
-            subscription = Subscription.objects.filter(
-                user=user,
-                status='active',
-                is_delete=False
-            ).select_related('plan').first()
-
-            if subscription and subscription.plan:
-                plan_name = subscription.plan.name.lower()
-                return any(p.lower() in plan_name for p in allowed_plans)
-
-            return False
-        except Exception:
-            return False
-
-    def _is_in_schedule(self, flag: FeatureFlag) -> bool:
-        """Check if current time is within flag's schedule."""
-        now = timezone.now()
-
-        if flag.start_date and now < flag.start_date:
-            return False
-        if flag.end_date and now > flag.end_date:
-            return False
+        return variant
 
-        return True
-
-    def _assign_variant(self, flag: FeatureFlag, user) -> str:
-        """Assign A/B test variant to user."""
-        config = flag.config or {}
-        variants = config.get('variants', ['control', 'variant'])
-        weights = config.get('weights', [50, 50])
-
-        if not variants:
-            return 'control'
-
-        # Deterministic assignment based on user
-        if user:
-            identifier = f"{flag.key}:{user.id}"
-        else:
-            identifier = f"{flag.key}:{random.random()}"
-
-        hash_value = int(hashlib.md5(identifier.encode()).hexdigest(), 16)
-        user_percentage = hash_value % 100
-
-        # Select variant based on weights
-        cumulative = 0
-        for variant, weight in zip(variants, weights):
-            cumulative += weight
-            if user_percentage < cumulative:
-                # Record variant assignment
-                if user:
-                    self._record_variant_assignment(flag, user, variant)
-                return variant
-
-        return variants[-1]
+    def evaluate_all(self, user=None, context: Dict = None) -> Dict[str, bool]:
+        """Evaluate every live flag for a user in one pass."""
+        return self.snapshot().evaluate_all(user=user, context=context)
 
     def _record_variant_assignment(
         self,
-        flag: FeatureFlag,
+        flag_id: int,
         user,
         variant: str
     ):
-        """Record A/B test variant assignment."""
+        """Record A/B test variant assignment (once per user per process)."""
+        marker = (flag_id, user.id)
+        if marker in self._recorded:
+            return
         try:
             ABTestResult.objects.get_or_create(
-                flag=flag,
+                flag_id=flag_id,
                 user=user,
                 defaults={'variant': variant}
             )
+            if len(self._recorded) >= self.MAX_RECORDED_ASSIGNMENTS:
+                self._recorded.clear()
+            self._recorded.add(marker)
         except Exception as e:
             logger.error(f"Error recording variant assignment: {e}")
 
+    # -------------------------------------------------------------------------
+    # Snapshot
+    # -------------------------------------------------------------------------
+
+    def snapshot(self) -> FlagSnapshot:
+        """
+        The current flag snapshot.
+
+        The shared version is read at most once per refresh interval; the
+        snapshot is rebuilt when it changed, or after CACHE_TIMEOUT when
+        the version cannot be read.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < self._refresh_interval():
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and now - self._checked_at < self._refresh_interval():
+                return snapshot
+
+            version = self._current_version()
+            stale = snapshot is None or (
+                snapshot.version != version if version is not None
+                else now - snapshot.loaded_at >= self.CACHE_TIMEOUT
+            )
+            if stale:
+                snapshot = self._load_snapshot(version, now)
+                self._snapshot = snapshot
+            self._checked_at = now
+            return snapshot
+
+    def invalidate(self):
+        """Bump the shared version once the current transaction commits."""
+        transaction.on_commit(self._bump_version)
+
+    def _bump_version(self):
+        self._snapshot = None
+        try:
+            cache.add(self.VERSION_KEY, 0, None)
+            cache.incr(self.VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"Failed to bump feature flag version: {e}")
+
+    def _current_version(self) -> Optional[int]:
+        try:
+            return cache.get(self.VERSION_KEY, 0)
+        except Exception as e:
+            logger.warning(f"Feature flag version unavailable: {e}")
+            return None
+
+    def _refresh_interval(self) -> float:
+        if self.refresh_interval is not None:
+            return self.refresh_interval
+        return getattr(settings, 'FEATURE_FLAG_REFRESH_INTERVAL', 5)
+
+    def _load_snapshot(self, version: Optional[int], now: float) -> FlagSnapshot:
+        """Build a snapshot from every flag and override (two queries)."""
+        try:
+            flag_rows = FeatureFlag.objects.exclude(
+                status__in=[FlagStatus.INACTIVE.value, FlagStatus.ARCHIVED.value]
+            ).values('id', 'key', 'flag_type', 'status', 'default_value', 'config', 'start_date', 'end_date')
+            flag_rows = list(flag_rows)
+            override_rows = FeatureFlagOverride.objects.filter(
+                flag_id__in=[row['id'] for row in flag_rows]
+            ).values_list('flag_id', 'user_id', 'value', 'variant')
+            override_rows = list(override_rows)
+        except Exception as e:
+            logger.error(f"Error loading feature flags: {e}")
+            if self._snapshot is not None:
+                return self._snapshot
+            flag_rows, override_rows, version = [], [], None
+
+        return FlagSnapshot.build(
+            flag_rows,
+            override_rows,
+            version=version,
+            loaded_at=now,
+            plan_lookup=self._plan_name,
+        )
+
+    @staticmethod
+    def _plan_name(user) -> str:
+        """Name of the user's active subscription plan, from entitlements."""
+        from coreapp.services.entitlements import entitlement_service
+
+        entitlements = entitlement_service.for_user(user)
+        if entitlements.subscription_status != 'active':
+            return ''
+        return entitlements.plan_name or ''
+
     # -------------------------------------------------------------------------
     # Management Methods
     # -------------------------------------------------------------------------
@@ -455,9 +386,6 @@ class FeatureFlagService:
 
             flag.save()
 
-            # Clear cache
-            cache.delete(f"{self.CACHE_PREFIX}{key}")
-
             return flag
         except FeatureFlag.DoesNotExist:
             return None
@@ -467,7 +395,6 @@ class FeatureFlagService:
         try:
             flag = FeatureFlag.objects.get(key=key)
             flag.delete()
-            cache.delete(f"{self.CACHE_PREFIX}{key}")
             return True
         except FeatureFlag.DoesNotExist:
             return False
@@ -509,11 +436,7 @@ class FeatureFlagService:
 
     def get_user_flags(self, user) -> Dict[str, bool]:
         """Get all flag values for a user."""
-        flags = self.get_all_flags(active_only=True)
-        return {
-            flag.key: self.is_enabled(flag.key, user=user)
-            for flag in flags
-        }
+        return self.evaluate_all(user)
 
     # -------------------------------------------------------------------------
     # A/B Test Analytics
@@ -576,3 +499,12 @@ class FeatureFlagService:
 # =============================================================================
 
 feature_flags = FeatureFlagService()
+
+
+@receiver(post_save, sender=FeatureFlag)
+@receiver(post_delete, sender=FeatureFlag)
+@receiver(post_save, sender=FeatureFlagOverride)
+@receiver(post_delete, sender=FeatureFlagOverride)
+def invalidate_flag_snapshot(sender, **kwargs):
+    """Publish a new flag version when a flag or override changes."""
+    feature_flags.invalidate()
@@ -0,0 +1,265 @@
+"""
+Feature Flag Evaluation Engine for MultinotesAI.
+
+This module provides:
+- Flags compiled once into immutable, evaluation-ready records
+- A snapshot of every live flag with a compact per-flag override map
+- In-memory evaluation of single flags, A/B variants and all flags at once
+- Deterministic hash buckets for percentage rollouts and variants
+
+The engine has no database access: FeatureFlagService (backend.feature_flags)
+loads rows into a FlagSnapshot and swaps in a new one when the flag version
+changes, so evaluating a flag on a hot path costs microseconds.
+"""
+
+import hashlib
+import random
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from django.utils import timezone
+
+
+# =============================================================================
+# Feature Flag Types
+# =============================================================================
+
+class FlagType(Enum):
+    """Types of feature flags."""
+    BOOLEAN = 'boolean'  # Simple on/off
+    PERCENTAGE = 'percentage'  # Percentage rollout
+    USER_LIST = 'user_list'  # Specific users
+    SUBSCRIPTION = 'subscription'  # Based on subscription plan
+    DATE_RANGE = 'date_range'  # Time-based
+    AB_TEST = 'ab_test'  # A/B testing
+
+
+class FlagStatus(Enum):
+    """Feature flag status."""
+    ACTIVE = 'active'
+    INACTIVE = 'inactive'
+    SCHEDULED = 'scheduled'
+    ARCHIVED = 'archived'
+
+
+CONTROL = 'control'
+
+
+def bucket(flag_key: str, identifier: Any) -> int:
+    """Stable 0-99 bucket of an identity for a flag."""
+    digest = hashlib.md5(f"{flag_key}:{identifier}".encode()).digest()
+    return int.from_bytes(digest, 'big') % 100
+
+
+# =============================================================================
+# Compiled Flags
+# =============================================================================
+
+@dataclass(frozen=True)
+class CompiledFlag:
+    """A flag row with its config parsed into lookup-ready fields."""
+    flag_id: int
+    key: str
+    flag_type: str
+    status: str
+    default_value: bool = False
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    percentage: int = 0
+    user_ids: frozenset = frozenset()
+    user_emails: frozenset = frozenset()
+    plans: Tuple[str, ...] = ()
+    variants: Tuple[str, ...] = ()
+    thresholds: Tuple[int, ...] = ()  # cumulative variant weights
+
+    @classmethod
+    def compile(cls, row: Mapping[str, Any]) -> 'CompiledFlag':
+        config = row.get('config') or {}
+        variants = tuple(config.get('variants', [CONTROL, 'variant']))
+        thresholds, cumulative = [], 0
+        for weight in config.get('weights', [50, 50]):
+            cumulative += weight
+            thresholds.append(cumulative)
+
+        return cls(
+            flag_id=row['id'],
+            key=row['key'],
+            flag_type=row['flag_type'],
+            status=row['status'],
+            default_value=row.get('default_value', False),
+            start_date=row.get('start_date'),
+            end_date=row.get('end_date'),
+            percentage=config.get('percentage', 0),
+            user_ids=frozenset(config.get('user_ids', [])),
+            user_emails=frozenset(config.get('user_emails', [])),
+            plans=tuple(plan.lower() for plan in config.get('plans', [])),
+            variants=variants,
+            thresholds=tuple(thresholds),
+        )
+
+    def in_schedule(self, now: datetime) -> bool:
+        if self.start_date and now < self.start_date:
+            return False
+        if self.end_date and now > self.end_date:
+            return False
+        return True
+
+    def is_live(self, now: datetime) -> bool:
+        if self.status == FlagStatus.ACTIVE.value:
+            return True
+        return self.status == FlagStatus.SCHEDULED.value and self.in_schedule(now)
+
+    def variant_for(self, identifier: Any) -> str:
+        if not self.variants:
+            return CONTROL
+        position = bucket(self.key, identifier)
+        for variant, threshold in zip(self.variants, self.thresholds):
+            if position < threshold:
+                return variant
+        return self.variants[-1]
+
+
+# =============================================================================
+# Snapshot
+# =============================================================================
+
+class FlagSnapshot:
+    """
+    Immutable view of every live flag and its per-user overrides.
+
+    Usage:
+        snapshot = FlagSnapshot.build(flag_rows, override_rows, version=3)
+        snapshot.is_enabled('new_dashboard', user=user)
+        snapshot.evaluate_all(user)
+
+    Overrides are held per flag as {user_id: (value, variant)}.
+    ``plan_lookup(user)`` returns the user's active plan name for
+    subscription-targeted flags.
+    """
+
+    __slots__ = ('flags', 'overrides', 'version', 'loaded_at', 'plan_lookup')
+
+    def __init__(
+        self,
+        flags: Dict[str, CompiledFlag],
+        overrides: Dict[int, Dict[int, Tuple[bool, str]]],
+        version: Any = None,
+        loaded_at: float = 0.0,
+        plan_lookup: Callable = None,
+    ):
+        self.flags = MappingProxyType(flags)
+        self.overrides = MappingProxyType({
+            flag_id: MappingProxyType(by_user) for flag_id, by_user in overrides.items()
+        })
+        self.version = version
+        self.loaded_at = loaded_at
+        self.plan_lookup = plan_lookup
+
+    @classmethod
+    def build(
+        cls,
+        flag_rows: Iterable[Mapping[str, Any]],
+        override_rows: Iterable[Tuple[int, int, bool, str]],
+        **kwargs
+    ) -> 'FlagSnapshot':
+        """Compile flag rows and (flag_id, user_id, value, variant) override rows."""
+        flags = {row['key']: CompiledFlag.compile(row) for row in flag_rows}
+        overrides: Dict[int, Dict[int, Tuple[bool, str]]] = {}
+        for flag_id, user_id, value, variant in override_rows:
+            overrides.setdefault(flag_id, {})[user_id] = (value, variant or '')
+        return cls(flags, overrides, **kwargs)
+
+    # -------------------------------------------------------------------------
+    # Evaluation
+    # -------------------------------------------------------------------------
+
+    def is_enabled(self, flag_key: str, user=None, default: bool = False, context: Dict = None) -> bool:
+        flag = self.flags.get(flag_key)
+        if flag is None or not flag.is_live(timezone.now()):
+            return default
+        return self._evaluate(flag, user, context, {})
+
+    def get_variant(self, flag_key: str, user=None, default: str = CONTROL) -> str:
+        flag = self.flags.get(flag_key)
+        if flag is None or flag.flag_type != FlagType.AB_TEST.value:
+            return default
+        if flag.status != FlagStatus.ACTIVE.value:
+            return default
+
+        override = self.override(flag, user)
+        if override is not None and override[1]:
+            return override[1]
+        return flag.variant_for(self._identity(user, None))
+
+    def evaluate_all(self, user=None, context: Dict = None) -> Dict[str, bool]:
+        """Every live flag for one user, sharing the clock and plan lookup."""
+        now = timezone.now()
+        memo: Dict[str, Any] = {}
+        return {
+            key: self._evaluate(flag, user, context, memo)
+            for key, flag in self.flags.items()
+            if flag.is_live(now)
+        }
+
+    def override(self, flag: CompiledFlag, user) -> Optional[Tuple[bool, str]]:
+        if user is None:
+            return None
+        by_user = self.overrides.get(flag.flag_id)
+        return by_user.get(user.id) if by_user else None
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _evaluate(self, flag: CompiledFlag, user, context: Optional[Dict], memo: Dict[str, Any]) -> bool:
+        override = self.override(flag, user)
+        if override is not None:
+            return override[0]
+
+        flag_type = flag.flag_type
+        if flag_type == FlagType.BOOLEAN.value:
+            return flag.default_value
+
+        if flag_type == FlagType.PERCENTAGE.value:
+            return bucket(flag.key, self._identity(user, context)) < flag.percentage
+
+        if flag_type == FlagType.USER_LIST.value:
+            if not user:
+                return flag.default_value
+            return user.id in flag.user_ids or getattr(user, 'email', None) in flag.user_emails
+
+        if flag_type == FlagType.SUBSCRIPTION.value:
+            if not user:
+                return flag.default_value
+            if 'plan' not in memo:
+                memo['plan'] = self._plan_name(user)
+            return any(plan in memo['plan'] for plan in flag.plans)
+
+        if flag_type == FlagType.DATE_RANGE.value:
+            return flag.in_schedule(timezone.now())
+
+        if flag_type == FlagType.AB_TEST.value:
+            # For A/B tests, is_enabled returns True if user gets any variant
+            return flag.variant_for(self._identity(user, context)) != CONTROL
+
+        return flag.default_value
+
+    def _plan_name(self, user) -> str:
+        if self.plan_lookup is None:
+            return ''
+        try:
+            return (self.plan_lookup(user) or '').lower()
+        except Exception:
+            return ''
+
+    @staticmethod
+    def _identity(user, context: Optional[Dict]):
+        """User id, else a caller-supplied identifier, else a coin flip."""
+        if user:
+            return user.id
+        if context and context.get('identifier') is not None:
+            return context['identifier']
+        return random.random()
@@ -0,0 +1,193 @@
+"""
+Buffered Log Writer for MultinotesAI.
+
+This module provides:
+- A bounded in-process buffer for request, audit and API usage log rows
+- A background flusher that writes them with bulk_create in batches
+- A drop counter when the buffer is full (logging never blocks a request)
+- Response size counting that does not materialize streaming bodies
+
+Log rows are built as unsaved model instances on the request path and
+appended to the buffer, which costs no database round-trip. The flusher
+wakes every LOG_WRITER_FLUSH_INTERVAL seconds, or as soon as a batch is
+full, and groups pending rows by model into one INSERT per batch.
+
+Rows get their auto_now_add timestamps when they are flushed, so those lag
+the event by at most the flush interval.
+"""
+
+import logging
+from collections import deque
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from backend.background_flusher import BackgroundFlusher
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Log Writer
+# =============================================================================
+
+class BufferedLogWriter(BackgroundFlusher):
+    """
+    Append log rows without touching the database; a thread writes them in bulk.
+
+    Usage:
+        log_writer.append(RequestLog(request_id=..., method='GET', ...))
+        log_writer.flush()  # write everything pending now (tests, shutdown)
+    """
+
+    thread_name = 'log-writer'
+
+    def __init__(self, max_size: int = None, batch_size: int = None,
+                 flush_interval: float = None, background: bool = True):
+        super().__init__(
+            flush_interval=flush_interval or getattr(settings, 'LOG_WRITER_FLUSH_INTERVAL', 1.0),
+            background=background,
+        )
+        self.max_size = max_size or getattr(settings, 'LOG_WRITER_BUFFER_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'LOG_WRITER_BATCH_SIZE', 500)
+
+        self._buffer = deque()
+
+        self.dropped = 0
+        self.written = 0
+        self.failed = 0
+
+    # -------------------------------------------------------------------------
+    # Request Path
+    # -------------------------------------------------------------------------
+
+    def append(self, instance) -> bool:
+        """
+        Queue an unsaved model instance for writing.
+
+        Returns:
+            False if the buffer was full and the row was dropped
+        """
+        with self._lock:
+            if len(self._buffer) >= self.max_size:
+                self.dropped += 1
+                metrics.counter('log_writer_dropped_total', labels={'model': instance._meta.label})
+                return False
+            self._buffer.append(instance)
+            pending = len(self._buffer)
+
+        if self.background:
+            self._ensure_running()
+            if pending >= self.batch_size:
+                self._wakeup.set()
+        return True
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def stats(self) -> Dict:
+        return {
+            'pending': self.pending(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+    # -------------------------------------------------------------------------
+    # Flushing
+    # -------------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write everything queued so far; returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._take(self.batch_size)
+                if not batch:
+                    break
+                written += self._write(batch)
+        return written
+
+    def _take(self, count: int) -> List:
+        with self._lock:
+            return [self._buffer.popleft() for _ in range(min(count, len(self._buffer)))]
+
+    def _write(self, batch: List) -> int:
+        """bulk_create the batch per model; a bad row only costs itself."""
+        by_model = {}
+        for instance in batch:
+            by_model.setdefault(type(instance), []).append(instance)
+
+        written = 0
+        for model, rows in by_model.items():
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_create(rows)
+                written += len(rows)
+            except IntegrityError:
+                # e.g. the user was deleted after the request; keep the rest
+                for row in rows:
+                    try:
+                        with transaction.atomic():
+                            row.save(force_insert=True)
+                        written += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.warning(f"Dropped {model._meta.label} log row: {e}")
+            except Exception as e:
+                self.failed += len(rows)
+                logger.error(f"Failed to write {len(rows)} {model._meta.label} log rows: {e}")
+
+        self.written += written
+        return written
+
+
+# =============================================================================
+# Response Size
+# =============================================================================
+
+def measure_response(response, on_complete: Callable[[int], None]):
+    """
+    Call ``on_complete(size)`` with the response body size in bytes.
+
+    Regular responses are measured right away. Streaming responses are
+    counted chunk by chunk as they are sent, and ``on_complete`` runs when
+    the stream ends, so the body is never held in memory.
+    """
+    if not getattr(response, 'streaming', False):
+        on_complete(len(response.content) if hasattr(response, 'content') else 0)
+        return response
+
+    is_async = getattr(response, 'is_async', False)
+    content = response.streaming_content
+
+    if is_async:
+        async def counted():
+            size = 0
+            try:
+                async for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                on_complete(size)
+    else:
+        def counted():
+            size = 0
+            try:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                on_complete(size)
+
+    response.streaming_content = counted()
+    return response
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+log_writer = BufferedLogWriter()
@@ -0,0 +1,380 @@
+"""
+Rate Limiting Engine for MultinotesAI.
+
+This module provides:
+- Sliding-window and GCRA (token bucket) limits, evaluated atomically in
+  Redis by one Lua script
+- Constant memory per key: a window counter pair or a single timestamp,
+  never a list of request times
+- Batched checks of several limits in one round trip, consuming from none
+  of them unless all allow the request
+- An in-process fallback with the same arithmetic, used in tests and while
+  Redis is unavailable
+
+The DRF throttles, API key limits, abuse detection and the batch/provider
+token buckets all draw from this engine, so concurrent requests on any
+node see one count.
+"""
+
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass, replace
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+SLIDING_WINDOW = 'sliding_window'
+GCRA = 'gcra'
+
+KEY_PREFIX = 'ratelimit'
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+# Local fallback: drop expired keys once the table grows past this
+LOCAL_PRUNE_THRESHOLD = 10000
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass(frozen=True)
+class Limit:
+    """
+    A limit of ``limit`` requests per ``period`` seconds on one key.
+
+    Sliding windows weight the previous fixed window's count by how much of
+    it still overlaps the trailing period. GCRA allows ``burst`` requests
+    at once (default: ``limit``) and then one every period / limit seconds.
+    """
+    key: str
+    limit: int
+    period: float
+    algorithm: str = SLIDING_WINDOW
+    burst: Optional[int] = None
+    cost: int = 1
+
+    @classmethod
+    def from_rate(cls, key: str, rate: str, **kwargs) -> 'Limit':
+        """Build a limit from a rate string such as '60/minute' or '5/m'."""
+        limit, period = parse_rate(rate)
+        return cls(key=key, limit=limit, period=period, **kwargs)
+
+
+@dataclass(frozen=True)
+class Decision:
+    """Outcome of checking one limit."""
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float = 0.0  # seconds until the request would be allowed
+    reset_after: float = 0.0  # seconds until the key is back to a clean slate
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """Parse 'N/period' (s, m, h, d or their full names) into (N, seconds)."""
+    match = re.match(r'^\s*(\d+)\s*/\s*([smhd])', (rate or '').lower())
+    if not match:
+        raise ValueError(f"Invalid rate format: {rate}")
+    return int(match.group(1)), PERIODS[match.group(2)]
+
+
+# =============================================================================
+# Redis Script
+# =============================================================================
+
+# KEYS: one per limit. ARGV: now, then algorithm, limit, period, burst, cost
+# per key. Returns allowed, remaining, retry_after, reset_after per key.
+# Writes happen only once every key has allowed the request.
+LIMIT_SCRIPT = """
+local now = tonumber(ARGV[1])
+local results = {}
+local writes = {}
+local all_allowed = true
+
+for i, key in ipairs(KEYS) do
+    local base = 1 + (i - 1) * 5
+    local algorithm = ARGV[base + 1]
+    local limit = tonumber(ARGV[base + 2])
+    local period = tonumber(ARGV[base + 3])
+    local burst = tonumber(ARGV[base + 4])
+    local cost = tonumber(ARGV[base + 5])
+    local allowed, remaining, retry_after, reset_after = 0, 0, 0, 0
+
+    if algorithm == 'gcra' then
+        local emission = period / limit
+        local tolerance = emission * burst
+        local tat = tonumber(redis.call('GET', key)) or now
+        if tat < now then tat = now end
+        local new_tat = tat + emission * cost
+        local allow_at = new_tat - tolerance
+        if now >= allow_at then
+            allowed = 1
+            remaining = math.floor((now - allow_at) / emission)
+            reset_after = new_tat - now
+            if cost > 0 then
+                writes[#writes + 1] = {'gcra', key, new_tat, math.ceil((new_tat - now) * 1000) + 1}
+            end
+        else
+            retry_after = allow_at - now
+            reset_after = tat - now
+        end
+    else
+        local window = math.floor(now / period)
+        local state = redis.call('HMGET', key, 'w', 'c', 'p')
+        local current, previous = 0, 0
+        local stored = tonumber(state[1])
+        if stored == window then
+            current = tonumber(state[2]) or 0
+            previous = tonumber(state[3]) or 0
+        elseif stored == window - 1 then
+            previous = tonumber(state[2]) or 0
+        end
+        local elapsed = now - window * period
+        local used = previous * (1 - elapsed / period) + current
+        if used + cost <= limit then
+            allowed = 1
+            remaining = math.floor(limit - used - cost)
+            current = current + cost
+            if cost > 0 then
+                writes[#writes + 1] = {'window', key, window, current, previous, math.ceil(2 * period * 1000)}
+            end
+        elseif current + cost <= limit then
+            retry_after = period * (1 - (limit - current - cost) / previous) - elapsed
+        elseif cost <= limit then
+            retry_after = period - elapsed + math.max(0, period * (1 - (limit - cost) / current))
+        else
+            retry_after = 2 * period - elapsed
+        end
+        if current > 0 then
+            reset_after = 2 * period - elapsed
+        elseif previous > 0 then
+            reset_after = period - elapsed
+        end
+    end
+
+    if allowed == 0 then all_allowed = false end
+    results[#results + 1] = allowed
+    results[#results + 1] = remaining
+    results[#results + 1] = tostring(retry_after)
+    results[#results + 1] = tostring(reset_after)
+end
+
+if all_allowed then
+    for _, write in ipairs(writes) do
+        if write[1] == 'gcra' then
+            redis.call('SET', write[2], tostring(write[3]), 'PX', write[4])
+        else
+            redis.call('HSET', write[2], 'w', write[3], 'c', write[4], 'p', write[5])
+            redis.call('PEXPIRE', write[2], write[6])
+        end
+    end
+end
+return results
+"""
+
+_limit_script_obj = None
+
+
+def _limit_script():
+    """The registered limit script, or None when the cache is not Redis."""
+    global _limit_script_obj
+    if _limit_script_obj is None:
+        try:
+            from django_redis import get_redis_connection
+            _limit_script_obj = get_redis_connection('default').register_script(LIMIT_SCRIPT)
+        except Exception as e:
+            logger.warning(f"Shared rate limiting unavailable, using in-process limits: {e}")
+            _limit_script_obj = False
+    return _limit_script_obj or None
+
+
+# =============================================================================
+# Local Arithmetic (mirrors LIMIT_SCRIPT)
+# =============================================================================
+
+def _sliding_window(state, now: float, limit: Limit):
+    """Evaluate a sliding window; returns (decision, new state or None)."""
+    period, cost = limit.period, limit.cost
+    window = math.floor(now / period)
+    current = previous = 0
+    if state and state[0] == window:
+        _, current, previous = state
+    elif state and state[0] == window - 1:
+        previous = state[1]
+
+    elapsed = now - window * period
+    used = previous * (1 - elapsed / period) + current
+    allowed = used + cost <= limit.limit
+    remaining, retry_after, write = 0, 0.0, None
+    if allowed:
+        remaining = math.floor(limit.limit - used - cost)
+        current += cost
+        if cost > 0:
+            write = ((window, current, previous), 2 * period)
+    elif current + cost <= limit.limit:
+        retry_after = period * (1 - (limit.limit - current - cost) / previous) - elapsed
+    elif cost <= limit.limit:
+        retry_after = period - elapsed + max(0, period * (1 - (limit.limit - cost) / current))
+    else:
+        retry_after = 2 * period - elapsed
+
+    if current > 0:
+        reset_after = 2 * period - elapsed
+    elif previous > 0:
+        reset_after = period - elapsed
+    else:
+        reset_after = 0.0
+    return Decision(allowed, limit.limit, remaining, retry_after, reset_after), write
+
+
+def _gcra(tat, now: float, limit: Limit):
+    """Evaluate GCRA; returns (decision, new state or None)."""
+    emission = limit.period / limit.limit
+    tolerance = emission * (limit.burst or limit.limit)
+    tat = max(tat if tat is not None else now, now)
+    new_tat = tat + emission * limit.cost
+    allow_at = new_tat - tolerance
+
+    if now >= allow_at:
+        remaining = math.floor((now - allow_at) / emission)
+        write = (new_tat, new_tat - now) if limit.cost > 0 else None
+        return Decision(True, limit.limit, remaining, 0.0, new_tat - now), write
+    return Decision(False, limit.limit, 0, allow_at - now, tat - now), None
+
+
+# =============================================================================
+# Rate Limit Engine
+# =============================================================================
+
+class RateLimitEngine:
+    """
+    Check and consume rate limits atomically.
+
+    Usage:
+        decision = rate_limiter.check(Limit.from_rate(f"user:{user.id}", '60/minute'))
+        if not decision.allowed:
+            raise Throttled(wait=decision.retry_after)
+
+        # Several limits at once: nothing is consumed unless all allow
+        burst, hourly = rate_limiter.check_many([
+            Limit(f"login:{ip}", 5, 60),
+            Limit(f"login:{ip}:hour", 20, 3600),
+        ])
+    """
+
+    def __init__(self, prefix: str = KEY_PREFIX, use_redis: bool = True):
+        self.prefix = prefix
+        self.use_redis = use_redis
+        self._local: Dict[str, tuple] = {}
+        self._lock = Lock()
+
+    # -------------------------------------------------------------------------
+    # Checks
+    # -------------------------------------------------------------------------
+
+    def check(self, limit: Limit) -> Decision:
+        """Count one request against a limit."""
+        return self.check_many([limit])[0]
+
+    def peek(self, limit: Limit) -> Decision:
+        """Report a limit's state without counting a request."""
+        return self.check(replace(limit, cost=0))
+
+    def check_many(self, limits: Sequence[Limit]) -> List[Decision]:
+        """
+        Check several limits (on distinct keys) in one atomic step.
+
+        Every limit is charged only if all of them allow the request, so a
+        burst limit and a sustained limit never drift apart.
+        """
+        if not limits:
+            return []
+
+        now = time.time()
+        script = _limit_script() if self.use_redis else None
+        if script is not None:
+            try:
+                return self._check_redis(script, limits, now)
+            except Exception as e:
+                logger.warning(f"Shared rate limit check failed, using in-process limits: {e}")
+        return self._check_local(limits, now)
+
+    def reset(self, *keys: str):
+        """Forget the state of the given keys."""
+        full_keys = [self._key(key) for key in keys]
+        with self._lock:
+            for key in full_keys:
+                self._local.pop(key, None)
+
+        script = _limit_script() if self.use_redis else None
+        if script is not None and full_keys:
+            try:
+                script.registered_client.delete(*full_keys)
+            except Exception as e:
+                logger.warning(f"Failed to reset rate limits {full_keys}: {e}")
+
+    # -------------------------------------------------------------------------
+    # Backends
+    # -------------------------------------------------------------------------
+
+    def _check_redis(self, script, limits: Sequence[Limit], now: float) -> List[Decision]:
+        args = [now]
+        for limit in limits:
+            args.extend([limit.algorithm, limit.limit, limit.period, limit.burst or limit.limit, limit.cost])
+
+        raw = script(keys=[self._key(limit.key) for limit in limits], args=args)
+        return [
+            Decision(
+                allowed=bool(int(raw[i * 4])),
+                limit=limit.limit,
+                remaining=int(raw[i * 4 + 1]),
+                retry_after=float(raw[i * 4 + 2]),
+                reset_after=float(raw[i * 4 + 3]),
+            )
+            for i, limit in enumerate(limits)
+        ]
+
+    def _check_local(self, limits: Sequence[Limit], now: float) -> List[Decision]:
+        with self._lock:
+            decisions, writes = [], []
+            for limit in limits:
+                key = self._key(limit.key)
+                state, expires_at = self._local.get(key, (None, 0))
+                if expires_at <= now:
+                    state = None
+
+                evaluate = _gcra if limit.algorithm == GCRA else _sliding_window
+                decision, write = evaluate(state, now, limit)
+                decisions.append(decision)
+                if write is not None:
+                    writes.append((key, write))
+
+            if all(decision.allowed for decision in decisions):
+                for key, (state, ttl) in writes:
+                    self._local[key] = (state, now + ttl)
+                if len(self._local) > LOCAL_PRUNE_THRESHOLD:
+                    self._prune(now)
+            return decisions
+
+    def _prune(self, now: float):
+        for key in [key for key, (_, expires_at) in self._local.items() if expires_at <= now]:
+            del self._local[key]
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+rate_limiter = RateLimitEngine()
@@ -39,6 +39,8 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import base64
 import bleach
 
+from backend.rate_limiting import Limit, rate_limiter
+
 logger = logging.getLogger(__name__)
 security_logger = logging.getLogger('security')
 audit_logger = logging.getLogger('audit')
@@ -866,23 +868,19 @@ class RateLimiter:
         num_requests, period = RateLimiter._parse_rate(rate)
 
         # Cache keys
-        count_key = f"ratelimit:{key_prefix}:{identifier}:count"
         block_key = f"ratelimit:{key_prefix}:{identifier}:blocked"
 
         # Check if blocked
         if cache.get(block_key):
             return False
 
-        # Get current count
-        current_count = cache.get(count_key, 0)
-
-        if current_count >= num_requests:
+        # Check and count atomically in the shared engine
+        decision = rate_limiter.check(Limit(f"{key_prefix}:{identifier}", num_requests, period))
+        if not decision.allowed:
             # Block for specified time
             cache.set(block_key, True, block_time)
             return False
 
-        # Increment count
-        cache.set(count_key, current_count + 1, period)
         return True
 
     @staticmethod
@@ -520,10 +520,24 @@ FACEBOOK_APP_SECRET = get_env_variable('FACEBOOK_APP_SECRET')
 # LLM API KEYS
 # =============================================================================
 
-TOGETHER_API_KEY = get_env_variable('TOGETHER_API_KEY')
-GEMINI_API_KEY = get_env_variable('GEMINI_API_KEY')
+# Same variables coreapp.utils reads for the Together and Gemini clients
+LLama_API_KEY = get_env_variable('LLama_API_KEY')
+GOOGLE_API_KEY = get_env_variable('GOOGLE_API_KEY')
 OPENAI_API_KEY = get_env_variable('OPENAI_API_KEY')
 
+# Serve text generation streams from the async provider clients instead of
+# the blocking SDKs. Only worth enabling when running under ASGI.
+ASYNC_LLM_STREAMING = get_bool_env('ASYNC_LLM_STREAMING', False)
+LLM_ASYNC_MAX_CONNECTIONS = int(get_env_variable('LLM_ASYNC_MAX_CONNECTIONS', '1000'))
+LLM_ASYNC_MAX_KEEPALIVE = int(get_env_variable('LLM_ASYNC_MAX_KEEPALIVE', '100'))
+LLM_ASYNC_TIMEOUT = int(get_env_variable('LLM_ASYNC_TIMEOUT', '120'))
+
+# Tokens held for the model's reply while a text generation streams; the
+# hold is reconciled with the real usage when the stream completes.
+TOKEN_RESERVATION_RESPONSE_BUDGET = int(get_env_variable('TOKEN_RESERVATION_RESPONSE_BUDGET', '1024'))
+# Holds left behind by crashed workers are returned after this many seconds
+TOKEN_RESERVATION_TTL = int(get_env_variable('TOKEN_RESERVATION_TTL', '900'))
+
 
 # =============================================================================
 # CUSTOM USER MODEL
@@ -694,3 +708,105 @@ CACHE_TIMEOUTS = {
     'templates': 60 * 30,         # 30 minutes
     'folder_tree': 60 * 2,        # 2 minutes
 }
+
+# Opt-in LLM response cache (requests send cache=user|global)
+LLM_RESPONSE_CACHE_TIMEOUT = int(get_env_variable('LLM_RESPONSE_CACHE_TIMEOUT', '3600'))
+# Hot entries also kept in an in-process LRU of this many responses
+LLM_RESPONSE_CACHE_LOCAL_ENTRIES = int(get_env_variable('LLM_RESPONSE_CACHE_LOCAL_ENTRIES', '512'))
+
+# Semantic search (embeddings kept in ContentEmbedding, searched in memory)
+SEMANTIC_SEARCH_ENABLED = get_bool_env('SEMANTIC_SEARCH_ENABLED', False)
+EMBEDDING_MODEL = get_env_variable('EMBEDDING_MODEL', 'text-embedding-3-small')
+# Per-user vector indexes kept loaded in each worker
+VECTOR_INDEX_MAX_USERS = int(get_env_variable('VECTOR_INDEX_MAX_USERS', '256'))
+
+# Full-text index (kept current on save; list views query it once backfilled
+# with `manage.py rebuild_text_index`)
+TEXT_INDEX_SEARCH_ENABLED = get_bool_env('TEXT_INDEX_SEARCH_ENABLED', False)
+
+# AI-process file ingestion (files are read in token-sized chunks, processed
+# in parallel and merged)
+AI_INGEST_CHUNK_TOKENS = int(get_env_variable('AI_INGEST_CHUNK_TOKENS', '6000'))
+AI_INGEST_MAX_WORKERS = int(get_env_variable('AI_INGEST_MAX_WORKERS', '4'))
+# Extracted text kept on the AiProcess record
+AI_INGEST_OUTPUT_MAX_CHARS = int(get_env_variable('AI_INGEST_OUTPUT_MAX_CHARS', '200000'))
+# Parent directory for per-job workspaces (system temp dir when unset)
+AI_INGEST_TMP_DIR = get_env_variable('AI_INGEST_TMP_DIR', None)
+
+# Folder share/delete: subtrees with more items than this run as a background
+# job (progress via the task status endpoint)
+SUBTREE_BACKGROUND_THRESHOLD = int(get_env_variable('SUBTREE_BACKGROUND_THRESHOLD', '500'))
+
+# Direct-to-S3 multipart uploads: bytes per presigned part (raised for files
+# that would need more than 10,000 parts), and how long the part URLs and the
+# storage reservation stay valid before the sweeper releases them
+DIRECT_UPLOAD_PART_SIZE = int(get_env_variable('DIRECT_UPLOAD_PART_SIZE', str(16 * 1024 * 1024)))
+DIRECT_UPLOAD_TTL = int(get_env_variable('DIRECT_UPLOAD_TTL', '86400'))
+
+# Request, audit and API usage logs are queued in memory and bulk-written by
+# a background thread; rows beyond the buffer size are dropped and counted
+LOG_WRITER_BUFFER_SIZE = int(get_env_variable('LOG_WRITER_BUFFER_SIZE', '10000'))
+LOG_WRITER_BATCH_SIZE = int(get_env_variable('LOG_WRITER_BATCH_SIZE', '500'))
+LOG_WRITER_FLUSH_INTERVAL = float(get_env_variable('LOG_WRITER_FLUSH_INTERVAL', '1.0'))
+
+# Per-user daily analytics counters are combined in memory and applied to
+# UserAnalytics with bulk F() updates this often (seconds); reaching the cap
+# of pending (user, day) keys flushes right away, and new keys beyond it are
+# dropped and counted
+ANALYTICS_FLUSH_INTERVAL = float(get_env_variable('ANALYTICS_FLUSH_INTERVAL', '5.0'))
+ANALYTICS_MAX_PENDING_KEYS = int(get_env_variable('ANALYTICS_MAX_PENDING_KEYS', '50000'))
+
+# Users per engagement-scoring task (active user ids are split into ranges)
+ENGAGEMENT_SCORE_BATCH_SIZE = int(get_env_variable('ENGAGEMENT_SCORE_BATCH_SIZE', '5000'))
+
+# Scheduled generations: seconds a node holds a claimed run before another
+# node may take it over, and how often the run_generation_scheduler loop
+# reloads upcoming fire times from the database
+SCHEDULED_GENERATION_LEASE = int(get_env_variable('SCHEDULED_GENERATION_LEASE', '600'))
+SCHEDULED_GENERATION_REFRESH = float(get_env_variable('SCHEDULED_GENERATION_REFRESH', '30'))
+
+# Batch jobs: requests per minute allowed per LLM provider across all workers
+# ("openai=3000,anthropic=1000"; providers not listed use the default), and
+# seconds without a finished item before a running job is re-dispatched
+BATCH_RATE_LIMIT_PER_MINUTE = int(get_env_variable('BATCH_RATE_LIMIT_PER_MINUTE', '600'))
+BATCH_PROVIDER_RATE_LIMITS = {
+    provider.strip(): int(limit)
+    for provider, _, limit in (
+        entry.partition('=') for entry in get_env_variable('BATCH_PROVIDER_RATE_LIMITS', '').split(',')
+    )
+    if provider.strip() and limit.strip()
+}
+BATCH_STALL_TIMEOUT = int(get_env_variable('BATCH_STALL_TIMEOUT', '900'))
+
+# Webhook delivery: HTTP requests in flight per worker process (also the
+# keep-alive pool size), and per endpoint within that
+WEBHOOK_DELIVERY_CONCURRENCY = int(get_env_variable('WEBHOOK_DELIVERY_CONCURRENCY', '16'))
+WEBHOOK_ENDPOINT_CONCURRENCY = int(get_env_variable('WEBHOOK_ENDPOINT_CONCURRENCY', '2'))
+
+# Notification broadcasts: users per fan-out task, and per-channel limits
+# shared by all workers (emails per minute, FCM multicast requests of up to
+# 500 devices per minute)
+NOTIFICATION_BROADCAST_CHUNK_SIZE = int(get_env_variable('NOTIFICATION_BROADCAST_CHUNK_SIZE', '1000'))
+NOTIFICATION_EMAIL_RATE_PER_MINUTE = int(get_env_variable('NOTIFICATION_EMAIL_RATE_PER_MINUTE', '600'))
+NOTIFICATION_PUSH_RATE_PER_MINUTE = int(get_env_variable('NOTIFICATION_PUSH_RATE_PER_MINUTE', '600'))
+
+# Encrypted fields: extra key versions ("2=<secret>,3=<secret>"; version 1
+# is derived from SECRET_KEY) and the version new values are written with
+# (default: the highest configured)
+ENCRYPTION_KEYS = {
+    int(version): secret.strip()
+    for version, _, secret in (
+        entry.strip().partition('=') for entry in get_env_variable('ENCRYPTION_KEYS', '').split(',')
+    )
+    if version.isdigit() and secret.strip()
+}
+ENCRYPTION_KEY_VERSION = int(get_env_variable('ENCRYPTION_KEY_VERSION', '0')) or None
+
+# Resolved entitlements (plan, rate tier, balances, storage limits): seconds
+# a user's or cluster's snapshot stays in the shared cache; changes to
+# Subscription, StorageUsage and Cluster invalidate it sooner
+ENTITLEMENTS_CACHE_TTL = int(get_env_variable('ENTITLEMENTS_CACHE_TTL', '300'))
+
+# Feature flags: seconds between checks of the shared flag version before an
+# in-process snapshot is reused; flag and override saves bump the version
+FEATURE_FLAG_REFRESH_INTERVAL = float(get_env_variable('FEATURE_FLAG_REFRESH_INTERVAL', '5'))
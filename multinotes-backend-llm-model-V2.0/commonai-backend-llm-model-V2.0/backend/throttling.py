@@ -7,25 +7,109 @@ This module provides rate limiting for:
 - AI generation endpoints
 - Payment endpoints
 - File upload endpoints
+
+Every throttle is evaluated by the shared rate-limit engine
+(backend.rate_limiting): one atomic Redis script per request and a
+constant-size sliding window per key, instead of DRF's cached list of
+request timestamps.
 """
 
+from types import SimpleNamespace
+
 from rest_framework.throttling import (
     UserRateThrottle,
     AnonRateThrottle,
     SimpleRateThrottle,
 )
-from django.core.cache import cache
 from django.conf import settings
 import logging
 
+from backend.rate_limiting import SLIDING_WINDOW, Limit, rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# Engine Throttle
+# =============================================================================
+
+class EngineRateThrottle(SimpleRateThrottle):
+    """
+    SimpleRateThrottle evaluated by the shared rate-limit engine.
+
+    Subclasses keep DRF's rate/scope/get_cache_key conventions. The rate
+    may depend on the request (get_request_rate), and extra_rates adds
+    further windows on the same identity, checked in the same atomic call.
+    """
+    algorithm = SLIDING_WINDOW
+    extra_rates = ()
+
+    def get_request_rate(self, request):
+        """Rate to enforce for this request (default: the class rate)."""
+        return self.rate
+
+    def get_limits(self, request, view):
+        """Limits to check for a request, or [] when it is not throttled."""
+        rate = self.get_request_rate(request)
+        if rate is None:
+            return []
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return []
+
+        self.num_requests, self.duration = self.parse_rate(rate)
+        limits = [Limit(self.key, self.num_requests, self.duration, algorithm=self.algorithm)]
+        for extra in self.extra_rates:
+            num_requests, duration = self.parse_rate(extra)
+            limits.append(Limit(f"{self.key}:{duration}", num_requests, duration, algorithm=self.algorithm))
+        return limits
+
+    def allow_request(self, request, view):
+        limits = self.get_limits(request, view)
+        if not limits:
+            self.decisions = []
+            return True
+
+        self.decisions = rate_limiter.check_many(limits)
+        return all(decision.allowed for decision in self.decisions)
+
+    def wait(self):
+        """Seconds until every limit that refused the request allows it again."""
+        waits = [decision.retry_after for decision in getattr(self, 'decisions', []) if not decision.allowed]
+        return max(waits) if waits else None
+
+
+class PlanRateThrottle(EngineRateThrottle):
+    """Throttle whose rate follows the user's subscription tier."""
+
+    PLAN_RATES = {
+        'free': '10/hour',
+    }
+
+    def get_rate(self):
+        return self.PLAN_RATES['free']
+
+    def get_request_rate(self, request):
+        if request.user and request.user.is_authenticated:
+            plan = self._get_user_plan(request.user)
+            return self.PLAN_RATES.get(plan, self.PLAN_RATES['free'])
+        return self.PLAN_RATES['free']
+
+    def _get_user_plan(self, user):
+        """Get user's current subscription plan."""
+        try:
+            from coreapp.services.entitlements import entitlement_service
+            return entitlement_service.for_user(user).rate_tier
+        except Exception as e:
+            logger.warning(f"Error getting user plan for throttling: {e}")
+        return 'free'
+
+
 # =============================================================================
 # Base Throttle Classes
 # =============================================================================
 
-class AnonymousThrottle(AnonRateThrottle):
+class AnonymousThrottle(EngineRateThrottle, AnonRateThrottle):
     """
     Throttle for anonymous (unauthenticated) users.
 
@@ -35,7 +119,7 @@ class AnonymousThrottle(AnonRateThrottle):
     scope = 'anon'
 
 
-class AuthenticatedThrottle(UserRateThrottle):
+class AuthenticatedThrottle(EngineRateThrottle, UserRateThrottle):
     """
     Throttle for authenticated users.
 
@@ -45,7 +129,7 @@ class AuthenticatedThrottle(UserRateThrottle):
     scope = 'user'
 
 
-class BurstThrottle(UserRateThrottle):
+class BurstThrottle(EngineRateThrottle, UserRateThrottle):
     """
     Throttle to prevent burst requests.
 
@@ -59,7 +143,7 @@ class BurstThrottle(UserRateThrottle):
 # AI Generation Throttles
 # =============================================================================
 
-class AIGenerationThrottle(SimpleRateThrottle):
+class AIGenerationThrottle(PlanRateThrottle):
     """
     Throttle for AI text generation endpoints.
 
@@ -84,38 +168,6 @@ class AIGenerationThrottle(SimpleRateThrottle):
             return f"throttle_ai_gen_{request.user.id}"
         return self.get_ident(request)
 
-    def get_rate(self):
-        """Get rate based on user's subscription."""
-        if hasattr(self, '_rate'):
-            return self._rate
-        return self.PLAN_RATES.get('free')
-
-    def allow_request(self, request, view):
-        if request.user.is_authenticated:
-            # Get user's subscription plan
-            plan = self._get_user_plan(request.user)
-            self._rate = self.PLAN_RATES.get(plan, self.PLAN_RATES['free'])
-        else:
-            self._rate = self.PLAN_RATES['free']
-
-        return super().allow_request(request, view)
-
-    def _get_user_plan(self, user):
-        """Get user's current subscription plan."""
-        try:
-            from planandsubscription.models import Subscription
-            subscription = Subscription.objects.filter(
-                user=user,
-                is_delete=False,
-                status='active'
-            ).select_related('plan').first()
-
-            if subscription and subscription.plan:
-                return subscription.plan.name.lower()
-        except Exception as e:
-            logger.warning(f"Error getting user plan for throttling: {e}")
-        return 'free'
-
 
 class AIImageGenerationThrottle(AIGenerationThrottle):
     """
@@ -142,7 +194,7 @@ class AIImageGenerationThrottle(AIGenerationThrottle):
         return self.get_ident(request)
 
 
-class StreamingThrottle(SimpleRateThrottle):
+class StreamingThrottle(PlanRateThrottle):
     """
     Throttle for streaming AI responses.
 
@@ -170,7 +222,7 @@ class StreamingThrottle(SimpleRateThrottle):
 # File Upload Throttles
 # =============================================================================
 
-class FileUploadThrottle(SimpleRateThrottle):
+class FileUploadThrottle(PlanRateThrottle):
     """
     Throttle for file upload endpoints.
 
@@ -193,37 +245,12 @@ class FileUploadThrottle(SimpleRateThrottle):
             return f"throttle_upload_{request.user.id}"
         return self.get_ident(request)
 
-    def allow_request(self, request, view):
-        if request.user.is_authenticated:
-            plan = self._get_user_plan(request.user)
-            self.rate = self.PLAN_RATES.get(plan, self.PLAN_RATES['free'])
-        else:
-            self.rate = self.PLAN_RATES['free']
-
-        return super().allow_request(request, view)
-
-    def _get_user_plan(self, user):
-        """Get user's current subscription plan."""
-        try:
-            from planandsubscription.models import Subscription
-            subscription = Subscription.objects.filter(
-                user=user,
-                is_delete=False,
-                status='active'
-            ).select_related('plan').first()
-
-            if subscription and subscription.plan:
-                return subscription.plan.name.lower()
-        except Exception:
-            pass
-        return 'free'
-
 
 # =============================================================================
 # Payment Throttles
 # =============================================================================
 
-class PaymentThrottle(SimpleRateThrottle):
+class PaymentThrottle(EngineRateThrottle):
     """
     Throttle for payment-related endpoints.
 
@@ -239,7 +266,7 @@ class PaymentThrottle(SimpleRateThrottle):
         return self.get_ident(request)
 
 
-class WebhookThrottle(SimpleRateThrottle):
+class WebhookThrottle(EngineRateThrottle):
     """
     Throttle for webhook endpoints.
 
@@ -257,7 +284,7 @@ class WebhookThrottle(SimpleRateThrottle):
 # Authentication Throttles
 # =============================================================================
 
-class LoginThrottle(SimpleRateThrottle):
+class LoginThrottle(EngineRateThrottle):
     """
     Throttle for login attempts.
 
@@ -267,12 +294,13 @@ class LoginThrottle(SimpleRateThrottle):
     """
     scope = 'login'
     rate = '5/minute'
+    extra_rates = ('20/hour',)
 
     def get_cache_key(self, request, view):
         return f"throttle_login_{self.get_ident(request)}"
 
 
-class PasswordResetThrottle(SimpleRateThrottle):
+class PasswordResetThrottle(EngineRateThrottle):
     """
     Throttle for password reset requests.
 
@@ -289,7 +317,7 @@ class PasswordResetThrottle(SimpleRateThrottle):
         return f"throttle_pwreset_{self.get_ident(request)}"
 
 
-class RegistrationThrottle(SimpleRateThrottle):
+class RegistrationThrottle(EngineRateThrottle):
     """
     Throttle for user registration.
 
@@ -306,7 +334,7 @@ class RegistrationThrottle(SimpleRateThrottle):
 # Admin Throttles
 # =============================================================================
 
-class AdminThrottle(UserRateThrottle):
+class AdminThrottle(EngineRateThrottle, UserRateThrottle):
     """
     Throttle for admin endpoints.
 
@@ -342,22 +370,19 @@ def get_throttle_status(user):
         ('payment', PaymentThrottle),
     ]
 
+    request = SimpleNamespace(user=user)
     for name, throttle_class in throttle_types:
         throttle = throttle_class()
-        cache_key = f"throttle_{name}_{user.id}"
-
-        # Get current request count from cache
-        history = cache.get(cache_key, [])
-        rate = throttle.get_rate() if hasattr(throttle, 'get_rate') else throttle.rate
+        limits = throttle.get_limits(request, None)
+        if not limits:
+            continue
 
-        if rate:
-            num_requests, duration = throttle.parse_rate(rate)
-            remaining = max(0, num_requests - len(history))
-            status[name] = {
-                'limit': num_requests,
-                'remaining': remaining,
-                'reset_seconds': duration,
-            }
+        decision = rate_limiter.peek(limits[0])
+        status[name] = {
+            'limit': decision.limit,
+            'remaining': decision.remaining,
+            'reset_seconds': round(decision.reset_after),
+        }
 
     return status
 
@@ -375,9 +400,7 @@ def clear_throttle(user, throttle_type='all'):
     else:
         types = [throttle_type]
 
-    for t in types:
-        cache_key = f"throttle_{t}_{user.id}"
-        cache.delete(cache_key)
+    rate_limiter.reset(*(f"throttle_{t}_{user.id}" for t in types))
 
     logger.info(f"Cleared throttle cache for user {user.id}: {throttle_type}")
 
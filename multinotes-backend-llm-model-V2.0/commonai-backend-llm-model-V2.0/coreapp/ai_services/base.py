@@ -23,6 +23,7 @@ from rest_framework import status
 from coreapp.models import LLM, LLM_Tokens, Prompt, PromptResponse, GroupResponse
 from planandsubscription.models import Subscription
 from authentication.awsservice import uploadImage
+from coreapp.services.token_ledger import token_ledger, KIND_FILE
 from backend.exceptions import (
     LLMModelNotFoundError,
     LLMModelDisconnectedError,
@@ -130,18 +131,7 @@ def manage_token_usage(user, tokens_used: int = 1) -> bool:
     Raises:
         InsufficientTokensError: If not enough tokens
     """
-    subscription = get_user_subscription(user)
-
-    if not subscription:
-        raise InsufficientTokensError('No active subscription found.')
-
-    if subscription.balanceToken < tokens_used:
-        raise InsufficientTokensError()
-
-    subscription.balanceToken -= tokens_used
-    subscription.usedToken += tokens_used
-    subscription.save()
-
+    token_ledger.consume(user, tokens_used, strict=True)
     return True
 
 
@@ -159,18 +149,7 @@ def manage_file_token_usage(user, tokens_used: int = 1) -> bool:
     Raises:
         InsufficientTokensError: If not enough tokens
     """
-    subscription = get_user_subscription(user)
-
-    if not subscription:
-        raise InsufficientTokensError('No active subscription found.')
-
-    if subscription.fileToken < tokens_used:
-        raise InsufficientTokensError('Insufficient file tokens.')
-
-    subscription.fileToken -= tokens_used
-    subscription.usedFileToken += tokens_used
-    subscription.save()
-
+    token_ledger.consume(user, tokens_used, kind=KIND_FILE, strict=True)
     return True
 
 
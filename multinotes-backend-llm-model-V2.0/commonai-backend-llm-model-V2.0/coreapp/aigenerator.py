@@ -3,6 +3,7 @@ from adrf.decorators import APIView
 from rest_framework.response import Response
 import httpx
 import asyncio
+import inspect
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync, sync_to_async
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -17,7 +18,7 @@ from .utils import (generateUsingGemini, generateUsingTogether,
                     generateTextToImageUsingTogether, generateCodeUsingTogether,
                     generateTextByOpenAI, generateTextToSpeech, speechToTextGenerator,
                     generateTextToImageUsingOpenai, textToCodeUsingGemini,
-                    generateVideoToTextUsingGemini, generateAudioToTextUsingGemini
+                    generateVideoToTextUsingGemini, generateAudioToTextUsingGemini,
                 )
 import time
 from rest_framework import status
@@ -40,22 +41,21 @@ from authentication.awsservice import uploadImage
 from .models import Prompt, PromptResponse
 from .serializers import TextToTextSerializer, PictureToTextSerializer, TextToImageSerializer, SpeechToTextSerializer
 from .authenticaton import TextSubscriptionAuth, FileSubscriptionAuth
+from .streaming import resolve_stream_mode, GenerationStreamEncoder, STREAM_MODE_CUMULATIVE, STREAM_MODE_HEADER, iter_replay_chunks
+from .services.llm_service import llm_service
+from .services.conversation_turns import conversation_turns, DEFAULT_SYSTEM_PROMPT
+from .services.token_ledger import token_ledger, KIND_FILE
+from .services.generation_records import generation_recorder
 from planandsubscription.models import Subscription
 from ticketandcategory.models import Category
+from backend.cache_service import cache_service, LLM_CACHE_SCOPES, LLM_CACHE_SCOPE_USER
 import os
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage
 import uuid
 
 def manage_file_token(user):
-    cluster = user.cluster
-    if cluster:
-        subs = cluster.subscription
-    else:
-        subs = Subscription.objects.filter(user=user.id, status__in=['active', 'trial']).first()
-    subs.fileToken -= 1
-    subs.usedFileToken += 1
-    subs.save()
+    token_ledger.consume(user, 1, kind=KIND_FILE)
 
 
 class TextAiGeneratorView(APIView):
@@ -152,6 +152,128 @@ def get_group_name(input_string):
     # If 3 or fewer words, return the entire string
     return ' '.join(words)
 
+
+# Async text generation (ASYNC_LLM_STREAMING)
+# LLM.source -> llm_service provider for the text models served async
+ASYNC_TEXT_PROVIDERS = {2: 'together', 3: 'google', 4: 'openai'}
+
+
+def load_conversation(groupId, provider):
+    """Return the history the sync generator of this provider would send."""
+    if not groupId:
+        return []
+    group = GroupResponse.objects.get(pk=groupId, is_delete=False)
+    system_prompt = None if provider == 'google' else DEFAULT_SYSTEM_PROMPT
+    return conversation_turns.get_history(group, system_prompt=system_prompt)
+
+
+async def streamTextGeneration(prompt, myModel, modelString, source, user, categoryID, llmId, promptWriter, groupId, streamMode=STREAM_MODE_CUMULATIVE):
+    """
+    Async counterpart of the text generators in utils.
+
+    Streams through llm_service's pooled async HTTP client so the stream
+    holds no thread while waiting on the provider. Frames and saved records
+    match the sync generators.
+    """
+    provider = ASYNC_TEXT_PROVIDERS[source]
+    history = await sync_to_async(load_conversation)(groupId, provider)
+
+    reservation = await sync_to_async(token_ledger.reserve_for_prompt)(user, prompt, history)
+
+    usage = {}
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    # Create the records while the provider works on the first token
+    starting = asyncio.ensure_future(sync_to_async(generation_recorder.start)(
+        user, llmId, categoryID, 8 if promptWriter else 2,
+        prompt=prompt, group_id=groupId, conversation=True))
+    try:
+        # Like the sync generators, send no max_tokens/temperature
+        async for fragment in llm_service.agenerate_stream(
+                prompt, provider=provider, model=modelString,
+                max_tokens=None, temperature=None,
+                history=history, usage=usage):
+            yield frames.chunk(fragment)
+        record = await starting
+    except BaseException:
+        await asyncio.wait([starting])
+        record = None if starting.exception() else starting.result()
+        await sync_to_async(generation_recorder.abort)(record, reservation)
+        raise
+
+    text = frames.text
+    tokenCount = usage.get('total') or llm_service.get_provider(provider).count_tokens(prompt + text)
+
+    await sync_to_async(generation_recorder.finish)(record, text, tokenCount, reservation)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
+
+
+# Response cache (opt-in with cache=user|global)
+def resolve_cache_scope(request):
+    """Cache scope a request opted in to, or None."""
+    scope = (request.data.get('cache') or '').strip().lower()
+    return scope if scope in LLM_CACHE_SCOPES else None
+
+
+def cachedTextGeneration(stream, cacheScope, prompt, myModel, modelString, user, categoryID, llmId, promptWriter, streamMode=STREAM_MODE_CUMULATIVE):
+    """
+    Serve a stateless text generation through the response cache.
+
+    A hit replays the stored text in the client's frame protocol without
+    calling the provider (``stream`` is never started). A miss passes the
+    provider stream through and stores the saved response once it is done.
+    """
+    scopeUser = user.id if cacheScope == LLM_CACHE_SCOPE_USER else None
+    fingerprint = cache_service.llm_response_fingerprint(
+        modelString, prompt, {'promptWriter': bool(promptWriter)})
+
+    cached = cache_service.get_llm_response(fingerprint, scopeUser)
+    if cached is not None:
+        return replayCachedText(cached['content'], prompt, myModel, user, categoryID, llmId, promptWriter, streamMode)
+    if inspect.isasyncgen(stream):
+        return storeAsyncTextGeneration(stream, fingerprint, modelString, scopeUser)
+    return storeTextGeneration(stream, fingerprint, modelString, scopeUser)
+
+
+def replayCachedText(text, prompt, myModel, user, categoryID, llmId, promptWriter, streamMode=STREAM_MODE_CUMULATIVE):
+    """Stream a cached response and record it like a fresh (but free) generation."""
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    record = generation_recorder.start(user, llmId, categoryID, 8 if promptWriter else 2, prompt=prompt)
+    try:
+        for fragment in iter_replay_chunks(text):
+            yield frames.chunk(fragment)
+    except BaseException:
+        generation_recorder.abort(record)
+        raise
+
+    generation_recorder.finish(record, text, 0)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=None)
+
+
+def load_cacheable_response(doneFrame):
+    """Saved text of the response a finished stream reported in its DONE frame."""
+    responseId = json.loads(doneFrame).get('responseId')
+    return PromptResponse.objects.filter(pk=responseId).values_list('response_text', flat=True).first()
+
+
+def storeTextGeneration(stream, fingerprint, modelString, scopeUser):
+    frame = None
+    for frame in stream:
+        yield frame
+    text = load_cacheable_response(frame) if frame else None
+    if text:
+        cache_service.set_llm_response(fingerprint, {'content': text, 'model': modelString}, scopeUser)
+
+
+async def storeAsyncTextGeneration(stream, fingerprint, modelString, scopeUser):
+    frame = None
+    async for frame in stream:
+        yield frame
+    text = await sync_to_async(load_cacheable_response)(frame) if frame else None
+    if text:
+        await sync_to_async(cache_service.set_llm_response)(
+            fingerprint, {'content': text, 'model': modelString}, scopeUser)
+
+
 class DynamicLlmGeneratorView(APIView):
     permission_classes = [IsAuthenticated, TextSubscriptionAuth]
 
@@ -168,6 +290,8 @@ class DynamicLlmGeneratorView(APIView):
             # source = request.data.get('source')
             chatbot = request.data.get('chatbot', 'false')
             chatbot = chatbot.lower() == 'true'
+            stream_mode = resolve_stream_mode(request)
+            cache_scope = resolve_cache_scope(request)
 
             # print("chatbot is ----> ", chatbot)
             # print("groupId is ----> ", groupId)
@@ -205,16 +329,28 @@ class DynamicLlmGeneratorView(APIView):
                 if not prompt:
                     return Response({'message': f'Please provide prompt!',}, status=status.HTTP_400_BAD_REQUEST)
                 
-                response = StreamingHttpResponse(
-                    generateTextToTextUsingTogether(
+                if settings.ASYNC_LLM_STREAMING:
+                    stream = streamTextGeneration(
+                        prompt, model, model_string, llm_instance.source,
+                        request.user, category, 
+                        llm_instance.id, promptWriter,
+                        groupId, streamMode=stream_mode)
+                else:
+                    stream = generateTextToTextUsingTogether(
                         prompt, model, model_string, 
                         request.user, category, 
                         llm_instance.id, promptWriter,
-                        groupId)
-                    )
+                        groupId, streamMode=stream_mode)
+                if cache_scope and not groupId:
+                    stream = cachedTextGeneration(
+                        stream, cache_scope, prompt, model, model_string,
+                        request.user, category, llm_instance.id,
+                        promptWriter, streamMode=stream_mode)
+                response = StreamingHttpResponse(stream)
         
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
             elif llm_instance.source==2 and llm_instance.code:
                 if not prompt:
@@ -223,12 +359,14 @@ class DynamicLlmGeneratorView(APIView):
                     generateCodeUsingTogether(
                         prompt, model, model_string,
                         request.user, category, 
-                        llm_instance.id, groupId
+                        llm_instance.id, groupId,
+                        streamMode=stream_mode
                     )
                 )
         
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
             
             elif llm_instance.source==2 and llm_instance.text_to_image: 
@@ -294,15 +432,27 @@ class DynamicLlmGeneratorView(APIView):
                 if not prompt:
                     return Response({'message': 'Please provide prompt!',}, status=status.HTTP_400_BAD_REQUEST)  
                 
-                response = StreamingHttpResponse(
-                    textToTextUsingGemini(prompt, model, model_string, 
+                if settings.ASYNC_LLM_STREAMING:
+                    stream = streamTextGeneration(
+                        prompt, model, model_string, llm_instance.source,
+                        request.user, category, 
+                        llm_instance.id, promptWriter,
+                        groupId, streamMode=stream_mode)
+                else:
+                    stream = textToTextUsingGemini(prompt, model, model_string, 
                             request.user, category, 
                             llm_instance.id, promptWriter,
-                            groupId)
-                        )
+                            groupId, streamMode=stream_mode)
+                if cache_scope and not groupId:
+                    stream = cachedTextGeneration(
+                        stream, cache_scope, prompt, model, model_string,
+                        request.user, category, llm_instance.id,
+                        promptWriter, streamMode=stream_mode)
+                response = StreamingHttpResponse(stream)
 
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
             
             elif llm_instance.source==3 and llm_instance.image_to_text: 
@@ -329,12 +479,13 @@ class DynamicLlmGeneratorView(APIView):
                             prompt, model, model_string, 
                             request.user, category, 
                             llm_instance.id, uploaded_file,
-                            groupId
+                            groupId, streamMode=stream_mode
                         )
                     )
                     
                     response['Content-Type'] = 'text/event-stream'
                     response['Cache-Control'] = 'no-cache'
+                    response[STREAM_MODE_HEADER] = stream_mode
                     return response
                 elif file_extension.lower() in audio_ext_list:
                     fs = FileSystemStorage(location=os.path.join(settings.BASE_DIR))
@@ -421,12 +572,13 @@ class DynamicLlmGeneratorView(APIView):
                                 prompt, model, model_string, 
                                 request.user, category, 
                                 llm_instance.id, uploaded_file,
-                                groupId
+                                groupId, streamMode=stream_mode
                             )
                         )
                 
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
 
             elif llm_instance.source==3 and llm_instance.code:      
@@ -436,11 +588,13 @@ class DynamicLlmGeneratorView(APIView):
                 response = StreamingHttpResponse(
                     textToCodeUsingGemini(prompt, model, model_string, 
                             request.user, category, 
-                            llm_instance.id, promptWriter, groupId)
+                            llm_instance.id, promptWriter, groupId,
+                            streamMode=stream_mode)
                         )
 
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
             
             ## Openai Converter
@@ -448,14 +602,26 @@ class DynamicLlmGeneratorView(APIView):
                 if not prompt:
                     return Response({'message': 'Please provide prompt!',}, status=status.HTTP_400_BAD_REQUEST)  
                 
-                response = StreamingHttpResponse(
-                    generateTextByOpenAI(prompt, model, model_string, 
+                if settings.ASYNC_LLM_STREAMING:
+                    stream = streamTextGeneration(
+                        prompt, model, model_string, llm_instance.source,
+                        request.user, category, 
+                        llm_instance.id, promptWriter,
+                        groupId, streamMode=stream_mode)
+                else:
+                    stream = generateTextByOpenAI(prompt, model, model_string, 
                             request.user, category, llm_instance.id, promptWriter,
-                            groupId)
-                        )
+                            groupId, streamMode=stream_mode)
+                if cache_scope and not groupId:
+                    stream = cachedTextGeneration(
+                        stream, cache_scope, prompt, model, model_string,
+                        request.user, category, llm_instance.id,
+                        promptWriter, streamMode=stream_mode)
+                response = StreamingHttpResponse(stream)
 
                 response['Content-Type'] = 'text/event-stream'
                 response['Cache-Control'] = 'no-cache'
+                response[STREAM_MODE_HEADER] = stream_mode
                 return response
                 
             elif llm_instance.source==4 and llm_instance.text_to_image:      
@@ -6,6 +6,9 @@ This module provides:
 - User behavior analytics
 - Feature usage tracking
 - Metrics collection
+
+Per-user daily counters are combined in memory and flushed to
+UserAnalytics in bulk (see coreapp.services.analytics_counters).
 """
 
 import logging
@@ -18,6 +21,8 @@ from django.db.models import Sum, Count, Avg, F
 from django.utils import timezone
 from django.conf import settings
 
+from .services.analytics_counters import analytics_counters
+
 logger = logging.getLogger(__name__)
 
 
@@ -83,6 +88,20 @@ class AnalyticsTracker:
         tracker.track_ai_usage(user, tokens=500, model='gpt-4')
     """
 
+    # UserAnalytics counter bumped by each event type
+    EVENT_COUNTERS = {
+        EventType.NOTE_CREATED: 'notes_created',
+        EventType.NOTE_EDITED: 'notes_edited',
+        EventType.NOTE_DELETED: 'notes_deleted',
+        EventType.FOLDER_CREATED: 'folders_created',
+        EventType.AI_TEXT_GENERATED: 'ai_text_generations',
+        EventType.AI_IMAGE_GENERATED: 'ai_image_generations',
+        EventType.CONTENT_SHARED: 'content_shared',
+        EventType.SHARE_VIEWED: 'shared_views_received',
+        EventType.FILE_UPLOADED: 'files_uploaded',
+        EventType.SESSION_STARTED: 'sessions_count',
+    }
+
     def __init__(self):
         self.enabled = getattr(settings, 'ANALYTICS_ENABLED', True)
 
@@ -107,33 +126,16 @@ class AnalyticsTracker:
             return False
 
         try:
-            from .models_analytics import UserAnalytics
-
-            analytics = UserAnalytics.get_or_create_today(user)
-
             # Update relevant counters based on event type
-            event_handlers = {
-                EventType.NOTE_CREATED: lambda: self._increment(analytics, 'notes_created'),
-                EventType.NOTE_EDITED: lambda: self._increment(analytics, 'notes_edited'),
-                EventType.NOTE_DELETED: lambda: self._increment(analytics, 'notes_deleted'),
-                EventType.FOLDER_CREATED: lambda: self._increment(analytics, 'folders_created'),
-                EventType.AI_TEXT_GENERATED: lambda: self._increment(analytics, 'ai_text_generations'),
-                EventType.AI_IMAGE_GENERATED: lambda: self._increment(analytics, 'ai_image_generations'),
-                EventType.CONTENT_SHARED: lambda: self._increment(analytics, 'content_shared'),
-                EventType.SHARE_VIEWED: lambda: self._increment(analytics, 'shared_views_received'),
-                EventType.FILE_UPLOADED: lambda: self._increment(analytics, 'files_uploaded'),
-                EventType.SESSION_STARTED: lambda: self._increment(analytics, 'sessions_count'),
-            }
-
-            handler = event_handlers.get(event_type)
-            if handler:
-                handler()
+            field = self.EVENT_COUNTERS.get(event_type)
+            if field:
+                analytics_counters.add(user.id, field)
 
             # Track feature usage
             if event_type == EventType.FEATURE_USED and metadata:
                 feature_name = metadata.get('feature')
                 if feature_name:
-                    analytics.track_feature(feature_name)
+                    analytics_counters.add_feature(user.id, feature_name)
 
             logger.debug(f"Tracked event {event_type} for user {user.id}")
             return True
@@ -142,12 +144,6 @@ class AnalyticsTracker:
             logger.error(f"Error tracking event: {e}")
             return False
 
-    def _increment(self, analytics, field: str, amount: int = 1):
-        """Increment an analytics field."""
-        current = getattr(analytics, field, 0) or 0
-        setattr(analytics, field, current + amount)
-        analytics.save(update_fields=[field, 'updated_at'])
-
     def track_ai_usage(
         self,
         user,
@@ -171,15 +167,9 @@ class AnalyticsTracker:
             return False
 
         try:
-            from .models_analytics import UserAnalytics
-
-            analytics = UserAnalytics.get_or_create_today(user)
-
-            analytics.ai_tokens_used = (analytics.ai_tokens_used or 0) + tokens
+            analytics_counters.add(user.id, 'ai_tokens_used', tokens)
             if is_streaming:
-                analytics.ai_requests_streamed = (analytics.ai_requests_streamed or 0) + 1
-
-            analytics.save(update_fields=['ai_tokens_used', 'ai_requests_streamed', 'updated_at'])
+                analytics_counters.add(user.id, 'ai_requests_streamed')
 
             logger.debug(f"Tracked AI usage: {tokens} tokens for user {user.id}")
             return True
@@ -209,14 +199,8 @@ class AnalyticsTracker:
             return False
 
         try:
-            from .models_analytics import UserAnalytics
-
-            analytics = UserAnalytics.get_or_create_today(user)
-
-            analytics.total_session_duration = (analytics.total_session_duration or 0) + duration_seconds
-            analytics.pages_viewed = (analytics.pages_viewed or 0) + pages_viewed
-
-            analytics.save(update_fields=['total_session_duration', 'pages_viewed', 'updated_at'])
+            analytics_counters.add(user.id, 'total_session_duration', duration_seconds)
+            analytics_counters.add(user.id, 'pages_viewed', pages_viewed)
 
             return True
 
@@ -245,15 +229,9 @@ class AnalyticsTracker:
             return False
 
         try:
-            from .models_analytics import UserAnalytics
-
-            analytics = UserAnalytics.get_or_create_today(user)
-
-            analytics.api_calls = (analytics.api_calls or 0) + 1
+            analytics_counters.add(user.id, 'api_calls')
             if is_error:
-                analytics.api_errors = (analytics.api_errors or 0) + 1
-
-            analytics.save(update_fields=['api_calls', 'api_errors', 'updated_at'])
+                analytics_counters.add(user.id, 'api_errors')
 
             return True
 
@@ -265,6 +243,8 @@ class AnalyticsTracker:
         """
         Get aggregated stats for a user.
 
+        Stored rows are merged with counts not yet flushed by this process.
+
         Args:
             user: User instance
             days: Number of days to aggregate
@@ -275,24 +255,32 @@ class AnalyticsTracker:
         from .models_analytics import UserAnalytics
 
         start_date = timezone.now().date() - timedelta(days=days)
+        fields = [
+            'notes_created', 'ai_text_generations', 'ai_image_generations', 'ai_tokens_used',
+            'sessions_count', 'total_session_duration', 'api_calls', 'api_errors',
+        ]
+
+        per_day = {
+            row.pop('date'): row
+            for row in UserAnalytics.objects.filter(user=user, date__gte=start_date).values('date', *fields)
+        }
+        for day, pending in analytics_counters.pending(user.id, since=start_date).items():
+            row = per_day.setdefault(day, dict.fromkeys(fields, 0))
+            for field in fields:
+                row[field] += pending.get(field, 0)
 
-        stats = UserAnalytics.objects.filter(
-            user=user,
-            date__gte=start_date
-        ).aggregate(
-            total_notes_created=Sum('notes_created'),
-            total_ai_generations=Sum('ai_text_generations') + Sum('ai_image_generations'),
-            total_tokens_used=Sum('ai_tokens_used'),
-            total_sessions=Sum('sessions_count'),
-            total_session_time=Sum('total_session_duration'),
-            total_api_calls=Sum('api_calls'),
-            total_api_errors=Sum('api_errors'),
-            avg_daily_notes=Avg('notes_created'),
-        )
+        totals = {field: sum(row[field] for row in per_day.values()) for field in fields}
 
         return {
             'period_days': days,
-            **{k: v or 0 for k, v in stats.items()}
+            'total_notes_created': totals['notes_created'],
+            'total_ai_generations': totals['ai_text_generations'] + totals['ai_image_generations'],
+            'total_tokens_used': totals['ai_tokens_used'],
+            'total_sessions': totals['sessions_count'],
+            'total_session_time': totals['total_session_duration'],
+            'total_api_calls': totals['api_calls'],
+            'total_api_errors': totals['api_errors'],
+            'avg_daily_notes': totals['notes_created'] / len(per_day) if per_day else 0,
         }
 
 
@@ -8,6 +8,7 @@ from datetime import date
 from django.conf import settings
 from rest_framework.exceptions import PermissionDenied
 from authentication.models import CustomUser
+from coreapp.services.entitlements import entitlement_service
 
 
 def decode_jwt_token(token):
@@ -28,22 +29,9 @@ class TextSubscriptionAuth(BasePermission):
     message = "You do not have an active subscription or your token has finished."
     
     def has_permission(self, request, view):
-        # Extract JWT token from the request
-        token = request.headers.get('Authorization').split()[1]
-        
-        # Implement your JWT decoding logic here
-        userId = decode_jwt_token(token)  # Replace with your JWT decoding logic
-
-        user = CustomUser.objects.get(id=userId)
-
-        cluster = user.cluster
-        if cluster:
-            cluster_user_id = cluster.subscription.user.id
-            subscription = Subscription.objects.filter(user=cluster_user_id, status__in=['active', 'trial'], subscriptionExpiryDate__gte=timezone.now(), balanceToken__gt=100).exists()
-        else:
-            subscription = Subscription.objects.filter(user=userId, status__in=['active', 'trial'], subscriptionExpiryDate__gte=timezone.now(), balanceToken__gt=100).exists()
-
-        if not subscription:
+        # request.user was already loaded from the JWT by the authentication
+        # class; its entitlements cover the cluster's subscription too
+        if not entitlement_service.for_user(request.user).can_generate():
                 raise PermissionDenied(self.message)
 
         return True
@@ -0,0 +1,62 @@
+"""
+Move legacy GroupResponse.conversation_history blobs into ConversationTurn rows.
+
+Groups are also migrated lazily the first time their history is read, so
+this command only needs to run once to finish the job in bulk.
+
+Usage:
+    python manage.py backfill_conversation_turns
+    python manage.py backfill_conversation_turns --batch-size 200 --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from coreapp.models import GroupResponse
+from coreapp.services.conversation_turns import conversation_turns
+
+
+class Command(BaseCommand):
+    help = 'Migrate legacy JSON conversation history into the ConversationTurn table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Groups loaded per query')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the groups that still need migrating')
+
+    def handle(self, *args, **options):
+        pending = (
+            GroupResponse.objects
+            .filter(turn_count=0, conversation_history__isnull=False)
+            .exclude(conversation_history='')
+        )
+        total = pending.count()
+
+        if options['dry_run']:
+            self.stdout.write(f"{total} groups need migrating")
+            return
+
+        migrated = turns = 0
+        last_id = 0
+        batch_size = options['batch_size']
+
+        while True:
+            batch = list(
+                pending.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'turn_count', 'conversation_history')[:batch_size]
+            )
+            if not batch:
+                break
+
+            for group in batch:
+                created = conversation_turns.import_legacy_history(group)
+                turns += created
+                migrated += 1 if created else 0
+            last_id = batch[-1].id
+
+            self.stdout.write(f"  {migrated}/{total} groups migrated")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Migrated {migrated} groups ({turns} turns)"
+        ))
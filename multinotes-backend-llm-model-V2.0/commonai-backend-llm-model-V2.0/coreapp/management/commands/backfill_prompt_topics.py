@@ -0,0 +1,77 @@
+"""
+Extract topics for existing prompts into the PromptTopic index.
+
+New responses are indexed in the background as they are saved; this
+command fills the index for older prompts (run it once after deploying)
+or repairs it after bulk updates that bypass signals. Extraction is
+CPU-bound, so batches are spread over a process pool while this process
+does the reads and writes.
+
+Usage:
+    python manage.py backfill_prompt_topics
+    python manage.py backfill_prompt_topics --workers 8 --batch-size 1000
+    python manage.py backfill_prompt_topics --missing --workers 0
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from coreapp.models import Prompt
+from coreapp.services.topic_index import topic_index
+
+
+class Command(BaseCommand):
+    help = 'Extract topics for existing prompts into the topic index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Prompts extracted and written per transaction')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Extraction processes (0 extracts in this process)')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only prompts that have no topics yet')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        workers = options['workers']
+
+        prompts = Prompt.objects.filter(is_delete=False)
+        if options['missing']:
+            prompts = prompts.filter(topics__isnull=True)
+        total = prompts.count()
+
+        # Workers are forked: don't hand them this process's connections
+        connections.close_all()
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        map_func = map
+        if executor is not None:
+            map_func = partial(executor.map, chunksize=max(1, batch_size // (workers * 4)))
+
+        indexed = topics = 0
+        last_id = 0
+        try:
+            while True:
+                prompt_ids = list(
+                    prompts.filter(id__gt=last_id)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not prompt_ids:
+                    break
+
+                topics += topic_index.index_prompts(prompt_ids, map_func=map_func)
+                indexed += len(prompt_ids)
+                last_id = prompt_ids[-1]
+
+                self.stdout.write(f"  {indexed}/{total} prompts indexed")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} prompts ({topics} topics)"
+        ))
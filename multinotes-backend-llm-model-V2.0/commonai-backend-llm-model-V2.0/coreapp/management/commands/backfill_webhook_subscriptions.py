@@ -0,0 +1,57 @@
+"""
+Create WebhookSubscription rows for webhooks registered before the index.
+
+Dispatch only finds webhooks through their subscription rows, which are
+written when a webhook is saved; webhooks that have not been saved since
+the index was added receive no events until this command runs.
+
+Usage:
+    python manage.py backfill_webhook_subscriptions
+    python manage.py backfill_webhook_subscriptions --batch-size 200 --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+
+from coreapp.services.webhook_service import Webhook
+
+
+class Command(BaseCommand):
+    help = 'Sync the webhook subscription index with each webhook\'s events'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Webhooks loaded per query')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only count the active webhooks without subscription rows')
+
+    def handle(self, *args, **options):
+        webhooks = Webhook.objects.filter(is_active=True, is_delete=False)
+
+        if options['dry_run']:
+            missing = webhooks.filter(subscriptions__isnull=True).exclude(events=[]).count()
+            self.stdout.write(f"{missing} webhooks have no subscription rows")
+            return
+
+        total = webhooks.count()
+        synced = 0
+        last_id = None
+        batch_size = options['batch_size']
+
+        while True:
+            batch = webhooks.order_by('id')
+            if last_id is not None:
+                batch = batch.filter(id__gt=last_id)
+            batch = list(batch.only('id', 'user_id', 'events', 'is_active', 'is_delete')[:batch_size])
+            if not batch:
+                break
+
+            for webhook in batch:
+                webhook.sync_subscriptions()
+            synced += len(batch)
+            last_id = batch[-1].id
+
+            self.stdout.write(f"  {synced}/{total} webhooks synced")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Synced subscriptions for {synced} webhooks"
+        ))
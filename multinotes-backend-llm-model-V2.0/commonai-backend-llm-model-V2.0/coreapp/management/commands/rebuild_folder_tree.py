@@ -0,0 +1,39 @@
+"""
+Rebuild the folder tree index (FolderClosure) from parent_folder links.
+
+Folders are indexed on create and move, and reads index a user's folders
+on first use; this command backfills every user up front or repairs the
+index after bulk updates that bypass signals.
+
+Usage:
+    python manage.py rebuild_folder_tree
+    python manage.py rebuild_folder_tree --user 42
+"""
+
+from django.core.management.base import BaseCommand
+
+from coreapp.models import Folder
+from coreapp.services.folder_tree import folder_tree
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the folder closure table used for subtree and breadcrumb reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild the folders of these users (repeatable)')
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or list(
+            Folder.objects.order_by().values_list('user_id', flat=True).distinct()
+        )
+
+        rows = 0
+        for index, user_id in enumerate(user_ids, start=1):
+            rows += folder_tree.rebuild(user_id=user_id)
+            if index % 100 == 0:
+                self.stdout.write(f"  {index}/{len(user_ids)} users")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt folder tree for {len(user_ids)} users ({rows} rows)"
+        ))
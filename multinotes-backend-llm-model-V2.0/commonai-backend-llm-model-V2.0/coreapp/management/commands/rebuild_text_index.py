@@ -0,0 +1,67 @@
+"""
+Rebuild the full-text index for prompt responses, documents and notebooks.
+
+New and edited rows are indexed on save; this command fills the index for
+existing rows (run it once before enabling TEXT_INDEX_SEARCH_ENABLED) or
+repairs it after bulk updates that bypass signals.
+
+Usage:
+    python manage.py rebuild_text_index
+    python manage.py rebuild_text_index --type document --batch-size 200
+"""
+
+from django.core.management.base import BaseCommand
+
+from coreapp.models import Document, NoteBook, PromptResponse
+from coreapp.services.text_index import text_index, DOC_RESPONSE, DOC_DOCUMENT, DOC_NOTEBOOK
+
+
+SOURCES = {
+    DOC_RESPONSE: (PromptResponse, ('response_text',)),
+    DOC_DOCUMENT: (Document, ('title', 'content')),
+    DOC_NOTEBOOK: (NoteBook, ('label', 'content')),
+}
+
+
+class Command(BaseCommand):
+    help = 'Index existing responses, documents and notebooks for full-text search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', choices=list(SOURCES), action='append', dest='types',
+                            help='Only rebuild these document types (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows indexed per transaction')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        for doc_type in options['types'] or list(SOURCES):
+            model, fields = SOURCES[doc_type]
+            rows = model.objects.filter(is_delete=False)
+            total = rows.count()
+            indexed = postings = 0
+            last_id = 0
+
+            while True:
+                batch = list(
+                    rows.filter(id__gt=last_id)
+                    .order_by('id')
+                    .only('id', 'user_id', 'is_delete', *fields)[:batch_size]
+                )
+                if not batch:
+                    break
+
+                items = []
+                for instance in batch:
+                    extracted = text_index.extract(doc_type, instance)
+                    if extracted is not None:
+                        items.append((instance.id, *extracted))
+                postings += text_index.index_many(doc_type, items)
+                indexed += len(items)
+                last_id = batch[-1].id
+
+                self.stdout.write(f"  {doc_type}: {indexed}/{total} indexed")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"Indexed {indexed} {doc_type} rows ({postings} postings)"
+            ))
@@ -0,0 +1,34 @@
+"""
+Run the scheduled-generation dispatcher in the foreground.
+
+The dispatch_due_scheduled_generations beat task checks for due schedules
+once a minute; this command instead sleeps until the earliest upcoming fire
+time, so runs are queued on the minute. Several instances may run at once:
+each due schedule is leased to a single node.
+
+Usage:
+    python manage.py run_generation_scheduler
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from coreapp.services.scheduled_generations import scheduled_generation_service
+
+
+class Command(BaseCommand):
+    help = 'Dispatch scheduled generations to Celery as they fall due'
+
+    def handle(self, *args, **options):
+        scheduled_generation_service.start()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generation scheduler running on {scheduled_generation_service.node_id}"
+        ))
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            scheduled_generation_service.stop()
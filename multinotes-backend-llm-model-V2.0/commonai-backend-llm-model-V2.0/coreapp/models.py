@@ -132,6 +132,23 @@ class Folder(models.Model):
     #     prompts = Prompt.objects.filter(folder__in=self.get_descendant_folders(include_self=True))
 
     #     return prompts
+
+
+class FolderClosure(models.Model):
+    """Ancestor/descendant pair of the folder tree (depth 0 is the folder itself)."""
+    ancestor = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='tree_descendants')
+    descendant = models.ForeignKey(Folder, on_delete=models.CASCADE, related_name='tree_ancestors')
+    depth = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'depth']),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} > {self.descendant_id} ({self.depth})"
+
             
 class GroupResponse(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -139,13 +156,32 @@ class GroupResponse(models.Model):
     llm = models.ForeignKey(LLM, on_delete=models.CASCADE)
     group_name = models.CharField(max_length=255)
     # conversation_id = models.CharField(max_length=255)
+    # Legacy JSON history; new turns go to ConversationTurn
     conversation_history = models.TextField(null=True, blank=True)
+    turn_count = models.PositiveIntegerField(default=0)  # last ConversationTurn.sequence
     is_active = models.BooleanField(default=True)
     is_delete = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
 
+class ConversationTurn(models.Model):
+    """One message of a chat group, append-only and numbered per group."""
+    group = models.ForeignKey(GroupResponse, on_delete=models.CASCADE, related_name='turns')
+    sequence = models.PositiveIntegerField()
+    role = models.CharField(max_length=20)   # user / assistant
+    content = models.TextField()
+    prompt = models.ForeignKey('Prompt', on_delete=models.SET_NULL, null=True, blank=True, related_name='turns')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('group', 'sequence')
+        ordering = ['group', 'sequence']
+
+    def __str__(self):
+        return f"{self.group_id} #{self.sequence} {self.role}"
+
+
 class Prompt(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     group = models.ForeignKey(GroupResponse, on_delete=models.CASCADE, null=True, blank=True)
@@ -262,6 +298,7 @@ class StorageUsage(models.Model):
 
     total_storage_used = models.BigIntegerField(default=0)  # store size in bytes
     storage_limit = models.BigIntegerField(default=0)  # Size store in bytes
+    reserved_storage = models.BigIntegerField(default=0)  # Bytes held by in-flight direct uploads
 
     is_delete = models.BooleanField(default=False)
     isSubscribe = models.BooleanField(default=False)
@@ -358,6 +395,210 @@ class UserContent(models.Model):
         return f"{self.user.username} - {self.fileName}"
 
 
+class UploadSession(models.Model):
+    """A presigned multipart upload straight to S3, holding storage quota until it settles."""
+    purpose_type = (("content", 'content'), ("profile_image", 'profile_image'))
+    status_type = (("reserved", 'reserved'), ("completed", 'completed'), ("released", 'released'))
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    storage = models.ForeignKey(StorageUsage, on_delete=models.SET_NULL, null=True, blank=True)
+    folder = models.ForeignKey(Folder, on_delete=models.SET_NULL, null=True, blank=True)
+    content = models.ForeignKey(UserContent, on_delete=models.SET_NULL, null=True, blank=True)
+    purpose = models.CharField(choices=purpose_type, max_length=20, default='content')
+    object_key = models.CharField(max_length=255)
+    upload_id = models.CharField(max_length=1024)
+    fileName = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=255, default='application/octet-stream')
+    reserved_size = models.BigIntegerField(default=0)  # Bytes declared (and held) at initiation
+    size = models.BigIntegerField(default=0)  # Bytes found on S3 at completion
+    part_size = models.BigIntegerField()
+    part_count = models.PositiveIntegerField()
+    status = models.CharField(choices=status_type, max_length=20, default='reserved')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.fileName} ({self.status})"
+
+
+class GenerationSchedule(models.Model):
+    """A cron-scheduled AI generation; due rows are claimed by one scheduler node at a time via a lease."""
+    status_type = (("active", 'active'), ("paused", 'paused'), ("completed", 'completed'),
+                   ("failed", 'failed'), ("expired", 'expired'), ("cancelled", 'cancelled'))
+
+    schedule_id = models.CharField(max_length=36, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='generation_schedules')
+    name = models.CharField(max_length=255)
+    description = models.TextField(blank=True, default='')
+    cron = models.CharField(max_length=255)
+    timezone = models.CharField(max_length=64, default='UTC')
+    repeat_interval = models.CharField(max_length=20, default='custom')
+    status = models.CharField(choices=status_type, max_length=20, default='active')
+    generation_config = models.JSONField(default=dict)
+    max_executions = models.PositiveIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    execution_count = models.PositiveIntegerField(default=0)
+    last_execution = models.DateTimeField(null=True, blank=True)
+    last_result = models.JSONField(null=True, blank=True)
+    next_run_at = models.DateTimeField(null=True, blank=True)
+    lease_owner = models.CharField(max_length=100, null=True, blank=True)  # Claim token of the node running it
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    webhook_url = models.URLField(max_length=1024, null=True, blank=True)
+    notify_on_completion = models.BooleanField(default=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_run_at']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name} ({self.cron})"
+
+
+class GenerationBatch(models.Model):
+    """A batch processing job; its items are GenerationBatchItem rows."""
+    status_type = (("pending", 'pending'), ("queued", 'queued'), ("processing", 'processing'),
+                   ("paused", 'paused'), ("completed", 'completed'), ("failed", 'failed'),
+                   ("cancelled", 'cancelled'), ("partial", 'partial'))
+
+    job_id = models.CharField(max_length=36, unique=True)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='generation_batches')
+    name = models.CharField(max_length=255)
+    status = models.CharField(choices=status_type, max_length=20, default='pending')
+    priority = models.PositiveSmallIntegerField(default=2)
+    config = models.JSONField(default=dict)
+    metadata = models.JSONField(default=dict, blank=True)  # Processor type, prompt template, model...
+    total_items = models.PositiveIntegerField(default=0)
+    processed_items = models.PositiveIntegerField(default=0)
+    successful_items = models.PositiveIntegerField(default=0)
+    failed_items = models.PositiveIntegerField(default=0)
+    total_tokens = models.BigIntegerField(default=0)
+    total_cost = models.FloatField(default=0.0)
+    error = models.TextField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['status', 'updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.name} ({self.status})"
+
+
+class GenerationBatchItem(models.Model):
+    """One input of a batch job, written back as soon as it finishes (the job's checkpoint)."""
+    status_type = (("pending", 'pending'), ("processing", 'processing'),
+                   ("completed", 'completed'), ("failed", 'failed'))
+
+    batch = models.ForeignKey(GenerationBatch, on_delete=models.CASCADE, related_name='items')
+    item_id = models.CharField(max_length=36)
+    position = models.PositiveIntegerField()
+    input_data = models.JSONField(default=dict)
+    status = models.CharField(choices=status_type, max_length=20, default='pending')
+    output = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    retries = models.PositiveSmallIntegerField(default=0)
+    tokens = models.PositiveIntegerField(default=0)
+    cost = models.FloatField(default=0.0)
+    processing_time_ms = models.FloatField(default=0.0)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('batch', 'position')
+        indexes = [
+            models.Index(fields=['batch', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.batch_id} #{self.position} ({self.status})"
+
+
+class ContentEmbedding(models.Model):
+    """Embedding of a response, document or notebook for semantic search (float32 bytes)."""
+    doc_type = models.CharField(max_length=20)   # response / document / notebook
+    doc_id = models.BigIntegerField()
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='content_embeddings')
+    dimensions = models.PositiveIntegerField()
+    vector = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('doc_type', 'doc_id')
+
+    def __str__(self):
+        return f"{self.doc_type} {self.doc_id} ({self.dimensions}d)"
+
+
+class SearchDocument(models.Model):
+    """A response, document or notebook in the full-text index."""
+    doc_type = models.CharField(max_length=20)   # response / document / notebook
+    doc_id = models.BigIntegerField()
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='search_documents')
+    length = models.PositiveIntegerField(default=0)   # indexed tokens, for BM25
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('doc_type', 'doc_id')
+        indexes = [
+            models.Index(fields=['user', 'doc_type']),
+        ]
+
+    def __str__(self):
+        return f"{self.doc_type} {self.doc_id}"
+
+
+class SearchPosting(models.Model):
+    """One term of an indexed document with its frequency."""
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    doc_type = models.CharField(max_length=20)
+    term = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'term']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.document_id})"
+
+
+class PromptTopic(models.Model):
+    """One topic extracted from a prompt and its responses."""
+    prompt = models.ForeignKey(Prompt, on_delete=models.CASCADE, related_name='topics')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    name = models.CharField(max_length=100)
+    category = models.CharField(max_length=50, blank=True)
+    score = models.FloatField(default=0)
+    prompt_created_at = models.DateTimeField()   # copied from the prompt, for trend buckets
+
+    class Meta:
+        unique_together = ('prompt', 'name')
+        indexes = [
+            models.Index(fields=['user', 'prompt_created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.prompt_id})"
+
+
 # class FolderData(models.Model):
 #     file = models.ForeignKey(UserContent, on_delete=models.CASCADE, null=True, blank=True)
 #     folder = models.ForeignKey(Folder, on_delete=models.CASCADE, null=True, blank=True)
@@ -413,16 +654,7 @@ class AiProcess(models.Model):
     is_delete = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    
-
-
-    
-
-    
-
-
-
-
 
 
-    
\ No newline at end of file
+# Models of the backend/ services (not an installed app), loaded with coreapp
+from .models_security import AbuseLog, BlockedIP, UserAPIKey, APIKeyUsageLog  # noqa: E402,F401
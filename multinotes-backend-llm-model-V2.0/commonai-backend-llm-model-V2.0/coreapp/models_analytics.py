@@ -6,6 +6,7 @@ This module provides:
 - PromptTemplate model for reusable prompts
 - SystemMetrics model for performance tracking
 - APIUsageLog for API usage tracking
+- DailyActivityRollup for incremental active-user and usage rollups
 """
 
 from django.db import models
@@ -431,18 +432,28 @@ class APIUsageLog(models.Model):
         """
         Log an API request.
 
+        The row is queued on the buffered log writer and saved in a batch
+        shortly after, so this does not hit the database.
+
         Args:
             user: User making the request
             endpoint: API endpoint called
             method: HTTP method
             **kwargs: Additional fields
+
+        Returns:
+            The queued APIUsageLog instance
         """
-        return cls.objects.create(
+        from backend.log_writer import log_writer
+
+        entry = cls(
             user=user,
             endpoint=endpoint,
             method=method,
             **kwargs
         )
+        log_writer.append(entry)
+        return entry
 
 
 # =============================================================================
@@ -508,3 +519,42 @@ class DailyAggregation(models.Model):
         today = timezone.now().date()
         obj, created = cls.objects.get_or_create(date=today)
         return obj
+
+
+# =============================================================================
+# Daily Activity Rollup Model
+# =============================================================================
+
+class DailyActivityRollup(models.Model):
+    """
+    Per-day partial aggregates of UserAnalytics.
+
+    ``active_users_bitmap`` is a zlib-compressed bitmap with bit N set when
+    user N was active that day. Weekly and monthly distinct counts OR the
+    bitmaps of the days in the window instead of rescanning raw rows.
+    """
+
+    date = models.DateField(unique=True)
+
+    active_users = models.PositiveIntegerField(default=0)
+    active_users_bitmap = models.BinaryField(default=bytes)
+
+    # Per-day sums
+    notes_created = models.PositiveIntegerField(default=0)
+    ai_generations = models.PositiveIntegerField(default=0)
+    ai_tokens_used = models.BigIntegerField(default=0)
+    sessions_count = models.PositiveIntegerField(default=0)
+    api_calls = models.PositiveIntegerField(default=0)
+    api_errors = models.PositiveIntegerField(default=0)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'daily_activity_rollups'
+        verbose_name = 'Daily Activity Rollup'
+        verbose_name_plural = 'Daily Activity Rollups'
+
+    def __str__(self):
+        return f"Activity rollup for {self.date}"
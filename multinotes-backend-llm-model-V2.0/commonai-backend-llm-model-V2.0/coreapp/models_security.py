@@ -0,0 +1,183 @@
+"""
+Security models for MultinotesAI.
+
+This module provides:
+- AbuseLog and BlockedIP for abuse detection (backend.abuse_detection)
+- UserAPIKey and APIKeyUsageLog for user API keys (backend.api_keys)
+
+The services live in backend/, which is not an installed app; the models
+are defined here and imported by coreapp.models so they load with coreapp.
+"""
+
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+
+# =============================================================================
+# Abuse Log Model
+# =============================================================================
+
+class AbuseLog(models.Model):
+    """Log of detected abuse incidents."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='abuse_logs'
+    )
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(blank=True)
+
+    abuse_type = models.CharField(max_length=50)
+    severity = models.IntegerField(default=1)
+    description = models.TextField()
+    metadata = models.JSONField(default=dict)
+
+    action_taken = models.CharField(max_length=50, default='log_only')
+    is_resolved = models.BooleanField(default=False)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    resolved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='resolved_abuse_logs'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'abuse_logs'
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['ip_address', '-created_at']),
+            models.Index(fields=['abuse_type', '-created_at']),
+            models.Index(fields=['is_resolved', '-created_at']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.abuse_type} - {self.ip_address or self.user}"
+
+
+class BlockedIP(models.Model):
+    """Blocked IP addresses."""
+
+    ip_address = models.GenericIPAddressField(unique=True)
+    reason = models.TextField()
+    blocked_until = models.DateTimeField(null=True, blank=True)
+    is_permanent = models.BooleanField(default=False)
+
+    blocked_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'blocked_ips'
+
+    def __str__(self):
+        return f"{self.ip_address} - {'Permanent' if self.is_permanent else 'Temporary'}"
+
+    @property
+    def is_active(self) -> bool:
+        if self.is_permanent:
+            return True
+        if self.blocked_until:
+            return timezone.now() < self.blocked_until
+        return False
+
+
+# =============================================================================
+# API Key Model
+# =============================================================================
+
+class UserAPIKey(models.Model):
+    """User API key for external integrations."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='api_keys'
+    )
+
+    # Key identification
+    name = models.CharField(max_length=100)
+    prefix = models.CharField(max_length=8, db_index=True)  # First 8 chars for lookup
+    key_hash = models.CharField(max_length=64, unique=True)  # SHA-256 hash
+
+    # Permissions
+    scopes = models.JSONField(default=list)  # ['read', 'write', 'generate']
+    rate_limit = models.IntegerField(default=1000)  # Requests per hour
+
+    # Metadata
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    last_used_ip = models.GenericIPAddressField(null=True, blank=True)
+    total_requests = models.IntegerField(default=0)
+
+    # Validity
+    is_active = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'user_api_keys'
+        indexes = [
+            models.Index(fields=['user', 'is_active']),
+            models.Index(fields=['prefix']),
+            models.Index(fields=['-created_at']),
+        ]
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.name} ({self.prefix}...)"
+
+    @property
+    def is_valid(self) -> bool:
+        """Check if key is valid."""
+        if not self.is_active:
+            return False
+        if self.expires_at and timezone.now() > self.expires_at:
+            return False
+        return True
+
+    @property
+    def is_expired(self) -> bool:
+        """Check if key is expired."""
+        if self.expires_at and timezone.now() > self.expires_at:
+            return True
+        return False
+
+
+class APIKeyUsageLog(models.Model):
+    """Log API key usage for analytics."""
+
+    api_key = models.ForeignKey(
+        UserAPIKey,
+        on_delete=models.CASCADE,
+        related_name='usage_logs'
+    )
+    endpoint = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    status_code = models.IntegerField()
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    response_time_ms = models.IntegerField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_key_usage_logs'
+        indexes = [
+            models.Index(fields=['api_key', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
+        ordering = ['-created_at']
@@ -7,7 +7,8 @@ from .models import (LLM, PromptResponse, Prompt, NoteBook,
 from planandsubscription.models import Category
 from authentication.models import CustomUser
 from planandsubscription.models import Transaction, Subscription
-from django.db.models import Sum
+from django.db.models import Sum, QuerySet
+from .services.folder_tree import folder_tree
 from backend.validators import (
     sanitize_text,
     sanitize_html,
@@ -257,6 +258,30 @@ class SingleNoteBookSerializer(serializers.ModelSerializer):
 
 
 
+def nested_subfolders(serializer, obj):
+    """
+    Serialize every folder below ``obj``, nested, without a query per folder.
+
+    The subtrees of all folders being serialized together are fetched once
+    and kept in the serializer context for the nested levels.
+    """
+    tree = serializer.context.get('folder_tree')
+    if tree is None or obj.id not in tree['covered']:
+        roots = [obj]
+        parent = serializer.parent
+        if isinstance(parent, serializers.ListSerializer) and isinstance(parent.instance, (list, tuple, QuerySet)):
+            roots = list(parent.instance)
+        children = folder_tree.children_map(roots)
+        covered = {root.id for root in roots}
+        covered.update(folder.id for folders in children.values() for folder in folders)
+        tree = {'children': children, 'covered': covered}
+        serializer.context['folder_tree'] = tree
+
+    return serializer.__class__(
+        tree['children'].get(obj.id, []), many=True, context={**serializer.context, 'folder_tree': tree}
+    ).data
+
+
 class FolderSerializer(serializers.ModelSerializer):
     subfolders = serializers.SerializerMethodField()
     user = GetCustomUserSerializer()
@@ -273,11 +298,7 @@ class FolderSerializer(serializers.ModelSerializer):
     #     super().__init__(*args, **kwargs)
 
     def get_subfolders(self, obj):
-        # Retrieve all subfolders for the current folder object
-        subfolders = obj.subfolders.all()
-        # Serialize the subfolders recursively
-        serializer = self.__class__(subfolders, many=True)
-        return serializer.data
+        return nested_subfolders(self, obj)
 
         # # Modify serialized data to include `isShare` key
         # subfolder_data = serializer.data
@@ -303,11 +324,7 @@ class CreateFolderSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_subfolders(self, obj):
-        # Retrieve all subfolders for the current folder object
-        subfolders = obj.subfolders.all()
-        # Serialize the subfolders recursively
-        serializer = self.__class__(subfolders, many=True)
-        return serializer.data
+        return nested_subfolders(self, obj)
 
 class FolderOutputSerializer(serializers.ModelSerializer):
     # subfolders = serializers.SerializerMethodField()
@@ -0,0 +1,232 @@
+"""
+Write-Combining Analytics Counters for MultinotesAI.
+
+This module provides:
+- In-process accumulation of UserAnalytics increments per (user, date, field)
+- A background flush that applies them with F() updates in bulk
+- Feature-usage counts merged into the JSON column under a row lock
+- Pending (not yet flushed) values for dashboards to merge with stored rows
+- A drop counter once ANALYTICS_MAX_PENDING_KEYS (user, date) pairs of counters
+  (or of feature usage) are pending
+
+Tracking an event only adds to a dict; no query runs on the request path.
+Users whose deltas are identical on the same day share one UPDATE, so a
+flush of thousands of "+1 api call" events is a handful of statements.
+Pending values held by other processes reach the database within
+ANALYTICS_FLUSH_INTERVAL seconds.
+
+A row that cannot be written (e.g. its user was deleted) only loses its
+own deltas; a flush that fails as a whole keeps every delta for the next
+attempt.
+"""
+
+import logging
+from collections import Counter, defaultdict
+from datetime import date as date_type
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backend.background_flusher import BackgroundFlusher
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Counter Buffer
+# =============================================================================
+
+class AnalyticsCounters(BackgroundFlusher):
+    """
+    Combine UserAnalytics increments in memory and flush them periodically.
+
+    Usage:
+        analytics_counters.add(user.id, 'api_calls')
+        analytics_counters.add_feature(user.id, 'export')
+        analytics_counters.pending(user.id, since=start_date)  # {date: {field: n}}
+    """
+
+    UPDATE_CHUNK = 500
+    thread_name = 'analytics-counters'
+
+    def __init__(self, flush_interval: float = None, max_keys: int = None, background: bool = True):
+        super().__init__(
+            flush_interval=flush_interval or getattr(settings, 'ANALYTICS_FLUSH_INTERVAL', 5.0),
+            background=background,
+        )
+        self.max_keys = max_keys or getattr(settings, 'ANALYTICS_MAX_PENDING_KEYS', 50000)
+
+        self._counts = defaultdict(Counter)    # (user_id, date) -> {field: delta}
+        self._features = defaultdict(Counter)  # (user_id, date) -> {feature: delta}
+
+        self.dropped = 0
+        self.failed = 0
+
+    # -------------------------------------------------------------------------
+    # Request Path
+    # -------------------------------------------------------------------------
+
+    def add(self, user_id: int, field: str, amount: int = 1, date: Optional[date_type] = None) -> bool:
+        """
+        Add ``amount`` to a UserAnalytics counter field.
+
+        Returns:
+            False if too many (user, date) pairs were pending and it was dropped
+        """
+        if not amount:
+            return True
+        return self._add(self._counts, (user_id, date or timezone.now().date()), field, amount)
+
+    def add_feature(self, user_id: int, feature: str, amount: int = 1, date: Optional[date_type] = None) -> bool:
+        """Count a use of ``feature`` in UserAnalytics.feature_usage (False if dropped)."""
+        return self._add(self._features, (user_id, date or timezone.now().date()), feature, amount)
+
+    def _add(self, pending: Dict, key, name: str, amount: int) -> bool:
+        with self._lock:
+            if key not in pending and len(pending) >= self.max_keys:
+                self.dropped += 1
+                metrics.counter('analytics_counters_dropped_total')
+                dropped = True
+            else:
+                pending[key][name] += amount
+                dropped = False
+            size = len(pending)
+
+        if self.background:
+            self._ensure_running()
+            if size >= self.max_keys:
+                self._wakeup.set()
+        return not dropped
+
+    def pending(self, user_id: int, since: Optional[date_type] = None) -> Dict:
+        """Unflushed deltas for a user: {date: {field: n, 'feature_usage': {name: n}}}."""
+        result = defaultdict(dict)
+        with self._lock:
+            for (uid, day), fields in self._counts.items():
+                if uid == user_id and (since is None or day >= since):
+                    result[day].update(fields)
+            for (uid, day), features in self._features.items():
+                if uid == user_id and (since is None or day >= since):
+                    result[day]['feature_usage'] = dict(features)
+        return dict(result)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = len(set(self._counts) | set(self._features))
+        return {'pending': pending, 'dropped': self.dropped, 'failed': self.failed}
+
+    # -------------------------------------------------------------------------
+    # Flushing
+    # -------------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Apply all pending deltas; returns the number of (user, date) rows touched."""
+        with self._flush_lock:
+            with self._lock:
+                counts, self._counts = self._counts, defaultdict(Counter)
+                features, self._features = self._features, defaultdict(Counter)
+            if not counts and not features:
+                return 0
+
+            try:
+                with transaction.atomic():
+                    failed = self._ensure_rows(set(counts) | set(features))
+                    for key in failed:
+                        counts.pop(key, None)
+                        features.pop(key, None)
+                    self._apply_counts(counts)
+                    failed |= self._apply_features(features)
+            except Exception:
+                self._restore(counts, features)
+                raise
+
+        self.failed += len(failed)
+        return len((set(counts) | set(features)) - failed)
+
+    def _ensure_rows(self, keys) -> set:
+        """Create the UserAnalytics rows that do not exist yet; returns the keys of deleted users."""
+        from django.contrib.auth import get_user_model
+        from coreapp.models_analytics import UserAnalytics
+
+        by_date = defaultdict(set)
+        for user_id, day in keys:
+            by_date[day].add(user_id)
+
+        missing = []
+        for day, user_ids in by_date.items():
+            existing = set(
+                UserAnalytics.objects.filter(date=day, user_id__in=user_ids).values_list('user_id', flat=True)
+            )
+            missing.extend((uid, day) for uid in user_ids - existing)
+        if not missing:
+            return set()
+
+        # Users deleted since the event would fail the whole insert
+        users = set(
+            get_user_model().objects.filter(id__in={uid for uid, _ in missing}).values_list('id', flat=True)
+        )
+        failed = {(uid, day) for uid, day in missing if uid not in users}
+        for uid, day in failed:
+            logger.warning(f"Dropped analytics deltas for deleted user {uid} on {day}")
+
+        UserAnalytics.objects.bulk_create(
+            [UserAnalytics(user_id=uid, date=day) for uid, day in missing if uid in users],
+            ignore_conflicts=True,
+        )
+        return failed
+
+    def _apply_counts(self, counts):
+        """One F() UPDATE per (date, identical deltas) group of users."""
+        from coreapp.models_analytics import UserAnalytics
+
+        groups = defaultdict(list)
+        for (user_id, day), fields in counts.items():
+            deltas = tuple(sorted((field, amount) for field, amount in fields.items() if amount))
+            if deltas:
+                groups[(day, deltas)].append(user_id)
+
+        now = timezone.now()
+        for (day, deltas), user_ids in groups.items():
+            changes = {field: F(field) + amount for field, amount in deltas}
+            for start in range(0, len(user_ids), self.UPDATE_CHUNK):
+                UserAnalytics.objects.filter(
+                    date=day, user_id__in=user_ids[start:start + self.UPDATE_CHUNK]
+                ).update(updated_at=now, **changes)
+
+    def _apply_features(self, features) -> set:
+        """Merge feature counts into the JSON column, each row under a lock; returns the keys that failed."""
+        from coreapp.models_analytics import UserAnalytics
+
+        failed = set()
+        for (user_id, day), delta in features.items():
+            try:
+                with transaction.atomic():
+                    row = UserAnalytics.objects.select_for_update().get(user_id=user_id, date=day)
+                    usage = row.feature_usage or {}
+                    for feature, amount in delta.items():
+                        usage[feature] = usage.get(feature, 0) + amount
+                    row.feature_usage = usage
+                    row.save(update_fields=['feature_usage', 'updated_at'])
+            except (UserAnalytics.DoesNotExist, IntegrityError, DataError) as e:
+                failed.add((user_id, day))
+                logger.warning(f"Dropped feature usage for user {user_id} on {day}: {e}")
+        return failed
+
+    def _restore(self, counts, features):
+        """Put deltas back after a failed flush so they are retried."""
+        with self._lock:
+            for key, fields in counts.items():
+                self._counts[key].update(fields)
+            for key, delta in features.items():
+                self._features[key].update(delta)
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+analytics_counters = AnalyticsCounters()
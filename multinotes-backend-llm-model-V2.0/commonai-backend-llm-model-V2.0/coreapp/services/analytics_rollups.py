@@ -0,0 +1,145 @@
+"""
+Incremental Analytics Rollups for MultinotesAI.
+
+This module provides:
+- Per-day rollups of UserAnalytics (sums plus an active-user bitmap)
+- Distinct active users over any window by OR-ing the daily bitmaps
+- DAU / WAU / MAU that only roll up days not stored yet
+
+A settled day's rollup never changes, so a daily run reads one day of raw
+rows (plus any days missing from the window) instead of rescanning the last
+30 days. Days within ROLLUP_SETTLE_DAYS of today are always recomputed,
+since late counter flushes can still land on them.
+"""
+
+import logging
+import zlib
+from datetime import date, timedelta
+from typing import Dict, Iterable
+
+from django.db.models import Sum
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+ROLLUP_SETTLE_DAYS = 1
+
+DAILY_SUMS = {
+    'notes_created': 'notes_created',
+    'ai_tokens_used': 'ai_tokens_used',
+    'sessions_count': 'sessions_count',
+    'api_calls': 'api_calls',
+    'api_errors': 'api_errors',
+}
+
+
+# =============================================================================
+# Bitmaps
+# =============================================================================
+
+def encode_bitmap(user_ids: Iterable[int]) -> bytes:
+    """Compressed bitmap with one bit per user id."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return b''
+    bits = bytearray(max(user_ids) // 8 + 1)
+    for user_id in user_ids:
+        bits[user_id >> 3] |= 1 << (user_id & 7)
+    return zlib.compress(bytes(bits))
+
+
+def decode_bitmap(data: bytes) -> int:
+    """Bitmap as a Python int (bit N = user N)."""
+    if not data:
+        return 0
+    return int.from_bytes(zlib.decompress(bytes(data)), 'little')
+
+
+def bitmap_count(bitmap: int) -> int:
+    return bin(bitmap).count('1')
+
+
+# =============================================================================
+# Rollup Engine
+# =============================================================================
+
+class ActivityRollups:
+    """
+    Store and merge per-day activity aggregates.
+
+    Usage:
+        activity_rollups.window_metrics(yesterday)   # {'dau': ..., 'wau': ..., 'mau': ...}
+        activity_rollups.distinct_active_users(start, end)
+    """
+
+    def rollup_day(self, day: date):
+        """(Re)compute the rollup for one day from its UserAnalytics rows."""
+        from coreapp.models_analytics import DailyActivityRollup, UserAnalytics
+
+        rows = UserAnalytics.objects.filter(date=day)
+        user_ids = list(rows.values_list('user_id', flat=True))
+        sums = rows.aggregate(
+            ai_text=Sum('ai_text_generations'),
+            ai_image=Sum('ai_image_generations'),
+            **{name: Sum(field) for name, field in DAILY_SUMS.items()}
+        )
+
+        rollup, _ = DailyActivityRollup.objects.update_or_create(
+            date=day,
+            defaults={
+                'active_users': len(set(user_ids)),
+                'active_users_bitmap': encode_bitmap(user_ids),
+                'ai_generations': (sums.pop('ai_text') or 0) + (sums.pop('ai_image') or 0),
+                **{name: value or 0 for name, value in sums.items()},
+            },
+        )
+        return rollup
+
+    def ensure(self, start: date, end: date) -> Dict:
+        """
+        Rollups for every day in [start, end], computing only the ones missing
+        or not yet settled.
+        """
+        from coreapp.models_analytics import DailyActivityRollup
+
+        stored = {r.date: r for r in DailyActivityRollup.objects.filter(date__gte=start, date__lte=end)}
+        unsettled = timezone.now().date() - timedelta(days=ROLLUP_SETTLE_DAYS)
+
+        day = start
+        while day <= end:
+            if day not in stored or day >= unsettled:
+                stored[day] = self.rollup_day(day)
+            day += timedelta(days=1)
+        return stored
+
+    def distinct_active_users(self, start: date, end: date) -> int:
+        """Users active on any day in [start, end]."""
+        merged = 0
+        for rollup in self.ensure(start, end).values():
+            merged |= decode_bitmap(rollup.active_users_bitmap)
+        return bitmap_count(merged)
+
+    def window_metrics(self, target_date: date) -> Dict:
+        """DAU, WAU and MAU ending on ``target_date``, from one pass over the rollups."""
+        rollups = self.ensure(target_date - timedelta(days=30), target_date)
+
+        merged, wau = 0, 0
+        for offset in range(31):
+            rollup = rollups[target_date - timedelta(days=offset)]
+            merged |= decode_bitmap(rollup.active_users_bitmap)
+            if offset == 7:
+                wau = bitmap_count(merged)
+
+        return {
+            'dau': rollups[target_date].active_users,
+            'wau': wau,
+            'mau': bitmap_count(merged),
+        }
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+activity_rollups = ActivityRollups()
@@ -3,30 +3,38 @@ Batch Processing Service for MultinotesAI.
 
 This module provides:
 - Batch prompt processing for multiple inputs
-- Queue-based job management
+- Database-backed jobs and items, checkpointed item by item
+- Execution as a Celery chord of item chunks, spread over worker nodes
+- A Redis token bucket per provider shared by every worker
 - Progress tracking and notifications
-- Rate limiting and throttling
 - Retry logic and error handling
+- Streaming result export
+
+A job's pending items are split into chunks of BatchConfig.batch_size; each
+chunk is one Celery task and the chord callback settles the job. Every item
+is written back the moment it finishes, so a paused, cancelled or crashed
+job resumes with only the items that never completed.
 
 WBS Item: 6.1.4 - Batch processing
 """
 
 import logging
 import time
-import json
 import uuid
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from dataclasses import dataclass, field
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, timedelta
 from enum import Enum
 from typing import Optional, List, Dict, Any, Callable, Iterator
-from queue import Queue, Empty
-from threading import Thread, Event
+from threading import Lock
 
 from django.conf import settings
-from django.core.cache import cache
+from django.db.models import Count, DateTimeField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from backend.rate_limiting import GCRA, Limit, rate_limiter
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,6 +62,14 @@ class BatchPriority(Enum):
     URGENT = 4
 
 
+# Statuses a job can still make progress in
+RUNNING_STATUSES = (BatchStatus.QUEUED.value, BatchStatus.PROCESSING.value)
+
+# Statuses a job no longer changes from
+FINAL_STATUSES = (BatchStatus.COMPLETED.value, BatchStatus.FAILED.value,
+                  BatchStatus.CANCELLED.value, BatchStatus.PARTIAL.value)
+
+
 @dataclass
 class BatchConfig:
     """Configuration for batch processing."""
@@ -85,6 +101,9 @@ class BatchItem:
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     processing_time_ms: float = 0.0
+    tokens: int = 0
+    cost: float = 0.0
+    pk: Optional[int] = None
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -109,7 +128,7 @@ class BatchJob:
     priority: BatchPriority = BatchPriority.NORMAL
     config: BatchConfig = field(default_factory=BatchConfig)
     progress: float = 0.0
-    created_at: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=timezone.now)
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     total_items: int = 0
@@ -122,7 +141,9 @@ class BatchJob:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
     def __post_init__(self):
-        self.total_items = len(self.items)
+        # Jobs loaded without their items keep the stored count
+        if not self.total_items:
+            self.total_items = len(self.items)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -179,36 +200,41 @@ class BatchResult:
 
 
 # =============================================================================
-# Rate Limiter
+# Rate Limiters
 # =============================================================================
 
 class RateLimiter:
-    """Token bucket rate limiter."""
+    """Token bucket rate limiter (per process)."""
 
     def __init__(self, rate: int, per_seconds: int = 60):
         self.rate = rate
         self.per_seconds = per_seconds
         self.tokens = rate
         self.last_update = time.time()
+        self._lock = Lock()
 
     def acquire(self, timeout: float = None) -> bool:
-        """Acquire a token, blocking if necessary."""
-        start_time = time.time()
+        """Acquire a token, sleeping exactly until one is due if necessary."""
+        deadline = None if timeout is None else time.time() + timeout
 
         while True:
-            self._refill()
-
-            if self.tokens >= 1:
-                self.tokens -= 1
+            wait_seconds = self._take()
+            if wait_seconds <= 0:
                 return True
 
-            if timeout is not None:
-                elapsed = time.time() - start_time
-                if elapsed >= timeout:
-                    return False
+            if deadline is not None and time.time() + wait_seconds > deadline:
+                return False
 
-            # Wait for token to become available
-            time.sleep(0.1)
+            time.sleep(wait_seconds)
+
+    def _take(self) -> float:
+        """Take a token; returns 0, or the seconds until a token is available."""
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) * self.per_seconds / self.rate
 
     def _refill(self):
         """Refill tokens based on elapsed time."""
@@ -219,6 +245,98 @@ class RateLimiter:
         self.last_update = now
 
 
+class SharedRateLimiter(RateLimiter):
+    """
+    Token bucket held by the shared rate-limit engine (GCRA in Redis), so
+    every process and node using the same key draws from one budget. The
+    engine falls back to in-process state while Redis is unavailable.
+    """
+
+    def __init__(self, key: str, rate: int, per_seconds: int = 60):
+        super().__init__(rate, per_seconds)
+        self.key = f"bucket:{key}"
+
+    def _take(self) -> float:
+        decision = rate_limiter.check(Limit(self.key, self.rate, self.per_seconds, algorithm=GCRA))
+        return 0.0 if decision.allowed else decision.retry_after
+
+
+_provider_limiters: Dict[str, SharedRateLimiter] = {}
+
+
+def provider_limiter(provider: str) -> SharedRateLimiter:
+    """Shared bucket for an LLM provider (BATCH_PROVIDER_RATE_LIMITS, requests per minute)."""
+    if provider not in _provider_limiters:
+        limits = getattr(settings, 'BATCH_PROVIDER_RATE_LIMITS', {})
+        rate = limits.get(provider) or getattr(settings, 'BATCH_RATE_LIMIT_PER_MINUTE', 600)
+        _provider_limiters[provider] = SharedRateLimiter(f"provider:{provider}", rate)
+    return _provider_limiters[provider]
+
+
+# =============================================================================
+# Item Processors
+# =============================================================================
+
+def _llm_processor(metadata: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    prompt_template = metadata.get('prompt_template') or '{{input}}'
+    provider = metadata.get('provider', 'openai')
+    model = metadata.get('model', 'gpt-3.5-turbo')
+    max_tokens = metadata.get('max_tokens', 1000)
+    temperature = metadata.get('temperature', 0.7)
+
+    def llm_processor(input_data: Dict[str, Any]) -> Dict[str, Any]:
+        from coreapp.services.llm_service import llm_service
+        from coreapp.services.prompt_chaining import TemplateEngine
+
+        engine = TemplateEngine()
+        prompt = engine.render(prompt_template, input_data)
+
+        response = llm_service.generate(
+            prompt=prompt,
+            provider=provider,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+
+        return {
+            'output': response.get('content', ''),
+            'tokens': (response.get('tokens') or {}).get('total', 0),
+            'cost': response.get('cost', 0.0),
+        }
+
+    return llm_processor
+
+
+def _embedding_processor(metadata: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def embedding_processor(input_data: Dict[str, Any]) -> Dict[str, Any]:
+        from coreapp.services.llm_service import llm_service
+
+        embedding = llm_service.get_embedding(input_data['text'], provider=metadata.get('provider', 'openai'))
+
+        return {
+            'output': embedding,
+            'tokens': len(input_data['text'].split()) // 4,
+            'cost': 0.0001,
+        }
+
+    return embedding_processor
+
+
+# processor_type -> factory(job metadata) -> fn(input_data). Workers rebuild
+# the function from the stored job, so processors are looked up by name.
+PROCESSORS: Dict[str, Callable[[Dict[str, Any]], Callable]] = {
+    'llm': _llm_processor,
+    'embedding': _embedding_processor,
+    'passthrough': lambda metadata: (lambda input_data: {'output': input_data}),
+}
+
+
+def register_processor(name: str, factory: Callable[[Dict[str, Any]], Callable]):
+    """Make a processor available to batch jobs as ``processor_type=name``."""
+    PROCESSORS[name] = factory
+
+
 # =============================================================================
 # Batch Processor
 # =============================================================================
@@ -227,32 +345,23 @@ class BatchProcessor:
     """
     Core batch processing engine.
 
-    Handles parallel execution, rate limiting, retries, and progress tracking.
+    Handles parallel execution, rate limiting, retries, and progress tracking
+    for the items handed to it; keeps at most max_concurrent items in flight.
     """
 
-    def __init__(self, config: BatchConfig = None):
+    def __init__(self, config: BatchConfig = None, limiters: Optional[List[RateLimiter]] = None):
         self.config = config or BatchConfig()
-        self.rate_limiter = RateLimiter(
-            rate=self.config.rate_limit_per_minute,
-            per_seconds=60
-        )
-        self._executor: Optional[ThreadPoolExecutor] = None
-        self._stop_event = Event()
-
-    @property
-    def executor(self) -> ThreadPoolExecutor:
-        if self._executor is None:
-            self._executor = ThreadPoolExecutor(
-                max_workers=self.config.max_concurrent
-            )
-        return self._executor
+        self.limiters = limiters if limiters is not None else [
+            RateLimiter(rate=self.config.rate_limit_per_minute, per_seconds=60)
+        ]
 
     def process(
         self,
         items: List[BatchItem],
         processor_fn: Callable[[Dict[str, Any]], Any],
-        on_item_complete: Optional[Callable] = None,
-        on_progress: Optional[Callable] = None,
+        on_item_start: Optional[Callable[[BatchItem], bool]] = None,
+        on_item_complete: Optional[Callable[[BatchItem], None]] = None,
+        should_continue: Optional[Callable[[], bool]] = None,
     ) -> BatchResult:
         """
         Process batch items.
@@ -260,100 +369,76 @@ class BatchProcessor:
         Args:
             items: List of items to process
             processor_fn: Function to process each item
-            on_item_complete: Callback after each item
-            on_progress: Progress callback
+            on_item_start: Called before an item is submitted; False skips it
+            on_item_complete: Called (on this thread) after each item
+            should_continue: Checked before each item; False stops submitting
 
         Returns:
-            BatchResult with all outcomes
+            BatchResult for the items that ran
         """
         start_time = time.time()
         results = []
         errors = []
-        total_tokens = 0
-        total_cost = 0.0
-        successful = 0
-        failed = 0
-
-        self._stop_event.clear()
-
-        # Process in batches
-        for batch_start in range(0, len(items), self.config.batch_size):
-            if self._stop_event.is_set():
-                break
-
-            batch_items = items[batch_start:batch_start + self.config.batch_size]
+        totals = {'tokens': 0, 'cost': 0.0, 'successful': 0, 'failed': 0}
+        in_flight = {}
 
-            # Submit batch to executor
-            futures = {}
-            for item in batch_items:
-                if self._stop_event.is_set():
-                    break
-
-                # Rate limiting
-                self.rate_limiter.acquire(timeout=30)
-
-                item.status = 'processing'
-                item.started_at = datetime.now()
-
-                future = self.executor.submit(
-                    self._process_item,
-                    item,
-                    processor_fn,
-                )
-                futures[future] = item
-
-            # Collect results
-            for future in as_completed(futures, timeout=self.config.timeout_per_item * len(batch_items)):
-                item = futures[future]
+        def collect(done):
+            for future in done:
+                item = in_flight.pop(future)
+                item.completed_at = timezone.now()
 
                 try:
-                    result = future.result(timeout=self.config.timeout_per_item)
+                    result = future.result()
 
                     item.output = result.get('output')
                     item.status = 'completed'
-                    item.completed_at = datetime.now()
                     item.processing_time_ms = result.get('processing_time_ms', 0)
+                    item.tokens = result.get('tokens', 0)
+                    item.cost = result.get('cost', 0.0)
 
-                    total_tokens += result.get('tokens', 0)
-                    total_cost += result.get('cost', 0.0)
-                    successful += 1
-
-                    results.append({
-                        'item_id': item.item_id,
-                        'output': item.output,
-                    })
+                    totals['tokens'] += item.tokens
+                    totals['cost'] += item.cost
+                    totals['successful'] += 1
+                    results.append({'item_id': item.item_id, 'output': item.output})
 
                 except Exception as e:
                     item.status = 'failed'
                     item.error = str(e)
-                    item.completed_at = datetime.now()
-                    failed += 1
-
-                    errors.append({
-                        'item_id': item.item_id,
-                        'error': str(e),
-                    })
+                    totals['failed'] += 1
+                    errors.append({'item_id': item.item_id, 'error': str(e)})
 
                 if on_item_complete:
                     on_item_complete(item)
 
-            # Progress update
-            if on_progress:
-                progress = (batch_start + len(batch_items)) / len(items) * 100
-                on_progress(progress, successful, failed)
+        with ThreadPoolExecutor(max_workers=self.config.max_concurrent) as executor:
+            for item in items:
+                while len(in_flight) >= self.config.max_concurrent:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
 
-        processing_time = (time.time() - start_time) * 1000
+                if should_continue and not should_continue():
+                    break
+
+                if on_item_start and not on_item_start(item):
+                    continue
+
+                item.status = 'processing'
+                item.started_at = item.started_at or timezone.now()
+                in_flight[executor.submit(self._process_item, item, processor_fn)] = item
+
+            if in_flight:
+                collect(wait(in_flight).done)
 
         return BatchResult(
             job_id='',
-            success=failed == 0,
+            success=totals['failed'] == 0,
             total_items=len(items),
-            successful_items=successful,
-            failed_items=failed,
+            successful_items=totals['successful'],
+            failed_items=totals['failed'],
             results=results,
-            total_tokens=total_tokens,
-            total_cost=total_cost,
-            processing_time_ms=processing_time,
+            total_tokens=totals['tokens'],
+            total_cost=totals['cost'],
+            processing_time_ms=(time.time() - start_time) * 1000,
             errors=errors,
         )
 
@@ -362,12 +447,15 @@ class BatchProcessor:
         item: BatchItem,
         processor_fn: Callable,
     ) -> Dict[str, Any]:
-        """Process a single item with retries."""
+        """Process a single item with retries; every attempt takes a rate-limit token."""
         retries = 0
         last_error = None
 
         while retries <= self.config.retry_count:
             try:
+                for limiter in self.limiters:
+                    limiter.acquire()
+
                 start_time = time.time()
                 result = processor_fn(item.input_data)
                 processing_time = (time.time() - start_time) * 1000
@@ -389,10 +477,6 @@ class BatchProcessor:
 
         raise last_error or Exception("Processing failed")
 
-    def stop(self):
-        """Stop processing."""
-        self._stop_event.set()
-
 
 # =============================================================================
 # Batch Processing Service
@@ -410,15 +494,13 @@ class BatchProcessingService:
             items=[{'text': 'Article 1...'}, {'text': 'Article 2...'}],
             prompt_template="Summarize: {{text}}"
         )
-        result = service.execute_job(job.job_id)
+        service.execute_job(job.job_id, async_execution=True)
+        for row in service.iter_results(job.job_id):
+            ...
     """
 
-    def __init__(self):
-        self._jobs: Dict[str, BatchJob] = {}
-        self._processors: Dict[str, BatchProcessor] = {}
-        self._job_queue: Queue = Queue()
-        self._worker_thread: Optional[Thread] = None
-        self._running = False
+    # How often a running chunk re-reads the job status (pause / cancel)
+    STATUS_CHECK_INTERVAL = 1.0
 
     # -------------------------------------------------------------------------
     # Job Creation
@@ -436,7 +518,7 @@ class BatchProcessingService:
         priority: BatchPriority = BatchPriority.NORMAL,
         config: BatchConfig = None,
         processor_type: str = 'llm',
-        custom_processor: Optional[Callable] = None,
+        provider: str = 'openai',
     ) -> BatchJob:
         """
         Create a new batch job.
@@ -451,12 +533,14 @@ class BatchProcessingService:
             temperature: Generation temperature
             priority: Job priority
             config: Batch configuration
-            processor_type: 'llm' or 'custom'
-            custom_processor: Custom processing function
+            processor_type: A PROCESSORS key ('llm', 'embedding', or one registered)
+            provider: LLM provider, which also selects the shared rate limit
 
         Returns:
             Created BatchJob
         """
+        from coreapp.models import GenerationBatch, GenerationBatchItem
+
         config = config or BatchConfig()
 
         if len(items) > config.max_items_per_batch:
@@ -464,41 +548,47 @@ class BatchProcessingService:
                 f"Too many items: {len(items)} > {config.max_items_per_batch}"
             )
 
-        job_id = str(uuid.uuid4())
+        if processor_type not in PROCESSORS:
+            raise ValueError(f"Unknown processor type: {processor_type}")
 
-        # Create batch items
-        batch_items = [
-            BatchItem(
-                item_id=str(uuid.uuid4()),
-                input_data=item,
-            )
-            for item in items
-        ]
+        job_id = str(uuid.uuid4())
 
-        job = BatchJob(
+        row = GenerationBatch.objects.create(
             job_id=job_id,
-            name=name,
             user_id=user_id,
-            items=batch_items,
-            priority=priority,
-            config=config,
+            name=name,
+            priority=priority.value,
+            config=asdict(config),
+            total_items=len(items),
             metadata={
                 'prompt_template': prompt_template,
                 'model': model,
                 'max_tokens': max_tokens,
                 'temperature': temperature,
                 'processor_type': processor_type,
-            }
+                'provider': provider,
+            },
         )
 
-        self._jobs[job_id] = job
-
-        # Cache job
-        self._cache_job(job)
+        # Create batch items
+        batch_items = [
+            BatchItem(
+                item_id=str(uuid.uuid4()),
+                input_data=item,
+            )
+            for item in items
+        ]
+        GenerationBatchItem.objects.bulk_create(
+            [
+                GenerationBatchItem(batch=row, item_id=item.item_id, position=position, input_data=item.input_data)
+                for position, item in enumerate(batch_items)
+            ],
+            batch_size=500,
+        )
 
         logger.info(f"Created batch job {job_id} with {len(items)} items")
 
-        return job
+        return self._to_job(row, batch_items)
 
     # -------------------------------------------------------------------------
     # Job Execution
@@ -515,8 +605,8 @@ class BatchProcessingService:
 
         Args:
             job_id: Job ID to execute
-            async_execution: Run in background
-            on_progress: Progress callback
+            async_execution: Run on the Celery workers
+            on_progress: Progress callback (sync only)
 
         Returns:
             BatchResult if sync, None if async
@@ -525,213 +615,238 @@ class BatchProcessingService:
         if not job:
             raise ValueError(f"Job not found: {job_id}")
 
-        if job.status not in [BatchStatus.PENDING, BatchStatus.PAUSED]:
+        target = BatchStatus.QUEUED if async_execution else BatchStatus.PROCESSING
+        if not self._transition(job_id, [BatchStatus.PENDING, BatchStatus.PAUSED], target, started=True):
             raise ValueError(f"Job cannot be executed: {job.status}")
 
         if async_execution:
-            self._queue_job(job)
+            self._dispatch(job_id)
             return None
 
-        return self._execute_job_sync(job, on_progress)
+        return self._execute_job_sync(job_id, on_progress)
 
     def _execute_job_sync(
         self,
-        job: BatchJob,
+        job_id: str,
         on_progress: Optional[Callable] = None,
     ) -> BatchResult:
-        """Execute job synchronously."""
-        job.status = BatchStatus.PROCESSING
-        job.started_at = datetime.now()
+        """Run every pending chunk in this process."""
+        start_time = time.time()
+        self._reset_stalled_items(job_id)
 
-        processor = BatchProcessor(job.config)
-        self._processors[job.job_id] = processor
+        for item_pks in self._pending_chunks(job_id):
+            self.process_chunk(job_id, item_pks)
+            if on_progress:
+                on_progress(self.get_job(job_id))
 
-        # Create processor function
-        processor_fn = self._create_processor_fn(job)
+        self.finalize_job(job_id)
 
-        def progress_callback(progress, successful, failed):
-            job.progress = progress
-            job.processed_items = successful + failed
-            job.successful_items = successful
-            job.failed_items = failed
+        result = self.get_results(job_id, require_complete=False)
+        result.processing_time_ms = (time.time() - start_time) * 1000
+        return result
 
-            if on_progress:
-                on_progress(job)
+    def _dispatch(self, job_id: str):
+        """Fan the pending items out as a chord of chunk tasks."""
+        self._reset_stalled_items(job_id)
+        chunks = self._pending_chunks(job_id)
+        self._enqueue(job_id, chunks)
+        logger.info(f"Dispatched batch job {job_id} as {len(chunks)} chunks")
 
-            # Send notification
-            if job.config.enable_notifications:
-                self._send_progress_notification(job)
+    def _enqueue(self, job_id: str, chunks: List[List[int]]):
+        from celery import chord, group
+        from coreapp.tasks.batch_tasks import finalize_batch_job, process_batch_chunk
 
-        try:
-            result = processor.process(
-                items=job.items,
-                processor_fn=processor_fn,
-                on_item_complete=lambda item: self._on_item_complete(job, item),
-                on_progress=progress_callback,
-            )
+        if not chunks:
+            finalize_batch_job.delay(None, job_id)
+            return
 
-            result.job_id = job.job_id
-            job.total_tokens = result.total_tokens
-            job.total_cost = result.total_cost
+        chord(
+            group(process_batch_chunk.s(job_id, item_pks) for item_pks in chunks),
+            finalize_batch_job.s(job_id),
+        ).apply_async()
 
-            if result.failed_items > 0 and result.successful_items > 0:
-                job.status = BatchStatus.PARTIAL
-            elif result.failed_items == result.total_items:
-                job.status = BatchStatus.FAILED
-            else:
-                job.status = BatchStatus.COMPLETED
+    def _pending_chunks(self, job_id: str) -> List[List[int]]:
+        from coreapp.models import GenerationBatch, GenerationBatchItem
 
-            job.completed_at = datetime.now()
-            job.progress = 100.0
+        batch_size = GenerationBatch.objects.get(job_id=job_id).config.get('batch_size', BatchConfig.batch_size)
+        pks = list(
+            GenerationBatchItem.objects.filter(batch__job_id=job_id, status='pending')
+            .order_by('position').values_list('pk', flat=True)
+        )
+        return [pks[start:start + batch_size] for start in range(0, len(pks), batch_size)]
 
-            # Cache results
-            if job.config.cache_results:
-                self._cache_result(result)
+    def _reset_stalled_items(self, job_id: str):
+        """Return items whose worker died mid-run to the pending pool."""
+        from coreapp.models import GenerationBatch, GenerationBatchItem
 
-            # Final notification
-            if job.config.enable_notifications:
-                self._send_completion_notification(job, result)
+        config = self._config(GenerationBatch.objects.get(job_id=job_id))
+        cutoff = timezone.now() - timedelta(seconds=config.timeout_per_item * (config.retry_count + 1))
+        GenerationBatchItem.objects.filter(
+            batch__job_id=job_id, status='processing', started_at__lt=cutoff,
+        ).update(status='pending', started_at=None)
 
-            return result
+    def process_chunk(self, job_id: str, item_pks: List[int]) -> Dict[str, int]:
+        """
+        Run one chunk of items (a Celery task body on the workers).
 
-        except Exception as e:
-            logger.exception(f"Batch job {job.job_id} failed: {e}")
-            job.status = BatchStatus.FAILED
-            job.error = str(e)
-            job.completed_at = datetime.now()
-
-            raise
-
-        finally:
-            if job.job_id in self._processors:
-                del self._processors[job.job_id]
-
-    def _create_processor_fn(self, job: BatchJob) -> Callable:
-        """Create processor function based on job type."""
-        metadata = job.metadata
-        processor_type = metadata.get('processor_type', 'llm')
-
-        if processor_type == 'llm':
-            prompt_template = metadata.get('prompt_template', '{{input}}')
-            model = metadata.get('model', 'gpt-3.5-turbo')
-            max_tokens = metadata.get('max_tokens', 1000)
-            temperature = metadata.get('temperature', 0.7)
-
-            def llm_processor(input_data: Dict[str, Any]) -> Dict[str, Any]:
-                from coreapp.services.llm_service import llm_service
-                from coreapp.services.prompt_chaining import TemplateEngine
-
-                engine = TemplateEngine()
-                prompt = engine.render(prompt_template, input_data)
-
-                response = llm_service.generate(
-                    prompt=prompt,
-                    model=model,
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                )
+        Each item is claimed with a conditional UPDATE before it runs and
+        written back as soon as it finishes, so a redelivered chunk skips
+        items another worker already took.
+        """
+        from coreapp.models import GenerationBatch, GenerationBatchItem
 
-                return {
-                    'output': response.get('text', ''),
-                    'tokens': response.get('output_tokens', 0),
-                    'cost': response.get('cost', 0.0),
-                }
+        row = GenerationBatch.objects.filter(job_id=job_id, status__in=RUNNING_STATUSES).first()
+        if not row:
+            return {'processed': 0}
+        self._transition(job_id, [BatchStatus.QUEUED], BatchStatus.PROCESSING)
 
-            return llm_processor
+        config = self._config(row)
+        processor_fn = PROCESSORS[row.metadata.get('processor_type', 'llm')](row.metadata)
+        processor = BatchProcessor(config, limiters=[
+            SharedRateLimiter(f"job:{job_id}", config.rate_limit_per_minute),
+            provider_limiter(row.metadata.get('provider', 'openai')),
+        ])
 
-        elif processor_type == 'custom':
-            custom_fn = metadata.get('custom_processor')
-            if custom_fn:
-                return custom_fn
+        items = [
+            self._to_item(item_row)
+            for item_row in GenerationBatchItem.objects.filter(pk__in=item_pks, status='pending').order_by('position')
+        ]
 
-        # Default: pass through
-        return lambda x: {'output': x}
+        def claim(item: BatchItem) -> bool:
+            item.started_at = timezone.now()
+            return bool(GenerationBatchItem.objects.filter(pk=item.pk, status='pending').update(
+                status='processing', started_at=item.started_at,
+            ))
 
-    def _on_item_complete(self, job: BatchJob, item: BatchItem):
-        """Handle item completion."""
-        job.processed_items = sum(
-            1 for i in job.items if i.status in ['completed', 'failed']
+        result = processor.process(
+            items=items,
+            processor_fn=processor_fn,
+            on_item_start=claim,
+            on_item_complete=lambda item: self._checkpoint(row.pk, item),
+            should_continue=self._status_watch(job_id),
         )
-        job.successful_items = sum(
-            1 for i in job.items if i.status == 'completed'
+
+        job = self.get_job(job_id)
+        if job and config.enable_notifications:
+            self._send_progress_notification(job)
+
+        return {'processed': result.successful_items + result.failed_items}
+
+    def _checkpoint(self, batch_pk: int, item: BatchItem):
+        """Persist a finished item and add it to the job's counters."""
+        from coreapp.models import GenerationBatch, GenerationBatchItem
+
+        now = timezone.now()
+        GenerationBatchItem.objects.filter(pk=item.pk).update(
+            status=item.status,
+            output=item.output,
+            error=item.error,
+            retries=item.retries,
+            tokens=item.tokens,
+            cost=item.cost,
+            processing_time_ms=item.processing_time_ms,
+            completed_at=item.completed_at or now,
         )
-        job.failed_items = sum(
-            1 for i in job.items if i.status == 'failed'
+
+        succeeded = item.status == 'completed'
+        GenerationBatch.objects.filter(pk=batch_pk).update(
+            processed_items=F('processed_items') + 1,
+            successful_items=F('successful_items') + int(succeeded),
+            failed_items=F('failed_items') + int(not succeeded),
+            total_tokens=F('total_tokens') + item.tokens,
+            total_cost=F('total_cost') + item.cost,
+            updated_at=now,
         )
-        job.progress = (job.processed_items / job.total_items) * 100
 
-    # -------------------------------------------------------------------------
-    # Job Queue (Background Processing)
-    # -------------------------------------------------------------------------
+    def _status_watch(self, job_id: str) -> Callable[[], bool]:
+        """should_continue callback that re-reads the job status at most once per interval."""
+        from coreapp.models import GenerationBatch
 
-    def _queue_job(self, job: BatchJob):
-        """Add job to queue for background processing."""
-        job.status = BatchStatus.QUEUED
-        self._job_queue.put((job.priority.value, job.job_id))
+        state = {'checked': 0.0, 'running': True}
 
-        # Start worker if not running
-        if not self._running:
-            self.start_worker()
+        def should_continue() -> bool:
+            if time.monotonic() - state['checked'] >= self.STATUS_CHECK_INTERVAL:
+                state['running'] = GenerationBatch.objects.filter(
+                    job_id=job_id, status__in=RUNNING_STATUSES,
+                ).exists()
+                state['checked'] = time.monotonic()
+            return state['running']
 
-    def start_worker(self):
-        """Start background worker thread."""
-        if self._running:
-            return
+        return should_continue
 
-        self._running = True
-        self._worker_thread = Thread(target=self._worker_loop, daemon=True)
-        self._worker_thread.start()
-        logger.info("Batch processing worker started")
-
-    def stop_worker(self):
-        """Stop background worker."""
-        self._running = False
-        if self._worker_thread:
-            self._worker_thread.join(timeout=5)
-        logger.info("Batch processing worker stopped")
-
-    def _worker_loop(self):
-        """Background worker loop."""
-        while self._running:
-            try:
-                # Get next job (with timeout)
-                try:
-                    priority, job_id = self._job_queue.get(timeout=1)
-                except Empty:
-                    continue
+    def finalize_job(self, job_id: str) -> Optional[BatchJob]:
+        """
+        Settle a job once no item is left to run (the chord callback).
 
-                job = self.get_job(job_id)
-                if not job:
-                    continue
+        Counters are recomputed from the items, so duplicate chunk deliveries
+        cannot skew them. Paused and cancelled jobs are left as they are.
+        """
+        from coreapp.models import GenerationBatch, GenerationBatchItem
+
+        counts = GenerationBatchItem.objects.filter(batch__job_id=job_id).aggregate(
+            total=Count('pk'),
+            unfinished=Count('pk', filter=Q(status__in=['pending', 'processing'])),
+            successful=Count('pk', filter=Q(status='completed')),
+            failed=Count('pk', filter=Q(status='failed')),
+            tokens=Coalesce(Sum('tokens'), 0),
+            cost=Coalesce(Sum('cost'), 0.0),
+        )
+        if counts['unfinished']:
+            return self.get_job(job_id)
+
+        if counts['failed'] and counts['successful']:
+            final = BatchStatus.PARTIAL
+        elif counts['failed'] == counts['total'] and counts['total']:
+            final = BatchStatus.FAILED
+        else:
+            final = BatchStatus.COMPLETED
+
+        now = timezone.now()
+        settled = GenerationBatch.objects.filter(job_id=job_id, status__in=RUNNING_STATUSES).update(
+            status=final.value,
+            processed_items=counts['successful'] + counts['failed'],
+            successful_items=counts['successful'],
+            failed_items=counts['failed'],
+            total_tokens=counts['tokens'],
+            total_cost=counts['cost'],
+            completed_at=now,
+            updated_at=now,
+        )
 
-                if job.status == BatchStatus.CANCELLED:
-                    continue
+        job = self.get_job(job_id)
+        if settled and job and job.config.enable_notifications:
+            self._send_completion_notification(job, self.get_results(job_id, require_complete=False))
+        return job
 
-                # Execute job
-                try:
-                    self._execute_job_sync(job)
-                except Exception as e:
-                    logger.error(f"Background job {job_id} failed: {e}")
+    def recover_stalled(self, stale_after: Optional[int] = None) -> int:
+        """Re-dispatch running jobs that have not finished an item for ``stale_after`` seconds."""
+        from coreapp.models import GenerationBatch
 
-            except Exception as e:
-                logger.error(f"Worker loop error: {e}")
+        stale_after = stale_after or getattr(settings, 'BATCH_STALL_TIMEOUT', 900)
+        cutoff = timezone.now() - timedelta(seconds=stale_after)
+        job_ids = list(
+            GenerationBatch.objects.filter(status__in=RUNNING_STATUSES, updated_at__lt=cutoff)
+            .values_list('job_id', flat=True)
+        )
+        for job_id in job_ids:
+            GenerationBatch.objects.filter(job_id=job_id).update(updated_at=timezone.now())
+            self._dispatch(job_id)
+        return len(job_ids)
 
     # -------------------------------------------------------------------------
     # Job Management
     # -------------------------------------------------------------------------
 
-    def get_job(self, job_id: str) -> Optional[BatchJob]:
-        """Get job by ID."""
-        # Check memory first
-        if job_id in self._jobs:
-            return self._jobs[job_id]
+    def get_job(self, job_id: str, with_items: bool = False) -> Optional[BatchJob]:
+        """Get job by ID (items are loaded only when asked for)."""
+        from coreapp.models import GenerationBatch
 
-        # Check cache
-        cached = cache.get(f"batch_job:{job_id}")
-        if cached:
-            return cached
+        row = GenerationBatch.objects.filter(job_id=job_id).first()
+        if not row:
+            return None
 
-        return None
+        items = [self._to_item(item_row) for item_row in row.items.order_by('position')] if with_items else []
+        return self._to_job(row, items)
 
     def list_jobs(
         self,
@@ -740,111 +855,101 @@ class BatchProcessingService:
         limit: int = 50,
     ) -> List[Dict[str, Any]]:
         """List jobs with optional filters."""
-        jobs = list(self._jobs.values())
+        from coreapp.models import GenerationBatch
+
+        rows = GenerationBatch.objects.all()
 
         if user_id:
-            jobs = [j for j in jobs if j.user_id == user_id]
+            rows = rows.filter(user_id=user_id)
 
         if status:
-            jobs = [j for j in jobs if j.status == status]
+            rows = rows.filter(status=status.value)
 
         # Sort by created_at descending
-        jobs.sort(key=lambda j: j.created_at, reverse=True)
+        rows = rows.order_by('-created_at')
 
-        return [j.to_dict() for j in jobs[:limit]]
+        return [self._to_job(row, []).to_dict() for row in rows[:limit]]
 
     def cancel_job(self, job_id: str) -> bool:
-        """Cancel a job."""
-        job = self.get_job(job_id)
-        if not job:
-            return False
-
-        if job.status in [BatchStatus.COMPLETED, BatchStatus.FAILED]:
-            return False
-
-        job.status = BatchStatus.CANCELLED
-
-        # Stop processor if running
-        if job_id in self._processors:
-            self._processors[job_id].stop()
-
-        logger.info(f"Cancelled batch job {job_id}")
-        return True
+        """Cancel a job; running chunks stop before their next item."""
+        cancelled = self._transition(
+            job_id,
+            [BatchStatus.PENDING, BatchStatus.QUEUED, BatchStatus.PROCESSING, BatchStatus.PAUSED],
+            BatchStatus.CANCELLED,
+            completed=True,
+        )
+        if cancelled:
+            logger.info(f"Cancelled batch job {job_id}")
+        return cancelled
 
     def pause_job(self, job_id: str) -> bool:
-        """Pause a running job."""
-        job = self.get_job(job_id)
-        if not job:
-            return False
-
-        if job.status != BatchStatus.PROCESSING:
-            return False
-
-        job.status = BatchStatus.PAUSED
-
-        if job_id in self._processors:
-            self._processors[job_id].stop()
-
-        return True
+        """Pause a running job; finished items are kept."""
+        return self._transition(job_id, [BatchStatus.QUEUED, BatchStatus.PROCESSING], BatchStatus.PAUSED)
 
     def resume_job(self, job_id: str) -> bool:
-        """Resume a paused job."""
-        job = self.get_job(job_id)
-        if not job:
+        """Resume a paused job with the items that have not finished."""
+        if not self._transition(job_id, [BatchStatus.PAUSED], BatchStatus.QUEUED):
             return False
 
-        if job.status != BatchStatus.PAUSED:
-            return False
-
-        # Re-queue job
-        self._queue_job(job)
+        self._dispatch(job_id)
         return True
 
     def delete_job(self, job_id: str) -> bool:
         """Delete a job."""
-        if job_id in self._jobs:
-            del self._jobs[job_id]
-            cache.delete(f"batch_job:{job_id}")
-            cache.delete(f"batch_result:{job_id}")
-            return True
-        return False
+        from coreapp.models import GenerationBatch
+
+        deleted, _ = GenerationBatch.objects.filter(job_id=job_id).delete()
+        return bool(deleted)
+
+    def _transition(
+        self,
+        job_id: str,
+        allowed: List[BatchStatus],
+        target: BatchStatus,
+        started: bool = False,
+        completed: bool = False,
+    ) -> bool:
+        """Move a job to ``target`` only if it is in one of the ``allowed`` statuses."""
+        from coreapp.models import GenerationBatch
+
+        now = timezone.now()
+        changes = {'status': target.value, 'updated_at': now}
+        if started:
+            changes['started_at'] = Coalesce(F('started_at'), Value(now, output_field=DateTimeField()))
+        if completed:
+            changes['completed_at'] = now
+
+        return bool(
+            GenerationBatch.objects.filter(
+                job_id=job_id, status__in=[status.value for status in allowed],
+            ).update(**changes)
+        )
 
     # -------------------------------------------------------------------------
     # Results
     # -------------------------------------------------------------------------
 
-    def get_results(self, job_id: str) -> Optional[BatchResult]:
-        """Get results for a completed job."""
-        # Check cache
-        cached = cache.get(f"batch_result:{job_id}")
-        if cached:
-            return cached
+    def get_results(self, job_id: str, require_complete: bool = True) -> Optional[BatchResult]:
+        """Get results for a completed job (use iter_results for large jobs)."""
+        from coreapp.models import GenerationBatchItem
 
         job = self.get_job(job_id)
         if not job:
             return None
 
-        if job.status not in [BatchStatus.COMPLETED, BatchStatus.PARTIAL]:
+        if require_complete and job.status not in [BatchStatus.COMPLETED, BatchStatus.PARTIAL]:
             return None
 
-        # Build result from job
-        results = [
-            {
-                'item_id': item.item_id,
-                'output': item.output,
-            }
-            for item in job.items
-            if item.status == 'completed'
-        ]
+        rows = GenerationBatchItem.objects.filter(
+            batch__job_id=job_id, status__in=['completed', 'failed'],
+        ).order_by('position').values_list('item_id', 'status', 'output', 'error')
 
-        errors = [
-            {
-                'item_id': item.item_id,
-                'error': item.error,
-            }
-            for item in job.items
-            if item.status == 'failed'
-        ]
+        results, errors = [], []
+        for item_id, item_status, output, error in rows:
+            if item_status == 'completed':
+                results.append({'item_id': item_id, 'output': output})
+            else:
+                errors.append({'item_id': item_id, 'error': error})
 
         return BatchResult(
             job_id=job_id,
@@ -859,40 +964,70 @@ class BatchProcessingService:
             errors=errors,
         )
 
+    def iter_results(self, job_id: str, chunk_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield every item's outcome in input order, reading ``chunk_size`` rows at a time."""
+        from coreapp.models import GenerationBatchItem
+
+        rows = GenerationBatchItem.objects.filter(batch__job_id=job_id).order_by('position').values(
+            'item_id', 'position', 'status', 'output', 'error', 'tokens', 'cost',
+        )
+        yield from rows.iterator(chunk_size=chunk_size)
+
     def get_item_result(
         self,
         job_id: str,
         item_id: str,
     ) -> Optional[Dict[str, Any]]:
         """Get result for a specific item."""
-        job = self.get_job(job_id)
-        if not job:
-            return None
-
-        for item in job.items:
-            if item.item_id == item_id:
-                return item.to_dict()
+        from coreapp.models import GenerationBatchItem
 
-        return None
+        row = GenerationBatchItem.objects.filter(batch__job_id=job_id, item_id=item_id).first()
+        return self._to_item(row).to_dict() if row else None
 
     # -------------------------------------------------------------------------
-    # Caching
+    # Rows
     # -------------------------------------------------------------------------
 
-    def _cache_job(self, job: BatchJob):
-        """Cache job state."""
-        cache.set(
-            f"batch_job:{job.job_id}",
-            job,
-            timeout=job.config.cache_ttl,
+    def _config(self, row) -> BatchConfig:
+        return BatchConfig(**row.config)
+
+    def _to_item(self, row) -> BatchItem:
+        return BatchItem(
+            item_id=row.item_id,
+            input_data=row.input_data,
+            status=row.status,
+            output=row.output,
+            error=row.error,
+            retries=row.retries,
+            started_at=row.started_at,
+            completed_at=row.completed_at,
+            processing_time_ms=row.processing_time_ms,
+            tokens=row.tokens,
+            cost=row.cost,
+            pk=row.pk,
         )
 
-    def _cache_result(self, result: BatchResult):
-        """Cache job result."""
-        cache.set(
-            f"batch_result:{result.job_id}",
-            result,
-            timeout=3600,
+    def _to_job(self, row, items: List[BatchItem]) -> BatchJob:
+        return BatchJob(
+            job_id=row.job_id,
+            name=row.name,
+            user_id=row.user_id,
+            items=items,
+            status=BatchStatus(row.status),
+            priority=BatchPriority(row.priority),
+            config=self._config(row),
+            progress=row.processed_items / row.total_items * 100 if row.total_items else 0.0,
+            created_at=row.created_at,
+            started_at=row.started_at,
+            completed_at=row.completed_at,
+            total_items=row.total_items,
+            processed_items=row.processed_items,
+            successful_items=row.successful_items,
+            failed_items=row.failed_items,
+            total_tokens=row.total_tokens,
+            total_cost=row.total_cost,
+            error=row.error,
+            metadata=row.metadata,
         )
 
     # -------------------------------------------------------------------------
@@ -1062,32 +1197,15 @@ Return a JSON object with entity types as keys and lists of extracted entities a
         user_id: int,
     ) -> BatchJob:
         """Create batch job for generating embeddings."""
-        service = batch_processing_service
-
-        def embedding_processor(input_data: Dict[str, Any]) -> Dict[str, Any]:
-            from coreapp.services.llm_service import llm_service
-
-            embedding = llm_service.get_embedding(input_data['text'])
-
-            return {
-                'output': embedding,
-                'tokens': len(input_data['text'].split()) // 4,
-                'cost': 0.0001,
-            }
-
-        return service.create_job(
+        return batch_processing_service.create_job(
             user_id=user_id,
             name="Embedding Generation",
             items=texts,
-            processor_type='custom',
+            processor_type='embedding',
             config=BatchConfig(
                 max_concurrent=10,
                 rate_limit_per_minute=3000,
             ),
-            metadata={
-                'processor_type': 'custom',
-                'custom_processor': embedding_processor,
-            }
         )
 
 
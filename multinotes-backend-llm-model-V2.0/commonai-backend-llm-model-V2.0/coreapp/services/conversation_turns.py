@@ -0,0 +1,235 @@
+"""
+Conversation Turn Store for MultinotesAI.
+
+This module provides:
+- Append-only storage of chat turns per group (ConversationTurn)
+- Capped, indexed reads of the recent history sent to the model
+- Lazy and bulk migration of the legacy JSON conversation_history blob
+
+Appending a turn is one counter update plus one insert, regardless of how
+long the conversation is, and concurrent turns in the same group get
+distinct sequence numbers instead of overwriting each other.
+"""
+
+import json
+import logging
+from typing import Dict, List, Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+# Turns sent back to the model as context (the old blob kept the last 20)
+HISTORY_LIMIT = 20
+
+ROLE_USER = 'user'
+ROLE_ASSISTANT = 'assistant'
+
+DEFAULT_SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+# =============================================================================
+# Conversation Turn Store
+# =============================================================================
+
+class ConversationTurnStore:
+    """
+    Read and append chat turns for a GroupResponse.
+
+    Usage:
+        history = conversation_turns.get_history(group)
+        ...
+        conversation_turns.append_exchange(group.id, prompt, text, prompt_id=promp.id)
+    """
+
+    def __init__(self, history_limit: int = HISTORY_LIMIT):
+        self.history_limit = history_limit
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def append_turns(self, group_id: int, turns: List[Dict[str, str]], prompt_id: int = None) -> int:
+        """
+        Append turns (role/content dicts) to a group.
+
+        Sequence numbers come from an atomic increment of
+        GroupResponse.turn_count, so only the counter row is locked and
+        only the new turns are written. Returns the last sequence used.
+        """
+        from coreapp.models import GroupResponse, ConversationTurn
+
+        if not turns:
+            return 0
+
+        with transaction.atomic():
+            GroupResponse.objects.filter(pk=group_id).update(
+                turn_count=F('turn_count') + len(turns),
+                updated_at=timezone.now(),
+            )
+            last = GroupResponse.objects.filter(pk=group_id).values_list('turn_count', flat=True).get()
+
+            first = last - len(turns) + 1
+            ConversationTurn.objects.bulk_create([
+                ConversationTurn(
+                    group_id=group_id,
+                    sequence=first + i,
+                    role=turn['role'],
+                    content=turn['content'],
+                    prompt_id=prompt_id,
+                )
+                for i, turn in enumerate(turns)
+            ])
+
+        return last
+
+    def append_exchange(self, group_id: int, prompt: str, response: str, prompt_id: int = None) -> int:
+        """Append a user prompt and the assistant reply."""
+        return self.append_turns(group_id, [
+            {'role': ROLE_USER, 'content': prompt},
+            {'role': ROLE_ASSISTANT, 'content': response},
+        ], prompt_id=prompt_id)
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def get_history(self, group, limit: int = None, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Return the most recent turns of a group, oldest first.
+
+        Reads at most ``limit`` rows through the (group, sequence) index.
+        Groups still holding a legacy JSON blob are migrated first.
+        """
+        from coreapp.models import ConversationTurn
+
+        if not group.turn_count and group.conversation_history:
+            self.import_legacy_history(group)
+
+        limit = limit or self.history_limit
+        recent = list(
+            ConversationTurn.objects
+            .filter(group_id=group.id)
+            .order_by('-sequence')
+            .values('role', 'content')[:limit]
+        )
+        recent.reverse()
+
+        if system_prompt:
+            return [{'role': 'system', 'content': system_prompt}] + recent
+        return recent
+
+    def turns_queryset(self, group_id: int):
+        """Queryset of a group's turns, newest first (for paginated views)."""
+        from coreapp.models import ConversationTurn
+
+        return ConversationTurn.objects.filter(group_id=group_id).order_by('-sequence')
+
+    # -------------------------------------------------------------------------
+    # Legacy Migration
+    # -------------------------------------------------------------------------
+
+    def import_legacy_history(self, group) -> int:
+        """
+        Build ConversationTurn rows for a group created before the turn table.
+
+        The full exchange is rebuilt from the group's Prompt/PromptResponse
+        rows (the JSON blob only kept the last 20 turns); groups without
+        text prompts fall back to the blob. Safe to call concurrently: the
+        group row is locked and the import is skipped if turns already
+        exist. Returns the number of turns created.
+        """
+        from coreapp.models import GroupResponse, ConversationTurn
+
+        with transaction.atomic():
+            locked = GroupResponse.objects.select_for_update().get(pk=group.pk)
+            if locked.turn_count or not locked.conversation_history:
+                group.turn_count = locked.turn_count
+                group.conversation_history = locked.conversation_history
+                return 0
+
+            turns = (
+                self._turns_from_prompts(locked.pk)
+                or self.parse_legacy_history(locked.conversation_history)
+            )
+            ConversationTurn.objects.bulk_create([
+                ConversationTurn(
+                    group_id=locked.pk,
+                    sequence=i + 1,
+                    role=turn['role'],
+                    content=turn['content'],
+                    prompt_id=turn.get('prompt_id'),
+                )
+                for i, turn in enumerate(turns)
+            ], batch_size=500)
+            GroupResponse.objects.filter(pk=locked.pk).update(
+                turn_count=len(turns),
+                conversation_history=None,
+            )
+
+        group.turn_count = len(turns)
+        group.conversation_history = None
+        return len(turns)
+
+    @staticmethod
+    def _turns_from_prompts(group_id: int) -> List[Dict]:
+        from coreapp.models import Prompt, PromptResponse
+
+        prompts = list(
+            Prompt.objects
+            .filter(group_id=group_id, is_delete=False)
+            .exclude(prompt_text__isnull=True).exclude(prompt_text='')
+            .order_by('created_at', 'id')
+            .values('id', 'prompt_text')
+        )
+        answers = {}
+        for row in (
+            PromptResponse.objects
+            .filter(prompt_id__in=[p['id'] for p in prompts], is_delete=False)
+            .exclude(response_text__isnull=True).exclude(response_text='')
+            .order_by('id')
+            .values('prompt_id', 'response_text')
+        ):
+            answers.setdefault(row['prompt_id'], row['response_text'])
+
+        turns = []
+        for p in prompts:
+            if p['id'] not in answers:
+                continue
+            turns.append({'role': ROLE_USER, 'content': p['prompt_text'], 'prompt_id': p['id']})
+            turns.append({'role': ROLE_ASSISTANT, 'content': answers[p['id']], 'prompt_id': p['id']})
+        return turns
+
+    @staticmethod
+    def parse_legacy_history(raw: str) -> List[Dict[str, str]]:
+        """Parse the JSON blob, dropping system turns and normalising roles."""
+        try:
+            history = json.loads(raw, strict=False)
+        except (TypeError, ValueError):
+            logger.warning("Unreadable conversation_history, skipping import")
+            return []
+
+        turns = []
+        for turn in history if isinstance(history, list) else []:
+            role = turn.get('role') if isinstance(turn, dict) else None
+            if role not in (ROLE_USER, ROLE_ASSISTANT, 'model'):
+                continue
+            turns.append({
+                'role': ROLE_USER if role == ROLE_USER else ROLE_ASSISTANT,
+                'content': turn.get('content') or '',
+            })
+        return turns
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+conversation_turns = ConversationTurnStore()
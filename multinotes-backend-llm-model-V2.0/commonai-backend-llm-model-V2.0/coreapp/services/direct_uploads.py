@@ -0,0 +1,292 @@
+"""
+Direct-to-S3 Uploads for MultinotesAI.
+
+This module provides:
+- Presigned multipart upload URLs, so file bytes never pass through Django
+- Atomic storage quota reservation when an upload is initiated
+- Completion that checks the stored object's size (HEAD) before charging
+- Release of abandoned reservations and their multipart uploads
+
+Quota changes are single conditional UPDATEs on StorageUsage, so parallel
+uploads against a shared (cluster) storage plan cannot overrun its limit.
+"""
+
+import logging
+import math
+import os
+import time
+import uuid
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backend.exceptions import FileTooLargeError, StorageLimitExceededError, UploadFailedError
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+PURPOSE_CONTENT = 'content'
+PURPOSE_PROFILE_IMAGE = 'profile_image'
+
+KEY_PREFIXES = {
+    PURPOSE_CONTENT: 'multinote/contents/',
+    PURPOSE_PROFILE_IMAGE: 'multinote/user/',
+}
+
+STATUS_RESERVED = 'reserved'
+STATUS_COMPLETED = 'completed'
+STATUS_RELEASED = 'released'
+
+# S3 multipart limits
+MIN_PART_SIZE = 5 * 1024 * 1024
+MAX_PARTS = 10000
+MAX_OBJECT_SIZE = 5 * 1024 ** 4
+
+
+# =============================================================================
+# Direct Upload Service
+# =============================================================================
+
+class DirectUploadService:
+    """
+    Reserve quota, hand out presigned part URLs and settle the upload.
+
+    Usage:
+        session, urls = direct_uploads.initiate(user, 'talk.mp4', size, 'video/mp4')
+        ... client PUTs each part to its URL and keeps the ETags ...
+        content = direct_uploads.complete(session, [{'PartNumber': 1, 'ETag': '"..."'}])
+    """
+
+    def __init__(self, part_size: int = None, ttl: int = None):
+        self.part_size = part_size
+        self.ttl = ttl
+
+    def _part_size(self, size: int) -> int:
+        part_size = self.part_size or getattr(settings, 'DIRECT_UPLOAD_PART_SIZE', 16 * 1024 * 1024)
+        return max(part_size, MIN_PART_SIZE, math.ceil(size / MAX_PARTS))
+
+    def _ttl(self) -> int:
+        return self.ttl if self.ttl is not None else getattr(settings, 'DIRECT_UPLOAD_TTL', 86400)
+
+    def storage_for(self, user):
+        """The StorageUsage an upload is charged to (the cluster's, if any)."""
+        from coreapp.models import StorageUsage
+
+        if user.cluster_id and user.cluster.storage_id:
+            return StorageUsage.objects.filter(pk=user.cluster.storage_id).first()
+        return StorageUsage.objects.filter(user=user.id, is_delete=False).first()
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def initiate(
+        self,
+        user,
+        file_name: str,
+        size: int,
+        content_type: str = None,
+        folder_id: Optional[int] = None,
+        purpose: str = PURPOSE_CONTENT,
+    ):
+        """
+        Reserve quota and start a multipart upload.
+
+        Returns:
+            (UploadSession, list of presigned part URLs)
+
+        Raises:
+            StorageLimitExceededError: No storage plan, or not enough room
+            FileTooLargeError: Size outside what S3 (or a profile image) allows
+            UploadFailedError: S3 refused to start the upload
+        """
+        from authentication.awsservice import create_multipart_upload, presign_upload_parts
+        from coreapp.models import UploadSession
+        from coreapp.services.storage_service import StorageConfig
+
+        max_size = MAX_OBJECT_SIZE if purpose == PURPOSE_CONTENT else StorageConfig.MAX_IMAGE_SIZE
+        if size <= 0 or size > max_size:
+            raise FileTooLargeError()
+
+        storage = None
+        if purpose == PURPOSE_CONTENT:
+            storage = self.storage_for(user)
+            if storage is None:
+                raise StorageLimitExceededError('No Storage Plan Found Plz add a Storage Plan')
+            if not self._apply(storage.id, reserved_delta=size, require_room=True):
+                raise StorageLimitExceededError(
+                    'Storage limit exceeded. Please delete some files or Buy Plan to upload new ones.'
+                )
+
+        file_name = os.path.basename(file_name) or 'file'
+        object_key = f"{KEY_PREFIXES[purpose]}{int(time.time())}-{uuid.uuid4().hex[:8]}-{file_name}"
+        content_type = content_type or 'application/octet-stream'
+
+        upload_id = create_multipart_upload(object_key, content_type)
+        if upload_id is None:
+            if storage:
+                self._apply(storage.id, reserved_delta=-size)
+            raise UploadFailedError()
+
+        part_size = self._part_size(size)
+        session = UploadSession.objects.create(
+            user=user,
+            storage=storage,
+            folder_id=folder_id,
+            purpose=purpose,
+            object_key=object_key,
+            upload_id=upload_id,
+            fileName=file_name,
+            content_type=content_type,
+            reserved_size=size,
+            part_size=part_size,
+            part_count=max(1, math.ceil(size / part_size)),
+            expires_at=timezone.now() + timedelta(seconds=self._ttl()),
+        )
+        urls = presign_upload_parts(object_key, upload_id, session.part_count, expires_in=self._ttl())
+        return session, urls
+
+    def complete(self, session, parts: List[Dict]):
+        """
+        Assemble the parts, verify the object's size and charge it.
+
+        The charge is the size S3 reports, not the size the client declared.
+        An object larger than its reservation is deleted and rejected.
+
+        Returns:
+            The new UserContent (content uploads) or the updated user
+        """
+        from authentication.awsservice import complete_multipart_upload, delete_file_from_s3, get_object_size
+
+        if session.status == STATUS_COMPLETED:
+            return session.content if session.purpose == PURPOSE_CONTENT else session.user
+
+        if not complete_multipart_upload(session.object_key, session.upload_id, parts):
+            raise UploadFailedError()
+        size = get_object_size(session.object_key)
+        if size is None:
+            raise UploadFailedError()
+        if size > session.reserved_size:
+            delete_file_from_s3(session.object_key)
+            self.release(session, abort=False)
+            raise FileTooLargeError('Uploaded file is larger than the size declared when the upload started.')
+
+        return self._settle(session, size)
+
+    def release(self, session, abort: bool = True) -> bool:
+        """Give back an unsettled reservation and abort its multipart upload."""
+        from authentication.awsservice import abort_multipart_upload
+        from coreapp.models import UploadSession
+
+        with transaction.atomic():
+            released = UploadSession.objects.filter(pk=session.pk, status=STATUS_RESERVED).update(
+                status=STATUS_RELEASED, updated_at=timezone.now(),
+            )
+            if not released:
+                return False
+            if session.storage_id:
+                self._apply(session.storage_id, reserved_delta=-session.reserved_size)
+
+        if abort:
+            abort_multipart_upload(session.object_key, session.upload_id)
+        session.status = STATUS_RELEASED
+        return True
+
+    def release_expired(self, batch_size: int = 200) -> int:
+        """Release uploads that were never completed before their reservation expired."""
+        from coreapp.models import UploadSession
+
+        expired = list(
+            UploadSession.objects
+            .filter(status=STATUS_RESERVED, expires_at__lt=timezone.now())
+            .order_by('expires_at')[:batch_size]
+        )
+        released = sum(1 for session in expired if self.release(session))
+        if released:
+            logger.info(f"Released {released} expired upload reservations")
+        return released
+
+    def charge(self, storage_id: int, size: int) -> bool:
+        """Add bytes stored through the app server to used storage (no lost updates)."""
+        return self._apply(storage_id, used_delta=size)
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _settle(self, session, size: int):
+        """Swap the reservation for the real size and record the upload."""
+        from coreapp.models import UploadSession, UserContent
+
+        with transaction.atomic():
+            settled = UploadSession.objects.filter(pk=session.pk, status=STATUS_RESERVED).update(
+                status=STATUS_COMPLETED, size=size, updated_at=timezone.now(),
+            )
+            if settled:
+                if session.storage_id:
+                    self._apply(session.storage_id, reserved_delta=-session.reserved_size, used_delta=size)
+            else:
+                session.refresh_from_db()
+                if session.status == STATUS_COMPLETED:
+                    return session.content if session.purpose == PURPOSE_CONTENT else session.user
+                # Swept as abandoned: the hold is gone, so the size needs room of its own
+                if session.storage_id and not self._apply(session.storage_id, used_delta=size, require_room=True):
+                    raise StorageLimitExceededError(
+                        'Storage limit exceeded. Please delete some files or Buy Plan to upload new ones.'
+                    )
+                UploadSession.objects.filter(pk=session.pk).update(
+                    status=STATUS_COMPLETED, size=size, updated_at=timezone.now(),
+                )
+
+            if session.purpose == PURPOSE_PROFILE_IMAGE:
+                session.user.profile_image = session.object_key
+                session.user.save(update_fields=['profile_image'])
+                result = session.user
+            else:
+                result = UserContent.objects.create(
+                    user_id=session.user_id,
+                    folder_id=session.folder_id,
+                    file=session.object_key,
+                    fileName=session.fileName,
+                    fileSize=size,
+                    self_upload=True,
+                )
+                UploadSession.objects.filter(pk=session.pk).update(content=result)
+                session.content = result
+
+        session.status = STATUS_COMPLETED
+        session.size = size
+        return result
+
+    @staticmethod
+    def _apply(storage_id: int, reserved_delta: int = 0, used_delta: int = 0,
+               require_room: bool = False) -> bool:
+        """Apply deltas to a StorageUsage row in one UPDATE; False if no row matched."""
+        from coreapp.models import StorageUsage
+
+        rows = StorageUsage.objects.filter(pk=storage_id)
+        if require_room:
+            rows = rows.filter(
+                storage_limit__gte=F('total_storage_used') + F('reserved_storage') + reserved_delta + used_delta
+            )
+        changes = {}
+        if reserved_delta:
+            changes['reserved_storage'] = F('reserved_storage') + reserved_delta
+        if used_delta:
+            changes['total_storage_used'] = F('total_storage_used') + used_delta
+        return rows.update(**changes) == 1
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+direct_uploads = DirectUploadService()
@@ -0,0 +1,273 @@
+"""
+Resolved Entitlements for MultinotesAI.
+
+This module provides:
+- One immutable snapshot of what a user may do: active plan, rate tier,
+  token balances and storage limits (the cluster's, for cluster members)
+- A per-request memo on the user instance plus a shared cache entry per
+  user or cluster
+- Invalidation when a Subscription, StorageUsage or Cluster changes
+
+Throttles, subscription permissions, the token ledger and the dashboard all
+read the same snapshot, so a generation request resolves it at most once
+instead of querying Subscription in every layer.
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+CACHE_PREFIX = 'entitlements'
+
+SCOPE_USER = 'user'
+SCOPE_CLUSTER = 'cluster'
+
+ACTIVE_STATUSES = ('active', 'trial')
+
+# Throttle tiers, matched against the subscribed plan's name
+RATE_TIERS = ('enterprise', 'pro', 'basic')
+DEFAULT_RATE_TIER = 'free'
+
+# Text balance a generation needs before it may start
+MIN_TEXT_BALANCE = 100
+
+MEMO_ATTR = '_entitlements'
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass(frozen=True)
+class Entitlements:
+    """What a user (or every member of a cluster) is entitled to."""
+    scope: str
+    scope_id: int
+    subscription_id: Optional[int] = None
+    subscription_status: Optional[str] = None
+    plan_name: str = ''
+    rate_tier: str = DEFAULT_RATE_TIER
+    expires_at: Optional[datetime] = None
+    balance_token: int = 0
+    used_token: int = 0
+    expire_token: int = 0
+    file_token: int = 0
+    used_file_token: int = 0
+    expire_file_token: int = 0
+    storage_id: Optional[int] = None
+    storage_status: Optional[str] = None
+    storage_limit: int = 0
+    storage_expires_at: Optional[datetime] = None
+
+    @property
+    def is_cluster(self) -> bool:
+        return self.scope == SCOPE_CLUSTER
+
+    @property
+    def is_subscribed(self) -> bool:
+        """Whether there is an active or trial subscription (expired or not)."""
+        return self.subscription_id is not None and self.subscription_status in ACTIVE_STATUSES
+
+    def is_active(self, now: datetime = None) -> bool:
+        """Whether the subscription is active or on trial and not expired."""
+        if not self.is_subscribed or self.expires_at is None:
+            return False
+        return self.expires_at >= (now or timezone.now())
+
+    def can_generate(self, min_balance: int = MIN_TEXT_BALANCE) -> bool:
+        return self.is_active() and self.balance_token > min_balance
+
+
+# =============================================================================
+# Entitlement Service
+# =============================================================================
+
+class EntitlementService:
+    """
+    Resolve, cache and invalidate Entitlements.
+
+    Usage:
+        entitlements = entitlement_service.for_user(request.user)
+        if not entitlements.can_generate():
+            raise PermissionDenied()
+
+    The snapshot is memoized on the user instance, which DRF builds afresh
+    for every request, and cached under the user's scope: cluster members
+    share their cluster's entry. Each entry is also indexed by the
+    subscription and storage rows it was built from, so a change to either
+    drops every entry that depends on it.
+    """
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl
+
+    def _ttl(self) -> int:
+        return self.ttl if self.ttl is not None else getattr(settings, 'ENTITLEMENTS_CACHE_TTL', 300)
+
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+
+    def for_user(self, user) -> Entitlements:
+        """Entitlements of a user, from the memo, the cache or the database."""
+        entitlements = getattr(user, MEMO_ATTR, None)
+        if entitlements is not None:
+            return entitlements
+
+        scope, scope_id = self.scope_for(user)
+        key = self._key(scope, scope_id)
+        entitlements = cache.get(key)
+        if entitlements is None:
+            entitlements = self.resolve(scope, scope_id)
+            self._store(key, entitlements)
+
+        setattr(user, MEMO_ATTR, entitlements)
+        return entitlements
+
+    @staticmethod
+    def scope_for(user):
+        if user.cluster_id:
+            return SCOPE_CLUSTER, user.cluster_id
+        return SCOPE_USER, user.id
+
+    def resolve(self, scope: str, scope_id: int) -> Entitlements:
+        """Build the snapshot from the database, bypassing the cache."""
+        from authentication.models import Cluster
+        from coreapp.models import StorageUsage
+        from planandsubscription.models import Subscription
+
+        if scope == SCOPE_CLUSTER:
+            cluster = (
+                Cluster.objects
+                .select_related('subscription__plan', 'storage')
+                .filter(pk=scope_id)
+                .first()
+            )
+            subscription = cluster.subscription if cluster else None
+            storage = cluster.storage if cluster else None
+        else:
+            subscription = (
+                Subscription.objects
+                .select_related('plan')
+                .filter(user=scope_id, status__in=ACTIVE_STATUSES, is_delete=False)
+                .first()
+            )
+            storage = StorageUsage.objects.filter(user=scope_id, is_delete=False).first()
+
+        values = {}
+        if subscription is not None:
+            plan_name = subscription.plan.plan_name
+            values.update(
+                subscription_id=subscription.pk,
+                subscription_status=subscription.status,
+                plan_name=plan_name or '',
+                rate_tier=self.rate_tier(plan_name) if subscription.status == 'active' else DEFAULT_RATE_TIER,
+                expires_at=subscription.subscriptionExpiryDate,
+                balance_token=subscription.balanceToken,
+                used_token=subscription.usedToken,
+                expire_token=subscription.expireToken,
+                file_token=subscription.fileToken,
+                used_file_token=subscription.usedFileToken,
+                expire_file_token=subscription.expireFileToken,
+            )
+        if storage is not None:
+            values.update(
+                storage_id=storage.pk,
+                storage_status=storage.status,
+                storage_limit=storage.storage_limit,
+                storage_expires_at=storage.subscriptionExpiryDate,
+            )
+        return Entitlements(scope=scope, scope_id=scope_id, **values)
+
+    @staticmethod
+    def rate_tier(plan_name: Optional[str]) -> str:
+        words = (plan_name or '').lower().split()
+        return next((tier for tier in RATE_TIERS if tier in words), DEFAULT_RATE_TIER)
+
+    # -------------------------------------------------------------------------
+    # Invalidation
+    # -------------------------------------------------------------------------
+
+    def forget(self, user):
+        """Drop the memo on a user instance (the next lookup re-reads the cache)."""
+        user.__dict__.pop(MEMO_ATTR, None)
+
+    def invalidate_user(self, user_id: int):
+        self._on_commit([self._key(SCOPE_USER, user_id)])
+
+    def invalidate_cluster(self, cluster_id: int):
+        self._on_commit([self._key(SCOPE_CLUSTER, cluster_id)])
+
+    def invalidate_subscription(self, subscription_id: int, user_id: int = None):
+        """Drop every entry built from a subscription (and the holder's own entry)."""
+        keys = [self._index_key('subscription', subscription_id)]
+        if user_id is not None:
+            keys.append(self._key(SCOPE_USER, user_id))
+        self._on_commit(keys, indexes=keys[:1])
+
+    def invalidate_storage(self, storage_id: int, user_id: int = None):
+        keys = [self._index_key('storage', storage_id)]
+        if user_id is not None:
+            keys.append(self._key(SCOPE_USER, user_id))
+        self._on_commit(keys, indexes=keys[:1])
+
+    def _on_commit(self, keys: List[str], indexes: Iterable[str] = ()):
+        # After commit, so a concurrent lookup cannot re-cache the old rows
+        indexes = list(indexes)
+        transaction.on_commit(lambda: self._delete(keys, indexes))
+
+    @staticmethod
+    def _delete(keys: List[str], indexes: List[str]):
+        try:
+            dependents = []
+            for dependent in cache.get_many(indexes).values():
+                dependents.extend(dependent)
+            cache.delete_many(list(keys) + dependents)
+        except Exception as e:
+            logger.warning(f"Failed to invalidate entitlements {keys}: {e}")
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _store(self, key: str, entitlements: Entitlements):
+        ttl = self._ttl()
+        try:
+            cache.set(key, entitlements, ttl)
+            for kind, row_id in (('subscription', entitlements.subscription_id), ('storage', entitlements.storage_id)):
+                if row_id is None:
+                    continue
+                index_key = self._index_key(kind, row_id)
+                dependents = cache.get(index_key) or []
+                if key not in dependents:
+                    cache.set(index_key, dependents + [key], ttl)
+        except Exception as e:
+            logger.warning(f"Failed to cache entitlements {key}: {e}")
+
+    @staticmethod
+    def _key(scope: str, scope_id: int) -> str:
+        return f"{CACHE_PREFIX}:{scope}:{scope_id}"
+
+    @staticmethod
+    def _index_key(kind: str, row_id: int) -> str:
+        return f"{CACHE_PREFIX}:by-{kind}:{row_id}"
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+entitlement_service = EntitlementService()
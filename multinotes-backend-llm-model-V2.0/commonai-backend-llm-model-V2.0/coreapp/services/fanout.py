@@ -0,0 +1,231 @@
+"""
+Multi-Model Fan-Out for MultinotesAI.
+
+This module provides:
+- Merging several model streams into one without busy-waiting
+- Per-source deadlines, counted from when each source starts running
+- Cancellation of the remaining upstreams when the consumer goes away
+- A bounded worker pool shared by every fan-out
+
+Each source runs on a pooled worker thread and pushes its items onto one
+shared queue. The consumer blocks on that queue until the next item or the
+nearest deadline, so an idle comparison stream costs no CPU.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from queue import Queue, Empty
+from typing import Any, Callable, Dict, Generator, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Events
+# =============================================================================
+
+EVENT_ITEM = 'item'
+EVENT_DONE = 'done'
+EVENT_ERROR = 'error'
+EVENT_TIMEOUT = 'timeout'
+
+# Internal: a worker picked the source up and its deadline is set
+_EVENT_STARTED = 'started'
+
+
+@dataclass
+class FanOutEvent:
+    """One item or terminal state from a fan-out source."""
+    key: Hashable
+    kind: str
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def is_terminal(self) -> bool:
+        return self.kind != EVENT_ITEM
+
+
+class _Source:
+    """Book-keeping for one running source."""
+
+    def __init__(self, key: Hashable, timeout: Optional[float]):
+        self.key = key
+        self.timeout = timeout
+        self.deadline = None    # set once a worker starts the source
+        self.cancelled = threading.Event()
+        self.finished = False
+
+    def start(self):
+        if self.timeout:
+            self.deadline = time.monotonic() + self.timeout
+
+
+# =============================================================================
+# Fan-Out Engine
+# =============================================================================
+
+class FanOut:
+    """
+    Run several iterables concurrently and merge what they produce.
+
+    Usage:
+        sources = {
+            'gpt-4': lambda: stream_openai(prompt),
+            'gemini-pro': lambda: stream_gemini(prompt),
+        }
+        for event in fan_out.stream(sources, timeout=120):
+            if event.kind == 'item':
+                yield event.value
+
+    Closing the consuming generator (e.g. Django closing a
+    StreamingHttpResponse when the client disconnects) cancels every source
+    that is still running. A cancelled or timed-out source is closed the next
+    time it yields; a call already blocked inside a provider SDK cannot be
+    interrupted, so its worker is released when that call returns.
+    """
+
+    def __init__(self, max_workers: int = 16):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='fanout',
+                    )
+        return self._executor
+
+    def stream(
+        self,
+        sources: Dict[Hashable, Callable[[], Iterable[Any]]],
+        timeout: Optional[float] = None,
+    ) -> Generator[FanOutEvent, None, None]:
+        """
+        Yield events from all sources in arrival order.
+
+        Every source ends with exactly one terminal event: ``done``,
+        ``error`` (with the exception) or ``timeout`` once it has run for
+        ``timeout`` seconds. Time spent waiting for a free worker does not
+        count, so a busy pool does not time out sources that never ran.
+        """
+        events = Queue()
+
+        running = {}
+        for key, factory in sources.items():
+            source = _Source(key, timeout)
+            running[key] = source
+            self.executor.submit(self._drain, source, factory, events)
+
+        try:
+            while running:
+                wait = self._next_wait(running)
+                try:
+                    event = events.get(timeout=wait)
+                except Empty:
+                    event = None
+
+                if event is not None and event.kind == _EVENT_STARTED:
+                    # Only wakes the loop to pick up the new deadline
+                    event = None
+
+                if event is not None:
+                    source = running.get(event.key)
+                    if source is None:
+                        # Late event from a source we already timed out
+                        continue
+                    if event.is_terminal:
+                        source.finished = True
+                        del running[event.key]
+                    yield event
+
+                for timed_out in self._expired(running):
+                    timed_out.cancelled.set()
+                    del running[timed_out.key]
+                    yield FanOutEvent(timed_out.key, EVENT_TIMEOUT)
+        finally:
+            for source in running.values():
+                source.cancelled.set()
+
+    def gather(
+        self,
+        calls: Dict[Hashable, Callable[[], Any]],
+        timeout: Optional[float] = None,
+    ) -> Generator[FanOutEvent, None, None]:
+        """
+        Run one-shot calls concurrently, yielding one event per call.
+
+        Successful calls produce an ``item`` event with the return value;
+        failures and timeouts produce ``error`` and ``timeout`` events.
+        """
+        sources = {key: self._once(call) for key, call in calls.items()}
+
+        for event in self.stream(sources, timeout=timeout):
+            if event.kind != EVENT_DONE:
+                yield event
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _once(call: Callable[[], Any]) -> Callable[[], Iterable[Any]]:
+        def run():
+            yield call()
+        return run
+
+    @staticmethod
+    def _drain(source: _Source, factory: Callable[[], Iterable[Any]], events: Queue):
+        """Worker body: push every item from one source onto the shared queue."""
+        iterator = None
+        try:
+            if source.cancelled.is_set():
+                return
+            source.start()
+            events.put(FanOutEvent(source.key, _EVENT_STARTED))
+            iterator = iter(factory())
+            for item in iterator:
+                if source.cancelled.is_set():
+                    return
+                events.put(FanOutEvent(source.key, EVENT_ITEM, item))
+            events.put(FanOutEvent(source.key, EVENT_DONE))
+        except Exception as e:
+            logger.warning(f"Fan-out source {source.key!r} failed: {e}")
+            events.put(FanOutEvent(source.key, EVENT_ERROR, error=e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None and source.cancelled.is_set():
+                try:
+                    close()
+                except Exception as e:
+                    logger.debug(f"Error closing fan-out source {source.key!r}: {e}")
+
+    @staticmethod
+    def _next_wait(running: Dict[Hashable, _Source]) -> Optional[float]:
+        deadlines = [s.deadline for s in running.values() if s.deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
+
+    @staticmethod
+    def _expired(running: Dict[Hashable, _Source]):
+        now = time.monotonic()
+        return [
+            s for s in list(running.values())
+            if s.deadline is not None and s.deadline <= now
+        ]
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+fan_out = FanOut()
@@ -0,0 +1,350 @@
+"""
+File Ingestion Pipeline for MultinotesAI.
+
+This module provides:
+- A private temporary workspace per AI-process job
+- Streamed S3 downloads into that workspace
+- Page, sheet and paragraph generators for PDF, Excel and Word files
+- Token-aware chunking of a stream of text blocks
+- Parallel map-reduce of an LLM step over the chunks
+
+Text is pulled through the stages one block at a time. Memory therefore
+depends on the chunk size and the number of chunks in flight, not on the
+size of the uploaded file.
+"""
+
+import logging
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+# AiProcess file types (see AiProcessView)
+FILE_TYPE_VIDEO = 1
+FILE_TYPE_AUDIO = 2
+FILE_TYPE_YOUTUBE = 3
+FILE_TYPE_PDF = 4
+FILE_TYPE_EXCEL = 5
+FILE_TYPE_WORD = 6
+FILE_TYPE_IMAGE = 7
+
+S3_READ_CHUNK_BYTES = 1024 * 1024
+
+# Rows / paragraphs grouped into one text block
+EXCEL_ROWS_PER_BLOCK = 200
+DOCX_PARAGRAPHS_PER_BLOCK = 50
+
+# Reduce rounds before the remaining partial results are simply joined
+MAX_REDUCE_ROUNDS = 4
+
+SPOOL_FILE_NAME = 'extracted.txt'
+
+
+class IngestionError(Exception):
+    """The source file could not be fetched."""
+
+
+# =============================================================================
+# Workspace
+# =============================================================================
+
+class IngestionWorkspace:
+    """
+    A temporary directory owned by one job, removed on exit.
+
+    Usage:
+        with IngestionWorkspace(user.id, content.id) as workspace:
+            path = workspace.file('source.pdf')
+    """
+
+    def __init__(self, user_id: int, job_id: int):
+        self.prefix = f"ingest_{user_id}_{job_id}_"
+        self.path: Optional[Path] = None
+
+    def __enter__(self) -> 'IngestionWorkspace':
+        base_dir = getattr(settings, 'AI_INGEST_TMP_DIR', None) or None
+        self.path = Path(tempfile.mkdtemp(prefix=self.prefix, dir=base_dir))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def file(self, name: str) -> Path:
+        return self.path / name
+
+    def spool(self, blocks: Iterable[str]) -> Iterator[str]:
+        """Pass blocks through while appending them to the workspace spool file."""
+        with open(self.file(SPOOL_FILE_NAME), 'a', encoding='utf-8') as spool:
+            for block in blocks:
+                spool.write(block)
+                spool.write('\n')
+                yield block
+
+    def read_spool(self, max_chars: int) -> str:
+        """The first ``max_chars`` characters of the spooled text."""
+        path = self.file(SPOOL_FILE_NAME)
+        if not path.exists():
+            return ''
+        with open(path, encoding='utf-8') as spool:
+            return spool.read(max_chars).strip()
+
+
+# =============================================================================
+# Readers
+# =============================================================================
+
+def iter_pdf_pages(path) -> Iterator[str]:
+    """Text of each PDF page in turn."""
+    import fitz
+
+    with fitz.open(path) as doc:
+        for page in doc:
+            yield page.get_text()
+
+
+def _sheet_blocks(title: str, rows: Iterable, rows_per_block: int) -> Iterator[str]:
+    lines = [f"Sheet: {title}"]
+    for row in rows:
+        if any(value not in (None, '') for value in row):
+            lines.append('\t'.join('' if value is None else str(value) for value in row))
+        if len(lines) >= rows_per_block:
+            yield '\n'.join(lines)
+            lines = []
+    if lines:
+        yield '\n'.join(lines)
+
+
+def iter_excel_rows(path, rows_per_block: int = EXCEL_ROWS_PER_BLOCK) -> Iterator[str]:
+    """Every sheet of a workbook as blocks of tab-separated rows (.xls via xlrd)."""
+    if Path(path).suffix.lower() == '.xls':
+        yield from iter_xls_rows(path, rows_per_block)
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            yield from _sheet_blocks(sheet.title, sheet.iter_rows(values_only=True), rows_per_block)
+    finally:
+        workbook.close()
+
+
+def iter_xls_rows(path, rows_per_block: int = EXCEL_ROWS_PER_BLOCK) -> Iterator[str]:
+    """A legacy .xls workbook, loading one sheet at a time."""
+    import xlrd
+
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        for index in range(workbook.nsheets):
+            sheet = workbook.sheet_by_index(index)
+            rows = (sheet.row_values(row) for row in range(sheet.nrows))
+            yield from _sheet_blocks(sheet.name, rows, rows_per_block)
+            workbook.unload_sheet(index)
+    finally:
+        workbook.release_resources()
+
+
+def iter_docx_paragraphs(path, paragraphs_per_block: int = DOCX_PARAGRAPHS_PER_BLOCK) -> Iterator[str]:
+    """Paragraphs of a .docx file in blocks."""
+    from docx import Document as WordDocument
+
+    lines = []
+    for paragraph in WordDocument(path).paragraphs:
+        lines.append(paragraph.text)
+        if len(lines) >= paragraphs_per_block:
+            yield '\n'.join(lines)
+            lines = []
+    if lines:
+        yield '\n'.join(lines)
+
+
+# =============================================================================
+# Chunking
+# =============================================================================
+
+class TokenChunker:
+    """
+    Pack a stream of text blocks into chunks of at most ``max_tokens``.
+
+    Blocks are kept whole where they fit; a block longer than a chunk is cut
+    on token boundaries.
+    """
+
+    def __init__(self, max_tokens: int = None, encoding=None):
+        self.max_tokens = max_tokens or getattr(settings, 'AI_INGEST_CHUNK_TOKENS', 6000)
+        self._encoding = encoding
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding('cl100k_base')
+        return self._encoding
+
+    def chunks(self, blocks: Iterable[str]) -> Iterator[str]:
+        buffer: List[str] = []
+        used = 0
+        for block in blocks:
+            if not block or not block.strip():
+                continue
+            tokens = self.encoding.encode(block)
+            if used and used + len(tokens) > self.max_tokens:
+                yield '\n'.join(buffer)
+                buffer, used = [], 0
+            if len(tokens) > self.max_tokens:
+                for start in range(0, len(tokens), self.max_tokens):
+                    yield self.encoding.decode(tokens[start:start + self.max_tokens])
+                continue
+            buffer.append(block)
+            used += len(tokens)
+        if buffer:
+            yield '\n'.join(buffer)
+
+
+# =============================================================================
+# Map-Reduce
+# =============================================================================
+
+def _run_step(process: Callable[[str, str], str], text: str, prompt: str) -> str:
+    try:
+        return process(text, prompt)
+    finally:
+        # Worker threads open their own connections (token accounting)
+        connections.close_all()
+
+
+class MapReduceRunner:
+    """
+    Apply one LLM step to every chunk in parallel, then merge the results.
+
+    ``process(text, prompt)`` makes one model call. Partial results are
+    packed into chunks again and merged with a combining prompt until one
+    result is left.
+
+    Usage:
+        runner = MapReduceRunner(chunker)
+        summary = runner.run(chunker.chunks(blocks), "Summarize", process)
+    """
+
+    def __init__(self, chunker: TokenChunker, max_workers: int = None):
+        self.chunker = chunker
+        self.max_workers = max_workers or getattr(settings, 'AI_INGEST_MAX_WORKERS', 4)
+
+    def run(self, chunks: Iterable[str], prompt: str, process: Callable[[str, str], str],
+            on_progress: Callable[[str, dict], None] = None) -> str:
+        partials = self.map(chunks, prompt, process, on_progress)
+
+        rounds = 0
+        while len(partials) > 1 and rounds < MAX_REDUCE_ROUNDS:
+            rounds += 1
+            if on_progress:
+                on_progress('reduce', {'round': rounds, 'parts': len(partials)})
+            partials = self.map(self.chunker.chunks(partials), self.merge_prompt(prompt), process)
+
+        return '\n'.join(partials)
+
+    def map(self, chunks: Iterable[str], prompt: str, process: Callable[[str, str], str],
+            on_progress: Callable[[str, dict], None] = None) -> List[str]:
+        """
+        Results of ``process`` for each chunk, in chunk order.
+
+        At most twice ``max_workers`` chunks are pulled from the iterator
+        ahead of the finished ones.
+        """
+        results = {}
+        pending = {}
+
+        def collect(futures):
+            for future in futures:
+                results[pending.pop(future)] = future.result()
+                if on_progress:
+                    on_progress('map', {'chunks_done': len(results)})
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, chunk in enumerate(chunks):
+                pending[executor.submit(_run_step, process, chunk, prompt)] = index
+                if len(pending) >= self.max_workers * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(list(pending))
+
+        return [results[index] for index in range(len(results))]
+
+    @staticmethod
+    def merge_prompt(prompt: str) -> str:
+        return (
+            f"{prompt} (the text is a list of partial results for consecutive parts "
+            f"of one document; combine them into a single result)"
+        )
+
+
+# =============================================================================
+# Extraction
+# =============================================================================
+
+def _download(url: str, path: Path):
+    from authentication.awsservice import stream_s3_file
+
+    if not stream_s3_file(url, path, S3_READ_CHUNK_BYTES):
+        raise IngestionError("There is an error in file downloading.")
+    return path
+
+
+def extract_blocks(file_type: int, url: str, workspace: IngestionWorkspace, user) -> Iterator[str]:
+    """
+    Text blocks of an AiProcess source, fetched into ``workspace``.
+
+    Documents are read lazily page by page; audio, video and image sources
+    are transcribed or described up front and come back as a single block.
+    """
+    from coreapp.views_legacy import (
+        convert_mp4_to_mp3, convert_audio_into_text, download_video, extract_text_from_doc,
+    )
+    from coreapp.utils import extract_text_from_image
+
+    file_type = int(file_type)
+    extension = url.split('.')[-1].lower()
+
+    if file_type == FILE_TYPE_VIDEO:
+        video = _download(url, workspace.file('source.mp4'))
+        audio = workspace.file('audio.mp3')
+        if not convert_mp4_to_mp3(video, audio):
+            return iter(())
+        return iter([convert_audio_into_text(audio, user, workspace.path)])
+
+    if file_type == FILE_TYPE_AUDIO:
+        audio = _download(url, workspace.file('source.mp3'))
+        return iter([convert_audio_into_text(audio, user, workspace.path)])
+
+    if file_type == FILE_TYPE_YOUTUBE:
+        audio = download_video(url, workspace.path, user.id)
+        return iter([convert_audio_into_text(audio, user, workspace.path)])
+
+    if file_type == FILE_TYPE_PDF:
+        return iter_pdf_pages(_download(url, workspace.file('source.pdf')))
+
+    if file_type == FILE_TYPE_EXCEL:
+        suffix = 'xls' if extension == 'xls' else 'xlsx'
+        return iter_excel_rows(_download(url, workspace.file(f'source.{suffix}')))
+
+    if file_type == FILE_TYPE_WORD:
+        if extension == 'docx':
+            return iter_docx_paragraphs(_download(url, workspace.file('source.docx')))
+        return iter([extract_text_from_doc(_download(url, workspace.file('source.doc')))])
+
+    if file_type == FILE_TYPE_IMAGE:
+        return iter([extract_text_from_image(_download(url, workspace.file(f'source.{extension}')))])
+
+    return iter(())
@@ -0,0 +1,196 @@
+"""
+Folder Tree Index for MultinotesAI.
+
+This module provides:
+- A closure table (FolderClosure) of every ancestor/descendant pair
+- Maintenance on folder create and move (deletes cascade)
+- Subtree, breadcrumb and subtree file-size reads in constant queries
+- Nested folder output assembled in memory from one fetch
+
+Reads that used to walk ``parent_folder`` or recurse through
+``subfolders.all()`` one query per folder now cost an index check plus
+one query, whatever the depth or size of the tree.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Sum
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Folder Tree
+# =============================================================================
+
+class FolderTree:
+    """
+    Maintain and query the folder closure table.
+
+    Usage:
+        folder_tree.breadcrumbs(folder)       # [{'id': .., 'title': ..}, ...]
+        folder_tree.subtree_ids(folder.id)    # folder and everything below it
+        folder_tree.subtree_file_size(user, folder.id)
+    """
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def on_created(self, folder):
+        """Add the rows for a new folder: itself plus one per ancestor."""
+        from coreapp.models import FolderClosure
+
+        rows = [FolderClosure(ancestor_id=folder.id, descendant_id=folder.id, depth=0)]
+        if folder.parent_folder_id:
+            # A parent from before the index would leave the new folder without ancestors
+            self.ensure_indexed([folder.parent_folder_id])
+            rows += [
+                FolderClosure(ancestor_id=ancestor_id, descendant_id=folder.id, depth=depth + 1)
+                for ancestor_id, depth in FolderClosure.objects
+                .filter(descendant_id=folder.parent_folder_id)
+                .values_list('ancestor_id', 'depth')
+            ]
+        FolderClosure.objects.bulk_create(rows, ignore_conflicts=True)
+
+    def on_moved(self, folder):
+        """Re-link a folder's subtree under its new ``parent_folder``."""
+        from coreapp.models import FolderClosure
+
+        subtree = dict(
+            FolderClosure.objects.filter(ancestor_id=folder.id).values_list('descendant_id', 'depth')
+        )
+        if not subtree:
+            # Folder predates the index
+            self.on_created(folder)
+            return
+        if folder.parent_folder_id in subtree:
+            logger.warning(f"Folder {folder.id} moved under its own subfolder; tree index not updated")
+            return
+
+        with transaction.atomic():
+            FolderClosure.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+            if folder.parent_folder_id:
+                ancestors = list(
+                    FolderClosure.objects
+                    .filter(descendant_id=folder.parent_folder_id)
+                    .values_list('ancestor_id', 'depth')
+                )
+                FolderClosure.objects.bulk_create([
+                    FolderClosure(ancestor_id=ancestor_id, descendant_id=descendant_id,
+                                  depth=ancestor_depth + depth + 1)
+                    for ancestor_id, ancestor_depth in ancestors
+                    for descendant_id, depth in subtree.items()
+                ], batch_size=2000)
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """Recompute the closure rows from ``parent_folder`` links. Returns rows written."""
+        from coreapp.models import Folder, FolderClosure
+
+        folders = Folder.objects.all()
+        if user_id:
+            folders = folders.filter(user_id=user_id)
+        parents = dict(folders.values_list('id', 'parent_folder_id'))
+
+        rows = []
+        for folder_id in parents:
+            ancestor_id, depth, seen = folder_id, 0, set()
+            while ancestor_id and ancestor_id not in seen:
+                seen.add(ancestor_id)
+                rows.append(FolderClosure(ancestor_id=ancestor_id, descendant_id=folder_id, depth=depth))
+                ancestor_id = parents.get(ancestor_id)
+                depth += 1
+
+        with transaction.atomic():
+            FolderClosure.objects.filter(descendant_id__in=parents).delete()
+            FolderClosure.objects.bulk_create(rows, batch_size=2000)
+        return len(rows)
+
+    def ensure_indexed(self, folder_ids: Iterable[int]):
+        """Rebuild the index for the owners of any folders created before it existed."""
+        from coreapp.models import Folder, FolderClosure
+
+        folder_ids = set(folder_ids)
+        indexed = set(
+            FolderClosure.objects.filter(descendant_id__in=folder_ids, depth=0).values_list('descendant_id', flat=True)
+        )
+        missing = folder_ids - indexed
+        if not missing:
+            return
+        user_ids = set(Folder.objects.filter(id__in=missing).values_list('user_id', flat=True))
+        for user_id in user_ids:
+            logger.info(f"Building folder tree index for user {user_id}")
+            self.rebuild(user_id=user_id)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def subtree_ids(self, folder_id: int, include_self: bool = True) -> List[int]:
+        """Ids of a folder's descendants at any depth."""
+        from coreapp.models import FolderClosure
+
+        self.ensure_indexed([folder_id])
+        rows = FolderClosure.objects.filter(ancestor_id=folder_id)
+        if not include_self:
+            rows = rows.filter(depth__gt=0)
+        return list(rows.values_list('descendant_id', flat=True))
+
+    def descendants(self, root_ids: Iterable[int]):
+        """Folders strictly below ``root_ids``, with their users, ordered by id."""
+        from coreapp.models import Folder
+
+        return (
+            Folder.objects
+            .filter(tree_ancestors__ancestor_id__in=list(root_ids), tree_ancestors__depth__gt=0)
+            .select_related('user')
+            .distinct()
+            .order_by('id')
+        )
+
+    def children_map(self, roots: Iterable) -> Dict[int, list]:
+        """Every folder below ``roots`` grouped by parent id, from one fetch."""
+        root_ids = [root.id for root in roots]
+        children = defaultdict(list)
+        if not root_ids:
+            return children
+        self.ensure_indexed(root_ids)
+        for folder in self.descendants(root_ids):
+            children[folder.parent_folder_id].append(folder)
+        return children
+
+    def breadcrumbs(self, folder) -> List[Dict]:
+        """Path from the root folder down to ``folder``."""
+        from coreapp.models import FolderClosure
+
+        self.ensure_indexed([folder.id])
+        path = [
+            {'id': ancestor_id, 'title': title}
+            for ancestor_id, title in FolderClosure.objects
+            .filter(descendant_id=folder.id)
+            .order_by('-depth')
+            .values_list('ancestor_id', 'ancestor__title')
+        ]
+        return path or [{'id': folder.id, 'title': folder.title}]
+
+    def subtree_file_size(self, user, folder_id: int) -> int:
+        """Total size of a user's files in a folder and all its subfolders."""
+        from coreapp.models import UserContent
+
+        self.ensure_indexed([folder_id])
+        total = UserContent.objects.filter(
+            user=user,
+            is_delete=False,
+            folder__tree_ancestors__ancestor_id=folder_id,
+        ).aggregate(total_size=Sum('fileSize'))['total_size']
+        return total or 0
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+folder_tree = FolderTree()
@@ -0,0 +1,181 @@
+"""
+Generation Record Persistence for MultinotesAI.
+
+This module provides:
+- A single persistence stage shared by the streaming generators
+- Prompt / PromptResponse ids allocated when the stream starts
+- One transaction at stream end for the response, token usage, ledger
+  settlement and conversation turns
+
+The rows a generation needs are created while the provider is still
+working on the first token, so their ids are known up front. Everything
+written at the end happens in one transaction before the final stream
+frame is sent, so a client that receives DONE can read the saved response
+and its token charge.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class GenerationRecord:
+    """Ids and metadata of one in-flight generation."""
+    user: Any
+    llm_id: int
+    category_id: int
+    response_type: int
+    prompt_text: Optional[str] = None
+    group_id: Optional[int] = None
+    conversation: bool = False
+    prompt_id: Optional[int] = None
+    response_id: Optional[int] = None
+    finished: bool = field(default=False, repr=False)
+
+
+# =============================================================================
+# Generation Recorder
+# =============================================================================
+
+class GenerationRecorder:
+    """
+    Persist a streamed generation with its ids known up front.
+
+    Usage:
+        record = generation_recorder.start(user, llmId, categoryID, 2, prompt=prompt,
+                                           group_id=groupId, conversation=True)
+        try:
+            ... stream chunks ...
+        except BaseException:
+            generation_recorder.abort(record, reservation)
+            raise
+
+        generation_recorder.finish(record, text, tokenCount, reservation)
+        yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
+    """
+
+    def start(self, user, llm_id: int, category_id: int, response_type: int, prompt: str = None,
+              group_id: int = None, prompt_image: str = None, conversation: bool = False) -> GenerationRecord:
+        """
+        Create the Prompt and an empty PromptResponse for a generation.
+
+        The empty response row is an intentional placeholder: it is
+        committed here so its id is known while streaming. Until finish()
+        writes the text or abort() removes it, other readers (e.g. group
+        history) see it with a NULL response_text.
+
+        ``conversation`` marks chat generations whose exchange is appended
+        to the group's conversation turns on finish.
+        """
+        from coreapp.models import Prompt, PromptResponse
+
+        with transaction.atomic():
+            promp = Prompt.objects.create(
+                prompt_text=prompt,
+                user=user,
+                prompt_image=prompt_image,
+                category_id=category_id,
+                group_id=group_id,
+                response_type=response_type,
+            )
+            response = PromptResponse.objects.create(
+                llm_id=llm_id,
+                prompt_id=promp.id,
+                user_id=user.id,
+                category_id=category_id,
+                response_type=response_type,
+            )
+
+        return GenerationRecord(
+            user=user,
+            llm_id=llm_id,
+            category_id=category_id,
+            response_type=response_type,
+            prompt_text=prompt,
+            group_id=group_id,
+            conversation=conversation,
+            prompt_id=promp.id,
+            response_id=response.id,
+        )
+
+    def finish(self, record: GenerationRecord, text: str, token_count: int, reservation=None):
+        """
+        Store the response and settle its cost in one transaction.
+
+        Writes the response text, the LLM_Tokens usage row, the token
+        ledger charge (committing ``reservation`` when given) and, for
+        conversation records in a group, the chat turns, then adds the text
+        to the full-text index and queues its embedding and topic
+        extraction. Runs once per record.
+        """
+        from coreapp.models import PromptResponse, LLM_Tokens
+        from coreapp.services.conversation_turns import conversation_turns
+        from coreapp.services.search_service import search_index_service
+        from coreapp.services.token_ledger import token_ledger
+        from coreapp.services.text_index import text_index, DOC_RESPONSE
+        from coreapp.services.topic_index import topic_index
+
+        if record.finished:
+            return
+        record.finished = True
+
+        with transaction.atomic():
+            PromptResponse.objects.filter(pk=record.response_id).update(
+                response_text=text,
+                tokenUsed=token_count,
+                updated_at=timezone.now(),
+            )
+            LLM_Tokens.objects.create(
+                user_id=record.user.id,
+                llm_id=record.llm_id,
+                prompt_id=record.prompt_id,
+                text_token_used=token_count,
+            )
+
+            if reservation is not None:
+                token_ledger.commit(reservation, token_count)
+            elif token_count:
+                token_ledger.consume(record.user, token_count)
+
+            if record.group_id and record.conversation:
+                conversation_turns.append_exchange(
+                    record.group_id, record.prompt_text, text, prompt_id=record.prompt_id,
+                )
+
+        # Saved with update(), so the post_save indexer does not see it
+        if text:
+            try:
+                text_index.index_many(DOC_RESPONSE, [(record.response_id, record.user.id, text)])
+            except Exception as e:
+                logger.warning(f"Failed to index response {record.response_id}: {e}")
+            search_index_service.schedule(DOC_RESPONSE, record.response_id)
+            topic_index.schedule(record.prompt_id)
+
+    def abort(self, record: Optional[GenerationRecord], reservation=None):
+        """Drop the rows of a generation that failed or was disconnected."""
+        from coreapp.models import Prompt
+        from coreapp.services.token_ledger import token_ledger
+
+        if reservation is not None:
+            token_ledger.release(reservation)
+        if record is None or record.finished:
+            return
+        record.finished = True
+        Prompt.objects.filter(pk=record.prompt_id).delete()
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+generation_recorder = GenerationRecorder()
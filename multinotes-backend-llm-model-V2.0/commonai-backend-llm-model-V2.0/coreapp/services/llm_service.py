@@ -6,17 +6,85 @@ This module provides a unified interface for interacting with multiple LLM provi
 - Anthropic (Claude)
 - Google (Gemini)
 - Together AI
+
+Every provider has a blocking interface (generate, generate_stream) built on
+the vendor SDKs and an async interface (agenerate, agenerate_stream) that
+talks to the HTTP APIs through a shared httpx connection pool, so an ASGI
+worker can hold many open streams without a thread per stream.
 """
 
+import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any, Generator, List
+import weakref
+from typing import Optional, Dict, Any, Generator, AsyncGenerator, List
 from abc import ABC, abstractmethod
 
+import httpx
 from django.conf import settings
 
+from backend.cache_service import cache_service, LLM_CACHE_SCOPES, LLM_CACHE_SCOPE_USER
+
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# Async HTTP Client Pool
+# =============================================================================
+
+# httpx.AsyncClient is bound to the event loop it was first used on, so the
+# pool is kept per loop. Under ASGI there is one loop per worker process.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the shared async HTTP client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=getattr(settings, 'LLM_ASYNC_MAX_CONNECTIONS', 1000),
+                max_keepalive_connections=getattr(settings, 'LLM_ASYNC_MAX_KEEPALIVE', 100),
+            ),
+            timeout=httpx.Timeout(getattr(settings, 'LLM_ASYNC_TIMEOUT', 120), connect=10),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_http_clients():
+    """Close the pooled client for the running loop (e.g. on ASGI shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def _iter_sse_data(response: httpx.Response) -> AsyncGenerator[str, None]:
+    """Yield the data payload of each server-sent event in a response."""
+    data_lines = []
+    async for line in response.aiter_lines():
+        if line.startswith('data:'):
+            data_lines.append(line[5:].lstrip())
+        elif not line and data_lines:
+            yield '\n'.join(data_lines)
+            data_lines = []
+    if data_lines:
+        yield '\n'.join(data_lines)
+
+
+async def _raise_for_status(response: httpx.Response, provider: str):
+    if response.is_error:
+        body = (await response.aread()).decode('utf-8', errors='replace')
+        raise httpx.HTTPStatusError(
+            f"{provider} returned {response.status_code}: {body[:500]}",
+            request=response.request,
+            response=response,
+        )
+
+
 # =============================================================================
 # LLM Provider Interface
 # =============================================================================
@@ -25,6 +93,7 @@ class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
 
     provider_name: str = "base"
+    DEFAULT_MODEL: str = None
 
     @abstractmethod
     def generate(
@@ -57,6 +126,83 @@ class LLMProvider(ABC):
         # Simple estimation: ~4 characters per token
         return len(text) // 4
 
+    # -------------------------------------------------------------------------
+    # Async interface
+    # -------------------------------------------------------------------------
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Async HTTP client; the shared pool unless one was injected."""
+        return getattr(self, '_http_client', None) or get_async_http_client()
+
+    @abstractmethod
+    def agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        model: str = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """
+        Generate a streaming response without blocking the event loop.
+
+        ``history`` holds earlier conversation turns as role/content dicts.
+        If ``usage`` is given it is filled with prompt/completion/total token
+        counts once the stream ends. A ``max_tokens`` or ``temperature`` of
+        None is left out of the request, so the model's own default applies.
+        """
+        pass
+
+    async def agenerate(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        model: str = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Generate a full response asynchronously (same shape as generate)."""
+        usage = {}
+        parts = []
+        async for text in self.agenerate_stream(
+            prompt,
+            system_prompt=system_prompt,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            history=history,
+            usage=usage,
+            **kwargs
+        ):
+            parts.append(text)
+
+        content = ''.join(parts)
+        return {
+            'content': content,
+            'model': model or self.DEFAULT_MODEL,
+            'tokens': {
+                'prompt': usage.get('prompt', 0),
+                'completion': usage.get('completion', self.count_tokens(content)),
+                'total': usage.get('total', self.count_tokens(content)),
+            },
+            'finish_reason': usage.get('finish_reason', 'stop'),
+        }
+
+    @staticmethod
+    def _set_usage(usage: Optional[Dict[str, int]], prompt: int, completion: int, total: int = None):
+        if usage is not None:
+            usage.update(
+                prompt=prompt or 0,
+                completion=completion or 0,
+                total=total if total is not None else (prompt or 0) + (completion or 0),
+            )
+
 
 # =============================================================================
 # OpenAI Provider
@@ -67,17 +213,24 @@ class OpenAIProvider(LLMProvider):
 
     provider_name = "openai"
     DEFAULT_MODEL = "gpt-4"
-
-    def __init__(self, api_key: str = None):
-        self.api_key = api_key or getattr(settings, 'OPENAI_API_KEY', '')
+    API_BASE = "https://api.openai.com/v1"
+    API_KEY_SETTING = 'OPENAI_API_KEY'
+    API_BASE_SETTING = 'OPENAI_API_BASE'
+    # Ask for a final usage chunk on streams (OpenAI-specific option)
+    STREAM_USAGE_OPTION = True
+
+    def __init__(self, api_key: str = None, api_base: str = None, http_client: httpx.AsyncClient = None):
+        self.api_key = api_key or getattr(settings, self.API_KEY_SETTING, '')
+        self.api_base = (api_base or getattr(settings, self.API_BASE_SETTING, '') or self.API_BASE).rstrip('/')
         self._client = None
+        self._http_client = http_client
 
     @property
     def client(self):
         if self._client is None:
             try:
                 from openai import OpenAI
-                self._client = OpenAI(api_key=self.api_key)
+                self._client = OpenAI(api_key=self.api_key, base_url=self.api_base)
             except ImportError:
                 raise ImportError("OpenAI package not installed. Run: pip install openai")
         return self._client
@@ -122,6 +275,14 @@ class OpenAIProvider(LLMProvider):
             logger.error(f"OpenAI generation error: {e}")
             raise
 
+    def get_embedding(self, text: str, model: str = None) -> List[float]:
+        """Embed text with the OpenAI embeddings API."""
+        response = self.client.embeddings.create(
+            model=model or getattr(settings, 'EMBEDDING_MODEL', 'text-embedding-3-small'),
+            input=text,
+        )
+        return response.data[0].embedding
+
     def generate_stream(
         self,
         prompt: str,
@@ -157,6 +318,84 @@ class OpenAIProvider(LLMProvider):
             logger.error(f"OpenAI streaming error: {e}")
             raise
 
+    async def agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        model: str = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """Generate a streaming response over the chat completions HTTP API."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.extend(history or [])
+        messages.append({"role": "user", "content": prompt})
+
+        payload = {
+            'model': model or self.DEFAULT_MODEL,
+            'messages': messages,
+            'stream': True,
+            **kwargs
+        }
+        if max_tokens is not None:
+            payload['max_tokens'] = max_tokens
+        if temperature is not None:
+            payload['temperature'] = temperature
+        if self.STREAM_USAGE_OPTION:
+            payload['stream_options'] = {'include_usage': True}
+
+        try:
+            async with self.http_client.stream(
+                'POST',
+                f"{self.api_base}/chat/completions",
+                json=payload,
+                headers={'Authorization': f"Bearer {self.api_key}"},
+            ) as response:
+                await _raise_for_status(response, self.provider_name)
+
+                async for data in _iter_sse_data(response):
+                    if data == '[DONE]':
+                        break
+                    chunk = json.loads(data)
+
+                    if chunk.get('usage'):
+                        self._set_usage(
+                            usage,
+                            chunk['usage'].get('prompt_tokens'),
+                            chunk['usage'].get('completion_tokens'),
+                            chunk['usage'].get('total_tokens'),
+                        )
+
+                    choices = chunk.get('choices') or []
+                    if choices and (choices[0].get('delta') or {}).get('content'):
+                        yield choices[0]['delta']['content']
+
+        except Exception as e:
+            logger.error(f"{self.provider_name} async streaming error: {e}")
+            raise
+
+
+# =============================================================================
+# Together AI Provider
+# =============================================================================
+
+class TogetherProvider(OpenAIProvider):
+    """Together AI provider (OpenAI-compatible API)."""
+
+    provider_name = "together"
+    DEFAULT_MODEL = "mistralai/Mistral-7B-Instruct-v0.2"
+    API_BASE = "https://api.together.xyz/v1"
+    # The Together SDK client in coreapp.utils reads the same key
+    API_KEY_SETTING = 'LLama_API_KEY'
+    API_BASE_SETTING = 'TOGETHER_API_BASE'
+    # Together sends usage on the last chunk without being asked
+    STREAM_USAGE_OPTION = False
+
 
 # =============================================================================
 # Anthropic Provider
@@ -167,10 +406,14 @@ class AnthropicProvider(LLMProvider):
 
     provider_name = "anthropic"
     DEFAULT_MODEL = "claude-3-sonnet-20240229"
+    API_BASE = "https://api.anthropic.com"
+    API_VERSION = "2023-06-01"
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, api_base: str = None, http_client: httpx.AsyncClient = None):
         self.api_key = api_key or getattr(settings, 'ANTHROPIC_API_KEY', '')
+        self.api_base = (api_base or getattr(settings, 'ANTHROPIC_API_BASE', '') or self.API_BASE).rstrip('/')
         self._client = None
+        self._http_client = http_client
 
     @property
     def client(self):
@@ -244,6 +487,63 @@ class AnthropicProvider(LLMProvider):
             logger.error(f"Anthropic streaming error: {e}")
             raise
 
+    async def agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        model: str = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """Generate a streaming response over the Messages HTTP API."""
+        payload = {
+            'model': model or self.DEFAULT_MODEL,
+            # The Messages API requires a limit
+            'max_tokens': max_tokens or 1000,
+            'messages': [*(history or []), {"role": "user", "content": prompt}],
+            'stream': True,
+        }
+        if temperature is not None:
+            payload['temperature'] = temperature
+        if system_prompt:
+            payload['system'] = system_prompt
+
+        headers = {
+            'x-api-key': self.api_key,
+            'anthropic-version': self.API_VERSION,
+        }
+        input_tokens = output_tokens = 0
+
+        try:
+            async with self.http_client.stream(
+                'POST', f"{self.api_base}/v1/messages", json=payload, headers=headers
+            ) as response:
+                await _raise_for_status(response, self.provider_name)
+
+                async for data in _iter_sse_data(response):
+                    event = json.loads(data)
+                    event_type = event.get('type')
+
+                    if event_type == 'message_start':
+                        input_tokens = event['message'].get('usage', {}).get('input_tokens', 0)
+                    elif event_type == 'content_block_delta':
+                        text = event.get('delta', {}).get('text')
+                        if text:
+                            yield text
+                    elif event_type == 'message_delta':
+                        output_tokens = event.get('usage', {}).get('output_tokens', output_tokens)
+                    elif event_type == 'error':
+                        raise RuntimeError(event.get('error', {}).get('message', 'Anthropic stream error'))
+
+            self._set_usage(usage, input_tokens, output_tokens)
+
+        except Exception as e:
+            logger.error(f"Anthropic async streaming error: {e}")
+            raise
+
 
 # =============================================================================
 # Google Gemini Provider
@@ -254,10 +554,14 @@ class GoogleProvider(LLMProvider):
 
     provider_name = "google"
     DEFAULT_MODEL = "gemini-pro"
+    API_BASE = "https://generativelanguage.googleapis.com/v1beta"
 
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, api_base: str = None, http_client: httpx.AsyncClient = None):
+        # The genai SDK in coreapp.utils is configured with the same key
         self.api_key = api_key or getattr(settings, 'GOOGLE_API_KEY', '')
+        self.api_base = (api_base or getattr(settings, 'GOOGLE_API_BASE', '') or self.API_BASE).rstrip('/')
         self._model = None
+        self._http_client = http_client
 
     def _get_model(self, model_name: str):
         try:
@@ -338,6 +642,71 @@ class GoogleProvider(LLMProvider):
             logger.error(f"Google streaming error: {e}")
             raise
 
+    async def agenerate_stream(
+        self,
+        prompt: str,
+        system_prompt: str = "",
+        model: str = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """Generate a streaming response over the Gemini REST API."""
+        model_name = model or self.DEFAULT_MODEL
+        full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+
+        contents = [
+            {
+                'role': 'user' if turn['role'] == 'user' else 'model',
+                'parts': [{'text': turn['content']}],
+            }
+            for turn in (history or []) if turn.get('role') != 'system'
+        ]
+        contents.append({'role': 'user', 'parts': [{'text': full_prompt}]})
+
+        generation_config = {}
+        if max_tokens is not None:
+            generation_config['maxOutputTokens'] = max_tokens
+        if temperature is not None:
+            generation_config['temperature'] = temperature
+        payload = {'contents': contents}
+        if generation_config:
+            payload['generationConfig'] = generation_config
+        metadata = {}
+
+        try:
+            async with self.http_client.stream(
+                'POST',
+                f"{self.api_base}/models/{model_name}:streamGenerateContent",
+                params={'alt': 'sse'},
+                # In a header, the key stays out of logged URLs and error messages
+                headers={'x-goog-api-key': self.api_key},
+                json=payload,
+            ) as response:
+                await _raise_for_status(response, self.provider_name)
+
+                async for data in _iter_sse_data(response):
+                    chunk = json.loads(data)
+                    metadata = chunk.get('usageMetadata') or metadata
+
+                    for candidate in chunk.get('candidates', [])[:1]:
+                        for part in candidate.get('content', {}).get('parts', []):
+                            if part.get('text'):
+                                yield part['text']
+
+            self._set_usage(
+                usage,
+                metadata.get('promptTokenCount', 0),
+                metadata.get('candidatesTokenCount', 0),
+                metadata.get('totalTokenCount'),
+            )
+
+        except Exception as e:
+            logger.error(f"Google async streaming error: {e}")
+            raise
+
 
 # =============================================================================
 # LLM Service
@@ -360,6 +729,7 @@ class LLMService:
         'openai': OpenAIProvider,
         'anthropic': AnthropicProvider,
         'google': GoogleProvider,
+        'together': TogetherProvider,
     }
 
     def __init__(self):
@@ -382,6 +752,8 @@ class LLMService:
         system_prompt: str = "",
         max_tokens: int = 1000,
         temperature: float = 0.7,
+        cache_scope: Optional[str] = None,
+        user_id: Optional[int] = None,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -394,12 +766,35 @@ class LLMService:
             system_prompt: System prompt
             max_tokens: Maximum tokens to generate
             temperature: Sampling temperature
+            cache_scope: Opt in to the response cache, 'user' or 'global'
+            user_id: Owner of 'user' scoped cache entries
 
         Returns:
-            Dict with response content and metadata
+            Dict with response content and metadata ('cached' is True when
+            the response came from the cache)
         """
         llm_provider = self.get_provider(provider)
-        return llm_provider.generate(
+        if cache_scope not in LLM_CACHE_SCOPES:
+            return llm_provider.generate(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                model=model,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+
+        scope_user = user_id if cache_scope == LLM_CACHE_SCOPE_USER else None
+        fingerprint = cache_service.llm_response_fingerprint(
+            f"{provider}:{model or llm_provider.DEFAULT_MODEL}",
+            [{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}],
+            dict(kwargs, max_tokens=max_tokens, temperature=temperature),
+        )
+        cached = cache_service.get_llm_response(fingerprint, scope_user)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        result = llm_provider.generate(
             prompt=prompt,
             system_prompt=system_prompt,
             model=model,
@@ -407,6 +802,9 @@ class LLMService:
             temperature=temperature,
             **kwargs
         )
+        if result.get('content'):
+            cache_service.set_llm_response(fingerprint, result, scope_user)
+        return dict(result, cached=False)
 
     def generate_stream(
         self,
@@ -437,12 +835,88 @@ class LLMService:
             **kwargs
         )
 
+    def get_embedding(self, text: str, provider: str = "openai", model: str = None) -> List[float]:
+        """
+        Get an embedding vector for text.
+
+        Only providers with an embeddings API (currently OpenAI) support this.
+        """
+        llm_provider = self.get_provider(provider)
+        if not hasattr(llm_provider, 'get_embedding'):
+            raise ValueError(f"Provider {provider} does not support embeddings")
+        return llm_provider.get_embedding(text, model=model)
+
+    async def agenerate(
+        self,
+        prompt: str,
+        provider: str = "openai",
+        model: str = None,
+        system_prompt: str = "",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Async version of generate() using the shared connection pool.
+
+        Args:
+            Same as generate(), plus:
+            history: Earlier conversation turns as role/content dicts
+        """
+        llm_provider = self.get_provider(provider)
+        return await llm_provider.agenerate(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            history=history,
+            **kwargs
+        )
+
+    def agenerate_stream(
+        self,
+        prompt: str,
+        provider: str = "openai",
+        model: str = None,
+        system_prompt: str = "",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        history: Optional[List[Dict[str, str]]] = None,
+        usage: Optional[Dict[str, int]] = None,
+        **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """
+        Async version of generate_stream().
+
+        Args:
+            Same as agenerate(), plus:
+            usage: Dict filled with prompt/completion/total token counts
+                when the stream ends
+
+        Yields:
+            Response text chunks
+        """
+        llm_provider = self.get_provider(provider)
+        return llm_provider.agenerate_stream(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            history=history,
+            usage=usage,
+            **kwargs
+        )
+
     def get_available_models(self, provider: str = None) -> Dict[str, List[str]]:
         """Get available models for providers."""
         models = {
             'openai': ['gpt-4', 'gpt-4-turbo', 'gpt-3.5-turbo'],
             'anthropic': ['claude-3-opus-20240229', 'claude-3-sonnet-20240229', 'claude-3-haiku-20240307'],
             'google': ['gemini-pro', 'gemini-pro-vision'],
+            'together': ['mistralai/Mistral-7B-Instruct-v0.2', 'meta-llama/Llama-2-70b-chat-hf'],
         }
         if provider:
             return {provider: models.get(provider, [])}
@@ -13,15 +13,17 @@ WBS Item: 6.1.1 - Multi-model comparison (run same prompt on 3 models)
 import logging
 import asyncio
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from functools import partial
 from typing import Optional, List, Dict, Any, Callable
 
 from django.conf import settings
 from django.core.cache import cache
 
+from .fanout import FanOut, fan_out, EVENT_ITEM, EVENT_TIMEOUT
+
 logger = logging.getLogger(__name__)
 
 
@@ -570,15 +572,9 @@ class MultiModelService:
         ModelProvider.MISTRAL: MistralAdapter,
     }
 
-    def __init__(self, max_workers: int = 5):
-        self.max_workers = max_workers
-        self._executor = None
-
-    @property
-    def executor(self):
-        if self._executor is None:
-            self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
-        return self._executor
+    def __init__(self, timeout: float = 120, fan_out_engine: FanOut = None):
+        self.timeout = timeout
+        self.fan_out = fan_out_engine or fan_out
 
     # -------------------------------------------------------------------------
     # Model Information
@@ -712,9 +708,9 @@ class MultiModelService:
         max_tokens: Optional[int],
         temperature: float,
     ) -> List[ModelResponse]:
-        """Run models in parallel using thread pool."""
+        """Run models in parallel on the shared fan-out pool."""
         responses = []
-        futures = {}
+        calls = {}
 
         for model_id in models:
             config = AVAILABLE_MODELS[model_id]
@@ -722,30 +718,29 @@ class MultiModelService:
 
             if adapter_class:
                 adapter = adapter_class(config)
-                future = self.executor.submit(
+                calls[model_id] = partial(
                     adapter.generate,
                     prompt=prompt,
                     system_prompt=system_prompt,
                     max_tokens=max_tokens,
                     temperature=temperature,
                 )
-                futures[future] = model_id
 
-        for future in as_completed(futures):
-            try:
-                response = future.result(timeout=120)
-                responses.append(response)
-            except Exception as e:
-                model_id = futures[future]
-                config = AVAILABLE_MODELS[model_id]
-                responses.append(ModelResponse(
-                    model_id=model_id,
-                    model_name=config.display_name,
-                    provider=config.provider.value,
-                    response_text='',
-                    success=False,
-                    error=f"Timeout or error: {str(e)}",
-                ))
+        for event in self.fan_out.gather(calls, timeout=self.timeout):
+            if event.kind == EVENT_ITEM:
+                responses.append(event.value)
+                continue
+
+            config = AVAILABLE_MODELS[event.key]
+            reason = 'Timeout' if event.kind == EVENT_TIMEOUT else f"Error: {event.error}"
+            responses.append(ModelResponse(
+                model_id=event.key,
+                model_name=config.display_name,
+                provider=config.provider.value,
+                response_text='',
+                success=False,
+                error=reason,
+            ))
 
         return responses
 
@@ -4,18 +4,27 @@ Notification Service for MultinotesAI.
 This module provides unified notification handling:
 - In-app notifications
 - Email notifications
-- Push notifications (future)
+- Push notifications (FCM)
 - Webhook notifications
+- Broadcast fan-out to large audiences with a progress and failure report
+
+A broadcast splits its audience into user id ranges, one Celery task per
+range. Each task bulk-inserts the in-app notifications, sends its emails
+over a single SMTP connection and its pushes as FCM multicasts, with
+per-channel rate limits shared across workers.
 """
 
 import logging
+import uuid
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from enum import Enum
 
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F, Max, Min
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 
 logger = logging.getLogger(__name__)
@@ -146,6 +155,55 @@ class Notification(models.Model):
             self.save(update_fields=['is_read', 'read_at'])
 
 
+class NotificationBroadcast(models.Model):
+    """A notification sent to many users, with its delivery report."""
+
+    status_type = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+
+    broadcast_id = models.CharField(max_length=64, unique=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notification_broadcasts'
+    )
+    notification_type = models.CharField(max_length=50)
+    channels = models.JSONField(default=list)
+    context = models.JSONField(default=dict, blank=True)
+    user_filter = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=status_type, default='pending')
+
+    # Progress (incremented by each chunk)
+    total_chunks = models.IntegerField(default=0)
+    completed_chunks = models.IntegerField(default=0)
+    processed_users = models.IntegerField(default=0)
+    in_app_created = models.IntegerField(default=0)
+    emails_sent = models.IntegerField(default=0)
+    emails_failed = models.IntegerField(default=0)
+    push_sent = models.IntegerField(default=0)
+    push_failed = models.IntegerField(default=0)
+    failures = models.JSONField(default=list, blank=True)  # Sample of failed recipients
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'notification_broadcasts'
+        indexes = [
+            models.Index(fields=['status', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.notification_type} broadcast - {self.status}"
+
+
 # =============================================================================
 # Notification Service
 # =============================================================================
@@ -223,42 +281,53 @@ class NotificationService:
     ) -> bool:
         """Send email notification."""
         try:
-            # Build context
-            email_context = {
-                'user': user,
-                'notification_type': notification_type.value,
-                **context
-            }
-
-            title = template_config.get('title', 'Notification from MultinotesAI')
-            template = template_config.get('template')
-
-            # Try to render HTML template
-            if template:
-                try:
-                    html_message = render_to_string(template, email_context)
-                    plain_message = strip_tags(html_message)
-                except Exception:
-                    html_message = None
-                    plain_message = self._get_plain_message(notification_type, context)
-            else:
-                html_message = None
-                plain_message = self._get_plain_message(notification_type, context)
-
-            send_mail(
-                subject=title,
-                message=plain_message,
-                from_email=self.from_email,
-                recipient_list=[user.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+            self._build_email(user, notification_type, context, template_config).send()
             return True
 
         except Exception as e:
             logger.error(f"Email notification error: {e}")
             return False
 
+    def _build_email(
+        self,
+        user,
+        notification_type: NotificationType,
+        context: Dict,
+        template_config: Dict
+    ) -> EmailMultiAlternatives:
+        """Render the notification email for one user."""
+        # Build context
+        email_context = {
+            'user': user,
+            'notification_type': notification_type.value,
+            **context
+        }
+
+        title = template_config.get('title', 'Notification from MultinotesAI')
+        template = template_config.get('template')
+
+        # Try to render HTML template
+        if template:
+            try:
+                html_message = render_to_string(template, email_context)
+                plain_message = strip_tags(html_message)
+            except Exception:
+                html_message = None
+                plain_message = self._get_plain_message(notification_type, context)
+        else:
+            html_message = None
+            plain_message = self._get_plain_message(notification_type, context)
+
+        message = EmailMultiAlternatives(
+            subject=title,
+            body=plain_message,
+            from_email=self.from_email,
+            to=[user.email],
+        )
+        if html_message:
+            message.attach_alternative(html_message, 'text/html')
+        return message
+
     def _create_in_app(
         self,
         user,
@@ -293,10 +362,16 @@ class NotificationService:
         notification_type: NotificationType,
         context: Dict
     ) -> bool:
-        """Send push notification (placeholder for future implementation)."""
-        # TODO: Implement push notifications (Firebase, OneSignal, etc.)
-        logger.info(f"Push notification not implemented yet for {notification_type.value}")
-        return False
+        """Send push notification to the user's device."""
+        from ticketandcategory.FCMManager import pushMulticast
+
+        token = getattr(user, 'deviceToken', None)
+        if not token or token == 'null':
+            return False
+
+        title = NOTIFICATION_TEMPLATES.get(notification_type, {}).get('title', 'Notification')
+        result = pushMulticast([token], title, self._get_plain_message(notification_type, context))
+        return result['success'] > 0
 
     def _get_plain_message(self, notification_type: NotificationType, context: Dict) -> str:
         """Generate plain text message for notification."""
@@ -372,17 +447,37 @@ class NotificationService:
 # =============================================================================
 
 class BulkNotificationService:
-    """Service for sending notifications to multiple users."""
+    """
+    Service for sending notifications to multiple users.
+
+    Usage:
+        broadcast = bulk_notification_service.broadcast(
+            NotificationType.MAINTENANCE,
+            context={'window': 'Sunday 02:00 UTC'},
+            channels=['in_app', 'email', 'push'],
+        )
+        bulk_notification_service.get_report(broadcast.broadcast_id)
+    """
+
+    MAX_FAILURES = 100  # Failed recipients kept in a broadcast report
+
+    CHANNEL_RATE_SETTINGS = {
+        'email': ('NOTIFICATION_EMAIL_RATE_PER_MINUTE', 600),  # messages
+        'push': ('NOTIFICATION_PUSH_RATE_PER_MINUTE', 600),  # multicast requests
+    }
 
     def __init__(self):
         self.notification_service = NotificationService()
+        self.chunk_size = getattr(settings, 'NOTIFICATION_BROADCAST_CHUNK_SIZE', 1000)
+        self._limiters = {}
 
     def notify_all_users(
         self,
         notification_type: NotificationType,
         context: Dict = None,
         channels: List[str] = None,
-        user_filter: Dict = None
+        user_filter: Dict = None,
+        async_delivery: bool = True
     ) -> int:
         """
         Send notification to all (or filtered) users.
@@ -391,33 +486,255 @@ class BulkNotificationService:
             notification_type: Type of notification
             context: Notification context
             channels: Notification channels
-            user_filter: Django ORM filter for users
+            user_filter: Django ORM filter for users (JSON-serializable)
+            async_delivery: Fan out over Celery instead of sending inline
 
         Returns:
-            Number of users notified
+            Number of users notified (queued, when async)
+        """
+        broadcast = self.broadcast(
+            notification_type,
+            context=context,
+            channels=channels,
+            user_filter=user_filter,
+            async_delivery=async_delivery,
+        )
+        if async_delivery:
+            return self._audience(broadcast).count()
+        return broadcast.processed_users
+
+    # -------------------------------------------------------------------------
+    # Fan-out
+    # -------------------------------------------------------------------------
+
+    def broadcast(
+        self,
+        notification_type: NotificationType,
+        context: Dict = None,
+        channels: List[str] = None,
+        user_filter: Dict = None,
+        created_by=None,
+        async_delivery: bool = True
+    ) -> NotificationBroadcast:
         """
+        Send a notification to every matching active user.
+
+        The audience is split into user id ranges of ``chunk_size``; each
+        range is one send_broadcast_chunk task and a chord callback writes
+        the final report.
+        """
+        broadcast = NotificationBroadcast.objects.create(
+            broadcast_id=str(uuid.uuid4()),
+            created_by=created_by,
+            notification_type=notification_type.value,
+            channels=channels or ['in_app'],
+            context=context or {},
+            user_filter=user_filter or {},
+            status='processing',
+        )
+
+        ranges = self._ranges(broadcast)
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(total_chunks=len(ranges))
+
+        if async_delivery:
+            self._enqueue(broadcast.broadcast_id, ranges)
+        else:
+            results = [self.send_chunk(broadcast.broadcast_id, start, end) for start, end in ranges]
+            self.finalize(broadcast.broadcast_id, results)
+
+        logger.info(f"Broadcast {broadcast.broadcast_id} split into {len(ranges)} chunks")
+        broadcast.refresh_from_db()
+        return broadcast
+
+    def _audience(self, broadcast: NotificationBroadcast):
         from django.contrib.auth import get_user_model
         User = get_user_model()
 
         queryset = User.objects.filter(is_active=True)
-        if user_filter:
-            queryset = queryset.filter(**user_filter)
+        if broadcast.user_filter:
+            queryset = queryset.filter(**broadcast.user_filter)
+        return queryset
+
+    def _ranges(self, broadcast: NotificationBroadcast) -> List[tuple]:
+        bounds = self._audience(broadcast).aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return []
+
+        return [
+            (start, start + self.chunk_size)
+            for start in range(bounds['first'], bounds['last'] + 1, self.chunk_size)
+        ]
 
-        count = 0
-        for user in queryset.iterator():
-            try:
-                self.notification_service.notify(
-                    user=user,
-                    notification_type=notification_type,
-                    channels=channels,
-                    context=context
-                )
-                count += 1
-            except Exception as e:
-                logger.error(f"Error notifying user {user.id}: {e}")
+    def _enqueue(self, broadcast_id: str, ranges: List[tuple]):
+        from celery import chord
+        from coreapp.tasks.broadcast_tasks import finalize_broadcast, send_broadcast_chunk
+
+        if not ranges:
+            finalize_broadcast.delay([], broadcast_id)
+            return
+
+        chord(
+            send_broadcast_chunk.s(broadcast_id, start, end) for start, end in ranges
+        )(finalize_broadcast.s(broadcast_id))
 
-        logger.info(f"Bulk notification sent to {count} users")
-        return count
+    def send_chunk(self, broadcast_id: str, start_id: int, end_id: int) -> Dict[str, Any]:
+        """Notify the audience users with ids in [start_id, end_id); returns the chunk report."""
+        broadcast = NotificationBroadcast.objects.get(broadcast_id=broadcast_id)
+        notification_type = NotificationType(broadcast.notification_type)
+        template_config = NOTIFICATION_TEMPLATES.get(notification_type, {})
+        users = list(self._audience(broadcast).filter(id__gte=start_id, id__lt=end_id).order_by('id'))
+
+        report = {
+            'users': len(users),
+            'in_app': 0,
+            'email_sent': 0,
+            'email_failed': 0,
+            'push_sent': 0,
+            'push_failed': 0,
+            'failures': [],
+        }
+
+        if users and 'in_app' in broadcast.channels:
+            self._bulk_in_app(users, notification_type, broadcast.context, template_config, report)
+        if users and 'email' in broadcast.channels:
+            self._send_emails(users, notification_type, broadcast.context, template_config, report)
+        if users and 'push' in broadcast.channels:
+            self._send_pushes(users, notification_type, broadcast.context, template_config, report)
+
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+            completed_chunks=F('completed_chunks') + 1,
+            processed_users=F('processed_users') + report['users'],
+            in_app_created=F('in_app_created') + report['in_app'],
+            emails_sent=F('emails_sent') + report['email_sent'],
+            emails_failed=F('emails_failed') + report['email_failed'],
+            push_sent=F('push_sent') + report['push_sent'],
+            push_failed=F('push_failed') + report['push_failed'],
+            updated_at=timezone.now(),
+        )
+        return report
+
+    def _bulk_in_app(self, users, notification_type, context, template_config, report):
+        """One bulk insert for the chunk's in-app notifications."""
+        priority = template_config.get('priority', NotificationPriority.NORMAL)
+        fields = {
+            'notification_type': notification_type.value,
+            'title': template_config.get('title', 'Notification'),
+            'message': self.notification_service._get_plain_message(notification_type, context),
+            'data': context,
+            'priority': priority.value if isinstance(priority, NotificationPriority) else priority,
+        }
+
+        try:
+            Notification.objects.bulk_create(
+                [Notification(user=user, **fields) for user in users],
+                batch_size=1000,
+            )
+            report['in_app'] += len(users)
+        except Exception as e:
+            logger.error(f"Bulk in-app notification error: {e}")
+            self._record_failure(report, 'in_app', None, e)
+
+    def _send_emails(self, users, notification_type, context, template_config, report):
+        """Send the chunk's emails over one SMTP connection."""
+        limiter = self._limiter('email')
+        recipients = [user for user in users if user.email]
+
+        try:
+            with get_connection(fail_silently=False) as connection:
+                for user in recipients:
+                    try:
+                        message = self.notification_service._build_email(
+                            user, notification_type, context, template_config
+                        )
+                        message.connection = connection
+                        limiter.acquire()
+                        message.send()
+                        report['email_sent'] += 1
+                    except Exception as e:
+                        report['email_failed'] += 1
+                        self._record_failure(report, 'email', user.id, e)
+
+        except Exception as e:
+            # Could not open the connection: nothing left in the chunk was sent
+            unsent = len(recipients) - report['email_sent'] - report['email_failed']
+            report['email_failed'] += unsent
+            logger.error(f"Broadcast email connection error: {e}")
+            self._record_failure(report, 'email', None, e)
+
+    def _send_pushes(self, users, notification_type, context, template_config, report):
+        """Send the chunk's pushes as FCM multicasts."""
+        from ticketandcategory.FCMManager import MULTICAST_SIZE, pushMulticast
+
+        limiter = self._limiter('push')
+        title = template_config.get('title', 'Notification')
+        body = self.notification_service._get_plain_message(notification_type, context)
+        tokens = [
+            user.deviceToken for user in users
+            if getattr(user, 'deviceToken', None) and user.deviceToken != 'null'
+        ]
+
+        for start in range(0, len(tokens), MULTICAST_SIZE):
+            batch = tokens[start:start + MULTICAST_SIZE]
+            limiter.acquire()
+            result = pushMulticast(batch, title, body)
+            report['push_sent'] += result['success']
+            report['push_failed'] += result['failure']
+
+    def _limiter(self, channel: str):
+        """Per-channel rate limit shared by every worker."""
+        if channel not in self._limiters:
+            from coreapp.services.batch_processing import SharedRateLimiter
+
+            setting, default = self.CHANNEL_RATE_SETTINGS[channel]
+            self._limiters[channel] = SharedRateLimiter(f"notify:{channel}", getattr(settings, setting, default))
+        return self._limiters[channel]
+
+    def _record_failure(self, report: Dict, channel: str, user_id: Optional[int], error: Exception):
+        if len(report['failures']) < self.MAX_FAILURES:
+            report['failures'].append({'channel': channel, 'user_id': user_id, 'error': str(error)[:200]})
+
+    # -------------------------------------------------------------------------
+    # Report
+    # -------------------------------------------------------------------------
+
+    def finalize(self, broadcast_id: str, results: List[Dict]) -> Optional[NotificationBroadcast]:
+        """Store the failure sample and settle the broadcast (chord callback)."""
+        failures = []
+        for result in results or []:
+            if isinstance(result, dict):
+                failures.extend(result.get('failures', []))
+
+        broadcast = NotificationBroadcast.objects.filter(broadcast_id=broadcast_id).first()
+        if not broadcast:
+            return None
+
+        broadcast.failures = failures[:self.MAX_FAILURES]
+        broadcast.status = 'completed' if broadcast.completed_chunks >= broadcast.total_chunks else 'failed'
+        broadcast.completed_at = timezone.now()
+        broadcast.save(update_fields=['failures', 'status', 'completed_at', 'updated_at'])
+        return broadcast
+
+    def get_report(self, broadcast_id: str) -> Optional[Dict[str, Any]]:
+        """Progress and delivery counts for a broadcast."""
+        broadcast = NotificationBroadcast.objects.filter(broadcast_id=broadcast_id).first()
+        if not broadcast:
+            return None
+
+        return {
+            'broadcast_id': broadcast.broadcast_id,
+            'notification_type': broadcast.notification_type,
+            'channels': broadcast.channels,
+            'status': broadcast.status,
+            'progress': round(broadcast.completed_chunks / broadcast.total_chunks * 100, 1)
+            if broadcast.total_chunks else 100.0,
+            'processed_users': broadcast.processed_users,
+            'in_app_created': broadcast.in_app_created,
+            'emails': {'sent': broadcast.emails_sent, 'failed': broadcast.emails_failed},
+            'push': {'sent': broadcast.push_sent, 'failed': broadcast.push_failed},
+            'failures': broadcast.failures,
+            'created_at': broadcast.created_at.isoformat(),
+            'completed_at': broadcast.completed_at.isoformat() if broadcast.completed_at else None,
+        }
 
 
 # =============================================================================
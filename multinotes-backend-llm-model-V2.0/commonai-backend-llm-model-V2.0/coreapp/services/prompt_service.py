@@ -194,7 +194,7 @@ class UserPromptHistory(models.Model):
         return f"{self.user.email}: {self.prompt_text[:50]}"
 
 
-class PromptTemplate(models.Model):
+class CustomPromptTemplate(models.Model):
     """Custom prompt templates (system and user-created)."""
 
     name = models.CharField(max_length=255)
@@ -222,7 +222,8 @@ class PromptTemplate(models.Model):
     is_delete = models.BooleanField(default=False)
 
     class Meta:
-        db_table = 'prompt_templates'
+        # models_analytics.PromptTemplate owns 'prompt_templates'
+        db_table = 'custom_prompt_templates'
         indexes = [
             models.Index(fields=['category', 'is_system']),
             models.Index(fields=['user', '-use_count']),
@@ -571,14 +572,14 @@ class PromptSuggestionService:
         category: str,
         description: str = '',
         is_public: bool = False
-    ) -> PromptTemplate:
+    ) -> CustomPromptTemplate:
         """Create a custom prompt template."""
         import re
 
         # Extract variables from template
         variables = re.findall(r'\{(\w+)\}', template)
 
-        return PromptTemplate.objects.create(
+        return CustomPromptTemplate.objects.create(
             user=user,
             name=name,
             template=template,
@@ -588,9 +589,9 @@ class PromptSuggestionService:
             is_public=is_public,
         )
 
-    def get_user_templates(self, user, limit: int = 50) -> List[PromptTemplate]:
+    def get_user_templates(self, user, limit: int = 50) -> List[CustomPromptTemplate]:
         """Get user's custom templates."""
-        return list(PromptTemplate.objects.filter(
+        return list(CustomPromptTemplate.objects.filter(
             user=user,
             is_delete=False
         ).order_by('-use_count')[:limit])
@@ -599,9 +600,9 @@ class PromptSuggestionService:
         self,
         category: str = None,
         limit: int = 20
-    ) -> List[PromptTemplate]:
+    ) -> List[CustomPromptTemplate]:
         """Get public templates."""
-        queryset = PromptTemplate.objects.filter(
+        queryset = CustomPromptTemplate.objects.filter(
             is_public=True,
             is_delete=False
         )
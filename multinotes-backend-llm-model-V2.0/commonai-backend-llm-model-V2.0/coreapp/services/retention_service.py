@@ -367,95 +367,8 @@ class RetentionCalculator:
             UserEngagementScore with score and breakdown
         """
         try:
-            from coreapp.models_analytics import UserAnalytics
-            from coreapp.models import ContentGen
-
-            # Time windows
-            last_7_days = timezone.now().date() - timedelta(days=7)
-            last_30_days = timezone.now().date() - timedelta(days=30)
-
-            # Get activity data
-            recent_analytics = UserAnalytics.objects.filter(
-                user=user,
-                date__gte=last_7_days
-            ).aggregate(
-                total_sessions=Sum('sessions'),
-                total_generations=Sum('ai_text_generations'),
-                total_tokens=Sum('ai_tokens_used'),
-                avg_session_duration=Avg('avg_session_duration')
-            )
-
-            monthly_analytics = UserAnalytics.objects.filter(
-                user=user,
-                date__gte=last_30_days
-            ).aggregate(
-                total_sessions=Sum('sessions'),
-                active_days=Count('date', distinct=True)
-            )
-
-            # Content activity
-            content_count = ContentGen.objects.filter(
-                user=user,
-                created_at__date__gte=last_30_days,
-                is_delete=False
-            ).count()
-
-            # Calculate factor scores (0-100 scale)
-            factors = {}
-
-            # Recency factor - days since last activity
-            last_activity = UserAnalytics.objects.filter(user=user).order_by('-date').first()
-            if last_activity:
-                days_since_active = (timezone.now().date() - last_activity.date).days
-                factors['recency'] = max(0, 100 - (days_since_active * 10))
-            else:
-                factors['recency'] = 0
-
-            # Frequency factor - sessions in last 7 days
-            sessions = recent_analytics.get('total_sessions') or 0
-            factors['frequency'] = min(100, sessions * 15)
-
-            # Activity depth - generations per session
-            generations = recent_analytics.get('total_generations') or 0
-            if sessions > 0:
-                factors['depth'] = min(100, (generations / sessions) * 20)
-            else:
-                factors['depth'] = 0
-
-            # Consistency - active days in last 30 days
-            active_days = monthly_analytics.get('active_days') or 0
-            factors['consistency'] = min(100, (active_days / 30) * 100)
-
-            # Content creation
-            factors['content'] = min(100, content_count * 10)
-
-            # Calculate weighted score
-            weights = {
-                'recency': 0.30,
-                'frequency': 0.25,
-                'depth': 0.20,
-                'consistency': 0.15,
-                'content': 0.10,
-            }
-
-            score = sum(factors[k] * weights[k] for k in factors)
-
-            # Determine engagement level
-            if score >= 70:
-                level = 'high'
-            elif score >= 40:
-                level = 'medium'
-            elif score >= 20:
-                level = 'low'
-            else:
-                level = 'at_risk'
-
-            return UserEngagementScore(
-                user_id=user.id,
-                score=round(score, 2),
-                level=level,
-                factors=factors
-            )
+            scores = self.calculate_engagement_scores(user_ids=[user.id])
+            return scores[0]
 
         except Exception as e:
             logger.error(f"Error calculating engagement score: {e}")
@@ -466,6 +379,132 @@ class RetentionCalculator:
                 factors={}
             )
 
+    def calculate_engagement_scores(
+        self,
+        start_id: int = None,
+        end_id: int = None,
+        user_ids: List[int] = None
+    ) -> List[UserEngagementScore]:
+        """
+        Score every active user in an id range (or list) with two queries.
+
+        Activity is aggregated per user in one grouped query over the last
+        30 days of UserAnalytics; users with no rows score from zeros.
+
+        Args:
+            start_id: First user id of the range (inclusive)
+            end_id: Last user id of the range (exclusive)
+            user_ids: Explicit users to score instead of a range
+
+        Returns:
+            UserEngagementScore per user, ordered by user id
+        """
+        from django.contrib.auth import get_user_model
+        from django.db.models import Max
+        from coreapp.models_analytics import UserAnalytics
+
+        User = get_user_model()
+
+        today = timezone.now().date()
+        last_7_days = today - timedelta(days=7)
+        last_30_days = today - timedelta(days=30)
+
+        users = User.objects.filter(is_active=True)
+        if user_ids is not None:
+            users = User.objects.filter(id__in=user_ids)
+        else:
+            users = users.filter(id__gte=start_id, id__lt=end_id)
+        ids = list(users.order_by('id').values_list('id', flat=True))
+
+        activity = {
+            row['user_id']: row
+            for row in UserAnalytics.objects.filter(
+                user_id__in=ids
+            ).values('user_id').annotate(
+                sessions=Sum('sessions_count', filter=Q(date__gte=last_7_days)),
+                generations=Sum('ai_text_generations', filter=Q(date__gte=last_7_days)),
+                active_days=Count('date', filter=Q(date__gte=last_30_days), distinct=True),
+                notes=Sum('notes_created', filter=Q(date__gte=last_30_days)),
+                last_active=Max('date'),
+            )
+        }
+
+        scores = []
+        for user_id in ids:
+            row = activity.get(user_id, {})
+            last_active = row.get('last_active')
+            scores.append(self._engagement_score(
+                user_id,
+                days_since_active=(today - last_active).days if last_active else None,
+                sessions=row.get('sessions') or 0,
+                generations=row.get('generations') or 0,
+                active_days=row.get('active_days') or 0,
+                content_count=row.get('notes') or 0,
+            ))
+        return scores
+
+    def _engagement_score(
+        self,
+        user_id: int,
+        days_since_active: Optional[int],
+        sessions: int,
+        generations: int,
+        active_days: int,
+        content_count: int
+    ) -> UserEngagementScore:
+        """Weighted engagement score from a user's activity figures."""
+        # Calculate factor scores (0-100 scale)
+        factors = {}
+
+        # Recency factor - days since last activity
+        if days_since_active is not None:
+            factors['recency'] = max(0, 100 - (days_since_active * 10))
+        else:
+            factors['recency'] = 0
+
+        # Frequency factor - sessions in last 7 days
+        factors['frequency'] = min(100, sessions * 15)
+
+        # Activity depth - generations per session
+        if sessions > 0:
+            factors['depth'] = min(100, (generations / sessions) * 20)
+        else:
+            factors['depth'] = 0
+
+        # Consistency - active days in last 30 days
+        factors['consistency'] = min(100, (active_days / 30) * 100)
+
+        # Content creation
+        factors['content'] = min(100, content_count * 10)
+
+        # Calculate weighted score
+        weights = {
+            'recency': 0.30,
+            'frequency': 0.25,
+            'depth': 0.20,
+            'consistency': 0.15,
+            'content': 0.10,
+        }
+
+        score = sum(factors[k] * weights[k] for k in factors)
+
+        # Determine engagement level
+        if score >= 70:
+            level = 'high'
+        elif score >= 40:
+            level = 'medium'
+        elif score >= 20:
+            level = 'low'
+        else:
+            level = 'at_risk'
+
+        return UserEngagementScore(
+            user_id=user_id,
+            score=round(score, 2),
+            level=level,
+            factors=factors
+        )
+
     # -------------------------------------------------------------------------
     # Churn Prediction
     # -------------------------------------------------------------------------
@@ -8,21 +8,34 @@ This module provides:
 - Timezone-aware scheduling
 - Webhook/notification on completion
 
+Schedules are GenerationSchedule rows. A due schedule is leased to one
+scheduler node with a conditional UPDATE and its run is handed to a Celery
+worker, so any number of nodes can dispatch without running a job twice;
+a run whose worker dies is picked up again once the lease expires.
+
 WBS Item: 6.1.5 - Scheduled generations
 """
 
+import heapq
 import logging
+import os
+import socket
 import uuid
-from datetime import datetime, timedelta
-from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone as dt_timezone
+from dataclasses import asdict, dataclass, field
 from enum import Enum
-from typing import Optional, List, Dict, Any, Callable
-from threading import Thread, Event
+from functools import cached_property
+from typing import Optional, List, Dict, Any, Tuple
+from threading import Lock, Thread, Event
 import time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from django.conf import settings
 from django.core.cache import cache
-from django.utils import timezone
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone as dj_timezone
+from django.utils.dateparse import parse_datetime
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +75,124 @@ class DayOfWeek(Enum):
     SUNDAY = 6
 
 
+# Field name, lowest and highest value, in cron order
+CRON_FIELDS = (
+    ('minute', 0, 59),
+    ('hour', 0, 23),
+    ('day_of_month', 1, 31),
+    ('month', 1, 12),
+    ('day_of_week', 0, 6),
+)
+
+# How far ahead next_run looks before deciding a schedule never fires
+# (long enough to reach a Feb 29 that also has to fall on a given weekday)
+MAX_LOOKAHEAD_YEARS = 28
+
+
+def _parse_field(pattern: str, min_val: int, max_val: int) -> int:
+    """Bitset (bit N set = value N allowed) for one cron field."""
+    mask = 0
+    for part in pattern.split(','):
+        part = part.strip()
+        try:
+            step = 1
+            if '/' in part:
+                part, step_str = part.split('/', 1)
+                step = int(step_str)
+            if part == '*':
+                start, end = min_val, max_val
+            elif '-' in part:
+                start_str, end_str = part.split('-', 1)
+                start, end = int(start_str), int(end_str)
+            else:
+                start = int(part)
+                end = max_val if step > 1 else start
+        except ValueError:
+            raise ValueError(f"Invalid cron field: {pattern}")
+
+        if step < 1 or not min_val <= start <= end <= max_val:
+            raise ValueError(f"Invalid cron field: {pattern} (allowed {min_val}-{max_val})")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    return mask
+
+
+def _next_bit(mask: int, value: int) -> Optional[int]:
+    """Smallest set bit >= value, or None."""
+    rest = mask >> value
+    if not rest:
+        return None
+    return value + (rest & -rest).bit_length() - 1
+
+
+class CompiledCron:
+    """
+    A cron expression reduced to one bitset per field.
+
+    next_fire jumps field by field (month, then day, hour, minute) instead of
+    testing every minute, so finding the next run is a handful of steps even
+    for schedules that fire once a year.
+    """
+
+    __slots__ = ('minutes', 'hours', 'days', 'months', 'weekdays')
+
+    def __init__(self, minutes: int, hours: int, days: int, months: int, weekdays: int):
+        self.minutes = minutes
+        self.hours = hours
+        self.days = days
+        self.months = months
+        self.weekdays = weekdays
+
+    @classmethod
+    def compile(cls, schedule: 'CronSchedule') -> 'CompiledCron':
+        return cls(*(
+            _parse_field(getattr(schedule, name), min_val, max_val)
+            for name, min_val, max_val in CRON_FIELDS
+        ))
+
+    def matches(self, dt: datetime) -> bool:
+        return bool(
+            self.minutes >> dt.minute & 1
+            and self.hours >> dt.hour & 1
+            and self.days >> dt.day & 1
+            and self.months >> dt.month & 1
+            and self.weekdays >> dt.weekday() & 1
+        )
+
+    def next_fire(self, after: datetime) -> datetime:
+        """First matching minute strictly after ``after`` (same tzinfo as ``after``)."""
+        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        last_year = dt.year + MAX_LOOKAHEAD_YEARS
+
+        while dt.year <= last_year:
+            if not self.months >> dt.month & 1:
+                month = _next_bit(self.months, dt.month + 1)
+                if month is None:
+                    dt = dt.replace(year=dt.year + 1, month=_next_bit(self.months, 1), day=1, hour=0, minute=0)
+                else:
+                    dt = dt.replace(month=month, day=1, hour=0, minute=0)
+                continue
+
+            if not (self.days >> dt.day & 1 and self.weekdays >> dt.weekday() & 1):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+
+            hour = _next_bit(self.hours, dt.hour)
+            if hour is None:
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+                continue
+            if hour != dt.hour:
+                dt = dt.replace(hour=hour, minute=0)
+
+            minute = _next_bit(self.minutes, dt.minute)
+            if minute is None:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+                continue
+            return dt.replace(minute=minute)
+
+        raise ValueError(f"Could not find next run time within {MAX_LOOKAHEAD_YEARS} years")
+
+
 @dataclass
 class CronSchedule:
     """Cron-like schedule specification."""
@@ -71,68 +202,19 @@ class CronSchedule:
     month: str = '*'  # 1-12 or *
     day_of_week: str = '*'  # 0-6 (Mon-Sun) or *
 
+    @cached_property
+    def compiled(self) -> CompiledCron:
+        return CompiledCron.compile(self)
+
     def matches(self, dt: datetime) -> bool:
         """Check if datetime matches this schedule."""
-        if not self._matches_field(self.minute, dt.minute, 0, 59):
-            return False
-        if not self._matches_field(self.hour, dt.hour, 0, 23):
-            return False
-        if not self._matches_field(self.day_of_month, dt.day, 1, 31):
-            return False
-        if not self._matches_field(self.month, dt.month, 1, 12):
-            return False
-        if not self._matches_field(self.day_of_week, dt.weekday(), 0, 6):
-            return False
-        return True
-
-    def _matches_field(self, pattern: str, value: int, min_val: int, max_val: int) -> bool:
-        """Check if value matches cron pattern."""
-        if pattern == '*':
-            return True
-
-        # Handle comma-separated values
-        if ',' in pattern:
-            values = [int(v.strip()) for v in pattern.split(',')]
-            return value in values
-
-        # Handle range
-        if '-' in pattern:
-            parts = pattern.split('-')
-            start, end = int(parts[0]), int(parts[1])
-            return start <= value <= end
-
-        # Handle step
-        if '/' in pattern:
-            parts = pattern.split('/')
-            if parts[0] == '*':
-                step = int(parts[1])
-                return (value - min_val) % step == 0
-            else:
-                start = int(parts[0])
-                step = int(parts[1])
-                return value >= start and (value - start) % step == 0
-
-        # Single value
-        try:
-            return int(pattern) == value
-        except ValueError:
-            return False
+        return self.compiled.matches(dt)
 
     def next_run(self, after: datetime = None) -> datetime:
         """Calculate next run time after given datetime."""
         if after is None:
-            after = timezone.now()
-
-        # Start from next minute
-        dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
-
-        # Find next matching time (max 366 days ahead)
-        for _ in range(366 * 24 * 60):
-            if self.matches(dt):
-                return dt
-            dt += timedelta(minutes=1)
-
-        raise ValueError("Could not find next run time within a year")
+            after = dj_timezone.now()
+        return self.compiled.next_fire(after)
 
     def to_string(self) -> str:
         """Convert to cron string."""
@@ -145,13 +227,22 @@ class CronSchedule:
         if len(parts) != 5:
             raise ValueError(f"Invalid cron format: {cron_str}")
 
-        return cls(
+        schedule = cls(
             minute=parts[0],
             hour=parts[1],
             day_of_month=parts[2],
             month=parts[3],
             day_of_week=parts[4],
         )
+        schedule.compiled  # Validate now rather than on first use
+        return schedule
+
+
+def _zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
 
 
 # =============================================================================
@@ -181,9 +272,25 @@ class ExecutionResult:
     cost: float = 0.0
     latency_ms: float = 0.0
     error: Optional[str] = None
-    executed_at: datetime = field(default_factory=datetime.now)
+    executed_at: datetime = field(default_factory=dj_timezone.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ExecutionResult':
+        """Rebuild a result stored with to_dict()."""
+        return cls(
+            execution_id=data['execution_id'],
+            schedule_id=data['schedule_id'],
+            status=data['status'],
+            output=data.get('output'),
+            input_tokens=data.get('input_tokens', 0),
+            output_tokens=data.get('output_tokens', 0),
+            cost=data.get('cost', 0.0),
+            latency_ms=data.get('latency_ms', 0.0),
+            error=data.get('error'),
+            executed_at=parse_datetime(data['executed_at']) if data.get('executed_at') else dj_timezone.now(),
+        )
+
     def to_dict(self) -> Dict[str, Any]:
         return {
             'execution_id': self.execution_id,
@@ -219,13 +326,18 @@ class ScheduledGeneration:
     last_result: Optional[ExecutionResult] = None
     webhook_url: Optional[str] = None
     notify_on_completion: bool = True
-    created_at: datetime = field(default_factory=datetime.now)
-    updated_at: datetime = field(default_factory=datetime.now)
+    created_at: datetime = field(default_factory=dj_timezone.now)
+    updated_at: datetime = field(default_factory=dj_timezone.now)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
     def __post_init__(self):
-        if self.next_execution is None:
-            self.next_execution = self.schedule.next_run()
+        if self.next_execution is None and self.status == ScheduleStatus.ACTIVE:
+            self.next_execution = self.next_fire()
+
+    def next_fire(self, after: Optional[datetime] = None) -> datetime:
+        """Next run after ``after`` (default now), evaluated in the schedule's timezone, returned in UTC."""
+        local = (after or dj_timezone.now()).astimezone(_zone(self.timezone))
+        return self.schedule.next_run(local).astimezone(dt_timezone.utc)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -270,11 +382,12 @@ class ScheduleManager:
     """
     Manager for scheduled generation jobs.
 
-    Handles CRUD operations and schedule validation.
+    Handles CRUD operations and schedule validation. Schedules live in
+    GenerationSchedule rows, so every node sees the same set.
     """
 
-    def __init__(self):
-        self._schedules: Dict[str, ScheduledGeneration] = {}
+    CONFIG_FIELDS = ('name', 'description', 'cron', 'generation_config', 'next_run_at',
+                     'webhook_url', 'max_executions', 'expires_at')
 
     def create(
         self,
@@ -296,10 +409,13 @@ class ScheduleManager:
         notify_on_completion: bool = True,
     ) -> ScheduledGeneration:
         """Create a new scheduled generation."""
+        from coreapp.models import GenerationSchedule
+
         schedule_id = str(uuid.uuid4())
 
-        # Parse cron schedule
+        # Parse cron schedule and timezone
         cron_schedule = CronSchedule.from_string(schedule)
+        _zone(timezone_str)
 
         generation_config = GenerationConfig(
             prompt_template=prompt_template,
@@ -325,10 +441,7 @@ class ScheduleManager:
             notify_on_completion=notify_on_completion,
         )
 
-        self._schedules[schedule_id] = scheduled_gen
-
-        # Cache schedule
-        self._cache_schedule(scheduled_gen)
+        GenerationSchedule.objects.create(**self._to_row(scheduled_gen))
 
         logger.info(f"Created scheduled generation {schedule_id}")
 
@@ -336,16 +449,10 @@ class ScheduleManager:
 
     def get(self, schedule_id: str) -> Optional[ScheduledGeneration]:
         """Get schedule by ID."""
-        if schedule_id in self._schedules:
-            return self._schedules[schedule_id]
-
-        # Check cache
-        cached = cache.get(f"schedule:{schedule_id}")
-        if cached:
-            self._schedules[schedule_id] = cached
-            return cached
+        from coreapp.models import GenerationSchedule
 
-        return None
+        row = GenerationSchedule.objects.filter(schedule_id=schedule_id).first()
+        return self._from_row(row) if row else None
 
     def list(
         self,
@@ -354,18 +461,20 @@ class ScheduleManager:
         limit: int = 50,
     ) -> List[ScheduledGeneration]:
         """List schedules with optional filters."""
-        schedules = list(self._schedules.values())
+        from coreapp.models import GenerationSchedule
+
+        rows = GenerationSchedule.objects.all()
 
         if user_id:
-            schedules = [s for s in schedules if s.user_id == user_id]
+            rows = rows.filter(user_id=user_id)
 
         if status:
-            schedules = [s for s in schedules if s.status == status]
+            rows = rows.filter(status=status.value)
 
         # Sort by next execution
-        schedules.sort(key=lambda s: s.next_execution or datetime.max)
+        rows = rows.order_by(F('next_run_at').asc(nulls_last=True))
 
-        return schedules[:limit]
+        return [self._from_row(row) for row in rows[:limit]]
 
     def update(
         self,
@@ -384,7 +493,8 @@ class ScheduleManager:
             schedule.description = kwargs['description']
         if 'schedule' in kwargs:
             schedule.schedule = CronSchedule.from_string(kwargs['schedule'])
-            schedule.next_execution = schedule.schedule.next_run()
+            if schedule.status == ScheduleStatus.ACTIVE:
+                schedule.next_execution = schedule.next_fire()
         if 'prompt_template' in kwargs:
             schedule.generation_config.prompt_template = kwargs['prompt_template']
         if 'model' in kwargs:
@@ -402,67 +512,211 @@ class ScheduleManager:
         if 'expires_at' in kwargs:
             schedule.expires_at = kwargs['expires_at']
 
-        schedule.updated_at = datetime.now()
+        schedule.updated_at = dj_timezone.now()
 
-        self._cache_schedule(schedule)
+        # Only configuration is written; run counters belong to the workers
+        row = self._to_row(schedule)
+        self._rows(schedule_id).update(
+            updated_at=schedule.updated_at,
+            **{name: row[name] for name in self.CONFIG_FIELDS}
+        )
 
         return schedule
 
     def pause(self, schedule_id: str) -> bool:
         """Pause a schedule."""
-        schedule = self.get(schedule_id)
-        if not schedule:
-            return False
-
-        if schedule.status == ScheduleStatus.ACTIVE:
-            schedule.status = ScheduleStatus.PAUSED
-            schedule.updated_at = datetime.now()
-            self._cache_schedule(schedule)
-            return True
-
-        return False
+        return bool(
+            self._rows(schedule_id, status=ScheduleStatus.ACTIVE).update(
+                status=ScheduleStatus.PAUSED.value, updated_at=dj_timezone.now()
+            )
+        )
 
     def resume(self, schedule_id: str) -> bool:
         """Resume a paused schedule."""
         schedule = self.get(schedule_id)
-        if not schedule:
+        if not schedule or schedule.status != ScheduleStatus.PAUSED:
             return False
 
-        if schedule.status == ScheduleStatus.PAUSED:
-            schedule.status = ScheduleStatus.ACTIVE
-            schedule.next_execution = schedule.schedule.next_run()
-            schedule.updated_at = datetime.now()
-            self._cache_schedule(schedule)
-            return True
-
-        return False
+        return bool(
+            self._rows(schedule_id, status=ScheduleStatus.PAUSED).update(
+                status=ScheduleStatus.ACTIVE.value,
+                next_run_at=schedule.next_fire(),
+                lease_owner=None,
+                lease_expires_at=None,
+                updated_at=dj_timezone.now(),
+            )
+        )
 
     def cancel(self, schedule_id: str) -> bool:
         """Cancel a schedule."""
-        schedule = self.get(schedule_id)
-        if not schedule:
-            return False
-
-        schedule.status = ScheduleStatus.CANCELLED
-        schedule.next_execution = None
-        schedule.updated_at = datetime.now()
-        self._cache_schedule(schedule)
-
-        logger.info(f"Cancelled schedule {schedule_id}")
-        return True
+        cancelled = self._rows(schedule_id).update(
+            status=ScheduleStatus.CANCELLED.value, next_run_at=None, updated_at=dj_timezone.now()
+        )
+        if cancelled:
+            logger.info(f"Cancelled schedule {schedule_id}")
+        return bool(cancelled)
 
     def delete(self, schedule_id: str) -> bool:
         """Delete a schedule."""
-        if schedule_id in self._schedules:
-            del self._schedules[schedule_id]
-            cache.delete(f"schedule:{schedule_id}")
-            cache.delete(f"schedule_history:{schedule_id}")
-            return True
-        return False
+        deleted, _ = self._rows(schedule_id).delete()
+        cache.delete(f"schedule_history:{schedule_id}")
+        return bool(deleted)
+
+    # -------------------------------------------------------------------------
+    # Leases
+    # -------------------------------------------------------------------------
 
-    def _cache_schedule(self, schedule: ScheduledGeneration):
-        """Cache schedule state."""
-        cache.set(f"schedule:{schedule.schedule_id}", schedule, timeout=86400)
+    def claim_due(
+        self,
+        owner: str,
+        lease_seconds: int,
+        now: Optional[datetime] = None,
+        limit: int = 100,
+        schedule_ids: Optional[List[str]] = None,
+    ) -> Tuple[str, List[ScheduledGeneration]]:
+        """
+        Lease due schedules to ``owner``.
+
+        A schedule is due when it is active, its next_run_at has passed and no
+        live lease is held on it. The lease is taken with one conditional
+        UPDATE, so when several nodes race for the same rows each row goes to
+        exactly one of them.
+
+        Returns:
+            (lease token, schedules won by this call)
+        """
+        from coreapp.models import GenerationSchedule
+
+        now = now or dj_timezone.now()
+        token = f"{owner[:80]}:{uuid.uuid4().hex[:12]}"
+
+        due = self._due(now)
+        if schedule_ids is not None:
+            due = due.filter(schedule_id__in=schedule_ids)
+        ids = list(due.order_by('next_run_at').values_list('id', flat=True)[:limit])
+        if not ids:
+            return token, []
+
+        self._due(now).filter(id__in=ids).update(
+            lease_owner=token,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+        )
+        return token, [self._from_row(row) for row in GenerationSchedule.objects.filter(lease_owner=token)]
+
+    def renew(self, schedule_id: str, lease_token: str, lease_seconds: int, now: Optional[datetime] = None) -> bool:
+        """
+        Extend a live lease before running the schedule.
+
+        One conditional UPDATE: returns False when ``lease_token`` no longer
+        holds the schedule or its lease has already expired, in which case
+        another node may be running it.
+        """
+        now = now or dj_timezone.now()
+        return bool(
+            self._rows(schedule_id)
+            .filter(lease_owner=lease_token, lease_expires_at__gt=now)
+            .update(lease_expires_at=now + timedelta(seconds=lease_seconds))
+        )
+
+    def release(self, schedule_id: str, lease_token: str):
+        """Drop a lease without recording a run."""
+        self._rows(schedule_id).filter(lease_owner=lease_token).update(lease_owner=None, lease_expires_at=None)
+
+    def record_execution(
+        self,
+        schedule: ScheduledGeneration,
+        result: ExecutionResult,
+        lease_token: Optional[str] = None,
+    ) -> bool:
+        """
+        Store a run's outcome and the next fire time, and release the lease.
+
+        Returns False when ``lease_token`` no longer holds the schedule (the
+        lease expired and another node took it over).
+        """
+        rows = self._rows(schedule.schedule_id)
+        if lease_token:
+            rows = rows.filter(lease_owner=lease_token)
+
+        changes = {
+            'execution_count': F('execution_count') + 1,
+            'last_execution': schedule.last_execution,
+            'last_result': result.to_dict(),
+            'next_run_at': schedule.next_execution,
+            'lease_owner': None,
+            'lease_expires_at': None,
+            'updated_at': dj_timezone.now(),
+        }
+        # Leave a pause or cancel made while the run was in flight alone
+        if schedule.status == ScheduleStatus.COMPLETED:
+            changes['status'] = schedule.status.value
+
+        return bool(rows.update(**changes))
+
+    # -------------------------------------------------------------------------
+    # Rows
+    # -------------------------------------------------------------------------
+
+    def _rows(self, schedule_id: str, status: Optional[ScheduleStatus] = None):
+        from coreapp.models import GenerationSchedule
+
+        rows = GenerationSchedule.objects.filter(schedule_id=schedule_id)
+        if status:
+            rows = rows.filter(status=status.value)
+        return rows
+
+    def _due(self, now: datetime):
+        from coreapp.models import GenerationSchedule
+
+        return GenerationSchedule.objects.filter(
+            status=ScheduleStatus.ACTIVE.value, next_run_at__lte=now,
+        ).filter(Q(lease_expires_at__isnull=True) | Q(lease_expires_at__lte=now))
+
+    def _to_row(self, schedule: ScheduledGeneration) -> Dict[str, Any]:
+        return {
+            'schedule_id': schedule.schedule_id,
+            'user_id': schedule.user_id,
+            'name': schedule.name,
+            'description': schedule.description,
+            'cron': schedule.schedule.to_string(),
+            'timezone': schedule.timezone,
+            'repeat_interval': schedule.repeat_interval.value,
+            'status': schedule.status.value,
+            'generation_config': asdict(schedule.generation_config),
+            'max_executions': schedule.max_executions,
+            'expires_at': schedule.expires_at,
+            'execution_count': schedule.execution_count,
+            'last_execution': schedule.last_execution,
+            'last_result': schedule.last_result.to_dict() if schedule.last_result else None,
+            'next_run_at': schedule.next_execution,
+            'webhook_url': schedule.webhook_url,
+            'notify_on_completion': schedule.notify_on_completion,
+            'metadata': schedule.metadata,
+        }
+
+    def _from_row(self, row) -> ScheduledGeneration:
+        return ScheduledGeneration(
+            schedule_id=row.schedule_id,
+            user_id=row.user_id,
+            name=row.name,
+            description=row.description,
+            generation_config=GenerationConfig(**row.generation_config),
+            schedule=CronSchedule.from_string(row.cron),
+            repeat_interval=RepeatInterval(row.repeat_interval),
+            status=ScheduleStatus(row.status),
+            timezone=row.timezone,
+            max_executions=row.max_executions,
+            expires_at=row.expires_at,
+            execution_count=row.execution_count,
+            last_execution=row.last_execution,
+            next_execution=row.next_run_at,
+            last_result=ExecutionResult.from_dict(row.last_result) if row.last_result else None,
+            webhook_url=row.webhook_url,
+            notify_on_completion=row.notify_on_completion,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            metadata=row.metadata,
+        )
 
 
 # =============================================================================
@@ -473,6 +727,11 @@ class ScheduledGenerationService:
     """
     Service for executing scheduled generations.
 
+    Due schedules are dispatched either by the dispatch_due_scheduled_generations
+    beat task or by start(), which keeps a min-heap of upcoming fire times and
+    sleeps until the earliest one. Either way each run is leased and sent to
+    the execute_scheduled_generation Celery task.
+
     Usage:
         service = ScheduledGenerationService()
         schedule = service.create_schedule(
@@ -484,11 +743,21 @@ class ScheduledGenerationService:
         service.start()
     """
 
-    def __init__(self):
+    HISTORY_SIZE = 100
+
+    def __init__(self, lease_seconds: int = None, refresh_interval: float = None):
         self.manager = ScheduleManager()
+        self.lease_seconds = lease_seconds or getattr(settings, 'SCHEDULED_GENERATION_LEASE', 600)
+        self.refresh_interval = refresh_interval or getattr(settings, 'SCHEDULED_GENERATION_REFRESH', 30.0)
         self._executor_thread: Optional[Thread] = None
         self._stop_event = Event()
-        self._execution_history: Dict[str, List[ExecutionResult]] = {}
+        self._wakeup = Event()
+        self._heap: List[Tuple[datetime, str]] = []  # (next_run_at, schedule_id)
+        self._heap_lock = Lock()
+
+    @property
+    def node_id(self) -> str:
+        return f"{socket.gethostname()}:{os.getpid()}"
 
     # -------------------------------------------------------------------------
     # Schedule Management (delegated to manager)
@@ -496,7 +765,9 @@ class ScheduledGenerationService:
 
     def create_schedule(self, **kwargs) -> ScheduledGeneration:
         """Create a new scheduled generation."""
-        return self.manager.create(**kwargs)
+        schedule = self.manager.create(**kwargs)
+        self._push(schedule)
+        return schedule
 
     def get_schedule(self, schedule_id: str) -> Optional[ScheduledGeneration]:
         """Get schedule by ID."""
@@ -515,6 +786,8 @@ class ScheduledGenerationService:
     def update_schedule(self, schedule_id: str, **kwargs) -> Optional[Dict[str, Any]]:
         """Update a schedule."""
         schedule = self.manager.update(schedule_id, **kwargs)
+        if schedule:
+            self._push(schedule)
         return schedule.to_dict() if schedule else None
 
     def pause_schedule(self, schedule_id: str) -> bool:
@@ -523,7 +796,10 @@ class ScheduledGenerationService:
 
     def resume_schedule(self, schedule_id: str) -> bool:
         """Resume a schedule."""
-        return self.manager.resume(schedule_id)
+        resumed = self.manager.resume(schedule_id)
+        if resumed and self._running():
+            self._push(self.manager.get(schedule_id))
+        return resumed
 
     def cancel_schedule(self, schedule_id: str) -> bool:
         """Cancel a schedule."""
@@ -533,6 +809,53 @@ class ScheduledGenerationService:
         """Delete a schedule."""
         return self.manager.delete(schedule_id)
 
+    # -------------------------------------------------------------------------
+    # Dispatch
+    # -------------------------------------------------------------------------
+
+    def dispatch_due(
+        self,
+        now: Optional[datetime] = None,
+        schedule_ids: Optional[List[str]] = None,
+        limit: int = 500,
+    ) -> int:
+        """Lease due schedules to this node and queue one Celery run per schedule."""
+        from coreapp.tasks.schedule_tasks import execute_scheduled_generation
+
+        token, schedules = self.manager.claim_due(
+            self.node_id, self.lease_seconds, now=now, limit=limit, schedule_ids=schedule_ids,
+        )
+        for schedule in schedules:
+            try:
+                execute_scheduled_generation.delay(schedule.schedule_id, token)
+            except Exception as e:
+                # The lease runs out and the next pass dispatches it again
+                logger.error(f"Failed to dispatch schedule {schedule.schedule_id}: {e}")
+
+        return len(schedules)
+
+    def run_claimed(self, schedule_id: str, lease_token: str) -> Optional[ExecutionResult]:
+        """
+        Worker entry point: run a schedule this lease was granted for.
+
+        Returns None without running when the lease was lost while the task
+        waited in the queue.
+        """
+        if not self.manager.renew(schedule_id, lease_token, self.lease_seconds):
+            logger.warning(f"Lease on schedule {schedule_id} was lost before it ran; skipping")
+            return None
+
+        schedule = self.manager.get(schedule_id)
+        if not schedule:
+            return None
+
+        if schedule.status != ScheduleStatus.ACTIVE:
+            self.manager.release(schedule_id, lease_token)
+            return None
+
+        logger.info(f"Executing schedule {schedule_id}")
+        return self._execute_schedule(schedule, lease_token)
+
     # -------------------------------------------------------------------------
     # Execution
     # -------------------------------------------------------------------------
@@ -545,45 +868,54 @@ class ScheduledGenerationService:
 
         return self._execute_schedule(schedule)
 
-    def _execute_schedule(self, schedule: ScheduledGeneration) -> ExecutionResult:
-        """Execute a scheduled generation."""
-        execution_id = str(uuid.uuid4())
-        start_time = time.time()
+    def _generate(self, schedule: ScheduledGeneration) -> Tuple[str, Dict[str, Any]]:
+        """Render the prompt and call the LLM; returns (prompt, response)."""
+        from coreapp.services.llm_service import llm_service
+        from coreapp.services.prompt_chaining import TemplateEngine
+
+        # Render prompt with variables
+        engine = TemplateEngine()
+        variables = {
+            **schedule.generation_config.variables,
+            'date': dj_timezone.now().strftime('%Y-%m-%d'),
+            'time': dj_timezone.now().strftime('%H:%M:%S'),
+            'datetime': dj_timezone.now().isoformat(),
+            'execution_count': schedule.execution_count + 1,
+        }
 
-        try:
-            from coreapp.services.llm_service import llm_service
-            from coreapp.services.prompt_chaining import TemplateEngine
-
-            # Render prompt with variables
-            engine = TemplateEngine()
-            variables = {
-                **schedule.generation_config.variables,
-                'date': timezone.now().strftime('%Y-%m-%d'),
-                'time': timezone.now().strftime('%H:%M:%S'),
-                'datetime': timezone.now().isoformat(),
-                'execution_count': schedule.execution_count + 1,
-            }
+        prompt = engine.render(
+            schedule.generation_config.prompt_template,
+            variables
+        )
 
-            prompt = engine.render(
-                schedule.generation_config.prompt_template,
+        system_prompt = None
+        if schedule.generation_config.system_prompt:
+            system_prompt = engine.render(
+                schedule.generation_config.system_prompt,
                 variables
             )
 
-            system_prompt = None
-            if schedule.generation_config.system_prompt:
-                system_prompt = engine.render(
-                    schedule.generation_config.system_prompt,
-                    variables
-                )
+        # Call LLM
+        response = llm_service.generate(
+            prompt=prompt,
+            model=schedule.generation_config.model,
+            max_tokens=schedule.generation_config.max_tokens,
+            temperature=schedule.generation_config.temperature,
+            system_prompt=system_prompt,
+        )
+        return prompt, response
 
-            # Call LLM
-            response = llm_service.generate(
-                prompt=prompt,
-                model=schedule.generation_config.model,
-                max_tokens=schedule.generation_config.max_tokens,
-                temperature=schedule.generation_config.temperature,
-                system_prompt=system_prompt,
-            )
+    def _execute_schedule(
+        self,
+        schedule: ScheduledGeneration,
+        lease_token: Optional[str] = None,
+    ) -> ExecutionResult:
+        """Execute a scheduled generation."""
+        execution_id = str(uuid.uuid4())
+        start_time = time.time()
+
+        try:
+            prompt, response = self._generate(schedule)
 
             latency_ms = (time.time() - start_time) * 1000
 
@@ -617,7 +949,7 @@ class ScheduledGenerationService:
 
         # Update schedule
         schedule.execution_count += 1
-        schedule.last_execution = datetime.now()
+        schedule.last_execution = dj_timezone.now()
         schedule.last_result = result
 
         # Check if schedule should complete
@@ -626,7 +958,10 @@ class ScheduledGenerationService:
             schedule.next_execution = None
         else:
             # Calculate next execution
-            schedule.next_execution = schedule.schedule.next_run(datetime.now())
+            schedule.next_execution = schedule.next_fire(schedule.last_execution)
+
+        if not self.manager.record_execution(schedule, result, lease_token):
+            logger.warning(f"Lease on schedule {schedule.schedule_id} was lost before the run was recorded")
 
         # Store history
         self._store_execution_result(result)
@@ -638,9 +973,6 @@ class ScheduledGenerationService:
         if schedule.webhook_url:
             self._call_webhook(schedule, result)
 
-        # Cache updates
-        self.manager._cache_schedule(schedule)
-
         return result
 
     def _should_complete(self, schedule: ScheduledGeneration) -> bool:
@@ -654,7 +986,7 @@ class ScheduledGenerationService:
             return True
 
         # Expired
-        if schedule.expires_at and datetime.now() >= schedule.expires_at:
+        if schedule.expires_at and dj_timezone.now() >= schedule.expires_at:
             return True
 
         return False
@@ -665,75 +997,112 @@ class ScheduledGenerationService:
 
     def start(self):
         """Start the scheduler."""
-        if self._executor_thread and self._executor_thread.is_alive():
+        if self._running():
             logger.warning("Scheduler already running")
             return
 
         self._stop_event.clear()
-        self._executor_thread = Thread(target=self._scheduler_loop, daemon=True)
+        self._executor_thread = Thread(target=self._scheduler_loop, name='generation-scheduler', daemon=True)
         self._executor_thread.start()
         logger.info("Scheduled generation service started")
 
     def stop(self):
         """Stop the scheduler."""
         self._stop_event.set()
+        self._wakeup.set()
         if self._executor_thread:
             self._executor_thread.join(timeout=5)
         logger.info("Scheduled generation service stopped")
 
+    def _running(self) -> bool:
+        return bool(self._executor_thread and self._executor_thread.is_alive())
+
+    def _push(self, schedule: Optional[ScheduledGeneration]):
+        """Put a schedule's next fire time on this node's heap and wake the loop."""
+        if not schedule or not self._running():
+            return
+        if schedule.status != ScheduleStatus.ACTIVE or not schedule.next_execution:
+            return
+        with self._heap_lock:
+            heapq.heappush(self._heap, (schedule.next_execution, schedule.schedule_id))
+        self._wakeup.set()
+
+    def _refresh_heap(self, now: datetime):
+        """
+        Reload fire times due before the next refresh.
+
+        Other nodes create and reschedule rows too; entries that went stale in
+        between are harmless because claim_due re-checks every row.
+        """
+        from coreapp.models import GenerationSchedule
+
+        horizon = now + timedelta(seconds=self.refresh_interval)
+        heap = list(
+            GenerationSchedule.objects.filter(
+                status=ScheduleStatus.ACTIVE.value, next_run_at__lte=horizon,
+            ).values_list('next_run_at', 'schedule_id')
+        )
+        heapq.heapify(heap)
+        with self._heap_lock:
+            self._heap = heap
+
+    def _pop_due(self, now: datetime) -> List[str]:
+        """Pop every heap entry whose fire time has passed."""
+        due = []
+        with self._heap_lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def _seconds_until_next(self, next_refresh: float) -> float:
+        wait = next_refresh - time.monotonic()
+        with self._heap_lock:
+            if self._heap:
+                wait = min(wait, (self._heap[0][0] - dj_timezone.now()).total_seconds())
+        return max(wait, 0)
+
     def _scheduler_loop(self):
-        """Main scheduler loop."""
+        """Main scheduler loop: sleep until the earliest fire time, then dispatch."""
+        next_refresh = 0.0
         while not self._stop_event.is_set():
             try:
-                now = datetime.now()
-
-                # Get all active schedules
-                schedules = self.manager.list(status=ScheduleStatus.ACTIVE)
+                now = dj_timezone.now()
 
-                for schedule in schedules:
-                    # Check if due for execution
-                    if schedule.next_execution and schedule.next_execution <= now:
-                        logger.info(f"Executing schedule {schedule.schedule_id}")
+                if time.monotonic() >= next_refresh:
+                    self._refresh_heap(now)
+                    next_refresh = time.monotonic() + self.refresh_interval
 
-                        try:
-                            self._execute_schedule(schedule)
-                        except Exception as e:
-                            logger.error(
-                                f"Failed to execute schedule {schedule.schedule_id}: {e}"
-                            )
+                due = self._pop_due(now)
+                if due:
+                    self.dispatch_due(now=now, schedule_ids=list(set(due)))
 
-                # Sleep for a minute before next check
-                for _ in range(60):
-                    if self._stop_event.is_set():
-                        break
-                    time.sleep(1)
+                self._wakeup.wait(self._seconds_until_next(next_refresh))
+                self._wakeup.clear()
 
             except Exception as e:
                 logger.error(f"Scheduler loop error: {e}")
-                time.sleep(10)
+                self._stop_event.wait(10)
+
+            finally:
+                close_old_connections()
 
     # -------------------------------------------------------------------------
     # Execution History
     # -------------------------------------------------------------------------
 
+    def _history(self, schedule_id: str) -> List[ExecutionResult]:
+        return cache.get(f"schedule_history:{schedule_id}") or []
+
     def _store_execution_result(self, result: ExecutionResult):
         """Store execution result in history."""
-        schedule_id = result.schedule_id
-
-        if schedule_id not in self._execution_history:
-            self._execution_history[schedule_id] = []
-
-        self._execution_history[schedule_id].append(result)
+        # Runs happen on any worker, so the shared cache holds the history
+        history = self._history(result.schedule_id)
+        history.append(result)
 
         # Keep only last 100 results
-        if len(self._execution_history[schedule_id]) > 100:
-            self._execution_history[schedule_id] = \
-                self._execution_history[schedule_id][-100:]
-
-        # Cache history
         cache.set(
-            f"schedule_history:{schedule_id}",
-            self._execution_history[schedule_id],
+            f"schedule_history:{result.schedule_id}",
+            history[-self.HISTORY_SIZE:],
             timeout=86400,
         )
 
@@ -743,12 +1112,7 @@ class ScheduledGenerationService:
         limit: int = 50,
     ) -> List[Dict[str, Any]]:
         """Get execution history for a schedule."""
-        # Check memory
-        if schedule_id in self._execution_history:
-            history = self._execution_history[schedule_id]
-        else:
-            # Check cache
-            history = cache.get(f"schedule_history:{schedule_id}") or []
+        history = self._history(schedule_id)
 
         # Sort by executed_at descending
         history.sort(key=lambda r: r.executed_at, reverse=True)
@@ -760,7 +1124,7 @@ class ScheduledGenerationService:
         schedule_id: str,
     ) -> Dict[str, Any]:
         """Get execution statistics for a schedule."""
-        history = self._execution_history.get(schedule_id, [])
+        history = self._history(schedule_id)
 
         if not history:
             return {
@@ -961,50 +1325,9 @@ Article number: {{{{execution_count}}}}""",
         )
 
 
-# =============================================================================
-# Celery Tasks Integration
-# =============================================================================
-
-def register_celery_tasks():
-    """Register Celery tasks for scheduled generations."""
-    try:
-        from celery import shared_task
-
-        @shared_task(name='execute_scheduled_generation')
-        def execute_scheduled_generation_task(schedule_id: str):
-            """Celery task to execute a scheduled generation."""
-            service = scheduled_generation_service
-            result = service.execute_now(schedule_id)
-            return result.to_dict() if result else None
-
-        @shared_task(name='check_due_schedules')
-        def check_due_schedules_task():
-            """Celery task to check and execute due schedules."""
-            service = scheduled_generation_service
-            now = datetime.now()
-
-            schedules = service.manager.list(status=ScheduleStatus.ACTIVE)
-            executed = 0
-
-            for schedule in schedules:
-                if schedule.next_execution and schedule.next_execution <= now:
-                    execute_scheduled_generation_task.delay(schedule.schedule_id)
-                    executed += 1
-
-            return {'executed': executed}
-
-        logger.info("Registered Celery tasks for scheduled generations")
-
-    except ImportError:
-        logger.debug("Celery not available, skipping task registration")
-
-
 # =============================================================================
 # Singleton Instance
 # =============================================================================
 
 scheduled_generation_service = ScheduledGenerationService()
 schedule_templates = ScheduleTemplates()
-
-# Register Celery tasks if available
-register_celery_tasks()
@@ -3,22 +3,26 @@ Semantic Search Service for MultinotesAI.
 
 This module provides:
 - Full-text search
-- Semantic/vector search using embeddings
+- Semantic/vector search using embeddings (see vector_index), written
+  in a Celery task when responses, documents and notebooks are saved
+- Hybrid ranking with reciprocal-rank fusion
+- Ranked library search over responses, documents and notebooks (see text_index)
 - Search result ranking and filtering
 - Search analytics
 """
 
 import logging
 import re
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Hashable, Tuple
 from datetime import datetime, timedelta
 
-from django.db.models import Q, F, Value, Case, When, IntegerField
+from django.db.models import Q, Value
 from django.db.models.functions import Coalesce, Greatest
 from django.contrib.postgres.search import (
     SearchVector, SearchQuery, SearchRank, TrigramSimilarity
 )
 from django.conf import settings
+from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +50,40 @@ class SearchConfig:
     MIN_SIMILARITY = 0.1
     FUZZY_THRESHOLD = 0.3
 
+    # Candidates taken from each ranking before fusion
+    TEXT_CANDIDATES = 100
+    SEMANTIC_CANDIDATES = 200
+
+    # Ranked matches considered by a text-only search
+    MAX_RANKED = 1000
+
+    # Reciprocal-rank fusion constant (score = sum of 1 / (RRF_K + rank))
+    RRF_K = 60
+
     # Cache settings
     CACHE_TIMEOUT = 300  # 5 minutes
     CACHE_PREFIX = 'search:'
 
 
+# =============================================================================
+# Ranking
+# =============================================================================
+
+def reciprocal_rank_fusion(*rankings: List[Hashable], k: int = SearchConfig.RRF_K) -> List[Hashable]:
+    """
+    Merge ranked key lists with reciprocal-rank fusion.
+
+    Each id scores the sum of 1 / (k + rank) over the lists it appears in,
+    so items ranked well by several retrievers come first without having
+    to compare their raw scores.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
 # =============================================================================
 # Search Service
 # =============================================================================
@@ -81,12 +114,12 @@ class SearchService:
         search_type: str = 'hybrid'
     ) -> Dict[str, Any]:
         """
-        Search user's content.
+        Search user's responses, documents and notebooks.
 
         Args:
             user: User performing search
             query: Search query string
-            filters: Optional filters (folder_id, date_range, etc.)
+            filters: Optional filters (content_type, folder_id, date_from, date_to)
             page: Page number
             page_size: Results per page
             search_type: 'text', 'semantic', or 'hybrid'
@@ -94,8 +127,6 @@ class SearchService:
         Returns:
             Search results with pagination info
         """
-        from coreapp.models import ContentGen
-
         # Validate query
         query = self._clean_query(query)
         if len(query) < self.config.MIN_QUERY_LENGTH:
@@ -107,35 +138,34 @@ class SearchService:
             self.config.MAX_RESULTS
         )
 
-        # Build base queryset
-        queryset = ContentGen.objects.filter(
-            user=user,
-            is_delete=False
-        )
+        # Build base querysets, one per content type
+        querysets = self._get_querysets(user, filters)
+        doc_types = list(querysets)
 
-        # Apply filters
-        queryset = self._apply_filters(queryset, filters)
+        offset = (page - 1) * page_size
 
-        # Perform search based on type
-        if search_type == 'text':
-            queryset = self._text_search(queryset, query)
-        elif search_type == 'semantic':
-            queryset = self._semantic_search(queryset, query, user)
-        else:  # hybrid
-            queryset = self._hybrid_search(queryset, query, user)
+        # Perform search based on type; rankings are (doc_type, doc_id) keys
+        ranked = None
+        if search_type == 'semantic':
+            ranked = self._semantic_search(query, user, doc_types)
+        elif search_type != 'text':  # hybrid
+            ranked = self._hybrid_search(query, user, doc_types)
 
-        # Get total count
-        total = queryset.count()
+        if ranked is None:
+            # Text search (also the fallback when semantic search is unavailable)
+            ranked = self._text_search(query, user, doc_types, self.config.MAX_RANKED)
 
-        # Paginate
-        offset = (page - 1) * page_size
-        results = list(queryset[offset:offset + page_size])
+        # Ranked in Python: only ids are checked against the filters and
+        # only the page's rows are fetched
+        ranked = self._restrict(ranked, querysets)
+        total = len(ranked)
+        results = self._load(ranked[offset:offset + page_size], querysets)
 
         # Log search
         self._log_search(user, query, total)
 
         return {
-            'results': [self._serialize_result(r) for r in results],
+            'results': [self._serialize_result(doc_type, item) for doc_type, item in results],
             'query': query,
             'total': total,
             'page': page,
@@ -157,14 +187,40 @@ class SearchService:
 
         return query.strip()
 
+    def _get_querysets(self, user, filters: Dict = None) -> Dict[str, Any]:
+        """The user's live rows per searchable type, with filters applied."""
+        from coreapp.models import Document, NoteBook, PromptResponse
+        from coreapp.services.text_index import DOC_RESPONSE, DOC_DOCUMENT, DOC_NOTEBOOK
+
+        filters = filters or {}
+        querysets = {
+            DOC_RESPONSE: PromptResponse.objects.select_related('prompt'),
+            DOC_DOCUMENT: Document.objects.all(),
+            DOC_NOTEBOOK: NoteBook.objects.all(),
+        }
+        if 'content_type' in filters:
+            querysets = {
+                doc_type: queryset for doc_type, queryset in querysets.items()
+                if doc_type == filters['content_type']
+            }
+        return {
+            doc_type: self._apply_filters(queryset.filter(user=user, is_delete=False), filters)
+            for doc_type, queryset in querysets.items()
+        }
+
     def _apply_filters(self, queryset, filters: Dict) -> Any:
         """Apply search filters to queryset."""
         if not filters:
             return queryset
 
-        # Filter by folder
+        from coreapp.models import PromptResponse
+
+        # Filter by folder (responses are not filed in folders)
         if 'folder_id' in filters:
-            queryset = queryset.filter(folder_id=filters['folder_id'])
+            if queryset.model is PromptResponse:
+                queryset = queryset.none()
+            else:
+                queryset = queryset.filter(folder_id=filters['folder_id'])
 
         # Filter by date range
         if 'date_from' in filters:
@@ -172,129 +228,82 @@ class SearchService:
         if 'date_to' in filters:
             queryset = queryset.filter(created_at__lte=filters['date_to'])
 
-        # Filter by content type
-        if 'content_type' in filters:
-            queryset = queryset.filter(content_type=filters['content_type'])
-
-        # Filter by tags
-        if 'tags' in filters:
-            for tag in filters['tags']:
-                queryset = queryset.filter(tags__contains=tag)
-
-        # Filter by favorites
-        if filters.get('favorites_only'):
-            queryset = queryset.filter(is_favorite=True)
-
         return queryset
 
-    def _text_search(self, queryset, query: str) -> Any:
-        """Perform full-text search."""
-        # Simple text search using icontains
-        search_filter = Q(title__icontains=query) | Q(generatedResponse__icontains=query)
+    def _text_search(self, query: str, user, doc_types: List[str], limit: int) -> List[Tuple[str, int]]:
+        """Rank content with the BM25 full-text index."""
+        from coreapp.services.text_index import text_index
 
-        # Also search in userPrompt if exists
-        if hasattr(queryset.model, 'userPrompt'):
-            search_filter |= Q(userPrompt__icontains=query)
-
-        return queryset.filter(search_filter).order_by('-updated_at')
+        if not doc_types:
+            return []
+        hits, _ = text_index.search(user.id, query, doc_types=doc_types, limit=limit)
+        return [(hit.doc_type, hit.doc_id) for hit in hits]
 
-    def _semantic_search(self, queryset, query: str, user) -> Any:
+    def _semantic_search(self, query: str, user, doc_types: List[str]) -> Optional[List[Tuple[str, int]]]:
         """
-        Perform semantic search using embeddings.
+        Rank content by embedding similarity to the query.
 
-        This requires a vector database (pgvector) or embedding storage.
-        Falls back to text search if embeddings not available.
+        Returns (doc_type, doc_id) keys, best first, or None when semantic
+        search is unavailable (callers fall back to text search).
         """
-        try:
-            # Check if semantic search is available
-            if not self._is_semantic_available():
-                logger.debug("Semantic search not available, falling back to text search")
-                return self._text_search(queryset, query)
-
-            # Get query embedding
-            embedding = self._get_embedding(query)
-            if not embedding:
-                return self._text_search(queryset, query)
-
-            # Find similar content (requires pgvector extension)
-            from coreapp.models import ContentEmbedding
-
-            # Get content IDs sorted by similarity
-            similar_ids = ContentEmbedding.objects.filter(
-                content__user=user,
-                content__is_delete=False
-            ).annotate(
-                similarity=1 - F('embedding').cosine_distance(embedding)
-            ).filter(
-                similarity__gte=self.config.MIN_SIMILARITY
-            ).order_by('-similarity').values_list('content_id', flat=True)
-
-            # Preserve order using CASE WHEN
-            ordering = Case(
-                *[When(pk=pk, then=pos) for pos, pk in enumerate(similar_ids)],
-                output_field=IntegerField()
-            )
+        if not self._is_semantic_available():
+            logger.debug("Semantic search not available, falling back to text search")
+            return None
 
-            return queryset.filter(id__in=similar_ids).annotate(
-                search_order=ordering
-            ).order_by('search_order')
+        embedding = self._get_embedding(query)
+        if not embedding:
+            return None
 
+        try:
+            from coreapp.services.vector_index import vector_index
+
+            matches = vector_index.search(
+                user.id, embedding,
+                k=self.config.SEMANTIC_CANDIDATES,
+                min_similarity=self.config.MIN_SIMILARITY,
+            )
         except Exception as e:
             logger.warning(f"Semantic search failed: {e}, falling back to text search")
-            return self._text_search(queryset, query)
+            return None
 
-    def _hybrid_search(self, queryset, query: str, user) -> Any:
+        return [key for key, _ in matches if key[0] in doc_types]
+
+    def _hybrid_search(self, query: str, user, doc_types: List[str]) -> List[Tuple[str, int]]:
         """
-        Combine text and semantic search for best results.
+        Combine text and semantic rankings with reciprocal-rank fusion.
         """
-        # Perform text search
-        text_results = set(
-            self._text_search(queryset, query).values_list('id', flat=True)[:100]
-        )
-
-        # Try semantic search
-        try:
-            if self._is_semantic_available():
-                semantic_queryset = self._semantic_search(queryset, query, user)
-                semantic_results = set(
-                    semantic_queryset.values_list('id', flat=True)[:100]
+        text_keys = self._text_search(query, user, doc_types, self.config.TEXT_CANDIDATES)
+
+        semantic_keys = self._semantic_search(query, user, doc_types)
+        if semantic_keys is None:
+            return text_keys
+
+        return reciprocal_rank_fusion(text_keys, semantic_keys)
+
+    def _restrict(self, ranked: List[Tuple[str, int]], querysets: Dict[str, Any]) -> List[Tuple[str, int]]:
+        """Drop ranked keys whose rows are deleted or filtered out (one query per type)."""
+        allowed = set()
+        for doc_type, queryset in querysets.items():
+            ids = [doc_id for key_type, doc_id in ranked if key_type == doc_type]
+            if ids:
+                allowed.update(
+                    (doc_type, doc_id)
+                    for doc_id in queryset.filter(id__in=ids).values_list('id', flat=True)
                 )
-
-                # Combine results, prioritizing items that appear in both
-                combined_ids = list(text_results | semantic_results)
-
-                # Score by appearance in both result sets
-                def score(item_id):
-                    score = 0
-                    if item_id in text_results:
-                        score += 1
-                    if item_id in semantic_results:
-                        score += 1
-                    return score
-
-                combined_ids.sort(key=score, reverse=True)
-
-                # Return queryset with preserved order
-                ordering = Case(
-                    *[When(pk=pk, then=pos) for pos, pk in enumerate(combined_ids)],
-                    output_field=IntegerField()
-                )
-
-                return queryset.filter(id__in=combined_ids).annotate(
-                    search_order=ordering
-                ).order_by('search_order')
-
-        except Exception as e:
-            logger.warning(f"Hybrid search semantic component failed: {e}")
-
-        # Fall back to text search results
-        ordering = Case(
-            *[When(pk=pk, then=pos) for pos, pk in enumerate(text_results)],
-            output_field=IntegerField()
-        )
-        return queryset.filter(id__in=text_results).annotate(
-            search_order=ordering
-        ).order_by('search_order')
+        return [key for key in ranked if key in allowed]
+
+    def _load(self, keys: List[Tuple[str, int]], querysets: Dict[str, Any]) -> List[Tuple[str, Any]]:
+        """(doc_type, row) pairs for the keys, in order (one query per type)."""
+        rows = {}
+        for doc_type, queryset in querysets.items():
+            ids = [doc_id for key_type, doc_id in keys if key_type == doc_type]
+            if ids:
+                rows[doc_type] = queryset.in_bulk(ids)
+        return [
+            (doc_type, rows[doc_type][doc_id])
+            for doc_type, doc_id in keys
+            if doc_id in rows.get(doc_type, {})
+        ]
 
     def _is_semantic_available(self) -> bool:
         """Check if semantic search is available."""
@@ -312,21 +321,33 @@ class SearchService:
             logger.error(f"Failed to get embedding: {e}")
             return None
 
-    def _serialize_result(self, content) -> Dict:
+    def _serialize_result(self, doc_type: str, content) -> Dict:
         """Serialize search result."""
+        title, text = self._title_and_text(doc_type, content)
         return {
+            'type': doc_type,
             'id': content.id,
-            'title': content.title,
-            'snippet': self._get_snippet(content),
-            'folder_id': content.folder_id,
+            'title': title,
+            'snippet': self._get_snippet(text),
+            'folder_id': getattr(content, 'folder_id', None),
             'created_at': content.created_at.isoformat() if content.created_at else None,
             'updated_at': content.updated_at.isoformat() if content.updated_at else None,
-            'is_favorite': getattr(content, 'is_favorite', False),
         }
 
-    def _get_snippet(self, content, max_length: int = 200) -> str:
+    @staticmethod
+    def _title_and_text(doc_type: str, content) -> Tuple[str, str]:
+        """Title and body of a response, document or notebook."""
+        from coreapp.services.text_index import DOC_RESPONSE, DOC_DOCUMENT
+
+        if doc_type == DOC_RESPONSE:
+            return content.prompt.title, content.response_text
+        if doc_type == DOC_DOCUMENT:
+            return content.title, content.content
+        return content.label, content.content
+
+    def _get_snippet(self, text: str, max_length: int = 200) -> str:
         """Get content snippet for search results."""
-        text = getattr(content, 'generatedResponse', '') or ''
+        text = text or ''
         if len(text) <= max_length:
             return text
         return text[:max_length].rsplit(' ', 1)[0] + '...'
@@ -374,20 +395,18 @@ class SearchService:
             limit: Maximum results
 
         Returns:
-            List of matching items
+            List of matching items (type, id, title)
         """
-        from coreapp.models import ContentGen
-
-        if len(query) < 2:
+        query = self._clean_query(query)
+        if len(query) < self.config.MIN_QUERY_LENGTH:
             return []
 
-        results = ContentGen.objects.filter(
-            user=user,
-            is_delete=False,
-            title__icontains=query
-        ).values('id', 'title')[:limit]
-
-        return list(results)
+        querysets = self._get_querysets(user)
+        ranked = self._text_search(query, user, list(querysets), limit)
+        return [
+            {'type': doc_type, 'id': item.id, 'title': self._title_and_text(doc_type, item)[0]}
+            for doc_type, item in self._load(ranked, querysets)
+        ]
 
     # -------------------------------------------------------------------------
     # Search Suggestions
@@ -397,6 +416,8 @@ class SearchService:
         """
         Get search suggestions based on partial query.
 
+        Completes the last word with terms from the user's full-text index.
+
         Args:
             user: User
             partial_query: Partial search string
@@ -405,19 +426,90 @@ class SearchService:
         Returns:
             List of suggestion strings
         """
-        from coreapp.models import ContentGen
+        from coreapp.services.text_index import text_index
 
+        partial_query = ' '.join((partial_query or '').split())
         if len(partial_query) < 2:
             return []
 
-        # Get matching titles
-        titles = ContentGen.objects.filter(
-            user=user,
-            is_delete=False,
-            title__istartswith=partial_query
-        ).values_list('title', flat=True).distinct()[:limit]
+        head, _, prefix = partial_query.rpartition(' ')
+        completions = text_index.suggest(user.id, prefix, limit=limit)
+        return [f"{head} {term}" if head else term for term in completions]
+
+    # -------------------------------------------------------------------------
+    # Library Search
+    # -------------------------------------------------------------------------
+
+    def search_library(
+        self,
+        user,
+        query: str,
+        doc_types: List[str] = None,
+        page: int = 1,
+        page_size: int = None
+    ) -> Dict[str, Any]:
+        """
+        BM25-ranked search over the user's responses, documents and notebooks.
 
-        return list(titles)
+        Args:
+            user: User performing search
+            query: Search query string (last word matches as a prefix)
+            doc_types: Limit to 'response', 'document' and/or 'notebook'
+            page: Page number
+            page_size: Results per page
+
+        Returns:
+            Search results with highlighted snippets and pagination info
+        """
+        from coreapp.services.text_index import text_index
+
+        query = self._clean_query(query)
+        if len(query) < self.config.MIN_QUERY_LENGTH:
+            return self._empty_results()
+
+        page_size = min(
+            page_size or self.config.DEFAULT_PAGE_SIZE,
+            self.config.MAX_RESULTS
+        )
+        hits, total = text_index.search(
+            user.id, query, doc_types=doc_types,
+            limit=page_size, offset=(page - 1) * page_size,
+        )
+
+        # Load the page's rows, one query per type
+        rows = dict(
+            ((doc_type, item.id), item)
+            for doc_type, item in self._load(
+                [(hit.doc_type, hit.doc_id) for hit in hits], self._get_querysets(user)
+            )
+        )
+
+        results = []
+        for hit in hits:
+            item = rows.get((hit.doc_type, hit.doc_id))
+            if item is None:
+                continue
+            title, text = self._title_and_text(hit.doc_type, item)
+            results.append({
+                'type': hit.doc_type,
+                'id': hit.doc_id,
+                'title': title,
+                'snippet': text_index.highlight(text, query),
+                'score': round(hit.score, 4),
+                'updated_at': item.updated_at.isoformat() if item.updated_at else None,
+            })
+
+        self._log_search(user, query, total)
+
+        return {
+            'results': results,
+            'query': query,
+            'total': total,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size,
+            'search_type': 'library',
+        }
 
     def get_recent_searches(self, user, limit: int = 10) -> List[str]:
         """Get user's recent search queries."""
@@ -455,76 +547,115 @@ class SearchService:
 
 class SearchIndexService:
     """
-    Service for managing search indexes and embeddings.
+    Service for managing the embeddings of responses, documents and notebooks.
+
+    Rows are embedded in a Celery task queued when they are saved (see
+    coreapp.signals); the text embedded is what the full-text index
+    indexes, so both rankings see the same content.
+
+    Usage:
+        search_index_service.schedule(DOC_DOCUMENT, document.id)
+        search_index_service.index_many(DOC_DOCUMENT, [1, 2, 3])
     """
 
-    def index_content(self, content) -> bool:
-        """
-        Index content for search.
+    MAX_EMBEDDING_CHARS = 8000
 
-        Args:
-            content: ContentGen instance
+    def is_enabled(self) -> bool:
+        return getattr(settings, 'SEMANTIC_SEARCH_ENABLED', False)
 
-        Returns:
-            True if successful
-        """
-        try:
-            # Create text index (MySQL FULLTEXT)
-            # This is handled automatically by MySQL if FULLTEXT index exists
+    def schedule(self, doc_type: str, doc_id: int):
+        """Queue embedding a row once the current transaction commits."""
+        if self.is_enabled():
+            transaction.on_commit(lambda: self._enqueue(doc_type, [doc_id]))
 
-            # Create embedding for semantic search
-            if getattr(settings, 'SEMANTIC_SEARCH_ENABLED', False):
-                self._create_embedding(content)
+    def _enqueue(self, doc_type: str, doc_ids: List[int]):
+        from coreapp.tasks.search_tasks import index_content_embeddings
 
-            return True
+        try:
+            index_content_embeddings.delay(doc_type, doc_ids)
         except Exception as e:
-            logger.error(f"Failed to index content {content.id}: {e}")
+            logger.warning(f"Failed to queue embeddings for {doc_type} {doc_ids}: {e}")
+
+    def index_instance(self, doc_type: str, instance) -> bool:
+        """
+        Embed (or unindex) a PromptResponse, Document or NoteBook.
+
+        Returns:
+            True if the row is indexed
+        """
+        from coreapp.services.text_index import text_index
+        from coreapp.services.vector_index import vector_index
+
+        extracted = text_index.extract(doc_type, instance)
+        if extracted is None:
+            vector_index.remove(doc_type, instance.pk, instance.user_id)
             return False
 
-    def _create_embedding(self, content):
-        """Create embedding for content."""
+        user_id, text = extracted
         try:
             from coreapp.services.llm_service import llm_service
-            from coreapp.models import ContentEmbedding
-
-            # Combine title and content for embedding
-            text = f"{content.title}\n\n{content.generatedResponse or ''}"
-            text = text[:8000]  # Limit text length
 
-            embedding = llm_service.get_embedding(text)
-
-            if embedding:
-                ContentEmbedding.objects.update_or_create(
-                    content=content,
-                    defaults={'embedding': embedding}
-                )
+            embedding = llm_service.get_embedding(text[:self.MAX_EMBEDDING_CHARS])
         except Exception as e:
-            logger.warning(f"Failed to create embedding: {e}")
+            logger.warning(f"Failed to create embedding for {doc_type} {instance.pk}: {e}")
+            return False
 
-    def reindex_all(self, user=None) -> int:
-        """Reindex all content."""
-        from coreapp.models import ContentGen
+        if not embedding:
+            return False
+        vector_index.add(user_id, doc_type, instance.pk, embedding)
+        return True
 
-        queryset = ContentGen.objects.filter(is_delete=False)
-        if user:
-            queryset = queryset.filter(user=user)
+    def index_many(self, doc_type: str, doc_ids: List[int]) -> int:
+        """Embed rows of one type; rows that no longer exist are unindexed."""
+        from coreapp.services.vector_index import vector_index
 
+        model = self._model(doc_type)
+        rows = model.objects.in_bulk(list(doc_ids))
         count = 0
-        for content in queryset.iterator():
-            if self.index_content(content):
+        for doc_id in doc_ids:
+            instance = rows.get(doc_id)
+            if instance is None:
+                vector_index.remove(doc_type, doc_id)
+            elif self.index_instance(doc_type, instance):
                 count += 1
+        return count
+
+    def reindex_all(self, user=None, batch_size: int = 500) -> int:
+        """Reindex all responses, documents and notebooks."""
+        from coreapp.services.text_index import DOC_TYPES
+
+        count = 0
+        for doc_type in DOC_TYPES:
+            queryset = self._model(doc_type).objects.filter(is_delete=False)
+            if user:
+                queryset = queryset.filter(user=user)
+
+            for instance in queryset.iterator(chunk_size=batch_size):
+                if self.index_instance(doc_type, instance):
+                    count += 1
 
         logger.info(f"Reindexed {count} content items")
         return count
 
-    def remove_index(self, content_id: int):
-        """Remove content from search index."""
+    def remove_index(self, doc_type: str, doc_id: int, user_id: int = None):
+        """Remove a row from the vector index."""
         try:
-            from coreapp.models import ContentEmbedding
+            from coreapp.services.vector_index import vector_index
 
-            ContentEmbedding.objects.filter(content_id=content_id).delete()
-        except Exception:
-            pass
+            vector_index.remove(doc_type, doc_id, user_id)
+        except Exception as e:
+            logger.warning(f"Failed to remove embedding of {doc_type} {doc_id}: {e}")
+
+    @staticmethod
+    def _model(doc_type: str):
+        from coreapp.models import Document, NoteBook, PromptResponse
+        from coreapp.services.text_index import DOC_RESPONSE, DOC_DOCUMENT
+
+        if doc_type == DOC_RESPONSE:
+            return PromptResponse
+        if doc_type == DOC_DOCUMENT:
+            return Document
+        return NoteBook
 
 
 # =============================================================================
@@ -0,0 +1,225 @@
+"""
+Bulk Folder Subtree Operations for MultinotesAI.
+
+This module provides:
+- One-pass collection of the folders, files and documents below a folder
+- Sharing a subtree with ``Share`` rows written by ``bulk_create``
+- Deleting a subtree with batched S3 deletes and a single storage update
+- Progress callbacks so large trees can run as a background job
+
+Sharing or deleting used to cost a serializer save, S3 call or
+``StorageUsage.save()`` per item; every step here is a fixed number of
+queries or one request per 1,000 S3 keys.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+# S3 DeleteObjects accepts at most 1,000 keys per request
+S3_DELETE_BATCH = 1000
+WRITE_BATCH = 1000
+
+
+# =============================================================================
+# Subtree Contents
+# =============================================================================
+
+@dataclass
+class SubtreeContents:
+    """Everything below (and including) a root folder."""
+
+    root_id: int
+    folders: Dict[int, Optional[int]] = field(default_factory=dict)  # id -> parent id
+    files: List[tuple] = field(default_factory=list)                 # (id, folder id, S3 key, size)
+    documents: List[tuple] = field(default_factory=list)             # (id, folder id, size)
+
+    @property
+    def item_count(self) -> int:
+        return len(self.folders) + len(self.files) + len(self.documents)
+
+    @property
+    def total_size(self) -> int:
+        return (sum(size or 0 for *_, size in self.files)
+                + sum(size or 0 for *_, size in self.documents))
+
+
+# =============================================================================
+# Subtree Operations
+# =============================================================================
+
+class SubtreeOperations:
+    """
+    Share or delete a whole folder subtree in bulk.
+
+    Usage:
+        contents = subtree_operations.collect(user, folder.id)
+        if subtree_operations.should_defer(contents):
+            delete_folder_subtree.delay(user.id, folder.id)
+        else:
+            subtree_operations.delete(user, contents)
+    """
+
+    def collect(self, user, root_id: int, include_deleted: bool = True) -> SubtreeContents:
+        """
+        Gather the subtree of ``root_id`` in three queries.
+
+        Args:
+            user: Owner of the files and documents
+            root_id: Folder at the top of the subtree
+            include_deleted: Keep soft-deleted subfolders (False when sharing)
+        """
+        from coreapp.models import Document, Folder, UserContent
+        from coreapp.services.folder_tree import folder_tree
+
+        folder_tree.ensure_indexed([root_id])
+        folders = Folder.objects.filter(tree_ancestors__ancestor_id=root_id)
+        if not include_deleted:
+            folders = folders.filter(is_delete=False)
+
+        contents = SubtreeContents(root_id=root_id)
+        contents.folders = dict(folders.values_list('id', 'parent_folder_id'))
+        contents.files = list(
+            UserContent.objects
+            .filter(user=user, is_delete=False, folder__in=list(contents.folders))
+            .values_list('id', 'folder_id', 'file', 'fileSize')
+        )
+        contents.documents = list(
+            Document.objects
+            .filter(user=user, is_delete=False, folder__in=list(contents.folders))
+            .values_list('id', 'folder_id', 'size')
+        )
+        return contents
+
+    def should_defer(self, contents: SubtreeContents) -> bool:
+        """Whether the subtree is large enough to hand to a background job."""
+        return contents.item_count > settings.SUBTREE_BACKGROUND_THRESHOLD
+
+    # -------------------------------------------------------------------------
+    # Share
+    # -------------------------------------------------------------------------
+
+    def share(
+        self,
+        owner_id: int,
+        share_to_id: int,
+        contents: SubtreeContents,
+        access_type: Optional[str] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> int:
+        """
+        Share every folder, file and document in ``contents``.
+
+        Items the recipient already has an active share for are skipped, so
+        re-sharing a folder only adds what was created since.
+
+        Returns:
+            Number of Share rows created
+        """
+        from coreapp.models import Share
+
+        existing = Share.objects.filter(owner_id=owner_id, share_to_user_id=share_to_id, is_delete=False)
+        shared_folders = set(existing.filter(folder__isnull=False).values_list('folder_id', flat=True))
+        shared_files = set(existing.filter(file__isnull=False).values_list('file_id', flat=True))
+        shared_documents = set(existing.filter(document__isnull=False).values_list('document_id', flat=True))
+
+        common = {'owner_id': owner_id, 'share_to_user_id': share_to_id}
+        if access_type:
+            common['access_type'] = access_type
+
+        rows = [
+            Share(folder_id=folder_id, content_type='folder',
+                  main_folder_id=None if folder_id == contents.root_id else parent_id, **common)
+            for folder_id, parent_id in contents.folders.items()
+            if folder_id not in shared_folders
+        ]
+        rows += [
+            Share(file_id=file_id, content_type='file', **common)
+            for file_id, *_ in contents.files
+            if file_id not in shared_files
+        ]
+        rows += [
+            Share(document_id=document_id, content_type='document', **common)
+            for document_id, *_ in contents.documents
+            if document_id not in shared_documents
+        ]
+
+        for start in range(0, len(rows), WRITE_BATCH):
+            Share.objects.bulk_create(rows[start:start + WRITE_BATCH])
+            if on_progress:
+                on_progress(min(start + WRITE_BATCH, len(rows)), len(rows))
+        return len(rows)
+
+    # -------------------------------------------------------------------------
+    # Delete
+    # -------------------------------------------------------------------------
+
+    def delete(
+        self,
+        user,
+        contents: SubtreeContents,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict:
+        """
+        Delete a subtree: S3 objects, file/document/folder rows and storage usage.
+
+        S3 failures are logged and the rows are still removed, as before.
+
+        Returns:
+            Summary with counts, bytes freed and the S3 keys that failed
+        """
+        from authentication.awsservice import delete_files_from_s3
+        from coreapp.models import Document, Folder, StorageUsage, UserContent
+
+        keys = [key for _, _, key, _ in contents.files if key]
+        total = len(keys) + contents.item_count
+        done = 0
+
+        failed = []
+        for start in range(0, len(keys), S3_DELETE_BATCH):
+            batch = keys[start:start + S3_DELETE_BATCH]
+            failed += delete_files_from_s3(batch)
+            done += len(batch)
+            if on_progress:
+                on_progress(done, total)
+        if failed:
+            logger.warning(f"{len(failed)} of {len(keys)} S3 objects not deleted for folder {contents.root_id}")
+
+        for model, rows in ((Document, contents.documents), (UserContent, contents.files)):
+            ids = [row[0] for row in rows]
+            for start in range(0, len(ids), WRITE_BATCH):
+                model.objects.filter(id__in=ids[start:start + WRITE_BATCH]).delete()
+                done += len(ids[start:start + WRITE_BATCH])
+                if on_progress:
+                    on_progress(done, total)
+
+        freed = contents.total_size
+        with transaction.atomic():
+            if freed:
+                StorageUsage.objects.filter(user=user, is_delete=False).update(
+                    total_storage_used=F('total_storage_used') - freed
+                )
+            Folder.objects.filter(id__in=list(contents.folders)).delete()
+        if on_progress:
+            on_progress(total, total)
+
+        return {
+            'folders': len(contents.folders),
+            'files': len(contents.files),
+            'documents': len(contents.documents),
+            'freed_bytes': freed,
+            's3_failed': failed,
+        }
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+subtree_operations = SubtreeOperations()
@@ -0,0 +1,352 @@
+"""
+Full-Text Index for MultinotesAI.
+
+This module provides:
+- An inverted index (term -> postings) over prompt responses, documents
+  and notebooks, kept up to date on save and delete
+- BM25-ranked search with prefix matching on the last query word
+- Term suggestions for search-as-you-type
+- Snippets with the matched words highlighted
+
+The index lives in two tables (SearchDocument, SearchPosting) so it works
+the same on MySQL and in tests, and lookups go through the (user, term)
+index instead of scanning TEXT columns with LIKE '%...%'.
+"""
+
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils.html import escape
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+DOC_RESPONSE = 'response'
+DOC_DOCUMENT = 'document'
+DOC_NOTEBOOK = 'notebook'
+DOC_TYPES = (DOC_RESPONSE, DOC_DOCUMENT, DOC_NOTEBOOK)
+
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+
+# Expansions of a prefix term considered per query (most frequent first)
+MAX_PREFIX_TERMS = 20
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the '
+    'this to was were will with'.split()
+)
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercased index terms of a text, in order."""
+    if not text:
+        return []
+    return [
+        word for word in _WORD_RE.findall(text.lower())
+        if MIN_TERM_LENGTH <= len(word) <= MAX_TERM_LENGTH and word not in STOPWORDS
+    ]
+
+
+def parse_query(query: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Split a query into exact terms and a trailing prefix.
+
+    The last word is treated as a prefix unless the query ends with a
+    space, so "machine lea" matches "learning".
+    """
+    words = [word for word in _WORD_RE.findall((query or '').lower()) if len(word) <= MAX_TERM_LENGTH]
+    if not words:
+        return [], None
+    if query[-1:].isspace():
+        return [word for word in words if word not in STOPWORDS and len(word) >= MIN_TERM_LENGTH], None
+    *terms, prefix = words
+    terms = [word for word in terms if word not in STOPWORDS and len(word) >= MIN_TERM_LENGTH]
+    return terms, prefix
+
+
+# =============================================================================
+# Data Classes
+# =============================================================================
+
+@dataclass
+class SearchHit:
+    """One ranked search result."""
+    doc_type: str
+    doc_id: int
+    score: float
+
+
+# =============================================================================
+# Text Index
+# =============================================================================
+
+class TextIndex:
+    """
+    Maintain and query the full-text index.
+
+    Usage:
+        text_index.index_instance(DOC_DOCUMENT, document)
+        hits = text_index.search(user.id, "quarterly report", doc_types=['document'])
+        ids = text_index.match_ids(user.id, "quarterly rep", DOC_DOCUMENT)
+    """
+
+    # -------------------------------------------------------------------------
+    # Indexing
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def extract(doc_type: str, instance) -> Optional[Tuple[int, str]]:
+        """(user_id, text) to index for a model instance, or None to unindex it."""
+        if getattr(instance, 'is_delete', False):
+            return None
+        if doc_type == DOC_RESPONSE:
+            text = instance.response_text
+        elif doc_type == DOC_DOCUMENT:
+            text = f"{instance.title or ''}\n{instance.content or ''}"
+        else:
+            text = f"{instance.label or ''}\n{instance.content or ''}"
+        if not text or not text.strip():
+            return None
+        return instance.user_id, text
+
+    def index_instance(self, doc_type: str, instance, created: bool = False):
+        """Index (or unindex) a PromptResponse, Document or NoteBook."""
+        extracted = self.extract(doc_type, instance)
+        if extracted is None:
+            if not created:
+                self.remove(doc_type, [instance.pk])
+        else:
+            user_id, text = extracted
+            self.index_many(doc_type, [(instance.pk, user_id, text)])
+
+    def index_many(self, doc_type: str, rows: Iterable[Tuple[int, int, str]]) -> int:
+        """
+        Replace the index entries of many documents at once.
+
+        ``rows`` are (doc_id, user_id, text). Uses one bulk insert for the
+        documents and one for their postings. Returns the postings written.
+        """
+        from coreapp.models import SearchDocument, SearchPosting
+
+        counted = {doc_id: (user_id, Counter(tokenize(text))) for doc_id, user_id, text in rows}
+        if not counted:
+            return 0
+
+        with transaction.atomic():
+            SearchDocument.objects.filter(doc_type=doc_type, doc_id__in=counted).delete()
+            SearchDocument.objects.bulk_create([
+                SearchDocument(doc_type=doc_type, doc_id=doc_id, user_id=user_id, length=sum(terms.values()))
+                for doc_id, (user_id, terms) in counted.items()
+            ])
+            # Re-read the keys: MySQL does not return ids from bulk_create
+            keys = dict(
+                SearchDocument.objects
+                .filter(doc_type=doc_type, doc_id__in=counted)
+                .values_list('doc_id', 'id')
+            )
+            postings = [
+                SearchPosting(document_id=keys[doc_id], user_id=user_id, doc_type=doc_type,
+                              term=term, frequency=frequency)
+                for doc_id, (user_id, terms) in counted.items()
+                for term, frequency in terms.items()
+            ]
+            SearchPosting.objects.bulk_create(postings, batch_size=2000)
+        return len(postings)
+
+    def remove(self, doc_type: str, doc_ids: Sequence[int]):
+        """Drop documents from the index."""
+        from coreapp.models import SearchDocument
+
+        SearchDocument.objects.filter(doc_type=doc_type, doc_id__in=list(doc_ids)).delete()
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def search(self, user_id: int, query: str, doc_types: Sequence[str] = None,
+               limit: int = 20, offset: int = 0) -> Tuple[List[SearchHit], int]:
+        """
+        BM25-ranked documents of a user matching any query term.
+
+        Returns (hits for the requested page, total matching documents).
+        """
+        from coreapp.models import SearchDocument, SearchPosting
+
+        terms = self._expand(user_id, query, doc_types)
+        if not terms:
+            return [], 0
+
+        documents = SearchDocument.objects.filter(user_id=user_id)
+        postings = SearchPosting.objects.filter(user_id=user_id, term__in=terms)
+        if doc_types:
+            documents = documents.filter(doc_type__in=doc_types)
+            postings = postings.filter(doc_type__in=doc_types)
+
+        stats = documents.aggregate(total=Count('id'), avg_length=Avg('length'))
+        total_docs = stats['total'] or 0
+        avg_length = stats['avg_length'] or 1.0
+
+        rows = list(postings.values_list('document_id', 'term', 'frequency', 'document__length',
+                                         'document__doc_type', 'document__doc_id'))
+        document_frequency = Counter(term for _, term, _, _, _, _ in rows)
+        idf = {
+            term: math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            for term, df in document_frequency.items()
+        }
+
+        scores: Dict[int, float] = {}
+        keys: Dict[int, Tuple[str, int]] = {}
+        for document_id, term, frequency, length, doc_type, doc_id in rows:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+            scores[document_id] = scores.get(document_id, 0.0) + (
+                idf[term] * frequency * (BM25_K1 + 1) / (frequency + norm)
+            )
+            keys[document_id] = (doc_type, doc_id)
+
+        ranked = sorted(scores, key=lambda document_id: (-scores[document_id], document_id))
+        hits = [
+            SearchHit(*keys[document_id], score=scores[document_id])
+            for document_id in ranked[offset:offset + limit]
+        ]
+        return hits, len(ranked)
+
+    def match_ids(self, user_id: int, query: str, doc_type: str, limit: int = None) -> List[int]:
+        """
+        Ids of a user's documents containing every query word.
+
+        The last word matches as a prefix. Meant as a drop-in for
+        ``field__icontains=query`` filters on list views.
+        """
+        from coreapp.models import SearchPosting
+
+        terms, prefix = parse_query(query)
+        if not terms and not prefix:
+            return []
+
+        postings = SearchPosting.objects.filter(user_id=user_id, doc_type=doc_type)
+        groups = [postings.filter(term=term) for term in dict.fromkeys(terms)]
+        if prefix:
+            groups.append(postings.filter(term__startswith=prefix))
+
+        matched: Optional[Set[int]] = None
+        for group in groups:
+            ids = set(group.values_list('document__doc_id', flat=True))
+            matched = ids if matched is None else matched & ids
+            if not matched:
+                return []
+
+        matched = sorted(matched, reverse=True)
+        return matched[:limit] if limit else matched
+
+    def suggest(self, user_id: int, prefix: str, limit: int = 5, doc_types: Sequence[str] = None) -> List[str]:
+        """Indexed terms starting with ``prefix``, most widely used first."""
+        from coreapp.models import SearchPosting
+
+        prefix = (prefix or '').strip().lower()
+        if len(prefix) < MIN_TERM_LENGTH:
+            return []
+
+        postings = SearchPosting.objects.filter(user_id=user_id, term__startswith=prefix)
+        if doc_types:
+            postings = postings.filter(doc_type__in=doc_types)
+        return list(
+            postings.values('term')
+            .annotate(documents=Count('id'))
+            .order_by('-documents', 'term')
+            .values_list('term', flat=True)[:limit]
+        )
+
+    def _expand(self, user_id: int, query: str, doc_types: Sequence[str] = None) -> List[str]:
+        """Query terms plus the indexed expansions of the trailing prefix."""
+        terms, prefix = parse_query(query)
+        if prefix:
+            terms = terms + self.suggest(user_id, prefix, limit=MAX_PREFIX_TERMS, doc_types=doc_types)
+        return list(dict.fromkeys(terms))
+
+    # -------------------------------------------------------------------------
+    # Snippets
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def highlight(text: str, query: str, max_length: int = 200,
+                  start_tag: str = '<mark>', end_tag: str = '</mark>') -> str:
+        """
+        HTML-escaped excerpt of ``text`` around the query words, with the
+        matches wrapped in ``start_tag`` / ``end_tag``.
+
+        The excerpt is the ``max_length`` window holding the most matches.
+        """
+        text = text or ''
+        terms, prefix = parse_query(query)
+        exact = set(terms)
+
+        matches = [
+            match for match in _WORD_RE.finditer(text)
+            if match.group().lower() in exact or (prefix and match.group().lower().startswith(prefix))
+        ]
+
+        start = 0
+        if matches and len(text) > max_length:
+            best = last = 0
+            for i, first in enumerate(matches):
+                while last < len(matches) and matches[last].end() - first.start() <= max_length:
+                    last += 1
+                if last - i > best:
+                    best, start = last - i, first.start()
+            # Start on a word boundary a little before the first match
+            start = max(0, start - max_length // 4)
+            if start:
+                space = text.rfind(' ', 0, start)
+                start = space + 1 if space >= 0 else start
+        end = min(len(text), start + max_length)
+
+        parts = []
+        cursor = start
+        for match in matches:
+            if match.start() < start or match.end() > end:
+                continue
+            parts.append(escape(text[cursor:match.start()]))
+            parts.append(f"{start_tag}{escape(match.group())}{end_tag}")
+            cursor = match.end()
+        parts.append(escape(text[cursor:end]))
+
+        snippet = ''.join(parts)
+        if start > 0:
+            snippet = '...' + snippet
+        if end < len(text):
+            snippet += '...'
+        return snippet
+
+    # -------------------------------------------------------------------------
+    # Configuration
+    # -------------------------------------------------------------------------
+
+    @property
+    def search_enabled(self) -> bool:
+        """Whether list views query the index instead of LIKE filters."""
+        return getattr(settings, 'TEXT_INDEX_SEARCH_ENABLED', False)
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+text_index = TextIndex()
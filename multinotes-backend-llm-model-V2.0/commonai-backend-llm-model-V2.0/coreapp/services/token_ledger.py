@@ -0,0 +1,275 @@
+"""
+Token Ledger for MultinotesAI.
+
+This module provides:
+- Atomic token deductions on Subscription (single UPDATE with F() expressions)
+- Reserve / commit / release of a token budget around a generation
+- Sweeping of reservations abandoned by crashed workers
+
+Every balance change is one conditional UPDATE, so parallel generations on
+a shared (cluster) subscription never lose each other's deductions and only
+hold the row lock for the duration of that statement.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from backend.exceptions import InsufficientTokensError
+from coreapp.services.entitlements import entitlement_service
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+KIND_TEXT = 'text'
+KIND_FILE = 'file'
+
+# kind -> (balance field, used field) on Subscription
+LEDGER_FIELDS = {
+    KIND_TEXT: ('balanceToken', 'usedToken'),
+    KIND_FILE: ('fileToken', 'usedFileToken'),
+}
+
+STATUS_RESERVED = 'reserved'
+STATUS_COMMITTED = 'committed'
+STATUS_RELEASED = 'released'
+
+
+# =============================================================================
+# Token Ledger
+# =============================================================================
+
+class TokenLedger:
+    """
+    Deduct, reserve and settle subscription tokens atomically.
+
+    Usage:
+        reservation = token_ledger.reserve_for_prompt(user, prompt, history)
+        try:
+            ... stream the generation ...
+        except BaseException:
+            token_ledger.release(reservation)
+            raise
+        token_ledger.commit(reservation, tokens_used)
+    """
+
+    def __init__(self, response_budget: int = None, ttl: int = None):
+        self.response_budget = response_budget
+        self.ttl = ttl
+
+    def _response_budget(self) -> int:
+        if self.response_budget is not None:
+            return self.response_budget
+        return getattr(settings, 'TOKEN_RESERVATION_RESPONSE_BUDGET', 1024)
+
+    def _ttl(self) -> timedelta:
+        seconds = self.ttl if self.ttl is not None else getattr(settings, 'TOKEN_RESERVATION_TTL', 900)
+        return timedelta(seconds=seconds)
+
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+
+    def subscription_id_for(self, user) -> Optional[int]:
+        """Id of the subscription a user spends from (the cluster's, if any)."""
+        return entitlement_service.for_user(user).subscription_id
+
+    def balance(self, user, kind: str = KIND_TEXT) -> int:
+        """Current balance of a user's subscription."""
+        from planandsubscription.models import Subscription
+
+        balance_field, _ = LEDGER_FIELDS[kind]
+        subscription_id = self.subscription_id_for(user)
+        if subscription_id is None:
+            return 0
+        return Subscription.objects.filter(pk=subscription_id).values_list(balance_field, flat=True).get()
+
+    # -------------------------------------------------------------------------
+    # Direct Deductions
+    # -------------------------------------------------------------------------
+
+    def consume(self, user, tokens: int, kind: str = KIND_TEXT, strict: bool = False) -> bool:
+        """
+        Deduct tokens that were already spent.
+
+        By default the balance may go negative, as the generators charge
+        after the fact. With ``strict`` the deduction only happens when the
+        balance covers it, and InsufficientTokensError is raised otherwise.
+        """
+        subscription_id = self.subscription_id_for(user)
+        if subscription_id is None:
+            if strict:
+                raise InsufficientTokensError('No active subscription found.')
+            logger.warning(f"No subscription to charge {tokens} {kind} tokens for user {user.id}")
+            return False
+
+        if self._apply(subscription_id, kind, -tokens, tokens, require_balance=strict):
+            entitlement_service.forget(user)
+            return True
+        if strict:
+            raise self._insufficient(kind)
+        return False
+
+    # -------------------------------------------------------------------------
+    # Reservations
+    # -------------------------------------------------------------------------
+
+    def estimate(self, prompt: str, history: List[Dict[str, str]] = None) -> int:
+        """Tokens to hold for a prompt: its input plus the response budget."""
+        from coreapp.services.token_service import token_estimator
+
+        text = prompt or ''
+        if history:
+            text += ''.join(turn.get('content') or '' for turn in history)
+        return token_estimator.estimate_tokens(text) + self._response_budget()
+
+    def reserve_for_prompt(self, user, prompt: str, history: List[Dict[str, str]] = None):
+        """Reserve the estimated cost of answering a prompt."""
+        return self.reserve(user, self.estimate(prompt, history))
+
+    def reserve(self, user, tokens: int, kind: str = KIND_TEXT, strict: bool = False):
+        """
+        Hold tokens for a generation that is about to start.
+
+        Returns a TokenReservation to pass to commit() or release(). When
+        the balance cannot cover the hold, a strict reserve raises
+        InsufficientTokensError; otherwise an empty reservation is returned
+        and commit() charges the real usage directly.
+        """
+        from planandsubscription.models import TokenReservation
+
+        subscription_id = self.subscription_id_for(user)
+        if subscription_id is None:
+            if strict:
+                raise InsufficientTokensError('No active subscription found.')
+            return TokenReservation(user_id=user.id, kind=kind, amount=0)
+
+        with transaction.atomic():
+            held = self._apply(subscription_id, kind, -tokens, 0, require_balance=True)
+            if not held:
+                if strict:
+                    raise self._insufficient(kind)
+                return TokenReservation(subscription_id=subscription_id, user_id=user.id, kind=kind, amount=0)
+
+            entitlement_service.forget(user)
+            return TokenReservation.objects.create(
+                subscription_id=subscription_id,
+                user_id=user.id,
+                kind=kind,
+                amount=tokens,
+                expires_at=timezone.now() + self._ttl(),
+            )
+
+    def commit(self, reservation, used: int) -> bool:
+        """
+        Settle a reservation with the tokens actually used.
+
+        The difference between the hold and the real usage is returned to
+        (or taken from) the balance in the same UPDATE that records usage.
+        Committing twice is a no-op. Returns False if nothing was charged.
+        """
+        from planandsubscription.models import TokenReservation
+
+        if reservation.pk is None:
+            if reservation.subscription_id is None:
+                logger.warning(f"No subscription to charge {used} {reservation.kind} tokens for user {reservation.user_id}")
+                return False
+            return self._apply(reservation.subscription_id, reservation.kind, -used, used)
+
+        with transaction.atomic():
+            settled = TokenReservation.objects.filter(pk=reservation.pk, status=STATUS_RESERVED).update(
+                status=STATUS_COMMITTED, used=used, updated_at=timezone.now(),
+            )
+            if settled:
+                refund = reservation.amount - used
+            else:
+                # Swept as abandoned: the hold is already back, charge in full
+                settled = TokenReservation.objects.filter(pk=reservation.pk, status=STATUS_RELEASED).update(
+                    status=STATUS_COMMITTED, used=used, updated_at=timezone.now(),
+                )
+                refund = -used
+            if not settled:
+                return False
+            self._apply(reservation.subscription_id, reservation.kind, refund, used)
+
+        reservation.status = STATUS_COMMITTED
+        reservation.used = used
+        return True
+
+    def release(self, reservation) -> bool:
+        """Return an unused hold to the balance (e.g. the generation failed)."""
+        from planandsubscription.models import TokenReservation
+
+        if reservation is None or reservation.pk is None:
+            return False
+
+        with transaction.atomic():
+            released = TokenReservation.objects.filter(pk=reservation.pk, status=STATUS_RESERVED).update(
+                status=STATUS_RELEASED, updated_at=timezone.now(),
+            )
+            if not released:
+                return False
+            self._apply(reservation.subscription_id, reservation.kind, reservation.amount, 0)
+
+        reservation.status = STATUS_RELEASED
+        return True
+
+    def release_expired(self, batch_size: int = 500) -> int:
+        """Release reservations whose generation never settled them."""
+        from planandsubscription.models import TokenReservation
+
+        expired = list(
+            TokenReservation.objects
+            .filter(status=STATUS_RESERVED, expires_at__lt=timezone.now())
+            .order_by('expires_at')[:batch_size]
+        )
+        released = sum(1 for reservation in expired if self.release(reservation))
+        if released:
+            logger.info(f"Released {released} expired token reservations")
+        return released
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _apply(subscription_id: int, kind: str, balance_delta: int, used_delta: int,
+               require_balance: bool = False) -> bool:
+        """Apply deltas to a subscription in one UPDATE; False if no row matched."""
+        from planandsubscription.models import Subscription
+
+        balance_field, used_field = LEDGER_FIELDS[kind]
+        rows = Subscription.objects.filter(pk=subscription_id)
+        if require_balance and balance_delta < 0:
+            rows = rows.filter(**{f'{balance_field}__gte': -balance_delta})
+
+        changes = {balance_field: F(balance_field) + balance_delta}
+        if used_delta:
+            changes[used_field] = F(used_field) + used_delta
+        if rows.update(**changes) != 1:
+            return False
+        # UPDATE skips post_save, so drop cached balances here
+        entitlement_service.invalidate_subscription(subscription_id)
+        return True
+
+    @staticmethod
+    def _insufficient(kind: str) -> InsufficientTokensError:
+        if kind == KIND_FILE:
+            return InsufficientTokensError('Insufficient file tokens.')
+        return InsufficientTokensError()
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+token_ledger = TokenLedger()
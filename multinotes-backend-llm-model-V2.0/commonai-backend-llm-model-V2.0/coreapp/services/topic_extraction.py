@@ -468,6 +468,9 @@ class ConversationTopicAnalyzer:
         """
         Get aggregated topics for a user's recent conversations.
 
+        Reads the per-prompt topic index (see topic_index), so nothing is
+        re-extracted here.
+
         Args:
             user_id: User ID
             limit: Max conversations to analyze
@@ -479,6 +482,7 @@ class ConversationTopicAnalyzer:
         from django.utils import timezone
         from datetime import timedelta
         from coreapp.models import Prompt
+        from coreapp.services.topic_index import topic_index
 
         cutoff_date = timezone.now() - timedelta(days=days)
 
@@ -486,52 +490,18 @@ class ConversationTopicAnalyzer:
             user_id=user_id,
             is_delete=False,
             created_at__gte=cutoff_date
-        ).order_by('-created_at')[:limit]
-
-        all_topics = []
-        category_counts = Counter()
-
-        for prompt in prompts:
-            result = self.analyze_conversation(prompt.id)
-            all_topics.extend(result.topics)
-            for cat, count in result.categories.items():
-                category_counts[cat] += count
-
-        # Aggregate topics
-        topic_scores = {}
-        for topic in all_topics:
-            name = topic.name.lower()
-            if name not in topic_scores:
-                topic_scores[name] = {
-                    'name': topic.name,
-                    'total_score': 0,
-                    'count': 0,
-                    'category': topic.category,
-                }
-            topic_scores[name]['total_score'] += topic.score
-            topic_scores[name]['count'] += 1
-
-        # Calculate average scores
-        aggregated_topics = []
-        for name, data in topic_scores.items():
-            avg_score = data['total_score'] / data['count']
-            aggregated_topics.append({
-                'name': data['name'],
-                'score': round(avg_score, 3),
-                'frequency': data['count'],
-                'category': data['category'],
-            })
-
-        # Sort by frequency * score
-        aggregated_topics.sort(
-            key=lambda t: t['frequency'] * t['score'],
-            reverse=True
         )
 
+        # Narrow the window to the newest `limit` conversations
+        oldest = prompts.order_by('-created_at').values_list('created_at', flat=True)[limit - 1:limit]
+        since = oldest[0] if oldest else cutoff_date
+
+        topics, categories = topic_index.user_topics(user_id, since)
+
         return {
-            'topics': aggregated_topics[:20],
-            'categories': dict(category_counts),
-            'total_conversations': prompts.count(),
+            'topics': topics,
+            'categories': categories,
+            'total_conversations': min(prompts.count(), limit),
             'period_days': days,
         }
 
@@ -555,50 +525,30 @@ class ConversationTopicAnalyzer:
         from django.utils import timezone
         from datetime import timedelta
         from coreapp.models import Prompt
+        from coreapp.services.topic_index import topic_index
 
         cutoff_date = timezone.now() - timedelta(days=days)
 
-        prompts = Prompt.objects.filter(
-            user_id=user_id,
-            is_delete=False,
-            created_at__gte=cutoff_date
-        ).order_by('created_at')
-
-        # Group prompts by interval
-        interval_days = 7 if interval == 'week' else 1
-        periods = {}
-
-        for prompt in prompts:
-            period_start = prompt.created_at.date()
-            if interval == 'week':
-                # Round to start of week
-                period_start = period_start - timedelta(days=period_start.weekday())
-
-            period_key = period_start.isoformat()
-
-            if period_key not in periods:
-                periods[period_key] = []
-            periods[period_key].append(prompt.id)
+        conversations = (
+            Prompt.objects.filter(
+                user_id=user_id,
+                is_delete=False,
+                created_at__gte=cutoff_date
+            )
+            .annotate(period=topic_index.period('created_at', interval))
+            .values_list('period')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        top_topics = topic_index.trends(user_id, cutoff_date, interval)
 
-        # Analyze each period
         trends = []
-        for period_key, prompt_ids in sorted(periods.items()):
-            period_topics = []
-
-            for prompt_id in prompt_ids:
-                result = self.analyze_conversation(prompt_id)
-                period_topics.extend(result.topics)
-
-            # Aggregate topics for this period
-            topic_counts = Counter(t.name.lower() for t in period_topics)
-
+        for period, count in sorted(conversations):
+            period_key = period.isoformat()
             trends.append({
                 'period': period_key,
-                'conversation_count': len(prompt_ids),
-                'top_topics': [
-                    {'name': name, 'count': count}
-                    for name, count in topic_counts.most_common(5)
-                ],
+                'conversation_count': count,
+                'top_topics': top_topics.get(period_key, []),
             })
 
         return trends
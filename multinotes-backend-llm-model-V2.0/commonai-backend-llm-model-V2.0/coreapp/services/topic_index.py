@@ -0,0 +1,241 @@
+"""
+Prompt Topic Index for MultinotesAI.
+
+This module provides:
+- Topics extracted once per prompt (with its responses) into PromptTopic
+  rows, in a Celery task queued when a response is saved
+- Bulk extraction of many prompts with two reads and one write, with the
+  CPU-bound extraction step pluggable into a process pool for backfills
+- Topic summaries and trends as SQL aggregations over the stored rows
+
+ConversationTopicAnalyzer reads its user topics and trends from here
+instead of re-running extraction over every prompt in the window.
+"""
+
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import Avg, Count, DateField, Max, Sum
+from django.db.models.functions import Trunc
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Configuration
+# =============================================================================
+
+MAX_NAME_LENGTH = 100
+MAX_CATEGORY_LENGTH = 50
+
+
+@dataclass
+class TopicSource:
+    """A prompt and its responses, ready for extraction."""
+    prompt_id: int
+    user_id: int
+    created_at: datetime
+    messages: List[Dict[str, str]]
+
+
+def extract_conversation_topics(messages: List[Dict[str, str]]) -> List[Tuple[str, str, float]]:
+    """
+    (name, category, score) of a conversation's topics.
+
+    Module-level and database-free so it can run in worker processes.
+    """
+    from coreapp.services.topic_extraction import topic_extractor
+
+    try:
+        result = topic_extractor.extract_from_conversation(messages)
+    except Exception as e:
+        logger.error(f"Topic extraction failed: {e}")
+        return []
+    return [(topic.name, topic.category or '', topic.score) for topic in result.topics]
+
+
+# =============================================================================
+# Topic Index
+# =============================================================================
+
+class TopicIndex:
+    """
+    Maintain and query per-prompt topics.
+
+    Usage:
+        topic_index.schedule(prompt_id)           # after a response changes
+        topic_index.index_prompts([1, 2, 3])      # extract and store now
+        topic_index.user_topics(user_id, since)   # aggregated summary
+        topic_index.trends(user_id, since, 'week')
+    """
+
+    # -------------------------------------------------------------------------
+    # Maintenance
+    # -------------------------------------------------------------------------
+
+    def schedule(self, prompt_id: int):
+        """Queue extraction for a prompt once the current transaction commits."""
+        transaction.on_commit(lambda: self._enqueue([prompt_id]))
+
+    def _enqueue(self, prompt_ids: List[int]):
+        from coreapp.tasks.topic_tasks import index_prompt_topics
+
+        try:
+            index_prompt_topics.delay(prompt_ids)
+        except Exception as e:
+            logger.warning(f"Failed to queue topic extraction for prompts {prompt_ids}: {e}")
+
+    def remove(self, prompt_ids: Iterable[int]):
+        from coreapp.models import PromptTopic
+
+        PromptTopic.objects.filter(prompt_id__in=list(prompt_ids)).delete()
+
+    def load(self, prompt_ids: Sequence[int]) -> List[TopicSource]:
+        """Live prompts among ``prompt_ids`` with their live responses (two queries)."""
+        from coreapp.models import Prompt, PromptResponse
+
+        responses = defaultdict(list)
+        rows = (
+            PromptResponse.objects
+            .filter(prompt_id__in=prompt_ids, is_delete=False)
+            .order_by('created_at', 'id')
+            .values_list('prompt_id', 'response_text')
+        )
+        for prompt_id, text in rows:
+            responses[prompt_id].append({'role': 'assistant', 'content': text or ''})
+
+        prompts = (
+            Prompt.objects
+            .filter(id__in=prompt_ids, is_delete=False)
+            .order_by('id')
+            .values_list('id', 'user_id', 'created_at', 'prompt_text')
+        )
+        return [
+            TopicSource(
+                prompt_id=prompt_id,
+                user_id=user_id,
+                created_at=created_at,
+                messages=[{'role': 'user', 'content': text or ''}] + responses[prompt_id],
+            )
+            for prompt_id, user_id, created_at, text in prompts
+        ]
+
+    def index_prompts(self, prompt_ids: Sequence[int], map_func: Callable = map) -> int:
+        """
+        Extract and store the topics of many prompts.
+
+        ``map_func`` runs the extraction (e.g. a process pool's map); reads
+        and writes stay in this process. Deleted or missing prompts lose
+        their rows. Returns the topic rows written.
+        """
+        from coreapp.models import PromptTopic
+
+        prompt_ids = list(prompt_ids)
+        if not prompt_ids:
+            return 0
+
+        sources = self.load(prompt_ids)
+        extracted = list(map_func(extract_conversation_topics, [source.messages for source in sources]))
+
+        topics = []
+        for source, source_topics in zip(sources, extracted):
+            seen = set()
+            for name, category, score in source_topics:
+                name = name[:MAX_NAME_LENGTH]
+                if name in seen:
+                    continue
+                seen.add(name)
+                topics.append(PromptTopic(
+                    prompt_id=source.prompt_id,
+                    user_id=source.user_id,
+                    name=name,
+                    category=category[:MAX_CATEGORY_LENGTH],
+                    score=score,
+                    prompt_created_at=source.created_at,
+                ))
+
+        with transaction.atomic():
+            PromptTopic.objects.filter(prompt_id__in=prompt_ids).delete()
+            PromptTopic.objects.bulk_create(topics)
+        return len(topics)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def user_topics(self, user_id: int, since: datetime, limit: int = 20) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        A user's topics since ``since``, ranked by frequency x average score.
+
+        Returns (topics, category counts), aggregated in the database.
+        """
+        from coreapp.models import PromptTopic
+
+        rows = PromptTopic.objects.filter(user_id=user_id, prompt_created_at__gte=since)
+
+        ranked = (
+            rows.values('name')
+            .annotate(
+                frequency=Count('id'),
+                average=Avg('score'),
+                weight=Sum('score'),
+                category=Max('category'),
+            )
+            .order_by('-weight', 'name')[:limit]
+        )
+        topics = [
+            {
+                'name': row['name'],
+                'score': round(row['average'], 3),
+                'frequency': row['frequency'],
+                'category': row['category'] or None,
+            }
+            for row in ranked
+        ]
+
+        categories = dict(
+            rows.exclude(category='')
+            .values_list('category')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        return topics, categories
+
+    def trends(self, user_id: int, since: datetime, interval: str = 'week', top: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+        """Top topics per day or week (weeks start on Monday, UTC), keyed by ISO date."""
+        from coreapp.models import PromptTopic
+
+        counts = (
+            PromptTopic.objects
+            .filter(user_id=user_id, prompt_created_at__gte=since)
+            .annotate(period=self.period('prompt_created_at', interval))
+            .values_list('period', 'name')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+
+        by_period = defaultdict(list)
+        for period, name, count in counts:
+            by_period[period.isoformat()].append({'name': name.lower(), 'count': count})
+
+        return {
+            period: sorted(topics, key=lambda t: (-t['count'], t['name']))[:top]
+            for period, topics in by_period.items()
+        }
+
+    @staticmethod
+    def period(field: str, interval: str) -> Trunc:
+        """Truncate a datetime field to its day or week, as a UTC date."""
+        kind = 'week' if interval == 'week' else 'day'
+        return Trunc(field, kind, output_field=DateField(), tzinfo=dt_timezone.utc)
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+topic_index = TopicIndex()
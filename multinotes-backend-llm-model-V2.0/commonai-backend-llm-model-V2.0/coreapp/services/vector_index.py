@@ -0,0 +1,302 @@
+"""
+Vector Index for MultinotesAI.
+
+This module provides:
+- Compact float32 storage of embeddings (ContentEmbedding.vector) of
+  prompt responses, documents and notebooks, keyed like the full-text
+  index by (doc_type, doc_id)
+- Per-user in-memory indexes searched with one batched NumPy product
+- Incremental updates, with other workers reloading on a version bump
+
+Embeddings are L2-normalised before they are stored, so cosine similarity
+is a plain dot product and a query against a user's index is a single
+matrix-vector multiply followed by a partial sort for the top k.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Encoding
+# =============================================================================
+
+def normalize_vector(vector: Sequence[float]) -> np.ndarray:
+    """Return the vector as unit-length float32."""
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(array)
+    if norm > 0:
+        array = array / norm
+    return array
+
+
+def encode_vector(vector: Sequence[float]) -> bytes:
+    """Normalise and pack a vector into float32 bytes (4 bytes per dimension)."""
+    return normalize_vector(vector).tobytes()
+
+
+def decode_vector(blob: bytes) -> np.ndarray:
+    """Unpack float32 bytes written by encode_vector."""
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+# =============================================================================
+# Per-user Index
+# =============================================================================
+
+class UserVectorIndex:
+    """
+    Dense matrix of one user's normalised embeddings.
+
+    Rows are kept in a preallocated matrix that grows by doubling, so
+    incremental adds are amortised O(d); removals move the last row into
+    the freed slot. Rows are identified by hashable keys, which VectorIndex
+    sets to (doc_type, doc_id).
+    """
+
+    def __init__(self, dimensions: int, keys: Sequence[Hashable] = (), matrix: np.ndarray = None, version: int = 0):
+        self.dimensions = dimensions
+        self.version = version
+        self.size = len(keys)
+        capacity = max(self.size, 16)
+        self._matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        self._keys = list(keys) + [None] * (capacity - self.size)
+        if self.size:
+            self._matrix[:self.size] = matrix
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the index matrix."""
+        return self._matrix.nbytes
+
+    def upsert(self, key: Hashable, vector: np.ndarray):
+        """Add or replace the (already normalised) vector of an item."""
+        row = self._rows.get(key)
+        if row is None:
+            if self.size == len(self._keys):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self._rows[key] = row
+            self._keys[row] = key
+        self._matrix[row] = vector
+
+    def remove(self, key: Hashable) -> bool:
+        """Drop an item; False if it was not indexed."""
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        last = self.size - 1
+        if row != last:
+            moved = self._keys[last]
+            self._matrix[row] = self._matrix[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+        self._keys[last] = None
+        self.size = last
+        return True
+
+    def search(self, query: np.ndarray, k: int = 10, min_similarity: float = None) -> List[Tuple[Hashable, float]]:
+        """Top ``k`` (key, cosine similarity) pairs for a normalised query."""
+        if not self.size or k <= 0 or query.shape[0] != self.dimensions:
+            return []
+
+        scores = self._matrix[:self.size] @ query
+        if k < self.size:
+            top = np.argpartition(scores, -k)[-k:]
+            top = top[np.argsort(scores[top])[::-1]]
+        else:
+            top = np.argsort(scores)[::-1]
+
+        results = [(self._keys[row], float(scores[row])) for row in top]
+        if min_similarity is not None:
+            results = [(key, score) for key, score in results if score >= min_similarity]
+        return results
+
+    def _grow(self):
+        capacity = len(self._keys) * 2
+        matrix = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        matrix[:self.size] = self._matrix[:self.size]
+        self._matrix = matrix
+        self._keys.extend([None] * (capacity - len(self._keys)))
+
+
+# =============================================================================
+# Vector Index
+# =============================================================================
+
+class VectorIndex:
+    """
+    Semantic search over ContentEmbedding rows, one index per user.
+
+    Indexes are loaded lazily and kept in a bounded LRU per worker. Every
+    write bumps a per-user version in the shared cache; a worker whose
+    loaded index is behind that version reloads it on the next search.
+
+    Usage:
+        vector_index.add(user.id, DOC_DOCUMENT, document.id, embedding)
+        matches = vector_index.search(user.id, query_embedding, k=50)
+        # [((doc_type, doc_id), similarity), ...]
+    """
+
+    VERSION_KEY = 'vector_index:version:{user_id}'
+
+    def __init__(self, max_users: int = None):
+        self.max_users = max_users
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _max_users(self) -> int:
+        if self.max_users is not None:
+            return self.max_users
+        return getattr(settings, 'VECTOR_INDEX_MAX_USERS', 256)
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def add(self, user_id: int, doc_type: str, doc_id: int, vector: Sequence[float]):
+        """Store (or replace) the embedding of a response, document or notebook."""
+        from coreapp.models import ContentEmbedding
+
+        normalized = normalize_vector(vector)
+        ContentEmbedding.objects.update_or_create(
+            doc_type=doc_type, doc_id=doc_id,
+            defaults={'user_id': user_id, 'dimensions': normalized.shape[0], 'vector': normalized.tobytes()},
+        )
+        key = (doc_type, doc_id)
+        self._apply(user_id, lambda index: index.upsert(key, normalized)
+                    if index.dimensions == normalized.shape[0] else False)
+
+    def remove(self, doc_type: str, doc_id: int, user_id: int = None) -> bool:
+        """Delete the embedding of a response, document or notebook."""
+        from coreapp.models import ContentEmbedding
+
+        embeddings = ContentEmbedding.objects.filter(doc_type=doc_type, doc_id=doc_id)
+        if user_id is None:
+            user_id = embeddings.values_list('user_id', flat=True).first()
+            if user_id is None:
+                return False
+
+        deleted, _ = embeddings.filter(user_id=user_id).delete()
+        if deleted:
+            self._apply(user_id, lambda index: index.remove((doc_type, doc_id)) or True)
+        return bool(deleted)
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def search(self, user_id: int, query: Sequence[float], k: int = 10,
+               min_similarity: float = None) -> List[Tuple[Tuple[str, int], float]]:
+        """Top ``k`` ((doc_type, doc_id), similarity) matches among a user's content."""
+        index = self.get_index(user_id)
+        if index is None:
+            return []
+        return index.search(normalize_vector(query), k=k, min_similarity=min_similarity)
+
+    def get_index(self, user_id: int) -> Optional[UserVectorIndex]:
+        """The user's loaded index, reloading it if another worker changed it."""
+        version = self._version(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = self._load(user_id, version)
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self._max_users():
+                self._indexes.popitem(last=False)
+        return index
+
+    def evict(self, user_id: int = None):
+        """Forget loaded indexes (all of them when no user is given)."""
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(user_id, None)
+
+    # -------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------
+
+    def _load(self, user_id: int, version: int) -> UserVectorIndex:
+        """Build a user's index from the stored embeddings."""
+        from coreapp.models import ContentEmbedding
+
+        rows = list(
+            ContentEmbedding.objects
+            .filter(user_id=user_id)
+            .order_by('-updated_at', '-id')
+            .values_list('doc_type', 'doc_id', 'dimensions', 'vector')
+        )
+        if not rows:
+            return UserVectorIndex(0, version=version)
+
+        # Vectors from an older embedding model are skipped until re-indexed
+        dimensions = rows[0][2]
+        current = [((doc_type, doc_id), bytes(blob)) for doc_type, doc_id, dims, blob in rows if dims == dimensions]
+        if len(current) < len(rows):
+            logger.warning(
+                f"Skipped {len(rows) - len(current)} embeddings of user {user_id} "
+                f"not matching {dimensions} dimensions"
+            )
+
+        keys = [key for key, _ in current]
+        matrix = np.frombuffer(b''.join(blob for _, blob in current), dtype=np.float32).reshape(len(keys), dimensions)
+        return UserVectorIndex(dimensions, keys, matrix, version=version)
+
+    def _apply(self, user_id: int, change):
+        """
+        Bump the user's version and apply ``change`` to the local index.
+
+        The change is only applied when the local index was current before
+        the bump; ``change`` returns False when it cannot be applied.
+        """
+        version = self._bump(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            if index.version == version - 1 and change(index) is not False:
+                index.version = version
+            else:
+                # Missed another worker's write (or dimensions changed): reload lazily
+                del self._indexes[user_id]
+
+    def _version(self, user_id: int) -> int:
+        return cache.get(self.VERSION_KEY.format(user_id=user_id), 0)
+
+    def _bump(self, user_id: int) -> int:
+        key = self.VERSION_KEY.format(user_id=user_id)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            return cache.incr(key)
+
+
+# =============================================================================
+# Singleton Instance
+# =============================================================================
+
+vector_index = VectorIndex()
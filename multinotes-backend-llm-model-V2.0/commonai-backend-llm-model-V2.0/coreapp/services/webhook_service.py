@@ -3,23 +3,35 @@ Webhook Service for MultinotesAI.
 
 This module provides webhook functionality:
 - Webhook registration and management
-- Event dispatching
-- Retry logic with exponential backoff
+- Event dispatching through an indexed event -> webhook subscription table
+- Pooled, per-endpoint batched delivery
+- Retry logic with exponential backoff and jitter
 - Signature verification
+
+Dispatching an event is one indexed query for the subscribed webhooks, one
+bulk insert for the deliveries and one task per endpoint batch. Delivery
+workers share a keep-alive HTTP session, run a few requests per endpoint
+at a time and write every outcome back in bulk.
 """
 
 import logging
 import hmac
 import hashlib
 import json
+import random
+import threading
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 from enum import Enum
 
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -116,12 +128,52 @@ class Webhook(models.Model):
         if not self.secret:
             self.secret = self._generate_secret()
         super().save(*args, **kwargs)
+        self.sync_subscriptions()
 
     @staticmethod
     def _generate_secret() -> str:
         """Generate a random webhook secret."""
         return f"whsec_{uuid.uuid4().hex}"
 
+    def sync_subscriptions(self):
+        """Make the subscription rows match ``events`` (no rows while inactive)."""
+        wanted = set(self.events or []) if self.is_active and not self.is_delete else set()
+        current = set(self.subscriptions.values_list('event_type', flat=True))
+
+        if current - wanted:
+            self.subscriptions.filter(event_type__in=current - wanted).delete()
+        if wanted - current:
+            WebhookSubscription.objects.bulk_create([
+                WebhookSubscription(webhook=self, user_id=self.user_id, event_type=event_type)
+                for event_type in wanted - current
+            ], ignore_conflicts=True)
+
+
+class WebhookSubscription(models.Model):
+    """One (webhook, event type) pair; '*' subscribes to every event."""
+
+    webhook = models.ForeignKey(
+        Webhook,
+        on_delete=models.CASCADE,
+        related_name='subscriptions'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='webhook_subscriptions'
+    )
+    event_type = models.CharField(max_length=100)
+
+    class Meta:
+        db_table = 'webhook_subscriptions'
+        unique_together = ('webhook', 'event_type')
+        indexes = [
+            models.Index(fields=['event_type', 'user']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} -> {self.webhook_id}"
+
 
 class WebhookDelivery(models.Model):
     """Webhook delivery attempt record."""
@@ -185,10 +237,16 @@ class WebhookService:
 
     DEFAULT_TIMEOUT = 30  # seconds
     MAX_RETRIES = 5
-    RETRY_DELAYS = [60, 300, 900, 3600, 7200]  # 1min, 5min, 15min, 1hr, 2hr
+    RETRY_BASE_DELAY = 60  # seconds before the first retry
+    RETRY_MAX_DELAY = 7200  # 2hr cap on the backoff
+    BATCH_SIZE = 100  # deliveries per delivery task
 
     def __init__(self):
         self.timeout = getattr(settings, 'WEBHOOK_TIMEOUT', self.DEFAULT_TIMEOUT)
+        self.concurrency = getattr(settings, 'WEBHOOK_DELIVERY_CONCURRENCY', 16)
+        self.endpoint_concurrency = getattr(settings, 'WEBHOOK_ENDPOINT_CONCURRENCY', 2)
+        self._session = None
+        self._session_lock = threading.Lock()
 
     # -------------------------------------------------------------------------
     # Webhook Registration
@@ -294,45 +352,44 @@ class WebhookService:
         payload = payload or {}
         event_name = event_type.value if isinstance(event_type, WebhookEventType) else event_type
 
-        # Find matching webhooks
-        queryset = Webhook.objects.filter(
-            is_active=True,
-            is_delete=False
-        )
-
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
-
-        # Filter by event subscription
-        webhooks = [
-            w for w in queryset
-            if event_name in w.events or '*' in w.events
-        ]
+        webhooks = self.subscribed_webhooks(event_name, user_id)
 
         if not webhooks:
             logger.debug(f"No webhooks subscribed to event: {event_name}")
             return 0
 
-        # Create delivery records
-        deliveries = []
-        for webhook in webhooks:
-            delivery = WebhookDelivery.objects.create(
+        # Create delivery records (ids are generated client-side)
+        deliveries = WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(
                 webhook=webhook,
                 event_type=event_name,
                 payload=self._build_payload(event_name, payload, webhook),
+                max_attempts=self.MAX_RETRIES,
             )
-            deliveries.append(delivery)
+            for webhook in webhooks
+        ])
 
         # Deliver webhooks
         if async_delivery:
             self._deliver_async(deliveries)
         else:
-            for delivery in deliveries:
-                self._deliver(delivery)
+            self.deliver_batch(deliveries)
 
         logger.info(f"Dispatched {len(deliveries)} webhooks for event: {event_name}")
         return len(deliveries)
 
+    def subscribed_webhooks(self, event_name: str, user_id: int = None) -> List[Webhook]:
+        """Active webhooks subscribed to ``event_name`` (or '*'), via the subscription index."""
+        subscriptions = WebhookSubscription.objects.filter(event_type__in=[event_name, '*'])
+        if user_id:
+            subscriptions = subscriptions.filter(user_id=user_id)
+
+        return list(Webhook.objects.filter(
+            id__in=subscriptions.values('webhook_id'),
+            is_active=True,
+            is_delete=False
+        ))
+
     def _build_payload(
         self,
         event_type: str,
@@ -348,6 +405,28 @@ class WebhookService:
             'webhook_id': str(webhook.id),
         }
 
+    # -------------------------------------------------------------------------
+    # Delivery
+    # -------------------------------------------------------------------------
+
+    @property
+    def session(self) -> requests.Session:
+        """Keep-alive HTTP session shared by the delivery threads of this process."""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=self.concurrency,
+                        pool_maxsize=self.concurrency,
+                        max_retries=0,
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    session.headers['User-Agent'] = 'MultinotesAI-Webhook/1.0'
+                    self._session = session
+        return self._session
+
     def _deliver(self, delivery: WebhookDelivery) -> bool:
         """
         Deliver a single webhook.
@@ -358,8 +437,54 @@ class WebhookService:
         Returns:
             True if successful
         """
+        return self.deliver_batch([delivery])[0]
+
+    def deliver_batch(self, deliveries: List[WebhookDelivery]) -> List[bool]:
+        """
+        Deliver webhooks, at most ``endpoint_concurrency`` requests per endpoint.
+
+        Each endpoint's deliveries are split into that many lanes, each lane
+        sends its requests one after another over the pooled session, and the
+        lanes share a pool of ``concurrency`` threads. The HTTP calls are the
+        only work done on the threads; the outcomes are saved here in bulk.
+
+        Returns:
+            Success flag per delivery, in the given order
+        """
+        if not deliveries:
+            return []
+
+        endpoints = defaultdict(list)
+        for delivery in deliveries:
+            endpoints[delivery.webhook.url].append(delivery)
+
+        lanes = [
+            batch[lane::self.endpoint_concurrency]
+            for batch in endpoints.values()
+            for lane in range(min(self.endpoint_concurrency, len(batch)))
+        ]
+
+        def send_lane(lane):
+            return [(delivery, self._send(delivery)) for delivery in lane]
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(lanes))) as executor:
+            outcomes = dict(
+                (delivery.id, outcome)
+                for lane_outcomes in executor.map(send_lane, lanes)
+                for delivery, outcome in lane_outcomes
+            )
+
+        attempted = [
+            delivery for delivery in deliveries
+            if self._apply_outcome(delivery, outcomes[delivery.id])
+        ]
+        self._save_outcomes(deliveries, attempted)
+
+        return [delivery.status == WebhookDeliveryStatus.SUCCESS.value for delivery in deliveries]
+
+    def _send(self, delivery: WebhookDelivery) -> Dict[str, Any]:
+        """POST one delivery; returns the response details or the error."""
         webhook = delivery.webhook
-        delivery.attempt_count += 1
 
         try:
             # Generate signature
@@ -368,17 +493,15 @@ class WebhookService:
                 webhook.secret
             )
 
-            # Make request
             headers = {
                 'Content-Type': 'application/json',
-                'User-Agent': 'MultinotesAI-Webhook/1.0',
                 'X-Webhook-ID': str(webhook.id),
                 'X-Webhook-Signature': signature,
                 'X-Webhook-Timestamp': str(int(timezone.now().timestamp())),
             }
 
             start_time = timezone.now()
-            response = requests.post(
+            response = self.session.post(
                 webhook.url,
                 json=delivery.payload,
                 headers=headers,
@@ -386,86 +509,124 @@ class WebhookService:
             )
             end_time = timezone.now()
 
-            # Update delivery record
-            delivery.response_status_code = response.status_code
-            delivery.response_body = response.text[:5000]  # Limit stored response
-            delivery.response_time_ms = int((end_time - start_time).total_seconds() * 1000)
-
-            if 200 <= response.status_code < 300:
-                delivery.status = WebhookDeliveryStatus.SUCCESS.value
-                delivery.delivered_at = timezone.now()
-
-                # Update webhook stats
-                webhook.total_deliveries += 1
-                webhook.successful_deliveries += 1
-                webhook.last_delivery_at = timezone.now()
-                webhook.save()
-
-                logger.info(f"Webhook delivered: {delivery.id} to {webhook.url}")
-                delivery.save()
-                return True
-            else:
-                delivery.error_message = f"HTTP {response.status_code}: {response.text[:500]}"
-                self._handle_failure(delivery)
-                return False
+            return {
+                'status_code': response.status_code,
+                'body': response.text[:5000],  # Limit stored response
+                'time_ms': int((end_time - start_time).total_seconds() * 1000),
+            }
 
         except requests.Timeout:
-            delivery.error_message = "Request timed out"
-            self._handle_failure(delivery)
-            return False
+            return {'error': "Request timed out", 'retry': True}
 
         except requests.RequestException as e:
-            delivery.error_message = str(e)
-            self._handle_failure(delivery)
-            return False
+            return {'error': str(e), 'retry': True}
 
         except Exception as e:
             logger.exception(f"Webhook delivery error: {e}")
-            delivery.error_message = str(e)
+            return {'error': str(e), 'retry': False}
+
+    def _apply_outcome(self, delivery: WebhookDelivery, outcome: Dict[str, Any]) -> bool:
+        """
+        Set the delivery's status, response and next retry from one attempt.
+
+        Returns:
+            False for unexpected errors, which do not count towards the stats
+        """
+        delivery.attempt_count += 1
+        delivery.next_retry_at = None
+
+        if 'status_code' in outcome:
+            delivery.response_status_code = outcome['status_code']
+            delivery.response_body = outcome['body']
+            delivery.response_time_ms = outcome['time_ms']
+
+            if 200 <= outcome['status_code'] < 300:
+                delivery.status = WebhookDeliveryStatus.SUCCESS.value
+                delivery.delivered_at = timezone.now()
+                logger.info(f"Webhook delivered: {delivery.id} to {delivery.webhook.url}")
+                return True
+
+            delivery.error_message = f"HTTP {outcome['status_code']}: {outcome['body'][:500]}"
+        elif not outcome['retry']:
+            delivery.error_message = outcome['error']
             delivery.status = WebhookDeliveryStatus.FAILED.value
-            delivery.save()
             return False
-
-    def _handle_failure(self, delivery: WebhookDelivery):
-        """Handle delivery failure and schedule retry if applicable."""
-        webhook = delivery.webhook
+        else:
+            delivery.error_message = outcome['error']
 
         if delivery.attempt_count < delivery.max_attempts:
-            # Schedule retry
-            retry_index = min(delivery.attempt_count - 1, len(self.RETRY_DELAYS) - 1)
-            retry_delay = self.RETRY_DELAYS[retry_index]
-
             delivery.status = WebhookDeliveryStatus.RETRYING.value
-            delivery.next_retry_at = timezone.now() + timedelta(seconds=retry_delay)
+            delivery.next_retry_at = timezone.now() + timedelta(seconds=self.retry_delay(delivery.attempt_count))
 
             logger.warning(
                 f"Webhook delivery failed, scheduling retry "
                 f"(attempt {delivery.attempt_count}/{delivery.max_attempts}): {delivery.id}"
             )
         else:
-            # Max retries reached
             delivery.status = WebhookDeliveryStatus.FAILED.value
-            webhook.failed_deliveries += 1
-
             logger.error(f"Webhook delivery permanently failed: {delivery.id}")
+        return True
 
-        webhook.total_deliveries += 1
-        webhook.save()
-        delivery.save()
+    def retry_delay(self, attempt: int) -> float:
+        """
+        Seconds before retry number ``attempt`` (1-based): the exponential
+        delay, jittered over its upper half so failed bursts spread out.
+        """
+        delay = min(self.RETRY_MAX_DELAY, self.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+        return random.uniform(delay / 2, delay)
+
+    def _save_outcomes(self, deliveries: List[WebhookDelivery], attempted: List[WebhookDelivery]):
+        """Bulk-save the deliveries and add the ``attempted`` ones to their webhooks' stats."""
+        WebhookDelivery.objects.bulk_update(deliveries, [
+            'status', 'attempt_count', 'next_retry_at', 'error_message', 'delivered_at',
+            'response_status_code', 'response_body', 'response_time_ms',
+        ], batch_size=500)
+
+        stats = defaultdict(lambda: {'total': 0, 'successful': 0, 'failed': 0})
+        for delivery in attempted:
+            if delivery.status == WebhookDeliveryStatus.SUCCESS.value:
+                stats[delivery.webhook_id]['successful'] += 1
+            elif delivery.status == WebhookDeliveryStatus.FAILED.value:
+                stats[delivery.webhook_id]['failed'] += 1
+            stats[delivery.webhook_id]['total'] += 1
+
+        now = timezone.now()
+        for webhook_id, counts in stats.items():
+            changes = {
+                'total_deliveries': F('total_deliveries') + counts['total'],
+                'successful_deliveries': F('successful_deliveries') + counts['successful'],
+                'failed_deliveries': F('failed_deliveries') + counts['failed'],
+                'updated_at': now,
+            }
+            if counts['successful']:
+                changes['last_delivery_at'] = now
+            Webhook.objects.filter(id=webhook_id).update(**changes)
 
     def _deliver_async(self, deliveries: List[WebhookDelivery]):
-        """Deliver webhooks asynchronously using Celery."""
+        """Queue one Celery task per endpoint batch of deliveries."""
         try:
-            from backend.celery_tasks import deliver_webhook_task
+            from coreapp.tasks.webhook_tasks import deliver_webhook_batch
 
+            endpoints = defaultdict(list)
             for delivery in deliveries:
-                deliver_webhook_task.delay(str(delivery.id))
+                endpoints[delivery.webhook.url].append(str(delivery.id))
+
+            for delivery_ids in endpoints.values():
+                for start in range(0, len(delivery_ids), self.BATCH_SIZE):
+                    deliver_webhook_batch.delay(delivery_ids[start:start + self.BATCH_SIZE])
 
         except ImportError:
             # Celery not available, deliver synchronously
             logger.warning("Celery not available, delivering webhooks synchronously")
-            for delivery in deliveries:
-                self._deliver(delivery)
+            self.deliver_batch(deliveries)
+
+    def deliver_pending(self, delivery_ids: List[str]) -> int:
+        """Deliver the given deliveries that are still pending (delivery task body)."""
+        deliveries = list(WebhookDelivery.objects.select_related('webhook').filter(
+            id__in=delivery_ids,
+            status=WebhookDeliveryStatus.PENDING.value
+        ))
+        return sum(self.deliver_batch(deliveries))
 
     def _generate_signature(self, payload: Dict, secret: str) -> str:
         """Generate HMAC signature for webhook payload."""
@@ -480,17 +641,30 @@ class WebhookService:
     # Retry Processing
     # -------------------------------------------------------------------------
 
-    def process_pending_retries(self) -> int:
-        """Process all pending webhook retries."""
-        pending = WebhookDelivery.objects.filter(
-            status=WebhookDeliveryStatus.RETRYING.value,
-            next_retry_at__lte=timezone.now()
-        )
+    def process_pending_retries(self, limit: int = 500) -> int:
+        """
+        Retry the deliveries whose backoff has elapsed, oldest due first.
+
+        Reads at most ``limit`` rows through the (status, next_retry_at)
+        index; rows locked by another runner are skipped, so concurrent
+        runs never retry the same delivery twice.
+        """
+        with transaction.atomic():
+            due = list(
+                WebhookDelivery.objects.select_for_update(skip_locked=True).filter(
+                    status=WebhookDeliveryStatus.RETRYING.value,
+                    next_retry_at__lte=timezone.now()
+                ).order_by('next_retry_at').values_list('id', flat=True)[:limit]
+            )
+            WebhookDelivery.objects.filter(id__in=due).update(
+                status=WebhookDeliveryStatus.PENDING.value,
+                next_retry_at=None
+            )
 
         count = 0
-        for delivery in pending:
-            self._deliver(delivery)
-            count += 1
+        for start in range(0, len(due), self.BATCH_SIZE):
+            self.deliver_pending(due[start:start + self.BATCH_SIZE])
+            count += len(due[start:start + self.BATCH_SIZE])
 
         if count > 0:
             logger.info(f"Processed {count} webhook retries")
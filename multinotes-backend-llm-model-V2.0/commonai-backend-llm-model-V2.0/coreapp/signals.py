@@ -1,8 +1,13 @@
-from django.db.models.signals import post_migrate
+import logging
+
+from django.db.models.signals import post_migrate, pre_save, post_save, post_delete
 from django.dispatch import receiver
-from .models import LLM
+from .models import LLM, Prompt, PromptResponse, Document, NoteBook, Folder, StorageUsage
 from ticketandcategory.models import Category,MainCategory
-from planandsubscription.models import UserPlan
+from planandsubscription.models import UserPlan, Subscription
+from authentication.models import Cluster
+
+logger = logging.getLogger(__name__)
 
 
 records = [
@@ -182,3 +187,129 @@ def add_static_category_data(sender, **kwargs):
         execute = True
 
 
+# Full-text and vector index maintenance. Services are imported in the receivers:
+# loading coreapp.services during app setup registers prompt_service's
+# models before models_analytics, which then fails to import.
+def _doc_type(sender):
+    from .services.text_index import DOC_RESPONSE, DOC_DOCUMENT, DOC_NOTEBOOK
+
+    return {PromptResponse: DOC_RESPONSE, Document: DOC_DOCUMENT, NoteBook: DOC_NOTEBOOK}[sender]
+
+
+@receiver(post_save, sender=PromptResponse)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=NoteBook)
+def update_text_index(sender, instance, created=False, raw=False, **kwargs):
+    from .services.text_index import text_index
+
+    if raw:
+        return
+    try:
+        text_index.index_instance(_doc_type(sender), instance, created=created)
+    except Exception as e:
+        logger.warning(f"Failed to index {sender.__name__} {instance.pk}: {e}")
+
+
+@receiver(post_delete, sender=PromptResponse)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=NoteBook)
+def remove_from_text_index(sender, instance, **kwargs):
+    from .services.text_index import text_index
+
+    try:
+        text_index.remove(_doc_type(sender), [instance.pk])
+    except Exception as e:
+        logger.warning(f"Failed to unindex {sender.__name__} {instance.pk}: {e}")
+
+
+# Vector index maintenance: rows are embedded in a Celery task
+@receiver(post_save, sender=PromptResponse)
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=NoteBook)
+def update_content_embedding(sender, instance, created=False, raw=False, **kwargs):
+    from .services.search_service import search_index_service
+
+    # Empty responses are created when a stream starts; finish() saves the text
+    if raw or (created and sender is PromptResponse and not instance.response_text):
+        return
+    search_index_service.schedule(_doc_type(sender), instance.pk)
+
+
+@receiver(post_delete, sender=PromptResponse)
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=NoteBook)
+def remove_content_embedding(sender, instance, **kwargs):
+    from .services.search_service import search_index_service
+
+    search_index_service.remove_index(_doc_type(sender), instance.pk, instance.user_id)
+
+
+# Prompt topic index maintenance
+@receiver(post_save, sender=PromptResponse)
+@receiver(post_delete, sender=PromptResponse)
+def update_prompt_topics(sender, instance, created=False, raw=False, **kwargs):
+    from .services.topic_index import topic_index
+
+    # Empty responses are created when a stream starts; finish() schedules those
+    if raw or (created and not instance.response_text):
+        return
+    topic_index.schedule(instance.prompt_id)
+
+
+@receiver(post_save, sender=Prompt)
+def remove_deleted_prompt_topics(sender, instance, raw=False, **kwargs):
+    from .services.topic_index import topic_index
+
+    if raw or not instance.is_delete:
+        return
+    try:
+        topic_index.remove([instance.pk])
+    except Exception as e:
+        logger.warning(f"Failed to remove topics of prompt {instance.pk}: {e}")
+
+
+# Folder tree index maintenance (rows of deleted folders cascade)
+@receiver(pre_save, sender=Folder)
+def remember_folder_parent(sender, instance, raw=False, **kwargs):
+    instance._tree_moved = False
+    if raw or not instance.pk:
+        return
+    previous = Folder.objects.filter(pk=instance.pk).values_list('parent_folder_id', flat=True).first()
+    instance._tree_moved = previous != instance.parent_folder_id
+
+
+@receiver(post_save, sender=Folder)
+def update_folder_tree(sender, instance, created=False, raw=False, **kwargs):
+    from .services.folder_tree import folder_tree
+
+    if raw:
+        return
+    if created:
+        folder_tree.on_created(instance)
+    elif getattr(instance, '_tree_moved', False):
+        folder_tree.on_moved(instance)
+
+
+# Entitlement cache invalidation
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_entitlements(sender, instance, **kwargs):
+    from .services.entitlements import entitlement_service
+
+    entitlement_service.invalidate_subscription(instance.pk, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=StorageUsage)
+@receiver(post_delete, sender=StorageUsage)
+def invalidate_storage_entitlements(sender, instance, **kwargs):
+    from .services.entitlements import entitlement_service
+
+    entitlement_service.invalidate_storage(instance.pk, user_id=instance.user_id)
+
+
+@receiver(post_save, sender=Cluster)
+@receiver(post_delete, sender=Cluster)
+def invalidate_cluster_entitlements(sender, instance, **kwargs):
+    from .services.entitlements import entitlement_service
+
+    entitlement_service.invalidate_cluster(instance.pk)
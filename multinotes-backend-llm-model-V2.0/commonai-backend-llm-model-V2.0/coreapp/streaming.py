@@ -3,12 +3,15 @@ Streaming response handler for MultinotesAI.
 
 This module provides:
 - Server-Sent Events (SSE) streaming
+- Generation frame encoding (legacy cumulative and delta protocols)
+- Replay of cached generations as a stream
 - WebSocket message handling
 - Chunked response generation
 - Stream buffering and rate limiting
 """
 
 import json
+import zlib
 import asyncio
 import logging
 from typing import Generator, AsyncGenerator, Optional, Callable, Any
@@ -102,6 +105,120 @@ class SSEStreamingResponse(StreamingHttpResponse):
                 yield SSEEvent(data=str(item)).encode()
 
 
+# =============================================================================
+# Generation Stream Frames
+# =============================================================================
+
+STREAM_MODE_CUMULATIVE = 'cumulative'
+STREAM_MODE_DELTA = 'delta'
+STREAM_MODES = (STREAM_MODE_CUMULATIVE, STREAM_MODE_DELTA)
+
+STREAM_MODE_HEADER = 'X-Stream-Mode'
+
+
+def resolve_stream_mode(request) -> str:
+    """
+    Negotiate the frame protocol for a generation stream.
+
+    Clients opt in to delta frames with ``streamMode=delta`` in the request
+    body or an ``X-Stream-Mode: delta`` header. Anything else falls back to
+    the legacy cumulative protocol so existing clients keep working.
+    """
+    mode = None
+    data = getattr(request, 'data', None)
+    if data is not None and hasattr(data, 'get'):
+        mode = data.get('streamMode')
+    if not mode:
+        mode = request.META.get('HTTP_X_STREAM_MODE')
+
+    mode = (mode or '').strip().lower()
+    return mode if mode in STREAM_MODES else STREAM_MODE_CUMULATIVE
+
+
+class GenerationStreamEncoder:
+    """
+    Encode the JSON frames yielded by the text generation streams.
+
+    Cumulative mode (legacy) repeats the whole text generated so far:
+        {"model": "GPT-4", "text": "Hello wor"}
+
+    Delta mode sends only the new fragment with a sequence number:
+        {"model": "GPT-4", "seq": 3, "delta": "wor"}
+
+    Every ``sync_interval`` delta frames, and on the final frame, the frame
+    also carries ``offset`` (UTF-8 byte length of the text so far) and
+    ``crc32`` (CRC-32 of those bytes) so a client can verify what it has
+    assembled and reconnect or refetch the response if it drifted.
+
+    Both modes end with a frame whose ``text`` is ``"DONE"``.
+
+    Usage:
+        frames = GenerationStreamEncoder(myModel, streamMode)
+        for fragment in provider_stream:
+            yield frames.chunk(fragment)
+        save(frames.text)
+        yield frames.done(promptId=..., responseId=...)
+    """
+
+    def __init__(
+        self,
+        model: str,
+        mode: str = STREAM_MODE_CUMULATIVE,
+        sync_interval: int = 32
+    ):
+        self.model = model
+        self.mode = mode if mode in STREAM_MODES else STREAM_MODE_CUMULATIVE
+        self.sync_interval = max(1, sync_interval)
+        self.seq = 0
+        self.offset = 0
+        self.crc32 = 0
+        self._parts = []
+        self._text = ''
+
+    @property
+    def is_delta(self) -> bool:
+        return self.mode == STREAM_MODE_DELTA
+
+    @property
+    def text(self) -> str:
+        """Full text generated so far."""
+        if self._parts:
+            self._text += ''.join(self._parts)
+            self._parts = []
+        return self._text
+
+    def chunk(self, fragment: str) -> str:
+        """Record a new fragment and return the frame to send for it."""
+        if self.is_delta:
+            return self._delta_frame(fragment)
+
+        self._text += fragment
+        return json.dumps({"model": self.model, "text": self._text})
+
+    def done(self, **extra) -> str:
+        """Return the final frame, carrying any saved record ids."""
+        if self.is_delta:
+            frame = {"model": self.model, "seq": self.seq + 1, **extra}
+            frame.update(offset=self.offset, crc32=self.crc32)
+        else:
+            frame = {"model": self.model, **extra}
+        frame["text"] = "DONE"
+        return json.dumps(frame)
+
+    def _delta_frame(self, fragment: str) -> str:
+        self.seq += 1
+        self._parts.append(fragment)
+
+        encoded = fragment.encode('utf-8')
+        self.offset += len(encoded)
+        self.crc32 = zlib.crc32(encoded, self.crc32)
+
+        frame = {"model": self.model, "seq": self.seq, "delta": fragment}
+        if self.seq % self.sync_interval == 0:
+            frame.update(offset=self.offset, crc32=self.crc32)
+        return json.dumps(frame)
+
+
 # =============================================================================
 # AI Stream Handler
 # =============================================================================
@@ -560,6 +677,17 @@ def create_sse_response(generator: Generator) -> SSEStreamingResponse:
     return SSEStreamingResponse(generator)
 
 
+def iter_replay_chunks(text: str, chunk_size: int = 64) -> Generator[str, None, None]:
+    """
+    Split a stored generation into stream-sized fragments.
+
+    Used to replay cached responses through GenerationStreamEncoder so a
+    cache hit reaches the client in the same frames as a live generation.
+    """
+    for start in range(0, len(text or ''), chunk_size):
+        yield text[start:start + chunk_size]
+
+
 def stream_json_array(items_generator: Generator) -> Generator[str, None, None]:
     """
     Stream items as a JSON array.
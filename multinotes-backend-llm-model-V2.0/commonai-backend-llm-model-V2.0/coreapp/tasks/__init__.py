@@ -5,6 +5,15 @@ This package contains all background tasks including:
 - Analytics collection and processing
 - Email notifications
 - Scheduled maintenance
+- Token reservation cleanup
+- Bulk folder subtree share/delete
+- Direct upload reservation cleanup
+- Scheduled generation dispatch and execution
+- Distributed batch job chunks and recovery
+- Webhook batch delivery and retries
+- Notification broadcast fan-out
+- Prompt topic extraction
+- Content embeddings for semantic search
 """
 
 from .analytics_tasks import (
@@ -15,6 +24,15 @@ from .analytics_tasks import (
     run_daily_analytics,
     cleanup_old_analytics,
 )
+from .token_tasks import release_expired_token_reservations
+from .folder_tasks import delete_folder_subtree, share_folder_subtree
+from .upload_tasks import release_expired_upload_reservations
+from .schedule_tasks import dispatch_due_scheduled_generations, execute_scheduled_generation
+from .batch_tasks import process_batch_chunk, finalize_batch_job, recover_stalled_batch_jobs
+from .webhook_tasks import deliver_webhook_batch, process_webhook_retries
+from .broadcast_tasks import send_broadcast_chunk, finalize_broadcast
+from .topic_tasks import index_prompt_topics
+from .search_tasks import index_content_embeddings
 
 __all__ = [
     'collect_daily_metrics',
@@ -23,4 +41,19 @@ __all__ = [
     'track_conversion_funnels',
     'run_daily_analytics',
     'cleanup_old_analytics',
+    'release_expired_token_reservations',
+    'delete_folder_subtree',
+    'share_folder_subtree',
+    'release_expired_upload_reservations',
+    'dispatch_due_scheduled_generations',
+    'execute_scheduled_generation',
+    'process_batch_chunk',
+    'finalize_batch_job',
+    'recover_stalled_batch_jobs',
+    'deliver_webhook_batch',
+    'process_webhook_retries',
+    'send_broadcast_chunk',
+    'finalize_broadcast',
+    'index_prompt_topics',
+    'index_content_embeddings',
 ]
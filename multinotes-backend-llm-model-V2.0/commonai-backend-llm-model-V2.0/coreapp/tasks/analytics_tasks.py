@@ -17,7 +17,7 @@ import logging
 from datetime import datetime, timedelta, date
 from typing import Dict, Any, List
 
-from celery import shared_task
+from celery import chord, shared_task
 from django.db.models import Count, Sum, Avg, F, Q
 from django.db.models.functions import TruncDate, TruncHour
 from django.utils import timezone
@@ -85,7 +85,7 @@ def collect_user_metrics(target_date: date) -> Dict:
     """Collect user-related metrics for a specific date."""
     try:
         from django.contrib.auth import get_user_model
-        from coreapp.models_analytics import UserAnalytics
+        from coreapp.services.analytics_rollups import activity_rollups
 
         User = get_user_model()
 
@@ -101,24 +101,9 @@ def collect_user_metrics(target_date: date) -> Dict:
             is_active=True
         ).count()
 
-        # Active users (DAU)
-        dau = UserAnalytics.objects.filter(
-            date=target_date
-        ).values('user_id').distinct().count()
-
-        # Weekly active users (WAU)
-        week_start = target_date - timedelta(days=7)
-        wau = UserAnalytics.objects.filter(
-            date__gte=week_start,
-            date__lte=target_date
-        ).values('user_id').distinct().count()
-
-        # Monthly active users (MAU)
-        month_start = target_date - timedelta(days=30)
-        mau = UserAnalytics.objects.filter(
-            date__gte=month_start,
-            date__lte=target_date
-        ).values('user_id').distinct().count()
+        # Active users (DAU / 7-day WAU / 30-day MAU) merged from daily rollups
+        active = activity_rollups.window_metrics(target_date)
+        dau, wau, mau = active['dau'], active['wau'], active['mau']
 
         return {
             'new_signups': new_users,
@@ -397,57 +382,42 @@ def store_product_metrics(target_date: date, metrics: Dict):
 # =============================================================================
 
 @shared_task(bind=True, max_retries=2)
-def calculate_user_engagement_scores(self, batch_size: int = 100):
+def calculate_user_engagement_scores(self, batch_size: int = None):
     """
     Calculate engagement scores for all active users.
 
+    Splits the active user ids into ranges and scores each range in its own
+    task (two queries per range), so the work spreads across workers. The
+    summary is merged and cached by finalize_engagement_scores.
+
     Should run daily after metrics collection.
     """
     try:
+        from django.conf import settings
         from django.contrib.auth import get_user_model
-        from coreapp.services.retention_service import retention_calculator
+        from django.db.models import Max, Min
 
         User = get_user_model()
+        batch_size = batch_size or getattr(settings, 'ENGAGEMENT_SCORE_BATCH_SIZE', 5000)
 
-        # Get active users
-        active_users = User.objects.filter(
-            is_active=True
-        ).order_by('id')
-
-        total = active_users.count()
-        processed = 0
-        scores = []
-
-        for user in active_users.iterator(chunk_size=batch_size):
-            try:
-                score = retention_calculator.calculate_engagement_score(user)
-                scores.append({
-                    'user_id': user.id,
-                    'score': score.score,
-                    'level': score.level,
-                })
-                processed += 1
-
-            except Exception as e:
-                logger.warning(f"Failed to calculate engagement for user {user.id}: {e}")
-
-        # Store aggregated engagement data
-        engagement_summary = {
-            'high': len([s for s in scores if s['level'] == 'high']),
-            'medium': len([s for s in scores if s['level'] == 'medium']),
-            'low': len([s for s in scores if s['level'] == 'low']),
-            'at_risk': len([s for s in scores if s['level'] == 'at_risk']),
-        }
+        bounds = User.objects.filter(is_active=True).aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            return {'status': 'success', 'batches': 0}
 
-        cache.set('engagement_summary', engagement_summary, 86400)
+        ranges = [
+            (start, start + batch_size)
+            for start in range(bounds['first'], bounds['last'] + 1, batch_size)
+        ]
+        result = chord(
+            score_engagement_batch.s(start, end) for start, end in ranges
+        )(finalize_engagement_scores.s())
 
-        logger.info(f"Calculated engagement scores: {processed}/{total} users")
+        logger.info(f"Dispatched engagement scoring in {len(ranges)} batches")
 
         return {
-            'status': 'success',
-            'processed': processed,
-            'total': total,
-            'summary': engagement_summary,
+            'status': 'dispatched',
+            'batches': len(ranges),
+            'task_id': result.id,
         }
 
     except Exception as e:
@@ -455,6 +425,40 @@ def calculate_user_engagement_scores(self, batch_size: int = 100):
         raise self.retry(exc=e)
 
 
+@shared_task
+def score_engagement_batch(start_id: int, end_id: int) -> Dict:
+    """Score active users with ids in [start_id, end_id); returns level counts."""
+    from coreapp.services.retention_service import retention_calculator
+
+    scores = retention_calculator.calculate_engagement_scores(start_id, end_id)
+
+    summary = {'high': 0, 'medium': 0, 'low': 0, 'at_risk': 0}
+    for score in scores:
+        summary[score.level] = summary.get(score.level, 0) + 1
+    return {'processed': len(scores), 'summary': summary}
+
+
+@shared_task
+def finalize_engagement_scores(batches: List[Dict]) -> Dict:
+    """Merge the per-batch level counts and cache the summary."""
+    engagement_summary = {'high': 0, 'medium': 0, 'low': 0, 'at_risk': 0}
+    processed = 0
+    for batch in batches:
+        processed += batch['processed']
+        for level, count in batch['summary'].items():
+            engagement_summary[level] = engagement_summary.get(level, 0) + count
+
+    cache.set('engagement_summary', engagement_summary, 86400)
+
+    logger.info(f"Calculated engagement scores for {processed} users: {engagement_summary}")
+
+    return {
+        'status': 'success',
+        'processed': processed,
+        'summary': engagement_summary,
+    }
+
+
 # =============================================================================
 # Revenue Analytics Task
 # =============================================================================
@@ -668,17 +672,21 @@ def run_daily_analytics():
 
     results = {}
 
+    # Steps run inline: a task must not block a worker waiting on other tasks
+
     # Collect yesterday's metrics
-    results['metrics'] = collect_daily_metrics.delay().get(timeout=300)
+    results['metrics'] = collect_daily_metrics()
 
-    # Calculate engagement scores
-    results['engagement'] = calculate_user_engagement_scores.delay().get(timeout=600)
+    # Calculate engagement scores: only dispatches the per-range chord;
+    # finalize_engagement_scores logs the summary and caches it under
+    # 'engagement_summary'
+    results['engagement'] = calculate_user_engagement_scores()
 
     # Calculate revenue analytics
-    results['revenue'] = calculate_revenue_analytics.delay().get(timeout=120)
+    results['revenue'] = calculate_revenue_analytics()
 
     # Track funnels
-    results['funnels'] = track_conversion_funnels.delay().get(timeout=120)
+    results['funnels'] = track_conversion_funnels()
 
     logger.info(f"Daily analytics batch complete: {results}")
 
@@ -0,0 +1,85 @@
+"""
+Batch Processing Celery Tasks for MultinotesAI.
+
+This module provides:
+- Processing of one chunk of a batch job's items
+- The chord callback that settles a job once its chunks finish
+- Recovery of jobs whose workers stopped mid-run
+
+Usage:
+    from coreapp.services.batch_processing import batch_processing_service
+    batch_processing_service.execute_job(job_id, async_execution=True)
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Chunk Execution
+# =============================================================================
+
+@shared_task(acks_late=True)
+def process_batch_chunk(job_id: str, item_ids: list):
+    """
+    Process one chunk of a batch job.
+
+    Items are claimed one at a time, so a redelivered chunk only runs the
+    items nobody has taken yet.
+
+    Args:
+        job_id: Batch job the items belong to
+        item_ids: Primary keys of the GenerationBatchItem rows in this chunk
+    """
+    try:
+        from coreapp.services.batch_processing import batch_processing_service
+
+        counts = batch_processing_service.process_chunk(job_id, item_ids)
+        return {'status': 'success', 'job_id': job_id, **counts}
+
+    except Exception as e:
+        logger.error(f"Batch job {job_id} chunk failed: {e}")
+        return {'status': 'error', 'job_id': job_id, 'message': str(e)}
+
+
+@shared_task
+def finalize_batch_job(chunk_results, job_id: str):
+    """
+    Settle a batch job after all of its chunks ran (chord callback).
+
+    Args:
+        chunk_results: Results of the chunk tasks (unused)
+        job_id: Batch job to settle
+    """
+    try:
+        from coreapp.services.batch_processing import batch_processing_service
+
+        job = batch_processing_service.finalize_job(job_id)
+        return {'status': 'success', 'job_id': job_id, 'job_status': job.status.value if job else None}
+
+    except Exception as e:
+        logger.error(f"Finalizing batch job {job_id} failed: {e}")
+        return {'status': 'error', 'job_id': job_id, 'message': str(e)}
+
+
+# =============================================================================
+# Recovery
+# =============================================================================
+
+@shared_task
+def recover_stalled_batch_jobs():
+    """Re-dispatch running batch jobs that stopped making progress."""
+    try:
+        from coreapp.services.batch_processing import batch_processing_service
+
+        recovered = batch_processing_service.recover_stalled()
+        if recovered:
+            logger.warning(f"Re-dispatched {recovered} stalled batch jobs")
+        return {'status': 'success', 'recovered': recovered}
+
+    except Exception as e:
+        logger.error(f"Batch job recovery failed: {e}")
+        return {'status': 'error', 'message': str(e)}
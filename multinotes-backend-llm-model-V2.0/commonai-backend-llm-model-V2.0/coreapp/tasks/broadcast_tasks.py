@@ -0,0 +1,66 @@
+"""
+Notification Broadcast Celery Tasks for MultinotesAI.
+
+This module provides:
+- Sending one user id range of a notification broadcast
+- The chord callback that writes the broadcast's final report
+
+Usage:
+    from coreapp.services.notification_service import bulk_notification_service
+    bulk_notification_service.broadcast(NotificationType.MAINTENANCE, channels=['in_app', 'email'])
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Fan-out
+# =============================================================================
+
+@shared_task(bind=True, max_retries=2, default_retry_delay=60)
+def send_broadcast_chunk(self, broadcast_id: str, start_id: int, end_id: int):
+    """
+    Notify the broadcast's audience with user ids in [start_id, end_id).
+
+    Args:
+        broadcast_id: Broadcast to send
+        start_id: First user id of the range
+        end_id: End of the range (exclusive)
+    """
+    try:
+        from coreapp.services.notification_service import bulk_notification_service
+
+        report = bulk_notification_service.send_chunk(broadcast_id, start_id, end_id)
+        return {'status': 'success', **report}
+
+    except Exception as e:
+        logger.error(f"Broadcast {broadcast_id} chunk [{start_id}, {end_id}) failed: {e}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        return {'status': 'error', 'message': str(e), 'failures': [
+            {'channel': 'chunk', 'user_id': None, 'error': f"users {start_id}-{end_id}: {e}"[:200]}
+        ]}
+
+
+@shared_task
+def finalize_broadcast(chunk_reports, broadcast_id: str):
+    """
+    Write the broadcast report once every chunk ran (chord callback).
+
+    Args:
+        chunk_reports: Reports returned by send_broadcast_chunk
+        broadcast_id: Broadcast to settle
+    """
+    try:
+        from coreapp.services.notification_service import bulk_notification_service
+
+        broadcast = bulk_notification_service.finalize(broadcast_id, chunk_reports)
+        return {'status': 'success', 'broadcast_status': broadcast.status if broadcast else None}
+
+    except Exception as e:
+        logger.error(f"Finalizing broadcast {broadcast_id} failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,101 @@
+"""
+Folder Subtree Celery Tasks for MultinotesAI.
+
+This module provides:
+- Background deletion of large folder subtrees
+- Background sharing of large folder subtrees
+
+Both report progress through TaskProgressTracker, so clients can follow
+them on the task status endpoint or the task WebSocket.
+
+Usage:
+    from coreapp.tasks.folder_tasks import delete_folder_subtree
+    result = delete_folder_subtree.delay(user.id, folder.id)
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+def _progress(tracker, verb):
+    def report(done, total):
+        tracker.total = total
+        tracker.update(current=done, message=f'{verb} {done}/{total}')
+    return report
+
+
+# =============================================================================
+# Delete
+# =============================================================================
+
+@shared_task(bind=True)
+def delete_folder_subtree(self, user_id: int, folder_id: int):
+    """
+    Delete a folder with every subfolder, file and document below it.
+
+    Args:
+        user_id: Owner of the folder
+        folder_id: Root of the subtree
+    """
+    from authentication.models import CustomUser
+    from coreapp.services.subtree_operations import subtree_operations
+    from coreapp.tasks.task_notifications import TaskProgressTracker
+
+    tracker = TaskProgressTracker(self, user_id=user_id)
+    try:
+        user = CustomUser.objects.get(pk=user_id)
+        contents = subtree_operations.collect(user, folder_id)
+        tracker.start(total=contents.item_count, message='Deleting folder')
+
+        summary = subtree_operations.delete(user, contents, on_progress=_progress(tracker, 'Deleted'))
+        summary['s3_failed'] = len(summary['s3_failed'])
+        tracker.complete(result=summary, message='Folder deleted')
+        return {'status': 'success', **summary}
+
+    except Exception as e:
+        logger.error(f"Folder {folder_id} delete failed: {e}")
+        tracker.fail(str(e), e)
+        return {'status': 'error', 'message': str(e)}
+
+
+# =============================================================================
+# Share
+# =============================================================================
+
+@shared_task(bind=True)
+def share_folder_subtree(self, owner_id: int, share_to_ids: list, folder_id: int, access_type: str = None):
+    """
+    Share a folder and everything below it with one or more users.
+
+    Args:
+        owner_id: Owner of the folder
+        share_to_ids: Recipient user ids
+        folder_id: Root of the subtree
+        access_type: 'can_view' or 'can_edit' (model default when None)
+    """
+    from authentication.models import CustomUser
+    from coreapp.services.subtree_operations import subtree_operations
+    from coreapp.tasks.task_notifications import TaskProgressTracker
+
+    tracker = TaskProgressTracker(self, user_id=owner_id)
+    try:
+        owner = CustomUser.objects.get(pk=owner_id)
+        contents = subtree_operations.collect(owner, folder_id, include_deleted=False)
+        tracker.start(total=contents.item_count * len(share_to_ids), message='Sharing folder')
+
+        created = 0
+        for index, share_to_id in enumerate(share_to_ids):
+            created += subtree_operations.share(owner_id, share_to_id, contents, access_type)
+            tracker.update(current=(index + 1) * contents.item_count,
+                           message=f'Shared with {index + 1}/{len(share_to_ids)} users')
+
+        tracker.complete(result={'shares_created': created}, message='Folder shared')
+        return {'status': 'success', 'shares_created': created}
+
+    except Exception as e:
+        logger.error(f"Folder {folder_id} share failed: {e}")
+        tracker.fail(str(e), e)
+        return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,64 @@
+"""
+Scheduled Generation Celery Tasks for MultinotesAI.
+
+This module provides:
+- Dispatch of due scheduled generations (leased to this worker's node)
+- Execution of one leased scheduled generation
+
+Usage:
+    from coreapp.tasks.schedule_tasks import dispatch_due_scheduled_generations
+    dispatch_due_scheduled_generations.delay()
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Dispatch
+# =============================================================================
+
+@shared_task
+def dispatch_due_scheduled_generations(limit: int = 500):
+    """
+    Lease due schedules and queue one execution task for each.
+
+    Args:
+        limit: Maximum schedules dispatched per run
+    """
+    try:
+        from coreapp.services.scheduled_generations import scheduled_generation_service
+
+        dispatched = scheduled_generation_service.dispatch_due(limit=limit)
+        return {'status': 'success', 'dispatched': dispatched}
+
+    except Exception as e:
+        logger.error(f"Scheduled generation dispatch failed: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+# =============================================================================
+# Execution
+# =============================================================================
+
+@shared_task
+def execute_scheduled_generation(schedule_id: str, lease_token: str):
+    """
+    Run a scheduled generation that was leased by a dispatcher.
+
+    Args:
+        schedule_id: Schedule to run
+        lease_token: Token returned when the schedule was claimed
+    """
+    try:
+        from coreapp.services.scheduled_generations import scheduled_generation_service
+
+        result = scheduled_generation_service.run_claimed(schedule_id, lease_token)
+        return {'status': 'success', 'result': result.to_dict() if result else None}
+
+    except Exception as e:
+        logger.error(f"Scheduled generation {schedule_id} failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,40 @@
+"""
+Search Index Celery Tasks for MultinotesAI.
+
+This module provides:
+- Embedding of saved responses, documents and notebooks for semantic search
+
+Usage:
+    from coreapp.tasks.search_tasks import index_content_embeddings
+    index_content_embeddings.delay('document', [document.id])
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Embeddings
+# =============================================================================
+
+@shared_task
+def index_content_embeddings(doc_type, doc_ids):
+    """
+    Embed rows and store them in the vector index.
+
+    Args:
+        doc_type: 'response', 'document' or 'notebook'
+        doc_ids: Rows to (re)index; deleted rows lose their embeddings
+    """
+    try:
+        from coreapp.services.search_service import search_index_service
+
+        indexed = search_index_service.index_many(doc_type, doc_ids)
+        return {'status': 'success', 'indexed': indexed}
+
+    except Exception as e:
+        logger.error(f"Embedding {doc_type} {doc_ids} failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,39 @@
+"""
+Token Ledger Celery Tasks for MultinotesAI.
+
+This module provides:
+- Release of token reservations abandoned by crashed or killed workers
+
+Usage:
+    from coreapp.tasks.token_tasks import release_expired_token_reservations
+    release_expired_token_reservations.delay()
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Reservation Sweeper
+# =============================================================================
+
+@shared_task
+def release_expired_token_reservations(batch_size: int = 500):
+    """
+    Return expired token holds to their subscriptions.
+
+    Args:
+        batch_size: Maximum reservations released per run
+    """
+    try:
+        from coreapp.services.token_ledger import token_ledger
+
+        released = token_ledger.release_expired(batch_size=batch_size)
+        return {'status': 'success', 'released': released}
+
+    except Exception as e:
+        logger.error(f"Token reservation sweep failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -0,0 +1,39 @@
+"""
+Topic Index Celery Tasks for MultinotesAI.
+
+This module provides:
+- Topic extraction for prompts whose responses changed
+
+Usage:
+    from coreapp.tasks.topic_tasks import index_prompt_topics
+    index_prompt_topics.delay([prompt.id])
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Topic Extraction
+# =============================================================================
+
+@shared_task
+def index_prompt_topics(prompt_ids):
+    """
+    Extract and store the topics of prompts.
+
+    Args:
+        prompt_ids: Prompts to (re)index; deleted prompts lose their topics
+    """
+    try:
+        from coreapp.services.topic_index import topic_index
+
+        written = topic_index.index_prompts(prompt_ids)
+        return {'status': 'success', 'topics': written}
+
+    except Exception as e:
+        logger.error(f"Topic extraction for prompts {prompt_ids} failed: {e}")
+        return {'status': 'error', 'message': str(e)}
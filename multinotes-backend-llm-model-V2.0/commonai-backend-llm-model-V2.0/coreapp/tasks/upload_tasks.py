@@ -0,0 +1,39 @@
+"""
+Direct Upload Celery Tasks for MultinotesAI.
+
+This module provides:
+- Release of storage held by direct uploads that were never completed
+
+Usage:
+    from coreapp.tasks.upload_tasks import release_expired_upload_reservations
+    release_expired_upload_reservations.delay()
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Reservation Sweeper
+# =============================================================================
+
+@shared_task
+def release_expired_upload_reservations(batch_size: int = 200):
+    """
+    Return expired upload holds to their storage plans and abort the S3 uploads.
+
+    Args:
+        batch_size: Maximum uploads released per run
+    """
+    try:
+        from coreapp.services.direct_uploads import direct_uploads
+
+        released = direct_uploads.release_expired(batch_size=batch_size)
+        return {'status': 'success', 'released': released}
+
+    except Exception as e:
+        logger.error(f"Upload reservation sweep failed: {e}")
+        return {'status': 'error', 'message': str(e)}
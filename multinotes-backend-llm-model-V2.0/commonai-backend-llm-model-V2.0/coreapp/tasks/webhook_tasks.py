@@ -0,0 +1,63 @@
+"""
+Webhook Delivery Celery Tasks for MultinotesAI.
+
+This module provides:
+- Delivery of one endpoint batch of webhook deliveries
+- Periodic retry of deliveries whose backoff has elapsed
+
+Usage:
+    from coreapp.services.webhook_service import webhook_service
+    webhook_service.dispatch(WebhookEventType.NOTE_CREATED, user_id=user.id, payload={...})
+"""
+
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Delivery
+# =============================================================================
+
+@shared_task(acks_late=True)
+def deliver_webhook_batch(delivery_ids: list):
+    """
+    Deliver a batch of pending webhook deliveries (usually one endpoint's).
+
+    Args:
+        delivery_ids: WebhookDelivery ids; ones no longer pending are skipped
+    """
+    try:
+        from coreapp.services.webhook_service import webhook_service
+
+        delivered = webhook_service.deliver_pending(delivery_ids)
+        return {'status': 'success', 'delivered': delivered, 'total': len(delivery_ids)}
+
+    except Exception as e:
+        logger.error(f"Webhook batch delivery failed: {e}")
+        return {'status': 'error', 'message': str(e)}
+
+
+# =============================================================================
+# Retries
+# =============================================================================
+
+@shared_task
+def process_webhook_retries(limit: int = 500):
+    """
+    Retry webhook deliveries that are due.
+
+    Args:
+        limit: Maximum deliveries retried per run
+    """
+    try:
+        from coreapp.services.webhook_service import webhook_service
+
+        retried = webhook_service.process_pending_retries(limit=limit)
+        return {'status': 'success', 'retried': retried}
+
+    except Exception as e:
+        logger.error(f"Webhook retry processing failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -116,6 +116,10 @@ urlpatterns=[
     path('update_content/<int:pk>/', UserFileView.as_view()),
     path('delete_content/<int:pk>/', UserFileView.as_view()),
 
+    path('initiate_upload/', DirectUploadView.as_view()),
+    path('complete_upload/<int:pk>/', DirectUploadView.as_view()),
+    path('abort_upload/<int:pk>/', DirectUploadView.as_view()),
+
     path('create_share_content/', ShareContentView.as_view()),
     path('get_share_content/<int:pk>/', ShareContentView.as_view()),
     path('get_share_contents/', ShareContentView.as_view()),
@@ -1,4 +1,5 @@
 # genareting logic prompttest/utils.py
+import logging
 import os
 import requests
 from pathlib import Path
@@ -27,9 +28,13 @@ from concurrent.futures import ThreadPoolExecutor
 from authentication.awsservice import uploadImage
 import concurrent.futures
 from asgiref.sync import async_to_sync, sync_to_async
-from .models import LLM, PromptResponse, NoteBook, Folder, Prompt, LLM_Tokens,GroupResponse
+from .models import LLM, NoteBook, Folder, GroupResponse
+from .streaming import GenerationStreamEncoder, STREAM_MODE_CUMULATIVE
+from .services.conversation_turns import conversation_turns, DEFAULT_SYSTEM_PROMPT
+from .services.token_ledger import token_ledger
+from .services.token_service import token_estimator
+from .services.generation_records import generation_recorder
 from django.http import JsonResponse, StreamingHttpResponse
-from planandsubscription.models import Subscription
 from rest_framework import status
 import threading
 import concurrent.futures
@@ -39,6 +44,8 @@ from django.core.files.base import ContentFile
 import uuid
 # import tiktoken
 
+logger = logging.getLogger(__name__)
+
 # Initialize API clients gracefully (allow app to start without all keys)
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 LLama_API_KEY = os.getenv('LLama_API_KEY')
@@ -77,32 +84,33 @@ thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 def send_response_to_socket(data, group_name):
     async_to_sync(channel_layer.group_send)(group_name, {'type': 'send_response', 'response': json.dumps(data)})
 
-def manage_token(user, tokenCount):
-        cluster = user.cluster
-        if cluster:
-            subs = cluster.subscription
+def gemini_token_count(model, text):
+    # Runs in the stream's finally block, so a failed count must not skip
+    # generation_recorder.finish; fall back to an estimate
+    try:
+        return model.count_tokens((text)).total_tokens
+    except Exception as e:
+        logger.warning(f"Gemini token count failed, using an estimate: {e}")
+        return token_estimator.estimate_tokens(text)
+
+def manage_token(user, tokenCount, reservation=None):
+        if reservation is not None:
+            token_ledger.commit(reservation, tokenCount)
         else:
-            subs = Subscription.objects.filter(user=user.id, status__in=['active', 'trial']).first()
-        subs.balanceToken -= tokenCount
-        subs.usedToken += tokenCount
-        subs.save()
+            token_ledger.consume(user, tokenCount)
 
 
 # Gemini Api
-def textToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId):
+def textToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId, streamMode=STREAM_MODE_CUMULATIVE):
         if groupId:
             group = GroupResponse.objects.get(pk=groupId, is_delete=False)
 
-            if not group.conversation_history:
-                prompt_history = ""
-                conversation_history = []
-            else:
-                conversation_history = json.loads(group.conversation_history, strict=False)
+            conversation_history = conversation_turns.get_history(group)
 
-                prompt_history = "\n".join([f"{turn['role']}: {turn['content']}" for turn in conversation_history])
+            prompt_history = "\n".join([f"{turn['role']}: {turn['content']}" for turn in conversation_history])
                 
-                # conversation_history.append({"role": "user", "content": prompt})
-                # print("History is ---> ", conversation_history)
+            # conversation_history.append({"role": "user", "content": prompt})
+            # print("History is ---> ", conversation_history)
 
 
             model = genai.GenerativeModel(modelString)
@@ -126,117 +134,47 @@ def textToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId,
             model = genai.GenerativeModel(modelString)
             stream = model.generate_content(prompt, stream=True)
 
-        text = ""
-        for chunk in stream:
-            # for part in chunk.parts:
-                # text += part.text
-            text += chunk.text
-            my_dict = json.dumps({"model": myModel,
-                    "text": text})
-            yield my_dict
-
-        tokenCount = model.count_tokens((text)).total_tokens
-        manage_token(user, tokenCount)
+        frames = GenerationStreamEncoder(myModel, streamMode)
+        reservation = token_ledger.reserve_for_prompt(user, prompt)
+        record = generation_recorder.start(user, llmId, categoryID, 8 if promptWriter else 2, prompt=prompt, group_id=groupId, conversation=True)
+        try:
+            for chunk in stream:
+                # for part in chunk.parts:
+                    # text += part.text
+                yield frames.chunk(chunk.text)
+        except BaseException:
+            generation_recorder.abort(record, reservation)
+            raise
 
-        if groupId:
-            conversation_history.append({"role": "user", "content": prompt})
-            conversation_history.append({"role": "model", "content": text})
-            short_history = conversation_history[-20:]
-            group.conversation_history = json.dumps(short_history)
-            group.save()
-
-        # Save the Prompt and Prompt Response
-        # try:
-        #     promp = Prompt.objects.get(
-        #         prompt_text=prompt, 
-        #         category=categoryID, 
-        #         # mainCategory=mainCategory,
-        #         user=user.id
-        #     )
-        #     response = PromptResponse.objects.create(
-        #         llm_id=llmId, response_text=text, 
-        #         prompt_id=promp.id, 
-        #         user_id = user.id,
-        #         category_id=categoryID, 
-        #         response_type = 8 if promptWriter else 2,
-        #         # mainCategory_id= mainCategory,
-        #         tokenUsed = tokenCount
-        #     )
-        # except Prompt.DoesNotExist:
-        promp = Prompt.objects.create(
-            prompt_text=prompt, 
-            user_id=user.id, 
-            category_id=categoryID,
-            group_id=groupId,
-            response_type = 8 if promptWriter else 2,
-            # mainCategory_id= mainCategory
-        )
-        response = PromptResponse.objects.create(
-            llm_id=llmId, response_text=text, 
-            prompt_id=promp.id, 
-            user_id = user.id,
-            category_id=categoryID, 
-            # mainCategory_id=mainCategory,
-            tokenUsed = tokenCount,
-            response_type = 8 if promptWriter else 2
-        )
-
-        LLM_Tokens.objects.create(
-            user_id = user.id,
-            llm_id = llmId,
-            prompt_id = promp.id,
-            text_token_used = tokenCount
-        )
+        text = frames.text
 
-        my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-        yield my_dict
+        tokenCount = gemini_token_count(model, text)
+        generation_recorder.finish(record, text, tokenCount, reservation)
+        yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 # Gemini Api
-def textToCodeUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId):
+def textToCodeUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId, streamMode=STREAM_MODE_CUMULATIVE):
         model = genai.GenerativeModel(
             model_name=modelString,
             tools='code_execution')
         stream = model.generate_content(prompt, stream=True)
 
-        text = ""
-        for chunk in stream:
-            # for part in chunk.parts:
-                # text += part.text
-            text += chunk.text
-            my_dict = json.dumps({"model": myModel,
-                    "text": text})
-            yield my_dict
-
-        tokenCount = model.count_tokens((text)).total_tokens
-        manage_token(user, tokenCount)
-
-        promp = Prompt.objects.create(
-            prompt_text=prompt, 
-            user_id=user.id, 
-            category_id=categoryID,
-            group_id=groupId,
-            response_type = 8 if promptWriter else 2,
-            # mainCategory_id= mainCategory
-        )
-        response = PromptResponse.objects.create(
-            llm_id=llmId, response_text=text, 
-            prompt_id=promp.id, 
-            user_id = user.id,
-            category_id=categoryID, 
-            # mainCategory_id=mainCategory,
-            tokenUsed = tokenCount,
-            response_type = 8 if promptWriter else 2
-        )
+        frames = GenerationStreamEncoder(myModel, streamMode)
+        record = generation_recorder.start(user, llmId, categoryID, 8 if promptWriter else 2, prompt=prompt, group_id=groupId)
+        try:
+            for chunk in stream:
+                # for part in chunk.parts:
+                    # text += part.text
+                yield frames.chunk(chunk.text)
+        except BaseException:
+            generation_recorder.abort(record)
+            raise
 
-        LLM_Tokens.objects.create(
-            user_id = user.id,
-            llm_id = llmId,
-            prompt_id = promp.id,
-            text_token_used = tokenCount
-        )
+        text = frames.text
 
-        my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-        yield my_dict
+        tokenCount = gemini_token_count(model, text)
+        generation_recorder.finish(record, text, tokenCount)
+        yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 def is_utf8mb4_compatible(text):
     try:
@@ -247,13 +185,13 @@ def is_utf8mb4_compatible(text):
         return False
     
 # Together Api
-def generateTextToTextUsingTogether(prompt, model, modelString, user, categoryID, llmId, promptWriter, groupId):
+def generateTextToTextUsingTogether(prompt, model, modelString, user, categoryID, llmId, promptWriter, groupId, streamMode=STREAM_MODE_CUMULATIVE):
 
     try:   
         if groupId:
             group = GroupResponse.objects.get(pk=groupId, is_delete=False)
 
-            conversation_history = [{"role": "system", "content": "You are a helpful assistant."}] if not group.conversation_history else json.loads(group.conversation_history, strict=False)
+            conversation_history = conversation_turns.get_history(group, system_prompt=DEFAULT_SYSTEM_PROMPT)
 
 
             conversation_history.append({"role": "user", "content": prompt})
@@ -294,76 +232,27 @@ def generateTextToTextUsingTogether(prompt, model, modelString, user, categoryID
         yield my_dict
         return
 
-    text = ""
-    for chunk in stream:
-        # print("Value is ----> ", chunk.choices[0].delta)
-        if chunk.choices and chunk.choices[0].delta.content is not None:
-            text += chunk.choices[0].delta.content
-            my_dict = json.dumps({"model": model, 
-                        "text": text})
-                            
-            yield my_dict
+    frames = GenerationStreamEncoder(model, streamMode)
+    reservation = token_ledger.reserve_for_prompt(user, prompt)
+    record = generation_recorder.start(user, llmId, categoryID, 8 if promptWriter else 2, prompt=prompt, group_id=groupId, conversation=True)
+    try:
+        for chunk in stream:
+            # print("Value is ----> ", chunk.choices[0].delta)
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield frames.chunk(chunk.choices[0].delta.content)
+    except BaseException:
+        generation_recorder.abort(record, reservation)
+        raise
 
+    text = frames.text
     tokenCount = chunk.usage.total_tokens
-    manage_token(user, tokenCount)
 
-    if groupId:
-        conversation_history.append({"role": "assistant", "content": text})
-        short_history = conversation_history[-20:]
-        group.conversation_history = json.dumps(short_history)
-        group.save()
-
-    # Save the Prompt and Prompt Response
-    # try:
-        # promp = Prompt.objects.get(
-        #     prompt_text=prompt, 
-        #     category=categoryID, 
-        #     # mainCategory=mainCategory, 
-        #     user=user.id
-        # )
-        # response = PromptResponse.objects.create(
-        #     llm_id=llmId, 
-        #     response_text=text, 
-        #     prompt_id=promp.id,
-        #     user_id = user.id,
-        #     response_type = 8 if promptWriter else 2,
-        #     category_id=categoryID,
-        #     # mainCategory_id=mainCategory,
-        #     tokenUsed = tokenCount
-        # )
-    # except Prompt.DoesNotExist:
-    promp = Prompt.objects.create(
-        prompt_text=prompt, 
-        user_id=user.id, 
-        category_id=categoryID,
-        group_id=groupId,
-        response_type = 8 if promptWriter else 2,
-        # mainCategory_id=mainCategory
-    )
-    response = PromptResponse.objects.create(
-        llm_id=llmId, 
-        response_text= text, 
-        prompt_id=promp.id,
-        user_id = user.id,
-        response_type = 8 if promptWriter else 2,
-        tokenUsed = tokenCount,
-        category_id=categoryID,
-        # mainCategory_id=mainCategory
-    )
-
-    LLM_Tokens.objects.create(
-        user_id = user.id,
-        llm_id = llmId,
-        prompt_id = promp.id,
-        text_token_used = tokenCount
-    )
-
-    my_dict = json.dumps({"model": model, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-    yield my_dict
+    generation_recorder.finish(record, text, tokenCount, reservation)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 
 #Image To Text Api
-def generateImageToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, img, groupId):
+def generateImageToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, img, groupId, streamMode=STREAM_MODE_CUMULATIVE):
 
     # print(f"Uploading file...")
     # video_file = genai.upload_file(path=settings.BASE_DIR/img.name)
@@ -403,69 +292,26 @@ def generateImageToTextUsingGemini(prompt, myModel, modelString, user, categoryI
     stream = model.generate_content([prompt, img_pil], stream=True)
  
 
-    text = ""
-    for chunk in stream:
-        if chunk.text is not None:
-            for part in chunk.parts:
-                text += part.text
-            # text += chunk.text
-                my_dict = json.dumps({"model": myModel, 
-                        "text": text})
-                yield my_dict
-
-
     imgKey = "multinote/imageToText/" + str(user.id) + "-" + img.name
-    uploadImage(img, imgKey, img.content_type)
-
-    tokenCount = model.count_tokens((text)).total_tokens
-    manage_token(user, tokenCount)
-
-    # Save the Prompt and Prompt Response
-    # try:
-    #     promp = Prompt.objects.get(
-    #         prompt_text=prompt, category=categoryID, 
-    #         user=user.id, prompt_image=imgKey, 
-    #         # mainCategory=mainCategory
-    #     )
-    #     response = PromptResponse.objects.create(
-    #         llm_id=llmId, response_text=text, 
-    #         prompt_id=promp.id, 
-    #         user_id = user.id,
-    #         response_type = 3,
-    #         tokenUsed = tokenCount,
-    #         category_id=categoryID,
-    #         # mainCategory_id=mainCategory
-    #     )
-    # except Prompt.DoesNotExist:
-    promp = Prompt.objects.create(
-        prompt_text=prompt, 
-        user_id=user.id, 
-        prompt_image=imgKey,
-        category_id=categoryID, 
-        group_id=groupId, 
-        response_type = 3,
-        # mainCategory_id=mainCategory
-    )
-    response = PromptResponse.objects.create(
-        llm_id=llmId, response_text=text, 
-        prompt_id=promp.id, 
-        user_id = user.id,
-        response_type = 3,
-        tokenUsed = tokenCount,
-        category_id=categoryID,
-        # mainCategory_id=mainCategory
-    )
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    record = generation_recorder.start(user, llmId, categoryID, 3, prompt=prompt, group_id=groupId, prompt_image=imgKey)
+    try:
+        for chunk in stream:
+            if chunk.text is not None:
+                for part in chunk.parts:
+                    yield frames.chunk(part.text)
+                # text += chunk.text
+    except BaseException:
+        generation_recorder.abort(record)
+        raise
 
-    LLM_Tokens.objects.create(
-        user_id = user.id,
-        llm_id = llmId,
-        prompt_id = promp.id,
-        text_token_used = tokenCount
-    )
+    text = frames.text
 
+    uploadImage(img, imgKey, img.content_type)
 
-    my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-    yield my_dict
+    tokenCount = gemini_token_count(model, text)
+    generation_recorder.finish(record, text, tokenCount)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 #Image To Text Api
 def generateAudioToTextUsingGemini(modelString, audio_file):
@@ -490,7 +336,7 @@ def generateAudioToTextUsingGemini(modelString, audio_file):
 
 
 #Gemini Video To Text Api
-def generateVideoToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, img, groupId):
+def generateVideoToTextUsingGemini(prompt, myModel, modelString, user, categoryID, llmId, img, groupId, streamMode=STREAM_MODE_CUMULATIVE):
 
     # print(f"Uploading file...")
     video_file = genai.upload_file(path=settings.BASE_DIR/img.name)
@@ -526,56 +372,27 @@ def generateVideoToTextUsingGemini(prompt, myModel, modelString, user, categoryI
     # stream = model.generate_content([prompt, img_pil], stream=True)
  
 
-    text = ""
-    for chunk in stream:
-        if chunk.text is not None:
-            for part in chunk.parts:
-                text += part.text
-            # text += chunk.text
-                my_dict = json.dumps({"model": myModel, 
-                        "text": text})
-                yield my_dict
-
-
     imgKey = "multinote/imageToText/" + str(user.id) + "-" + img.name
-    uploadImage(img, imgKey, img.content_type)
-
-
-    tokenCount = model.count_tokens((text)).total_tokens
-    manage_token(user, tokenCount)
-
-
-    promp = Prompt.objects.create(
-        prompt_text=prompt, 
-        user_id=user.id, 
-        prompt_image=imgKey,
-        category_id=categoryID, 
-        group_id=groupId, 
-        response_type = 3,
-        # mainCategory_id=mainCategory
-    )
-    response = PromptResponse.objects.create(
-        llm_id=llmId, response_text=text, 
-        prompt_id=promp.id, 
-        user_id = user.id,
-        response_type = 3,
-        tokenUsed = tokenCount,
-        category_id=categoryID,
-        # mainCategory_id=mainCategory
-    )
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    record = generation_recorder.start(user, llmId, categoryID, 3, prompt=prompt, group_id=groupId, prompt_image=imgKey)
+    try:
+        for chunk in stream:
+            if chunk.text is not None:
+                for part in chunk.parts:
+                    yield frames.chunk(part.text)
+                # text += chunk.text
+    except BaseException:
+        generation_recorder.abort(record)
+        raise
 
-    LLM_Tokens.objects.create(
-        user_id = user.id,
-        llm_id = llmId,
-        prompt_id = promp.id,
-        text_token_used = tokenCount
-    )
+    text = frames.text
 
+    uploadImage(img, imgKey, img.content_type)
     os.remove(settings.BASE_DIR/img.name)
 
-
-    my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-    yield my_dict
+    tokenCount = gemini_token_count(model, text)
+    generation_recorder.finish(record, text, tokenCount)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 
 def generateTextToImageUsingTogether(prompt, model_string, width, height):
@@ -602,7 +419,7 @@ def generateTextToImageUsingOpenai(prompt, model_string, widht, height):
     return response.data[0].b64_json
 
 
-def generateCodeUsingTogether(prompt, myModel, model_string, user, categoryId, llmId, groupId):
+def generateCodeUsingTogether(prompt, myModel, model_string, user, categoryId, llmId, groupId, streamMode=STREAM_MODE_CUMULATIVE):
     try:
         stream = togetherClient.completions.create(
             model= model_string,
@@ -627,65 +444,21 @@ def generateCodeUsingTogether(prompt, myModel, model_string, user, categoryId, l
         yield my_dict
         return
 
-    text = ""
-    for chunk in stream:
-        if chunk.choices and chunk.choices[0].delta.content is not None:
-            text += chunk.choices[0].delta.content
-            my_dict = json.dumps({"model": myModel, 
-                        "text": text})
-            
-            # print(text)
-                            
-            yield my_dict
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    record = generation_recorder.start(user, llmId, categoryId, 7, prompt=prompt, group_id=groupId)
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield frames.chunk(chunk.choices[0].delta.content)
+    except BaseException:
+        generation_recorder.abort(record)
+        raise
 
+    text = frames.text
     tokenCount = chunk.usage.total_tokens
-    manage_token(user, tokenCount)
 
-    # Save the Prompt and Prompt Response
-    # try:
-    #     promp = Prompt.objects.get(
-    #         prompt_text=prompt, 
-    #         category=categoryId, 
-    #         # mainCategory=mainCategory, 
-    #         user=user.id
-    #     )
-    #     response = PromptResponse.objects.create(
-    #         llm_id=llmId, response_text=text, 
-    #         prompt_id=promp.id, 
-    #         user_id = user.id,
-    #         response_type = 7,
-    #         tokenUsed = tokenCount,
-    #         category_id=categoryId, 
-    #         # mainCategory_id=mainCategory, 
-    #     )
-    # except Prompt.DoesNotExist:
-    promp = Prompt.objects.create(
-        prompt_text=prompt, 
-        user_id=user.id, 
-        category_id=categoryId,
-        group_id=groupId,
-        response_type = 7,
-        # mainCategory_id=mainCategory
-    )
-    response = PromptResponse.objects.create(
-        llm_id=llmId, response_text=text, 
-        prompt_id=promp.id, 
-        user_id = user.id,
-        response_type = 7,
-        tokenUsed = tokenCount,
-        category_id=categoryId,
-        # mainCategory_id=mainCategory
-    )
-
-    LLM_Tokens.objects.create(
-        user_id = user.id,
-        llm_id = llmId,
-        prompt_id = promp.id,
-        text_token_used = tokenCount
-    )
-
-    my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-    yield my_dict
+    generation_recorder.finish(record, text, tokenCount)
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 
 # Gemini Api
@@ -741,7 +514,7 @@ def generateTextByTogether(prompt, modelString, model, groupName):
         
 
 # Gemini Api
-def generateUsingGeminiTest(prompt, modelString, myModel, queue):
+def generateUsingGeminiTest(prompt, modelString, myModel):
         # time.sleep(60)
         # print(myModel, timezone.now())
         model = genai.GenerativeModel(modelString)
@@ -754,18 +527,17 @@ def generateUsingGeminiTest(prompt, modelString, myModel, queue):
                 # text += chunk.text
                 my_dict = json.dumps({"model": myModel, 
                         "text": text})
-                queue.put(f"data: {my_dict}\n\n")
+                yield f"data: {my_dict}\n\n"
 
         my_dict = json.dumps({"model": myModel, "text": ["DONE"]})
-        queue.put(f"data: {my_dict}\n\n")
+        yield f"data: {my_dict}\n\n"
         # print(myModel, timezone.now())
-        queue.put("DONE")
 
 
 
 
 # Together Api
-def generateTextByTogetherTest(prompt, modelString, model, queue):
+def generateTextByTogetherTest(prompt, modelString, model):
         # print(model, timezone.now())        
         stream = togetherClient.chat.completions.create(
             model=modelString,
@@ -774,18 +546,23 @@ def generateTextByTogetherTest(prompt, modelString, model, queue):
         )
 
         text = ""
-        for chunk in stream:
-            if chunk.choices and chunk.choices[0].delta.content is not None:
-                text += chunk.choices[0].delta.content
-                my_dict = json.dumps({"model": model, 
-                            "text": text
-                          })
-                queue.put(f"data: {my_dict}\n\n")
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    text += chunk.choices[0].delta.content
+                    my_dict = json.dumps({"model": model, 
+                                "text": text
+                              })
+                    yield f"data: {my_dict}\n\n"
+        finally:
+            # Release the upstream connection when the fan-out cancels us
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
 
         my_dict = json.dumps({"model": model, "text": ["DONE"]})
-        queue.put(f"data: {my_dict}\n\n")
+        yield f"data: {my_dict}\n\n"
         # print(model, timezone.now()) 
-        queue.put("DONE")
 
 
 
@@ -824,12 +601,12 @@ def generateTextByTogetherTest(prompt, modelString, model, queue):
 #         send_response_to_socket({"Message": str(e)}, groupName)
 
 # OpenAI Api
-def generateTextByOpenAI(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId):
+def generateTextByOpenAI(prompt, myModel, modelString, user, categoryID, llmId, promptWriter, groupId, streamMode=STREAM_MODE_CUMULATIVE):
 
     if groupId:
         group = GroupResponse.objects.get(pk=groupId, is_delete=False)
 
-        conversation_history = [{"role": "system", "content": "You are a helpful assistant."}] if not group.conversation_history else json.loads(group.conversation_history, strict=False)
+        conversation_history = conversation_turns.get_history(group, system_prompt=DEFAULT_SYSTEM_PROMPT)
 
 
         conversation_history.append({"role": "user", "content": prompt})
@@ -855,73 +632,24 @@ def generateTextByOpenAI(prompt, myModel, modelString, user, categoryID, llmId,
             stream_options={"include_usage": True}
         )
 
-    text = ""
-    for chunk in stream:
-        if chunk.choices and chunk.choices[0].delta.content is not None:
-            text += chunk.choices[0].delta.content
-            # print(chunk.choices[0].delta.content, end="", flush=True)
-            # print(text)
-            my_dict = json.dumps({"model": myModel, 
-                        "text": text})
-            yield my_dict
+    frames = GenerationStreamEncoder(myModel, streamMode)
+    reservation = token_ledger.reserve_for_prompt(user, prompt)
+    record = generation_recorder.start(user, llmId, categoryID, 8 if promptWriter else 2, prompt=prompt, group_id=groupId, conversation=True)
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                # print(chunk.choices[0].delta.content, end="", flush=True)
+                yield frames.chunk(chunk.choices[0].delta.content)
+    except BaseException:
+        generation_recorder.abort(record, reservation)
+        raise
 
+    text = frames.text
     tokenCount = chunk.usage.total_tokens
-    manage_token(user, tokenCount)
 
-    if groupId:
-        conversation_history.append({"role": "assistant", "content": text})
-        short_history = conversation_history[-20:]
-
-        group.conversation_history = json.dumps(short_history)
-        group.save()
-
-    # Save the Prompt and Prompt Response
-    # try:
-    #     promp = Prompt.objects.get(
-    #         prompt_text=prompt, 
-    #         category=categoryID, 
-    #         # mainCategory=mainCategory, 
-    #         user=user.id
-    #     )
-    #     response = PromptResponse.objects.create(
-    #         llm_id=llmId, 
-    #         response_text=text, 
-    #         prompt_id=promp.id, 
-    #         user_id = user.id,
-    #         response_type = 8 if promptWriter else 2,
-    #         tokenUsed = tokenCount,
-    #         category_id=categoryID,
-    #         # mainCategory_id = mainCategory
-    #     )
-    # except Prompt.DoesNotExist:
-    promp = Prompt.objects.create(
-        prompt_text=prompt, 
-        user_id=user.id, 
-        category_id=categoryID,
-        group_id=groupId,
-        response_type = 8 if promptWriter else 2,
-        # mainCategory_id = mainCategory
-    )
-    response = PromptResponse.objects.create(
-        llm_id=llmId, response_text=text, 
-        prompt_id=promp.id, 
-        user_id = user.id,
-        response_type = 8 if promptWriter else 2,
-        tokenUsed = tokenCount,
-        category_id=categoryID,
-        # mainCategory_id = mainCategory
-    )
-
-    LLM_Tokens.objects.create(
-        user_id = user.id,
-        llm_id = llmId,
-        prompt_id = promp.id,
-        text_token_used = tokenCount
-    )
-
-    my_dict = json.dumps({"model": myModel, "promptId": promp.id, "responseId": response.id, "groupId": groupId, "text": "DONE"})
-    yield my_dict
-            
+    generation_recorder.finish(record, text, tokenCount, reservation)
+        
+    yield frames.done(promptId=record.prompt_id, responseId=record.response_id, groupId=groupId)
 
 
 def generateChatGPT():
@@ -98,6 +98,7 @@ from ..views_legacy import (
 
     # File/Content Views
     UserFileView,
+    DirectUploadView,
 
     # Share Views
     ShareWithMeView,
@@ -173,6 +174,7 @@ __all__ = [
     'RatingByLlm',
     'UserLlmMngt',
     'UserFileView',
+    'DirectUploadView',
     'ShareWithMeView',
     'GetRootRecentShareFileView',
     'UserStorageDetailView',
@@ -14,8 +14,10 @@ WBS Items:
 - 6.1.5: Scheduled generations
 """
 
+import json
 import logging
 
+from django.http import StreamingHttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -407,6 +409,7 @@ class CreateBatchJobView(APIView):
         ],
         "prompt_template": "Summarize: {{text}}",
         "model": "gpt-3.5-turbo",
+        "provider": "openai",
         "priority": "normal"
     }
     """
@@ -426,6 +429,7 @@ class CreateBatchJobView(APIView):
         model = request.data.get('model', 'gpt-3.5-turbo')
         max_tokens = request.data.get('max_tokens', 1000)
         temperature = request.data.get('temperature', 0.7)
+        provider = request.data.get('provider', 'openai')
         priority_str = request.data.get('priority', 'normal')
 
         if not items:
@@ -455,6 +459,7 @@ class CreateBatchJobView(APIView):
                 max_tokens=max_tokens,
                 temperature=temperature,
                 priority=priority,
+                provider=provider,
             )
 
             return Response(job.to_dict(), status=status.HTTP_201_CREATED)
@@ -594,6 +599,43 @@ class BatchJobResultsView(APIView):
         return Response(result.to_dict())
 
 
+class BatchJobResultsDownloadView(APIView):
+    """
+    Download every item result as newline-delimited JSON.
+
+    GET /api/ai/batch/<job_id>/results/download/
+
+    Rows are streamed from the database in input order, so large jobs are
+    never held in memory.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        """Stream job results."""
+        from coreapp.services.batch_processing import batch_processing_service
+
+        job = batch_processing_service.get_job(job_id)
+        if not job:
+            return Response(
+                {'error': 'Job not found'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if job.user_id != request.user.id:
+            return Response(
+                {'error': 'Access denied'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        rows = batch_processing_service.iter_results(job_id)
+        response = StreamingHttpResponse(
+            (json.dumps(row, default=str) + '\n' for row in rows),
+            content_type='application/x-ndjson',
+        )
+        response['Content-Disposition'] = f'attachment; filename="batch-{job_id}.ndjson"'
+        return response
+
+
 class ListBatchJobsView(APIView):
     """
     List batch jobs.
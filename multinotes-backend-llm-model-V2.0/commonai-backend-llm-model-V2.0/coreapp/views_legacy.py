@@ -10,7 +10,7 @@ from .utils import (generateUsingGemini, generateUsingTogether,
 from rest_framework.permissions import IsAuthenticated
 from .models import (LLM, PromptResponse, NoteBook, Folder, Prompt, 
                         Document, LLM_Ratings, LLM_Tokens, UserLLM, UserContent,
-                        StorageUsage, Share, GroupResponse, AiProcess
+                        StorageUsage, Share, GroupResponse, AiProcess, UploadSession
                     ) 
 from .serializers import (PromptCreateSerializer, LlmSerializer, 
                             CategorySerializer, FolderSerializer,
@@ -34,6 +34,11 @@ from .serializers import (PromptCreateSerializer, LlmSerializer,
                             GroupOutputSerializer, GroupHistorySerializer,
                             AiProcessSerializer
                          )
+from .services.text_index import text_index, DOC_DOCUMENT, DOC_NOTEBOOK
+from .services.folder_tree import folder_tree
+from .services.subtree_operations import subtree_operations
+from .services.direct_uploads import direct_uploads, PURPOSE_CONTENT, PURPOSE_PROFILE_IMAGE, STATUS_RESERVED
+from .services.entitlements import entitlement_service
 from planandsubscription.models import Subscription, Transaction, UserPlan
 from ticketandcategory.models import Category, MainCategory
 from rest_framework.response import Response
@@ -58,6 +63,7 @@ from datetime import timedelta, datetime
 from django.db.models.functions import TruncDay
 from django.db.models.functions import TruncDate
 from authentication.tasks import share_content_email, aiprocess_data
+from .tasks.folder_tasks import delete_folder_subtree, share_folder_subtree
 from authentication.awsservice import delete_file_from_s3, download_s3_file
 from planandsubscription.serializers import UpdateTransactionSerializer
 import re
@@ -404,13 +410,8 @@ class CategoryListingView(ListAPIView):
 class PromptLibraryView(APIView):
     permission_classes = [IsAuthenticated]
     def get_folder_path(self, folder):
-        # Recursively get the folder path until the root folder
-        path = [{'id': folder.id, 'title': folder.title}]
-        parent_folder = folder.parent_folder
-        while parent_folder:
-            path.insert(0, {'id': parent_folder.id, 'title': parent_folder.title})
-            parent_folder = parent_folder.parent_folder
-        return path
+        # Folder path from the root folder, in one query
+        return folder_tree.breadcrumbs(folder)
     
 
     def get_folder_data(self, folder):
@@ -483,7 +484,7 @@ def get_folder_detail(user, folder_id):
 
     linked_folders = Folder.objects.filter(user=user, parent_folder__id=folder_id, is_delete=False)
 
-    linked_folders = linked_folders.order_by('-created_at')
+    linked_folders = linked_folders.select_related('user').order_by('-created_at')
     linked_folders_serializer = FolderSerializer(linked_folders, many=True)
 
     sub_folders = linked_folders_serializer.data
@@ -494,13 +495,8 @@ def get_folder_detail(user, folder_id):
 class FolderLibraryView(APIView):
     permission_classes = [IsAuthenticated]
     def get_folder_path(self, folder):
-        # Recursively get the folder path until the root folder
-        path = [{'id': folder.id, 'title': folder.title}]
-        parent_folder = folder.parent_folder
-        while parent_folder:
-            path.insert(0, {'id': parent_folder.id, 'title': parent_folder.title})
-            parent_folder = parent_folder.parent_folder
-        return path
+        # Folder path from the root folder, in one query
+        return folder_tree.breadcrumbs(folder)
     
 
     def get_folder_data(self, folder):
@@ -574,15 +570,13 @@ class FolderLibraryView(APIView):
         # linked_document_contents = linked_document_contents.order_by('-created_at')
         # linked_document_contents_serializer = DocumentContentSerializer(linked_document_contents, many=True)
 
-        linked_folders = linked_folders.order_by('-created_at')
+        linked_folders = linked_folders.select_related('user').order_by('-created_at')
         # linked_folders_serializer = FolderSerializer(linked_folders, many=True, isShare=isShare_bool)
 
-        # linked_folders_serializer = FolderSerializer(linked_folders, many=True)
-        data = []
-        for item in linked_folders:
-            folder_data = FolderSerializer(item).data
+        # Serialize together so all subtrees come from one fetch
+        data = FolderSerializer(linked_folders, many=True).data
+        for folder_data in data:
             folder_data['isShare'] = False
-            data.append(folder_data)
 
         return APIResponse({
             # 'linked_files': linked_file_contents_serializer.data,
@@ -649,9 +643,12 @@ class NoteBookListingView(APIView):
 
         # Apply search filter if search_query is provided
         if search_query:
-            linked_notes = linked_notes.filter(
-                Q(label__icontains=search_query) | Q(content__icontains=search_query)
-            )
+            if text_index.search_enabled:
+                linked_notes = linked_notes.filter(id__in=text_index.match_ids(user.id, search_query, DOC_NOTEBOOK))
+            else:
+                linked_notes = linked_notes.filter(
+                    Q(label__icontains=search_query) | Q(content__icontains=search_query)
+                )
             linked_folders = linked_folders.filter(
                 title__icontains=search_query
             )
@@ -911,50 +908,6 @@ class GetUserFolderView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-# def upload_folder_structure_to_drive(user, service, folder_data, parent_id=None):
-def delete_folders_file(user, folder_data, folder_list):
-    """
-    Recursively uploads folders to Google Drive while maintaining the structure.
-    """
-
-    for folder in folder_data:
-        files = get_files(user, folder['id'])
-
-        documents = get_documents(user, folder['id'])
-
-        folder_list.append(folder['id'])
-
-        storage = StorageUsage.objects.filter(user=user, is_delete=False).first()
-
-        for document in documents:
-            doc_obj = Document.objects.filter(id=document['id'], is_delete=False).first()
-            doc_obj.delete()
-            
-            if storage:
-                storage.total_storage_used -= doc_obj.size
-                storage.save()
-
-        for file in files:
-            file_obj = UserContent.objects.filter(id=file['id'], is_delete=False).first()
-
-            s3_file_key = file['file']
-
-            sStatus = delete_file_from_s3(s3_file_key)
-
-            file_obj.delete()
-
-            if storage:
-                storage.total_storage_used -= file_obj.fileSize
-                storage.save()
-
-
-        
-        # Recursively create subfolders
-        if folder['subfolders']:
-            delete_folders_file(user, folder['subfolders'], folder_list)
-
-    return folder_list  
-
 class DeleteFolderView(APIView):
     def delete(self, request, pk=None):
         user = request.user
@@ -963,45 +916,16 @@ class DeleteFolderView(APIView):
         except Folder.DoesNotExist:
             return Response({"message": "Folder Not Found"}, status=status.HTTP_404_NOT_FOUND)
         
-        folder_list = [pk]     
-        folderName, folder_data = get_folder_detail(user, pk)
-
-        files = get_files(user, pk)
-
-        documents = get_documents(user, pk)
-
-        storage = StorageUsage.objects.filter(user=user, is_delete=False).first()
+        # The folder with every subfolder, file and document below it
+        contents = subtree_operations.collect(user, folder.id)
 
-        for document in documents:
-            doc_obj = Document.objects.filter(id=document['id'], is_delete=False).first()
-            doc_obj.delete()
-            
-            if storage:
-                storage.total_storage_used -= doc_obj.size
-                storage.save()
+        if subtree_operations.should_defer(contents):
+            # Hide the folder now; the job removes the rows and S3 objects
+            Folder.objects.filter(id=folder.id).update(is_delete=True)
+            task = delete_folder_subtree.delay(user.id, folder.id)
+            return Response({"message": "Folder Delete in progress", "task_id": task.id}, status=status.HTTP_202_ACCEPTED)
 
-        for file in files:
-            file_obj = UserContent.objects.filter(id=file['id'], is_delete=False).first()
-
-            # if file['content_type'] == 'document':
-            #     file_obj.delete()
-            #     if storage:
-            #         storage.total_storage_used -= file_obj.fileSize
-            #         storage.save()
-            # else:
-            s3_file_key = file['file']
-            sStatus = delete_file_from_s3(s3_file_key)
-
-            file_obj.delete()  
-            if storage:
-                storage.total_storage_used -= file_obj.fileSize
-                storage.save()
-
-
-        new_folder_list = delete_folders_file(user, folder_data, folder_list)
-
-        # print("List is ---> ", new_folder_list)
-        Folder.objects.filter(id__in=new_folder_list).delete()
+        subtree_operations.delete(user, contents)
 
         return Response({"message": "Folder Delete"}, status=status.HTTP_200_OK)
     
@@ -1735,12 +1659,18 @@ class PromptDocument(APIView):
         # category_id = request.query_params.get('category_id') 
         queryset = Document.objects.filter(enabled=True, is_delete=False,user=request.user.id)
 
-        if search != 'null':
-            queryset = queryset.filter(
-                Q(llm_model__icontains=search) | 
-                Q(title__icontains=search) | 
-                Q(content__icontains=search)
-            )
+        if search and search != 'null':
+            if text_index.search_enabled:
+                queryset = queryset.filter(
+                    Q(llm_model__icontains=search) |
+                    Q(id__in=text_index.match_ids(request.user.id, search, DOC_DOCUMENT))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(llm_model__icontains=search) | 
+                    Q(title__icontains=search) | 
+                    Q(content__icontains=search)
+                )
 
         queryset = queryset.order_by('-created_at')
 
@@ -1885,10 +1815,16 @@ class GroupHistoryView(APIView):
 
         paginator = self.pagination_class()
 
+        try:
+            group = GroupResponse.objects.get(pk=pk, user=request.user.id, is_delete=False)
+        except GroupResponse.DoesNotExist:
+            return Response({"message": "Group not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        queryset = Prompt.objects.filter(enabled=True, is_delete=False, user=request.user.id, group=pk)
-
-        queryset = queryset.order_by('-created_at')
+        # Every generation type (text, image, code, audio) is a Prompt row;
+        # ConversationTurn only holds the chat text sent back to the model
+        queryset = Prompt.objects.filter(
+            enabled=True, is_delete=False, user=request.user.id, group=group.id,
+        ).select_related('category').order_by('-created_at')
         serializer = GroupHistorySerializer(queryset, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -2022,38 +1958,21 @@ class DashboardCount(APIView):
             is_delete=False
         ).count()
 
-        subs = Subscription.objects.filter(
-            user=request.user.id, 
-            status__in=['active', 'trial'],
-            is_delete = False,
-        ).first()
+        entitlements = entitlement_service.for_user(request.user)
+
+        avialableToken = entitlements.balance_token if entitlements.is_subscribed else 0
 
-        if subs:
-            avialableToken = subs.balanceToken
-            usedTextToken = subs.usedToken
+        # Only the balance is shared with a cluster; the other counters are the user's own
+        own_subscription = entitlements.is_subscribed and not entitlements.is_cluster
+
+        if own_subscription:
+            usedTextToken = entitlements.used_token
         else:
+            # Cluster members (and users without a plan) only count their own usage
             usedTextToken = PromptResponse.objects.filter(
                 user=request.user.id, 
                 response_type__in=[2, 3, 7, 8]).aggregate(
                     total=Sum('tokenUsed')).get('total', 0)
-            
-            # if request.user.cluster and request.user.cluster.subscription:
-            #     try:
-            #         cluster_subs = Subscription.objects.get(id=request.user.cluster.subscription.id, status='active')
-            #         avialableToken = cluster_subs.balanceToken
-            #     except Subscription.DoesNotExist:
-            #         avialableToken = 0
-            # else:
-            #     avialableToken = 0
-
-            cluster = request.user.cluster
-            subscription = getattr(cluster, 'subscription', None)
-
-            avialableToken = (
-                subscription.balanceToken 
-                if subscription and (subscription.status == 'active' or subscription.status == 'trial') 
-                else 0
-            )
 
 
         data = {
@@ -2069,11 +1988,11 @@ class DashboardCount(APIView):
             # 'avialableToken': subs.balanceToken if subs else 0,
             'avialableToken': avialableToken,
             'usedToken': 0 if usedTextToken is None else usedTextToken,
-            'expireToken': subs.expireToken if subs else 0,
+            'expireToken': entitlements.expire_token if own_subscription else 0,
 
-            'availableFileToken': subs.fileToken if subs else 0,
-            'usedFileToken': subs.usedFileToken if subs else 0,
-            'expireFileToken': subs.expireFileToken if subs else 0,
+            'availableFileToken': entitlements.file_token if own_subscription else 0,
+            'usedFileToken': entitlements.used_file_token if own_subscription else 0,
+            'expireFileToken': entitlements.expire_file_token if own_subscription else 0,
         }
 
         return Response({"data": data}, status=status.HTTP_200_OK)
@@ -2363,7 +2282,7 @@ class UserFileView(APIView):
                     storage = StorageUsage.objects.get(id=storageId)
 
                     # Calculate new total usage if this file is uploaded
-                    new_total_storage_used = storage.total_storage_used + file.size
+                    new_total_storage_used = storage.total_storage_used + storage.reserved_storage + file.size
 
                     if new_total_storage_used > storage.storage_limit:
                         return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2389,8 +2308,7 @@ class UserFileView(APIView):
                         if serializer.is_valid():
                             serializer.save()
 
-                            storage.total_storage_used = new_total_storage_used
-                            storage.save()
+                            direct_uploads.charge(storage.id, file.size)
                             
                             return Response(serializer.data, status=status.HTTP_200_OK)
                         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2432,7 +2350,7 @@ class UserFileView(APIView):
 
                     # if storage:           
                         # Calculate new total usage if this file is uploaded
-                        new_total_storage_used = storage.total_storage_used + file.size
+                        new_total_storage_used = storage.total_storage_used + storage.reserved_storage + file.size
 
                         if new_total_storage_used > storage.storage_limit:
                             return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2458,8 +2376,7 @@ class UserFileView(APIView):
                             if serializer.is_valid():
                                 serializer.save()
 
-                                storage.total_storage_used = new_total_storage_used
-                                storage.save()
+                                direct_uploads.charge(storage.id, file.size)
                                 
                                 return Response(serializer.data, status=status.HTTP_200_OK)
                             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2500,7 +2417,7 @@ class UserFileView(APIView):
 
                     if storage:           
                         # Calculate new total usage if this file is uploaded
-                        new_total_storage_used = storage.total_storage_used + file.size
+                        new_total_storage_used = storage.total_storage_used + storage.reserved_storage + file.size
 
                         if new_total_storage_used > storage.storage_limit:
                             return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2526,8 +2443,7 @@ class UserFileView(APIView):
                             if serializer.is_valid():
                                 serializer.save()
 
-                                storage.total_storage_used = new_total_storage_used
-                                storage.save()
+                                direct_uploads.charge(storage.id, file.size)
                                 
                                 return Response(serializer.data, status=status.HTTP_200_OK)
                             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2574,7 +2490,7 @@ class UserFileView(APIView):
                 storage = StorageUsage.objects.get(id=storageId)
 
                 # Calculate new total usage if this file is uploaded
-                new_total_storage_used = storage.total_storage_used + fileSize
+                new_total_storage_used = storage.total_storage_used + storage.reserved_storage + fileSize
 
                 if new_total_storage_used > storage.storage_limit:
                     return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2600,8 +2516,7 @@ class UserFileView(APIView):
                 if serializer.is_valid():
                     serializer.save()
 
-                    storage.total_storage_used = new_total_storage_used
-                    storage.save()
+                    direct_uploads.charge(storage.id, fileSize)
                     
                     return Response(serializer.data, status=status.HTTP_200_OK)
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2640,7 +2555,7 @@ class UserFileView(APIView):
                     cluster.save()
 
                     # Calculate new total usage if this file is uploaded
-                    new_total_storage_used = storage.total_storage_used + fileSize
+                    new_total_storage_used = storage.total_storage_used + storage.reserved_storage + fileSize
 
                     if new_total_storage_used > storage.storage_limit:
                         return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2666,8 +2581,7 @@ class UserFileView(APIView):
                     if serializer.is_valid():
                         serializer.save()
 
-                        storage.total_storage_used = new_total_storage_used
-                        storage.save()
+                        direct_uploads.charge(storage.id, fileSize)
                         
                         return Response(serializer.data, status=status.HTTP_200_OK)
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2706,7 +2620,7 @@ class UserFileView(APIView):
 
                 if storage:           
                     # Calculate new total usage if this file is uploaded
-                    new_total_storage_used = storage.total_storage_used + fileSize
+                    new_total_storage_used = storage.total_storage_used + storage.reserved_storage + fileSize
 
                     if new_total_storage_used > storage.storage_limit:
                         return Response({"message": "Storage limit exceeded. Please delete some files or Buy Plan to upload new ones."}, status=status.HTTP_403_FORBIDDEN)
@@ -2732,8 +2646,7 @@ class UserFileView(APIView):
                     if serializer.is_valid():
                         serializer.save()
 
-                        storage.total_storage_used = new_total_storage_used
-                        storage.save()
+                        direct_uploads.charge(storage.id, fileSize)
                         
                         return Response(serializer.data, status=status.HTTP_200_OK)
                     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -2794,6 +2707,74 @@ class UserFileView(APIView):
             return Response({"message": "File Update"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+class DirectUploadView(APIView):
+    """
+    Presigned multipart uploads: the client PUTs file parts straight to S3.
+
+    POST   initiate_upload/          reserve quota, get one URL per part
+    PATCH  complete_upload/<pk>/     send the parts' ETags, get the stored file
+    DELETE abort_upload/<pk>/        give the reservation back
+    """
+
+    def post(self, request):
+        fileName = request.data.get("fileName", None)
+        fileSize = request.data.get("fileSize", None)
+        folder_id = request.data.get("folder", None)
+        purpose = request.data.get("purpose", PURPOSE_CONTENT)
+
+        if not fileName or fileSize is None:
+            return Response({"message": "fileName and fileSize are required."}, status=status.HTTP_400_BAD_REQUEST)
+        if purpose not in (PURPOSE_CONTENT, PURPOSE_PROFILE_IMAGE):
+            return Response({"message": "Invalid upload purpose."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fileSize = int(fileSize)
+        except (TypeError, ValueError):
+            return Response({"message": "fileSize must be a number of bytes."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if folder_id and not Folder.objects.filter(id=folder_id, user=request.user.id, is_delete=False).exists():
+            return Response({"message": "Folder Not Found"}, status=status.HTTP_404_NOT_FOUND)
+
+        session, urls = direct_uploads.initiate(
+            request.user, fileName, fileSize,
+            content_type=request.data.get("contentType", None),
+            folder_id=folder_id or None,
+            purpose=purpose,
+        )
+        return Response({
+            "upload": session.id,
+            "key": session.object_key,
+            "part_size": session.part_size,
+            "part_urls": urls,
+            "expires_at": session.expires_at,
+        }, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, pk=None):
+        session = UploadSession.objects.filter(pk=pk, user=request.user.id).first()
+        if session is None:
+            return Response({"message": "Upload Not Found"}, status=status.HTTP_404_NOT_FOUND)
+
+        parts = request.data.get("parts", None)
+        if not isinstance(parts, list) or not parts:
+            return Response({"message": "parts must list each PartNumber and ETag."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            parts = [{"PartNumber": int(part["PartNumber"]), "ETag": str(part["ETag"])} for part in parts]
+        except (KeyError, TypeError, ValueError):
+            return Response({"message": "parts must list each PartNumber and ETag."}, status=status.HTTP_400_BAD_REQUEST)
+
+        result = direct_uploads.complete(session, parts)
+        if session.purpose == PURPOSE_PROFILE_IMAGE:
+            return Response({'message': 'Image uploaded', 'imageKey': session.object_key}, status=status.HTTP_200_OK)
+        return Response(ContentOutputSerializer(result).data, status=status.HTTP_200_OK)
+
+    def delete(self, request, pk=None):
+        session = UploadSession.objects.filter(pk=pk, user=request.user.id, status=STATUS_RESERVED).first()
+        if session is None:
+            return Response({"message": "Upload Not Found"}, status=status.HTTP_404_NOT_FOUND)
+
+        direct_uploads.release(session)
+        return Response({"message": "Upload Cancelled"}, status=status.HTTP_200_OK)
+
+
 class ShareWithMeView(APIView):
     pagination_class = PageNumberPagination
 
@@ -3114,52 +3095,6 @@ class UserStorageDetailView(APIView):
         
         return Response({"message": "Storage not found/expire"}, status=status.HTTP_404_NOT_FOUND)
     
-# Get file size for all subfolder file.
-def get_sub_folder_detail(ownerId, shareToId, folder_data, access_type, folderId):
-    for folder in folder_data:
-        detail = {
-            "folder": folder['id'],
-            "owner": ownerId,
-            "share_to_user": shareToId,
-            "content_type": "folder",
-            "access_type": access_type,
-            "main_folder": folderId
-        }
-        serializer = ShareContentInputSerializer(data=detail, many=False)
-        if serializer.is_valid():
-            serializer.save()
-
-            files = UserContent.objects.filter(user=ownerId,is_delete=False, folder=folder['id'])
-
-            for userFile in files:
-                detail = {
-                    "file": userFile.id,
-                    "owner": ownerId,
-                    "share_to_user": shareToId,
-                    "content_type": "file",
-                    "access_type": access_type,
-                }
-                serializer = ShareContentInputSerializer(data=detail, many=False)
-                if serializer.is_valid():
-                    serializer.save()
-            documents = Document.objects.filter(user=ownerId, is_delete=False, folder=folder['id'])
-            for document in documents:
-                detail = {
-                    "document": document.id,
-                    "owner": ownerId,
-                    "share_to_user": shareToId,
-                    "content_type": "document",
-                    "access_type": access_type,
-                }
-                serializer = ShareContentInputSerializer(data=detail, many=False)
-                if serializer.is_valid():
-                    serializer.save()
-        
-        # Recursively create subfolders
-        if folder['subfolders']:
-            get_sub_folder_detail(ownerId, shareToId, folder['subfolders'], access_type, folder['id'])
-
-
 # User Share Content Management
 class ShareContentView(APIView):
     pagination_class = PageNumberPagination
@@ -3216,6 +3151,11 @@ class ShareContentView(APIView):
         not_exits = []
         # exits = []
         verified = []
+        deferredUsers = []
+        if contentType == "folder":
+            subtree = subtree_operations.collect(request.user, folderId, include_deleted=False)
+            deferSubtree = subtree_operations.should_defer(subtree)
+
         for email in emails:
             user = CustomUser.objects.filter(email=email, is_delete=False).first()
             # if user and user.is_verified and not user.is_blocked:
@@ -3273,101 +3213,29 @@ class ShareContentView(APIView):
                         verified.append(email)
                         share_content_email.delay(user.id)
             elif user and contentType == "folder":
-                share = Share.objects.filter(
-                    owner=request.user.id, 
-                    share_to_user=user.id, 
-                    content_type=contentType,
-                    folder = folderId,
-                    is_delete=False
-                ).exists()
-                if share:
-                    verified.append(email)
-                    share_content_email.delay(user.id)
-                    
-                    files = UserContent.objects.filter(user=request.user,is_delete=False, folder=folderId)
-                    for userFile in files:
-                        try:
-                            shareFile = Share.objects.get(file=userFile.id, is_delete=False)
-                        except shareFile.DoesNotExist():
-                            detail = {
-                                "file": userFile.id,
-                                "owner": request.user.id,
-                                "share_to_user": user.id,
-                                "content_type": "file",
-                                "access_type": access_type,
-                            }
-                            serializer = ShareContentInputSerializer(data=detail, many=False)
-                            if serializer.is_valid():
-                                serializer.save()
-
-                    documents = Document.objects.filter(user=request.user, is_delete=False, folder=folderId)
-                    for document in documents:
-                        try:
-                            shareFile = Share.objects.get(document=document.id, is_delete=False)
-                        except shareFile.DoesNotExist():
-                            detail = {
-                                "document": document.id,
-                                "owner": request.user.id,
-                                "share_to_user": user.id,
-                                "content_type": "document",
-                                "access_type": access_type,
-                            }
-                            serializer = ShareContentInputSerializer(data=detail, many=False)
-                            if serializer.is_valid():
-                                serializer.save()
+                # The folder and everything below it; items already shared are skipped
+                if deferSubtree:
+                    deferredUsers.append(user.id)
                 else:
-                    detail = {
-                        "folder": folderId,
-                        "owner": request.user.id,
-                        "share_to_user": user.id,
-                        "content_type": contentType,
-                        "access_type": access_type,
-                    }
-                    serializer = ShareContentInputSerializer(data=detail, many=False)
-                    if serializer.is_valid():
-                        serializer.save()
-
-                        files = UserContent.objects.filter(user=request.user,is_delete=False, folder=folderId)
-                        for userFile in files:
-                            detail = {
-                                "file": userFile.id,
-                                "owner": request.user.id,
-                                "share_to_user": user.id,
-                                "content_type": "file",
-                                "access_type": access_type,
-                            }
-                            serializer = ShareContentInputSerializer(data=detail, many=False)
-                            if serializer.is_valid():
-                                serializer.save()
-                        documents = Document.objects.filter(user=request.user, is_delete=False, folder=folderId)
-                        for document in documents:
-                            detail = {
-                                "document": document.id,
-                                "owner": request.user.id,
-                                "share_to_user": user.id,
-                                "content_type": "document",
-                                "access_type": access_type,
-                            }
-                            serializer = ShareContentInputSerializer(data=detail, many=False)
-                            if serializer.is_valid():
-                                serializer.save()
-
-                        folderName, folder_data = get_folder_detail(request.user.id, folderId)
+                    subtree_operations.share(request.user.id, user.id, subtree, access_type)
 
-                        get_sub_folder_detail(request.user.id, user.id, folder_data, access_type, folderId)
-
-                        verified.append(email)
-                        share_content_email.delay(user.id)
+                verified.append(email)
+                share_content_email.delay(user.id)
 
             # elif user and (not user.is_verified or user.is_blocked):
             #     exits.append(email)
             else:
                 not_exits.append(email)
          
-        return Response({"content_sent_mails": verified, 
+        response = {"content_sent_mails": verified, 
                         #  "not_verified_mails": exits,
                          "not_exists_mails": not_exits,
-                          "message": "Content share Successfully" }, status=status.HTTP_200_OK)
+                          "message": "Content share Successfully" }
+
+        if deferredUsers:
+            task = share_folder_subtree.delay(request.user.id, deferredUsers, folderId, access_type)
+            response["task_id"] = task.id
+        return Response(response, status=status.HTTP_200_OK)
     
 
     def get(self, request, pk=None):
@@ -3773,8 +3641,9 @@ def convert_mp4_to_mp3(input_file, output_file):
     except subprocess.CalledProcessError as e:
         return False
     
-def convert_audio_into_text(audio_file_path, user):
-    output_path = settings.BASE_DIR
+def convert_audio_into_text(audio_file_path, user, workDir=None):
+    # Chunk files go to the caller's job directory when given
+    output_path = workDir or settings.BASE_DIR
 
     url = "https://api.openai.com/v1/audio/transcriptions"
 
@@ -10,6 +10,7 @@ import json
 from django.http import JsonResponse, StreamingHttpResponse, HttpResponse
 from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from .models import LLM
+from .services.fanout import fan_out, EVENT_ITEM, EVENT_ERROR, EVENT_TIMEOUT
 from .utils import (generateUsingGemini, generateUsingTogether, 
                     generateTextByTogether, generateTextByTogetherTest, 
                     generateUsingGeminiTest
@@ -18,7 +19,7 @@ import time
 from rest_framework import status
 import multiprocessing
 from threading import Event, Thread
-from queue import Queue
+from functools import partial
 from django.utils import timezone
 
 import asyncio
@@ -122,11 +123,13 @@ class TextGenerationAPIView(APIView):
 
 
 ####################################################################3333
+# Per-model limit for a comparison stream, in seconds
+MODEL_STREAM_TIMEOUT = 120
+
 # Combine the generators into a single asynchronous generator
-def combine_generators(models, prompt):
+def combine_generators(models, prompt, timeout=MODEL_STREAM_TIMEOUT):
 # def combine_generators(param_1):
-    threads = []
-    queue_list = []
+    sources = {}
     for model in models:
         try:
             llm_instance = LLM.objects.get(name=model)
@@ -140,40 +143,10 @@ def combine_generators(models, prompt):
             return
         
         if model == "Gemini Pro":
-            queue_1 = Queue()
-            thread_1 = Thread(
-                target=generateUsingGeminiTest, 
-                args=(prompt, model_string, model, queue_1))
-            thread_1.start()
-            threads.append(thread_1)
-            queue_list.append(queue_1)
-
-        elif model == 'Llama 2':
-            queue_2 = Queue()
-            thread_2 = Thread(
-                target=generateTextByTogetherTest, 
-                args=(prompt, model_string, model, queue_2))
-            thread_2.start()
-            threads.append(thread_2)
-            queue_list.append(queue_2)
-
-        elif model == 'Mistral':
-            queue_3 = Queue()
-            thread_3 = Thread(
-                target=generateTextByTogetherTest, 
-                args=(prompt, model_string, model, queue_3))
-            thread_3.start()
-            threads.append(thread_3)
-            queue_list.append(queue_3)
-
-        elif model == 'Gemma Instruct':
-            queue_4 = Queue()
-            thread_4 = Thread(
-                target=generateTextByTogetherTest, 
-                args=(prompt, model_string, model, queue_4))
-            thread_4.start()
-            threads.append(thread_4)
-            queue_list.append(queue_4)
+            sources[model] = partial(generateUsingGeminiTest, prompt, model_string, model)
+
+        elif model in ['Llama 2', 'Mistral', 'Gemma Instruct']:
+            sources[model] = partial(generateTextByTogetherTest, prompt, model_string, model)
 
         else:
             my_dict = {
@@ -183,22 +156,18 @@ def combine_generators(models, prompt):
             yield f"data: {my_dict}\n\n"
             return
 
-    # Yield data from all queues concurrently
-    done_count = 0
-    while done_count < len(threads):
-        for queue in queue_list:
-            try:
-                data = queue.get_nowait()
-                if data == "DONE":
-                    done_count += 1
-                else:
-                    yield data
-            except Exception:
-                pass  # Queue is empty, continue to the next one
-
-    # # Wait for all threads to finish
-    # for thread in threads:
-    #     thread.join()
+    # Yield data from all models as it arrives. Closing this generator
+    # (client disconnect) cancels the models that are still streaming.
+    for event in fan_out.stream(sources, timeout=timeout):
+        if event.kind == EVENT_ITEM:
+            yield event.value
+        elif event.kind in (EVENT_ERROR, EVENT_TIMEOUT):
+            my_dict = json.dumps({
+                "model": event.key,
+                "text": ["DONE"],
+                "error": "timeout" if event.kind == EVENT_TIMEOUT else "failed",
+            })
+            yield f"data: {my_dict}\n\n"
 
     
 
@@ -98,7 +98,31 @@ class Subscription(models.Model):
 
     def __str__(self):
         return f"{self.plan.plan_name}"
-    
+
+
+
+class TokenReservation(models.Model):
+    """Tokens held from a subscription while a generation is running."""
+    kind_type = (("text", 'text'), ("file", 'file'))
+    status_type = (("reserved", 'reserved'), ("committed", 'committed'), ("released", 'released'))
+
+    subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='reservations')
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
+    kind = models.CharField(choices=kind_type, max_length=10, default='text')
+    amount = models.IntegerField(default=0)
+    used = models.IntegerField(default=0)
+    status = models.CharField(choices=status_type, max_length=20, default='reserved')
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subscription_id}: {self.amount} {self.kind} ({self.status})"
 
 
 class Transaction(models.Model):
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Batch Processing Benchmark for MultinotesAI.
+
+Measures batch job throughput against a local fake LLM (a processor that
+sleeps for a fixed latency, standing in for the provider round-trip):
+- Sequential: one item in flight at a time
+- Pooled: max_concurrent items in flight in one worker
+- Workers: the job's chunks split over several simulated worker nodes
+  (threads calling process_chunk, as the Celery chord would)
+
+Every run creates a fresh job and reports items/s plus the database
+queries spent per item (claim + checkpoint) in the single-worker runs.
+
+The database is created with Django's test database machinery and
+destroyed afterwards, so the configured database is never written to.
+
+Usage:
+    python scripts/benchmark_batch_processing.py
+    python scripts/benchmark_batch_processing.py --items 500 --latency 0.2 --workers 4
+"""
+
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def fake_llm(latency):
+    """Processor factory for a provider that answers after ``latency`` seconds."""
+    def factory(metadata):
+        def process(input_data):
+            time.sleep(latency)
+            return {'output': f"summary of {input_data['text']}", 'tokens': 50, 'cost': 0.0001}
+        return process
+    return factory
+
+
+def run(service, user, args, max_concurrent, workers=1):
+    """Create and run one job; returns (seconds, main-thread queries, job)."""
+    from django.db import close_old_connections, connection
+    from django.test.utils import CaptureQueriesContext
+    from coreapp.services.batch_processing import BatchConfig, BatchStatus
+
+    config = BatchConfig(
+        max_concurrent=max_concurrent,
+        batch_size=args.batch_size,
+        retry_count=0,
+        rate_limit_per_minute=1_000_000,
+        max_items_per_batch=args.items,
+        enable_notifications=False,
+    )
+    job = service.create_job(
+        user_id=user.id,
+        name='benchmark',
+        items=[{'text': f'document {i}'} for i in range(args.items)],
+        processor_type='fake_llm',
+        provider='benchmark',
+        config=config,
+    )
+    service._transition(job.job_id, [BatchStatus.PENDING], BatchStatus.PROCESSING, started=True)
+    chunks = service._pending_chunks(job.job_id)
+
+    def worker(assigned):
+        try:
+            for item_pks in assigned:
+                service.process_chunk(job.job_id, item_pks)
+        finally:
+            close_old_connections()
+
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if workers == 1:
+            for item_pks in chunks:
+                service.process_chunk(job.job_id, item_pks)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as nodes:
+                list(nodes.map(worker, [chunks[n::workers] for n in range(workers)]))
+        elapsed = time.perf_counter() - start
+        service.finalize_job(job.job_id)
+
+    return elapsed, len(queries), service.get_job(job.job_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batch job throughput against a fake LLM')
+    parser.add_argument('--items', type=int, default=200, help='Items per job')
+    parser.add_argument('--latency', type=float, default=0.05, help='Fake LLM latency in seconds')
+    parser.add_argument('--concurrency', type=int, default=10, help='Items in flight per worker')
+    parser.add_argument('--batch-size', type=int, default=50, help='Items per chunk task')
+    parser.add_argument('--workers', type=int, default=4, help='Simulated worker nodes')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from coreapp.services.batch_processing import BatchProcessingService, register_processor
+
+    register_processor('fake_llm', fake_llm(args.latency))
+    # Measure the engine, not the provider limit
+    settings.BATCH_PROVIDER_RATE_LIMITS = {'benchmark': 1_000_000}
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            username='bench', email='bench@example.com', password='bench-pass'
+        )
+        service = BatchProcessingService()
+
+        runs = [
+            ('sequential', dict(max_concurrent=1)),
+            ('pooled', dict(max_concurrent=args.concurrency)),
+            (f'{args.workers} workers', dict(max_concurrent=args.concurrency, workers=args.workers)),
+        ]
+
+        n = args.items
+        header = f"{'run':>18} | {'items/s':>9} | {'queries/item':>12} | {'status':>10}"
+        print(f"{n} items, {args.latency * 1000:.0f} ms fake LLM latency")
+        print(header)
+        print('-' * len(header))
+        for label, options in runs:
+            elapsed, queries, job = run(service, user, args, **options)
+            per_item = f"{queries / n:.2f}" if options.get('workers', 1) == 1 else '-'
+            print(f"{label:>18} | {n / elapsed:>9.1f} | {per_item:>12} | {job.status.value:>10}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
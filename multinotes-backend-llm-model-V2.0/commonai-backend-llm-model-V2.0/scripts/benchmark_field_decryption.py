@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Encrypted Field Decryption Benchmark for MultinotesAI.
+
+Measures the per-row cost of decrypting an encrypted column:
+- Derive per row: PBKDF2 key derivation and a new AESGCM on every value
+  (what an uncached key lookup costs)
+- New cipher per row: cached key, but a new AESGCM on every value
+- Keyring: cached key and cipher (decrypt_aes_gcm)
+- Bulk: decrypt_many over the whole column
+
+Usage:
+    python scripts/benchmark_field_decryption.py
+    python scripts/benchmark_field_decryption.py --rows 5000 --derive-rows 20
+"""
+
+import os
+import sys
+import time
+import base64
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def per_row(values, decrypt):
+    """Best-of-three microseconds per value."""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for value in values:
+            decrypt(value)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(values) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark encrypted field decryption')
+    parser.add_argument('--rows', type=int, default=2000, help='Values in the column')
+    parser.add_argument('--derive-rows', type=int, default=10, help='Values for the (slow) derive-per-row run')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    from backend.crypto import (
+        NONCE_SIZE,
+        _derive_key,
+        _split_header,
+        decrypt_aes_gcm,
+        decrypt_many,
+        encrypt_aes_gcm,
+        keyring,
+    )
+
+    values = [encrypt_aes_gcm(f'sk-live-{n:06d}-abcdefghijklmnopqrstuvwxyz') for n in range(args.rows)]
+    key = keyring.key(1)
+
+    def derive_per_row(value):
+        encrypted = base64.urlsafe_b64decode(_split_header(value)[1])
+        cipher = AESGCM(_derive_key(settings.SECRET_KEY))
+        return cipher.decrypt(encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], None).decode()
+
+    def new_cipher_per_row(value):
+        encrypted = base64.urlsafe_b64decode(_split_header(value)[1])
+        return AESGCM(key).decrypt(encrypted[:NONCE_SIZE], encrypted[NONCE_SIZE:], None).decode()
+
+    results = [
+        ('derive per row', per_row(values[:args.derive_rows], derive_per_row)),
+        ('new cipher per row', per_row(values, new_cipher_per_row)),
+        ('keyring', per_row(values, decrypt_aes_gcm)),
+    ]
+
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        decrypt_many(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    results.append(('bulk (decrypt_many)', best / len(values) * 1e6))
+
+    header = f"{'path':>20} | {'us/row':>10} | {'50-row page (ms)':>16}"
+    print(header)
+    print('-' * len(header))
+    for label, us in results:
+        print(f"{label:>20} | {us:>10.1f} | {us * 50 / 1000:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+"""
+Folder Tree Benchmark for MultinotesAI.
+
+Seeds a throwaway test database with one user's folder tree (5,000
+folders, 10 levels deep by default, one file per folder) and compares the
+recursive per-folder reads with the closure-table reads for:
+- Nested serialization of a whole tree (FolderSerializer)
+- The breadcrumb path of the deepest folder
+- The total file size of a subtree
+
+The database is created with Django's test database machinery and
+destroyed afterwards, so the configured database is never written to.
+
+Usage:
+    python scripts/benchmark_folder_tree.py
+    python scripts/benchmark_folder_tree.py --folders 20000 --depth 15 --repeat 5
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def seed(folders, depth, roots):
+    """Create the tree level by level; return (user, root folders, deepest folder)."""
+    from django.contrib.auth import get_user_model
+    from coreapp.models import Folder, UserContent
+
+    rng = random.Random(0)
+    user = get_user_model().objects.create_user(
+        username='bench', email='bench@example.com', password='bench-pass'
+    )
+
+    per_level, extra = divmod(max(0, folders - roots), max(1, depth - 1))
+    levels = [[Folder.objects.create(title=f'root {i}', user=user) for i in range(roots)]]
+    for level in range(1, depth):
+        levels.append([
+            Folder.objects.create(title=f'L{level}-{i}', user=user, parent_folder=rng.choice(levels[-1]))
+            for i in range(max(1, per_level + (level <= extra)))
+        ])
+
+    UserContent.objects.bulk_create([
+        UserContent(user=user, folder=folder, fileName='file', file='key', fileSize=1024)
+        for level in levels for folder in level
+    ])
+    return user, levels[0], levels[-1][0]
+
+
+def legacy_serializer():
+    """FolderSerializer as it was: one subfolders query per folder."""
+    from rest_framework import serializers
+    from coreapp.models import Folder
+    from coreapp.serializers import GetCustomUserSerializer
+
+    class LegacyFolderSerializer(serializers.ModelSerializer):
+        subfolders = serializers.SerializerMethodField()
+        user = GetCustomUserSerializer()
+
+        class Meta:
+            model = Folder
+            fields = '__all__'
+
+        def get_subfolders(self, obj):
+            return self.__class__(obj.subfolders.all(), many=True).data
+
+    return LegacyFolderSerializer
+
+
+def legacy_breadcrumbs(folder):
+    path = [{'id': folder.id, 'title': folder.title}]
+    parent_folder = folder.parent_folder
+    while parent_folder:
+        path.insert(0, {'id': parent_folder.id, 'title': parent_folder.title})
+        parent_folder = parent_folder.parent_folder
+    return path
+
+
+def legacy_subtree_size(user, folder_data):
+    from coreapp.views_legacy import get_folder_file_size
+
+    total = 0
+    for folder in folder_data:
+        total += get_folder_file_size(user, folder['id'])
+        total += legacy_subtree_size(user, folder['subfolders'])
+    return total
+
+
+def measure(fn, repeat):
+    """(queries of one run, median ms)."""
+    from django.db import connection
+
+    # Counted with a wrapper: connection.queries is capped at 9,000 entries
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return len(queries), sorted(times)[len(times) // 2] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark folder tree reads before and after the closure table')
+    parser.add_argument('--folders', type=int, default=5000, help='Folders in the tree')
+    parser.add_argument('--depth', type=int, default=10, help='Levels in the tree')
+    parser.add_argument('--roots', type=int, default=10, help='Top-level folders')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per read (median is kept)')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+    from coreapp.models import Folder
+    from coreapp.serializers import FolderSerializer
+    from coreapp.services.folder_tree import folder_tree
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        start = time.perf_counter()
+        user, roots, deepest = seed(args.folders, args.depth, args.roots)
+        print(f"Seeded {Folder.objects.count()} folders, {args.depth} levels, in {time.perf_counter() - start:.1f}s")
+
+        root_ids = [root.id for root in roots]
+        deepest = Folder.objects.get(pk=deepest.pk)
+        nested = FolderSerializer(Folder.objects.filter(id__in=root_ids), many=True).data
+        Legacy = legacy_serializer()
+
+        reads = [
+            ('tree serialize',
+             lambda: Legacy(Folder.objects.filter(id__in=root_ids), many=True).data,
+             lambda: FolderSerializer(Folder.objects.filter(id__in=root_ids).select_related('user'), many=True).data),
+            ('breadcrumbs',
+             lambda: legacy_breadcrumbs(Folder.objects.get(pk=deepest.pk)),
+             lambda: folder_tree.breadcrumbs(deepest)),
+            ('subtree size',
+             lambda: sum(legacy_subtree_size(user, [folder]) for folder in nested),
+             lambda: sum(folder_tree.subtree_file_size(user, root_id) for root_id in root_ids)),
+        ]
+
+        header = (f"{'read':>15} | {'queries before':>14} | {'ms before':>10} | "
+                  f"{'queries after':>13} | {'ms after':>9}")
+        print(header)
+        print('-' * len(header))
+        for label, before, after in reads:
+            before_queries, before_ms = measure(before, args.repeat)
+            after_queries, after_ms = measure(after, args.repeat)
+            print(f"{label:>15} | {before_queries:>14} | {before_ms:>10.1f} | "
+                  f"{after_queries:>13} | {after_ms:>9.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
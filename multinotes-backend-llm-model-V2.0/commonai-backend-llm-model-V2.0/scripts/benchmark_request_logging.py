@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Request Logging Benchmark for MultinotesAI.
+
+Compares the per-request cost of writing a log row:
+- Inline: create the row before the view and save it again after
+  (the old RequestLoggingMiddleware pattern, two round-trips)
+- Buffered: build the row and append it to the log writer
+
+APIUsageLog rows are used as the log rows. The buffered run also reports
+what the flusher spends writing the same rows with bulk_create, which
+happens off the request path.
+
+The database is created with Django's test database machinery and
+destroyed afterwards, so the configured database is never written to.
+
+Usage:
+    python scripts/benchmark_request_logging.py
+    python scripts/benchmark_request_logging.py --requests 20000 --batch-size 1000
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def inline_request(user, i):
+    """Two writes per request, as the middleware used to do."""
+    from coreapp.models_analytics import APIUsageLog
+
+    entry = APIUsageLog.objects.create(user=user, endpoint='/api/user/get_contents/', method='GET',
+                                       request_id=f'inline-{i}')
+    entry.status_code = 200
+    entry.response_time_ms = 12
+    entry.save()
+
+
+def buffered_request(writer, user, i):
+    from coreapp.models_analytics import APIUsageLog
+
+    writer.append(APIUsageLog(user=user, endpoint='/api/user/get_contents/', method='GET',
+                              request_id=f'buffered-{i}', status_code=200, response_time_ms=12))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark inline vs buffered request logging')
+    parser.add_argument('--requests', type=int, default=5000, help='Simulated requests per run')
+    parser.add_argument('--batch-size', type=int, default=500, help='Log writer batch size')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, setup_test_environment
+    from backend.log_writer import BufferedLogWriter
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        user = get_user_model().objects.create_user(
+            username='bench', email='bench@example.com', password='bench-pass'
+        )
+        writer = BufferedLogWriter(max_size=args.requests, batch_size=args.batch_size, background=False)
+
+        with CaptureQueriesContext(connection) as inline_queries:
+            start = time.perf_counter()
+            for i in range(args.requests):
+                inline_request(user, i)
+            inline_s = time.perf_counter() - start
+
+        with CaptureQueriesContext(connection) as buffered_queries:
+            start = time.perf_counter()
+            for i in range(args.requests):
+                buffered_request(writer, user, i)
+            buffered_s = time.perf_counter() - start
+
+        with CaptureQueriesContext(connection) as flush_queries:
+            start = time.perf_counter()
+            writer.flush()
+            flush_s = time.perf_counter() - start
+
+        n = args.requests
+        header = f"{'path':>20} | {'queries/request':>15} | {'us/request':>10}"
+        print(header)
+        print('-' * len(header))
+        print(f"{'inline':>20} | {len(inline_queries) / n:>15.2f} | {inline_s / n * 1e6:>10.1f}")
+        print(f"{'buffered (request)':>20} | {len(buffered_queries) / n:>15.2f} | {buffered_s / n * 1e6:>10.1f}")
+        print(f"{'buffered (flusher)':>20} | {len(flush_queries) / n:>15.2f} | {flush_s / n * 1e6:>10.1f}")
+        print(f"Flushed {writer.written} rows in {len(flush_queries)} queries, dropped {writer.dropped}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Generation Stream Encoding Benchmark for MultinotesAI.
+
+Compares the legacy cumulative frame protocol against the delta protocol
+used by the generation endpoints. For each response length it reports:
+- Bytes written to the wire
+- Encoder CPU time per response
+
+Usage:
+    python scripts/benchmark_stream_encoding.py
+    python scripts/benchmark_stream_encoding.py --lengths 256 1024 4096 --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def make_fragments(token_count):
+    """Simulate provider chunks of roughly one token each."""
+    words = ['the ', 'model ', 'streams ', 'a ', 'long ', 'answer, ', 'token ', 'by ', 'token. ']
+    return [words[i % len(words)] for i in range(token_count)]
+
+
+def run_encoder(mode, fragments, repeat):
+    """Return (bytes on the wire, best CPU seconds) for one response."""
+    from coreapp.streaming import GenerationStreamEncoder
+
+    best_cpu = None
+    wire_bytes = 0
+
+    for _ in range(repeat):
+        frames = GenerationStreamEncoder('benchmark-model', mode)
+        wire_bytes = 0
+
+        start = time.process_time()
+        for fragment in fragments:
+            wire_bytes += len(frames.chunk(fragment).encode('utf-8'))
+        wire_bytes += len(frames.done(promptId=1, responseId=1, groupId=None).encode('utf-8'))
+        elapsed = time.process_time() - start
+
+        best_cpu = elapsed if best_cpu is None else min(best_cpu, elapsed)
+
+    return wire_bytes, best_cpu
+
+
+def format_bytes(num):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark generation stream encoding')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[256, 1024, 4096, 16384],
+                        help='Response lengths in tokens')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is kept)')
+    args = parser.parse_args()
+
+    setup_django()
+    from coreapp.streaming import STREAM_MODE_CUMULATIVE, STREAM_MODE_DELTA
+
+    header = f"{'tokens':>8} | {'cumulative':>12} {'cpu ms':>9} | {'delta':>12} {'cpu ms':>9} | {'bytes x':>8}"
+    print(header)
+    print('-' * len(header))
+
+    for length in args.lengths:
+        fragments = make_fragments(length)
+        cum_bytes, cum_cpu = run_encoder(STREAM_MODE_CUMULATIVE, fragments, args.repeat)
+        delta_bytes, delta_cpu = run_encoder(STREAM_MODE_DELTA, fragments, args.repeat)
+
+        print(
+            f"{length:>8} | {format_bytes(cum_bytes):>12} {cum_cpu * 1000:>9.2f} | "
+            f"{format_bytes(delta_bytes):>12} {delta_cpu * 1000:>9.2f} | "
+            f"{cum_bytes / max(delta_bytes, 1):>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    main()
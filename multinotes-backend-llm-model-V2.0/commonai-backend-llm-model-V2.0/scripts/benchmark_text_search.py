@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Full-Text Search Benchmark for MultinotesAI.
+
+Seeds a throwaway test database with prompt responses, builds the
+full-text index over them and compares, per query:
+- The current LIKE path (response_text__icontains, count + first page)
+- The index path (BM25-ranked text_index.search, first page + total)
+- The list-view filter path (text_index.match_ids)
+
+Queries cover a common word, a mid-frequency word, a rare word and a
+prefix. Response text is drawn from a Zipf-distributed vocabulary.
+
+The database is created with Django's test database machinery and
+destroyed afterwards, so the configured database is never written to.
+Seeding 1M rows takes a while (and about 40 postings per row).
+
+Usage:
+    python scripts/benchmark_text_search.py
+    python scripts/benchmark_text_search.py --rows 100000 --users 10 --repeat 20
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def make_vocabulary(size, seed=0):
+    """Pronounceable pseudo-words, most common first."""
+    rng = random.Random(seed)
+    consonants, vowels = 'bcdfghklmnprstvz', 'aeiou'
+    words = set()
+    while len(words) < size:
+        length = rng.randint(2, 5)
+        words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(length)))
+    return sorted(words, key=lambda w: (len(w), w))
+
+
+def seed(rows, users, words_per_row, batch_size):
+    """Create users and prompt responses; return (user ids, vocabulary)."""
+    from django.contrib.auth import get_user_model
+    from coreapp.models import LLM, Prompt, PromptResponse
+    from ticketandcategory.models import Category, MainCategory
+
+    vocabulary = make_vocabulary(5000)
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    rng = random.Random(1)
+
+    user_model = get_user_model()
+    user_ids = [
+        user_model.objects.create_user(
+            username=f'bench{i}', email=f'bench{i}@example.com', password='bench-pass'
+        ).id
+        for i in range(users)
+    ]
+    llm = LLM.objects.create(name='Bench', model_string='bench')
+    category = Category.objects.create(
+        mainCategory=MainCategory.objects.create(name='Bench', alias_name='bench'),
+        name='Bench', alias_name='bench',
+    )
+    prompts = {
+        user_id: Prompt.objects.create(user_id=user_id, category=category, prompt_text='bench', title='bench').id
+        for user_id in user_ids
+    }
+
+    for start in range(0, rows, batch_size):
+        batch = []
+        for i in range(start, min(rows, start + batch_size)):
+            user_id = user_ids[i % users]
+            text = ' '.join(rng.choices(vocabulary, weights=weights, k=words_per_row))
+            batch.append(PromptResponse(
+                user_id=user_id, llm=llm, prompt_id=prompts[user_id], category=category,
+                response_text=text, response_type=2,
+            ))
+        PromptResponse.objects.bulk_create(batch)
+
+    return user_ids, vocabulary
+
+
+def build_index(batch_size):
+    from coreapp.models import PromptResponse
+    from coreapp.services.text_index import text_index, DOC_RESPONSE
+
+    last_id = 0
+    postings = 0
+    while True:
+        batch = list(
+            PromptResponse.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'user_id', 'response_text')[:batch_size]
+        )
+        if not batch:
+            return postings
+        postings += text_index.index_many(DOC_RESPONSE, batch)
+        last_id = batch[-1][0]
+
+
+def timed(fn, repeat):
+    """Median wall time of ``fn`` in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def run_queries(user_id, vocabulary, repeat):
+    from coreapp.models import PromptResponse
+    from coreapp.services.text_index import text_index, DOC_RESPONSE
+
+    queries = [
+        ('common', vocabulary[0] + ' '),
+        ('mid', vocabulary[200] + ' '),
+        ('rare', vocabulary[4000] + ' '),
+        ('prefix', vocabulary[50][:3]),
+    ]
+
+    header = f"{'query':>8} | {'matches':>8} | {'icontains ms':>13} | {'bm25 ms':>9} | {'match_ids ms':>13}"
+    print(header)
+    print('-' * len(header))
+
+    for label, query in queries:
+        def like():
+            rows = PromptResponse.objects.filter(
+                user_id=user_id, is_delete=False, response_text__icontains=query.strip(),
+            )
+            return rows.count(), list(rows.order_by('-created_at')[:20])
+
+        matches = like()[0]
+        like_ms = timed(like, repeat)
+        bm25_ms = timed(lambda: text_index.search(user_id, query, doc_types=[DOC_RESPONSE], limit=20), repeat)
+        ids_ms = timed(lambda: text_index.match_ids(user_id, query, DOC_RESPONSE), repeat)
+        print(f"{label:>8} | {matches:>8} | {like_ms:>13.1f} | {bm25_ms:>9.1f} | {ids_ms:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full-text index against icontains')
+    parser.add_argument('--rows', type=int, default=1000000, help='Prompt responses to seed')
+    parser.add_argument('--users', type=int, default=10, help='Users the rows are spread over')
+    parser.add_argument('--words', type=int, default=40, help='Words per response')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert / index batch')
+    parser.add_argument('--repeat', type=int, default=10, help='Runs per query (median is kept)')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        start = time.perf_counter()
+        user_ids, vocabulary = seed(args.rows, args.users, args.words, args.batch_size)
+        print(f"Seeded {args.rows} responses for {args.users} users in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        postings = build_index(args.batch_size)
+        print(f"Indexed {postings} postings in {time.perf_counter() - start:.1f}s")
+        print(f"Queries for one user (~{args.rows // args.users} responses), median of {args.repeat}:")
+
+        run_queries(user_ids[0], vocabulary, args.repeat)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
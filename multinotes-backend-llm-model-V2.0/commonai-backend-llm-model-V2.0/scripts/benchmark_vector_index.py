@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Vector Index Benchmark for MultinotesAI.
+
+Builds in-memory vector indexes of random unit vectors and measures, for
+each index size:
+- Load time from the stored float32 bytes (what a worker does on reload)
+- Memory held by the index
+- Top-k query latency (p50 / p95) of the batched NumPy search
+
+Memory grows as size x dimensions x 4 bytes, so 1M vectors at 256
+dimensions need about 1 GB (plus the same again while loading).
+
+Usage:
+    python scripts/benchmark_vector_index.py
+    python scripts/benchmark_vector_index.py --sizes 10000 100000 --dimensions 1536 --queries 50
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+def make_blob(size, dimensions, seed=0, batch=100000):
+    """Random unit vectors packed as one float32 byte string."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    parts = []
+    for start in range(0, size, batch):
+        vectors = rng.standard_normal((min(batch, size - start), dimensions), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        parts.append(vectors.tobytes())
+    return b''.join(parts)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def format_bytes(num):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if num < 1024:
+            return f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def run(size, dimensions, queries, k):
+    """Return (load seconds, index bytes, query latencies in seconds)."""
+    import numpy as np
+    from coreapp.services.vector_index import UserVectorIndex, normalize_vector
+
+    blob = make_blob(size, dimensions)
+
+    start = time.perf_counter()
+    matrix = np.frombuffer(blob, dtype=np.float32).reshape(size, dimensions)
+    index = UserVectorIndex(dimensions, np.arange(size), matrix)
+    load_time = time.perf_counter() - start
+    del blob, matrix
+
+    rng = np.random.default_rng(1)
+    latencies = []
+    for _ in range(queries):
+        query = normalize_vector(rng.standard_normal(dimensions))
+        start = time.perf_counter()
+        index.search(query, k=k)
+        latencies.append(time.perf_counter() - start)
+
+    return load_time, index.nbytes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the in-memory vector index')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='Number of vectors per index')
+    parser.add_argument('--dimensions', type=int, default=256, help='Embedding dimensions')
+    parser.add_argument('--queries', type=int, default=100, help='Queries per index size')
+    parser.add_argument('--k', type=int, default=10, help='Results per query')
+    args = parser.parse_args()
+
+    setup_django()
+
+    header = f"{'vectors':>9} | {'memory':>10} | {'load ms':>9} | {'p50 ms':>8} | {'p95 ms':>8}"
+    print(f"dimensions={args.dimensions} k={args.k} queries={args.queries}")
+    print(header)
+    print('-' * len(header))
+
+    for size in args.sizes:
+        load_time, nbytes, latencies = run(size, args.dimensions, args.queries, args.k)
+        print(
+            f"{size:>9} | {format_bytes(nbytes):>10} | {load_time * 1000:>9.1f} | "
+            f"{percentile(latencies, 50) * 1000:>8.2f} | {percentile(latencies, 95) * 1000:>8.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
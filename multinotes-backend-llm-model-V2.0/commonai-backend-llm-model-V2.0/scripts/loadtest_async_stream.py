@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""
+Async Streaming Load Test for MultinotesAI.
+
+Starts a local fake OpenAI-compatible provider that streams SSE tokens with
+a fixed delay, then opens many concurrent streams through
+LLMService.agenerate_stream on a single event loop. It reports:
+- Time to first token (p50 / p95 / max)
+- Total wall time and aggregate tokens per second
+- Peak thread count of the process (stays flat with the async clients)
+
+The fake provider shares the event loop with the clients, so at high stream
+counts the wall time is bounded by this one process's CPU, not the provider.
+
+Usage:
+    python scripts/loadtest_async_stream.py
+    python scripts/loadtest_async_stream.py --streams 2000 --tokens 50 --delay 0.02
+    python scripts/loadtest_async_stream.py --provider-only --port 9100
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from pathlib import Path
+
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+# Set Django settings
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+
+def setup_django():
+    """Initialize Django."""
+    import django
+    django.setup()
+
+
+# =============================================================================
+# Fake Provider
+# =============================================================================
+
+class FakeProvider:
+    """Minimal HTTP/1.1 server speaking the chat completions streaming API."""
+
+    def __init__(self, tokens=30, delay=0.05):
+        self.tokens = tokens
+        self.delay = delay
+        self.requests = 0
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                body = json.loads(await reader.readexactly(length)) if length else {}
+                self.requests += 1
+                await self.stream(writer, body.get('model', 'fake-model'))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def stream(self, writer, model):
+        writer.write(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Content-Type: text/event-stream\r\n'
+            b'Transfer-Encoding: chunked\r\n'
+            b'Connection: keep-alive\r\n\r\n'
+        )
+
+        for i in range(self.tokens):
+            await asyncio.sleep(self.delay)
+            chunk = {'model': model, 'choices': [{'index': 0, 'delta': {'content': f'tok{i} '}}]}
+            self._write_event(writer, json.dumps(chunk))
+            await writer.drain()
+
+        usage = {'prompt_tokens': 5, 'completion_tokens': self.tokens, 'total_tokens': self.tokens + 5}
+        self._write_event(writer, json.dumps({'model': model, 'choices': [], 'usage': usage}))
+        self._write_event(writer, '[DONE]')
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    @staticmethod
+    def _write_event(writer, data):
+        payload = f"data: {data}\n\n".encode('utf-8')
+        writer.write(f"{len(payload):x}\r\n".encode('ascii') + payload + b'\r\n')
+
+
+# =============================================================================
+# Load Test
+# =============================================================================
+
+async def one_stream(service, ttft, errors):
+    start = time.perf_counter()
+    first = None
+    count = 0
+    try:
+        async for _ in service.agenerate_stream('load test', provider='openai', model='fake-model'):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+    except Exception as e:
+        errors.append(str(e))
+        return 0
+    ttft.append(first or 0.0)
+    return count
+
+
+async def run_load(args):
+    from coreapp.services.llm_service import LLMService, close_async_http_clients
+
+    provider = FakeProvider(tokens=args.tokens, delay=args.delay)
+    server = await asyncio.start_server(provider.handle, '127.0.0.1', args.port, backlog=4096)
+    port = server.sockets[0].getsockname()[1]
+
+    service = LLMService()
+    service._providers['openai'] = service.PROVIDERS['openai'](
+        api_key='test', api_base=f"http://127.0.0.1:{port}/v1"
+    )
+
+    peak_threads = threading.active_count()
+    stop = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not stop.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_threads())
+    ttft, errors = [], []
+
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(one_stream(service, ttft, errors) for _ in range(args.streams)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await sampler
+    await close_async_http_clients()
+    server.close()
+    await server.wait_closed()
+
+    ttft.sort()
+    tokens = sum(counts)
+
+    def pct(p):
+        return ttft[min(len(ttft) - 1, int(len(ttft) * p))] * 1000 if ttft else 0.0
+
+    print(f"Streams:           {args.streams} ({len(errors)} failed)")
+    print(f"Tokens per stream: {args.tokens} @ {args.delay * 1000:.0f} ms")
+    print(f"Wall time:         {elapsed:.2f} s (ideal {args.tokens * args.delay:.2f} s)")
+    print(f"Throughput:        {tokens / elapsed:,.0f} tokens/s")
+    print(f"TTFT p50/p95/max:  {pct(0.5):.1f} / {pct(0.95):.1f} / {pct(1.0):.1f} ms")
+    print(f"Peak threads:      {peak_threads}")
+    if errors:
+        print(f"First error:       {errors[0]}")
+
+
+async def serve_provider(args):
+    provider = FakeProvider(tokens=args.tokens, delay=args.delay)
+    server = await asyncio.start_server(provider.handle, '127.0.0.1', args.port, backlog=4096)
+    print(f"Fake provider on http://127.0.0.1:{server.sockets[0].getsockname()[1]}/v1 (Ctrl+C to stop)")
+    print("Point OPENAI_API_BASE / TOGETHER_API_BASE at it to load test a running server.")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test async LLM streaming against a fake provider')
+    parser.add_argument('--streams', type=int, default=500, help='Concurrent streams')
+    parser.add_argument('--tokens', type=int, default=30, help='Tokens per stream')
+    parser.add_argument('--delay', type=float, default=0.05, help='Seconds between tokens')
+    parser.add_argument('--port', type=int, default=0, help='Fake provider port (0 = any free port)')
+    parser.add_argument('--provider-only', action='store_true',
+                        help='Only run the fake provider, e.g. to load test the HTTP endpoint')
+    args = parser.parse_args()
+
+    if args.provider_only:
+        try:
+            asyncio.run(serve_provider(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    setup_django()
+    # httpx logs every request at INFO
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    asyncio.run(run_load(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -51,15 +51,16 @@ def user_factory(db):
         is_email_verified=True,
         **kwargs
     ):
+        import uuid
         if email is None:
-            import uuid
             email = f"testuser_{uuid.uuid4().hex[:8]}@example.com"
+        kwargs.setdefault('username', f"{email.split('@')[0]}_{uuid.uuid4().hex[:6]}")
 
+        # CustomUser keeps a single `name` field instead of first/last names
         user = User.objects.create_user(
             email=email,
             password=password,
-            first_name=first_name,
-            last_name=last_name,
+            name=f"{first_name} {last_name}",
             is_active=is_active,
             is_staff=is_staff,
             **kwargs
@@ -0,0 +1,135 @@
+"""
+Tests for write-combining analytics counters.
+
+Tests cover:
+- Tracking events without touching the database
+- Flushing combined deltas with grouped F() updates
+- Merging feature usage into existing JSON
+- Stats that include pending (unflushed) counts
+- Keeping deltas when a flush fails, and isolating rows that cannot be written
+- Dropping (and counting) new keys past max_keys
+"""
+
+from datetime import timedelta
+from unittest.mock import Mock, patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from coreapp.analytics_tracking import AnalyticsTracker, EventType
+from coreapp.models_analytics import UserAnalytics
+from coreapp.services.analytics_counters import AnalyticsCounters
+
+
+@pytest.fixture
+def counters():
+    counters = AnalyticsCounters(background=False)
+    with patch('coreapp.analytics_tracking.analytics_counters', counters):
+        yield counters
+
+
+@pytest.mark.django_db
+class TestAnalyticsCounters:
+    """Tests for AnalyticsCounters."""
+
+    def test_tracking_is_free_and_flush_is_grouped(self, create_user, counters):
+        users = [create_user(email=f'u{i}@example.com', username=f'u{i}') for i in range(5)]
+        tracker = AnalyticsTracker()
+
+        with CaptureQueriesContext(connection) as tracking:
+            for user in users:
+                for _ in range(3):
+                    tracker.track_api_call(user, '/api/x/')
+            tracker.track_event(users[0], EventType.NOTE_CREATED)
+        with CaptureQueriesContext(connection) as flush:
+            touched = counters.flush()
+
+        assert len(tracking) == 0
+        assert touched == 5
+        updates = [q for q in flush if q['sql'].startswith('UPDATE')]
+        assert len(updates) == 2
+        rows = UserAnalytics.objects.filter(user__in=users)
+        assert sorted(rows.values_list('api_calls', flat=True)) == [3] * 5
+        assert rows.get(user=users[0]).notes_created == 1
+
+    def test_increments_add_to_existing_rows(self, user, counters):
+        UserAnalytics.objects.create(user=user, api_calls=10, feature_usage={'export': 2})
+        counters.add(user.id, 'api_calls', 4)
+        counters.add_feature(user.id, 'export')
+        counters.add_feature(user.id, 'share')
+
+        counters.flush()
+
+        row = UserAnalytics.objects.get(user=user)
+        assert row.api_calls == 14
+        assert row.feature_usage == {'export': 3, 'share': 1}
+
+    def test_stats_merge_pending_counts(self, user, counters):
+        yesterday = timezone.now().date() - timedelta(days=1)
+        UserAnalytics.objects.create(user=user, date=yesterday, notes_created=2, api_calls=5)
+        tracker = AnalyticsTracker()
+        tracker.track_event(user, EventType.NOTE_CREATED)
+        tracker.track_api_call(user, '/api/x/', is_error=True)
+
+        stats = tracker.get_user_stats(user, days=7)
+
+        assert stats['total_notes_created'] == 3
+        assert stats['total_api_calls'] == 6 and stats['total_api_errors'] == 1
+        assert stats['avg_daily_notes'] == 1.5
+
+    def test_failed_flush_keeps_deltas(self, user, counters):
+        counters.add(user.id, 'api_calls', 2)
+
+        with patch.object(counters, '_apply_counts', side_effect=RuntimeError('db down')):
+            with pytest.raises(RuntimeError):
+                counters.flush()
+        counters.add(user.id, 'api_calls')
+        counters.flush()
+
+        assert UserAnalytics.objects.get(user=user).api_calls == 3
+
+    def test_deleted_user_only_loses_its_own_deltas(self, user, create_user, counters):
+        gone = create_user(email='gone@example.com', username='gone')
+        counters.add(user.id, 'api_calls')
+        counters.add(gone.id, 'api_calls')
+        counters.add_feature(gone.id, 'export')
+        gone.delete()
+
+        assert counters.flush() == 1
+
+        assert UserAnalytics.objects.get(user=user).api_calls == 1
+        assert counters.stats() == {'pending': 0, 'dropped': 0, 'failed': 1}
+
+    def test_feature_row_failure_is_isolated(self, user, create_user, counters):
+        other = create_user(email='other@example.com', username='other')
+        counters.add_feature(user.id, 'export')
+        counters.add_feature(other.id, 'export')
+        real_get = UserAnalytics.objects.get
+
+        def get(**kwargs):
+            if kwargs['user_id'] == user.id:
+                raise UserAnalytics.DoesNotExist()
+            return real_get(**kwargs)
+
+        with patch.object(UserAnalytics.objects, 'select_for_update', return_value=Mock(get=get)):
+            assert counters.flush() == 1
+
+        assert UserAnalytics.objects.get(user=other).feature_usage == {'export': 1}
+        assert counters.failed == 1 and counters.pending(user.id) == {}
+
+    def test_new_keys_past_max_keys_are_dropped(self, user, create_user):
+        counters = AnalyticsCounters(max_keys=1, background=False)
+        other = create_user(email='other@example.com', username='other')
+
+        assert counters.add(user.id, 'api_calls')
+        assert counters.add(user.id, 'api_calls')
+        assert not counters.add(other.id, 'api_calls')
+        assert counters.add_feature(user.id, 'export')
+        assert not counters.add_feature(other.id, 'export')
+        counters.flush()
+
+        assert UserAnalytics.objects.get(user=user).api_calls == 2
+        assert not UserAnalytics.objects.filter(user=other).exists()
+        assert counters.stats()['dropped'] == 2
@@ -0,0 +1,119 @@
+"""
+Tests for incremental analytics rollups.
+
+Tests cover:
+- Active-user bitmaps
+- DAU / WAU / MAU merged from daily rollups
+- Only missing or unsettled days being rolled up
+- Set-based engagement scoring and summary merging
+- The daily batch dispatching engagement scoring without waiting on it
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from coreapp.models_analytics import DailyActivityRollup, UserAnalytics
+from coreapp.services.analytics_rollups import (
+    ActivityRollups, bitmap_count, decode_bitmap, encode_bitmap,
+)
+from coreapp.services.retention_service import retention_calculator
+from coreapp.tasks import analytics_tasks
+from coreapp.tasks.analytics_tasks import finalize_engagement_scores, run_daily_analytics
+
+
+def test_bitmap_round_trip():
+    bitmap = decode_bitmap(encode_bitmap([1, 9, 9, 4000]))
+
+    assert bitmap_count(bitmap) == 3
+    assert bitmap >> 4000 & 1 and not bitmap >> 3999 & 1
+    assert decode_bitmap(encode_bitmap([])) == 0
+
+
+@pytest.fixture
+def activity(create_user):
+    """Five users active on different days over the last five weeks."""
+    today = timezone.now().date()
+    users = [create_user(email=f'a{i}@example.com', username=f'a{i}') for i in range(5)]
+    days_ago = {0: [1, 2], 1: [1], 2: [5], 3: [20], 4: [40]}
+    for i, offsets in days_ago.items():
+        for offset in offsets:
+            UserAnalytics.objects.create(user=users[i], date=today - timedelta(days=offset), api_calls=2)
+    return users
+
+
+@pytest.mark.django_db
+class TestActivityRollups:
+    """Tests for ActivityRollups."""
+
+    def test_window_metrics(self, activity):
+        target = timezone.now().date() - timedelta(days=1)
+
+        metrics = ActivityRollups().window_metrics(target)
+
+        assert metrics == {'dau': 2, 'wau': 3, 'mau': 4}
+        assert DailyActivityRollup.objects.get(date=target).api_calls == 4
+
+    def test_settled_days_are_not_recomputed(self, activity):
+        rollups = ActivityRollups()
+        target = timezone.now().date() - timedelta(days=1)
+        rollups.window_metrics(target)
+
+        with patch.object(rollups, 'rollup_day', wraps=rollups.rollup_day) as rollup_day:
+            rollups.window_metrics(target)
+
+        assert [call.args[0] for call in rollup_day.call_args_list] == [target]
+
+
+@pytest.mark.django_db
+class TestEngagementScores:
+    """Tests for batched engagement scoring."""
+
+    def test_range_is_scored_in_two_queries(self, activity):
+        ids = [user.id for user in activity]
+
+        with CaptureQueriesContext(connection) as queries:
+            scores = retention_calculator.calculate_engagement_scores(min(ids), max(ids) + 1)
+
+        assert len(queries) == 2
+        assert [score.user_id for score in scores] == ids
+        assert scores[0].score > scores[4].score
+        assert scores[4].factors['frequency'] == 0
+
+    def test_single_user_score_matches_batch(self, activity):
+        single = retention_calculator.calculate_engagement_score(activity[0])
+        batch = retention_calculator.calculate_engagement_scores(activity[0].id, activity[0].id + 1)
+
+        assert single == batch[0]
+
+    def test_batch_summaries_are_merged(self):
+        result = finalize_engagement_scores([
+            {'processed': 3, 'summary': {'high': 1, 'medium': 0, 'low': 0, 'at_risk': 2}},
+            {'processed': 2, 'summary': {'high': 0, 'medium': 1, 'low': 1, 'at_risk': 0}},
+        ])
+
+        assert result['processed'] == 5
+        assert result['summary'] == {'high': 1, 'medium': 1, 'low': 1, 'at_risk': 2}
+
+    def test_summary_is_cached(self):
+        finalize_engagement_scores([{'processed': 1, 'summary': {'high': 1}}])
+
+        assert cache.get('engagement_summary') == {'high': 1, 'medium': 0, 'low': 0, 'at_risk': 0}
+
+
+@pytest.mark.django_db
+def test_daily_batch_dispatches_engagement_scoring(user):
+    with patch.object(analytics_tasks, 'chord') as chord, \
+            patch.object(analytics_tasks, 'collect_daily_metrics', return_value={'status': 'success'}), \
+            patch.object(analytics_tasks, 'calculate_revenue_analytics', return_value={}), \
+            patch.object(analytics_tasks, 'track_conversion_funnels', return_value={}):
+        chord.return_value.return_value.id = 'chord-id'
+        results = run_daily_analytics()
+
+    assert results['engagement'] == {'status': 'dispatched', 'batches': 1, 'task_id': 'chord-id'}
+    assert results['metrics'] == {'status': 'success'}
@@ -0,0 +1,220 @@
+"""
+Tests for the async LLM provider clients.
+
+Tests cover:
+- Streaming over the OpenAI, Together, Anthropic and Gemini HTTP APIs
+- Token usage reporting
+- Leaving out unset generation limits
+- Reading the same API keys as the sync clients
+- Non-streaming agenerate
+- Shared connection pool per event loop
+- Provider error handling
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from django.test import override_settings
+
+from coreapp.services.llm_service import (
+    LLMService,
+    OpenAIProvider,
+    TogetherProvider,
+    AnthropicProvider,
+    GoogleProvider,
+    get_async_http_client,
+)
+
+
+def sse(*events):
+    return ''.join(f"data: {e if isinstance(e, str) else json.dumps(e)}\n\n" for e in events)
+
+
+def mock_client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def collect(provider, usage=None, **kwargs):
+    async def run():
+        async with provider._http_client:
+            return [t async for t in provider.agenerate_stream('Hi', usage=usage, **kwargs)]
+    return asyncio.run(run())
+
+
+class TestOpenAICompatibleStreaming:
+    """Tests for OpenAI and Together async streams."""
+
+    def test_stream_yields_deltas_and_usage(self):
+        seen = {}
+
+        def handler(request):
+            seen['url'] = str(request.url)
+            seen['auth'] = request.headers['authorization']
+            seen['body'] = json.loads(request.content)
+            body = sse(
+                {'choices': [{'delta': {'role': 'assistant'}}]},
+                {'choices': [{'delta': {'content': 'Hel'}}]},
+                {'choices': [{'delta': {'content': 'lo'}}]},
+                {'choices': [], 'usage': {'prompt_tokens': 3, 'completion_tokens': 2, 'total_tokens': 5}},
+                '[DONE]',
+            )
+            return httpx.Response(200, text=body, headers={'content-type': 'text/event-stream'})
+
+        provider = OpenAIProvider(api_key='sk-test', api_base='https://llm.test/v1',
+                                  http_client=mock_client(handler))
+        usage = {}
+        history = [{'role': 'assistant', 'content': 'Earlier'}]
+
+        assert collect(provider, usage, model='gpt-4', history=history) == ['Hel', 'lo']
+        assert usage == {'prompt': 3, 'completion': 2, 'total': 5}
+        assert seen['url'] == 'https://llm.test/v1/chat/completions'
+        assert seen['auth'] == 'Bearer sk-test'
+        assert seen['body']['stream'] is True
+        assert seen['body']['stream_options'] == {'include_usage': True}
+        assert seen['body']['messages'] == history + [{'role': 'user', 'content': 'Hi'}]
+
+    def test_together_uses_its_own_endpoint(self):
+        seen = {}
+
+        def handler(request):
+            seen['url'] = str(request.url)
+            seen['body'] = json.loads(request.content)
+            return httpx.Response(200, text=sse({'choices': [{'delta': {'content': 'ok'}}]}, '[DONE]'))
+
+        provider = TogetherProvider(api_key='t', http_client=mock_client(handler))
+
+        assert collect(provider) == ['ok']
+        assert seen['url'] == 'https://api.together.xyz/v1/chat/completions'
+        assert 'stream_options' not in seen['body']
+
+    def test_unset_limits_are_left_out(self):
+        seen = {}
+
+        def handler(request):
+            seen['body'] = json.loads(request.content)
+            return httpx.Response(200, text=sse({'choices': [{'delta': {'content': 'ok'}}]}, '[DONE]'))
+
+        provider = TogetherProvider(api_key='t', http_client=mock_client(handler))
+
+        assert collect(provider, max_tokens=None, temperature=None) == ['ok']
+        assert 'max_tokens' not in seen['body'] and 'temperature' not in seen['body']
+
+    @override_settings(LLama_API_KEY='llama-key', GOOGLE_API_KEY='google-key')
+    def test_keys_match_the_sync_clients(self):
+        assert TogetherProvider().api_key == 'llama-key'
+        assert GoogleProvider().api_key == 'google-key'
+
+    def test_http_error_is_raised(self):
+        def handler(request):
+            return httpx.Response(429, text='{"error": "rate limited"}')
+
+        provider = OpenAIProvider(api_key='sk', http_client=mock_client(handler))
+
+        with pytest.raises(httpx.HTTPStatusError, match='429'):
+            collect(provider)
+
+
+class TestAnthropicStreaming:
+    """Tests for the Anthropic async stream."""
+
+    def test_stream_yields_text_deltas(self):
+        def handler(request):
+            assert request.headers['x-api-key'] == 'ak'
+            assert json.loads(request.content)['system'] == 'Be brief'
+            body = ''.join([
+                'event: message_start\n' + sse({'type': 'message_start', 'message': {'usage': {'input_tokens': 7}}}),
+                sse({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'Hi '}}),
+                sse({'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': 'there'}}),
+                sse({'type': 'message_delta', 'usage': {'output_tokens': 2}}),
+                sse({'type': 'message_stop'}),
+            ])
+            return httpx.Response(200, text=body)
+
+        provider = AnthropicProvider(api_key='ak', http_client=mock_client(handler))
+        usage = {}
+
+        assert collect(provider, usage, system_prompt='Be brief') == ['Hi ', 'there']
+        assert usage == {'prompt': 7, 'completion': 2, 'total': 9}
+
+
+class TestGoogleStreaming:
+    """Tests for the Gemini async stream."""
+
+    def test_stream_maps_history_roles(self):
+        seen = {}
+
+        def handler(request):
+            seen['url'] = request.url
+            seen['key'] = request.headers['x-goog-api-key']
+            seen['body'] = json.loads(request.content)
+            body = sse(
+                {'candidates': [{'content': {'parts': [{'text': 'Bon'}]}}]},
+                {'candidates': [{'content': {'parts': [{'text': 'jour'}]}}],
+                 'usageMetadata': {'promptTokenCount': 4, 'candidatesTokenCount': 2, 'totalTokenCount': 6}},
+            )
+            return httpx.Response(200, text=body)
+
+        provider = GoogleProvider(api_key='gk', http_client=mock_client(handler))
+        usage = {}
+        history = [
+            {'role': 'user', 'content': 'Hello'},
+            {'role': 'model', 'content': 'Hi'},
+        ]
+
+        assert collect(provider, usage, model='gemini-pro', history=history) == ['Bon', 'jour']
+        assert usage == {'prompt': 4, 'completion': 2, 'total': 6}
+        assert seen['url'].path.endswith('/models/gemini-pro:streamGenerateContent')
+        assert seen['url'].params['alt'] == 'sse'
+        assert seen['key'] == 'gk' and 'key' not in seen['url'].params
+        assert [c['role'] for c in seen['body']['contents']] == ['user', 'model', 'user']
+
+    def test_unset_limits_are_left_out(self):
+        seen = {}
+
+        def handler(request):
+            seen['body'] = json.loads(request.content)
+            return httpx.Response(200, text=sse({'candidates': [{'content': {'parts': [{'text': 'ok'}]}}]}))
+
+        provider = GoogleProvider(api_key='gk', http_client=mock_client(handler))
+
+        assert collect(provider, max_tokens=None, temperature=None) == ['ok']
+        assert 'generationConfig' not in seen['body']
+
+
+class TestLLMServiceAsync:
+    """Tests for LLMService async entry points."""
+
+    def test_agenerate_assembles_stream(self):
+        def handler(request):
+            body = sse(
+                {'choices': [{'delta': {'content': 'A'}}]},
+                {'choices': [{'delta': {'content': 'B'}}]},
+                {'choices': [], 'usage': {'prompt_tokens': 1, 'completion_tokens': 2, 'total_tokens': 3}},
+                '[DONE]',
+            )
+            return httpx.Response(200, text=body)
+
+        service = LLMService()
+        service._providers['openai'] = OpenAIProvider(api_key='sk', http_client=mock_client(handler))
+
+        result = asyncio.run(service.agenerate('Hi', provider='openai', model='gpt-4'))
+
+        assert result['content'] == 'AB'
+        assert result['model'] == 'gpt-4'
+        assert result['tokens'] == {'prompt': 1, 'completion': 2, 'total': 3}
+
+    def test_unknown_provider(self):
+        with pytest.raises(ValueError):
+            LLMService().agenerate_stream('Hi', provider='nope')
+
+    def test_pool_is_shared_per_loop(self):
+        async def clients():
+            return get_async_http_client(), get_async_http_client()
+
+        first, second = asyncio.run(clients())
+        other, _ = asyncio.run(clients())
+
+        assert first is second
+        assert other is not first
@@ -0,0 +1,222 @@
+"""
+Tests for the distributed batch job engine.
+
+Tests cover:
+- Local and Redis-backed token buckets
+- Running a job to completion with item checkpoints
+- Partial failures
+- Pausing and resuming without re-running finished items
+- Redelivered chunks skipping claimed items
+- Dispatching pending items as chunks, and stalled-job recovery
+- Streaming results in input order
+"""
+
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.utils import timezone
+
+from backend import rate_limiting
+from coreapp.models import GenerationBatch, GenerationBatchItem
+from coreapp.services import batch_processing
+from coreapp.services.batch_processing import (
+    BatchConfig,
+    BatchProcessingService,
+    BatchStatus,
+    RateLimiter,
+    SharedRateLimiter,
+)
+
+
+@pytest.fixture(autouse=True)
+def local_buckets():
+    with patch.object(rate_limiting, '_limit_script', return_value=None), \
+            patch.object(rate_limiting.rate_limiter, '_local', {}):
+        yield
+
+
+@pytest.fixture
+def calls():
+    """Inputs seen by the 'recording' processor; inputs with 'fail' raise."""
+    seen = []
+
+    def factory(metadata):
+        def process(input_data):
+            seen.append(input_data['n'])
+            if input_data.get('fail'):
+                raise RuntimeError('provider error')
+            return {'output': input_data['n'] * 2, 'tokens': 10, 'cost': 0.01}
+        return process
+
+    with patch.dict(batch_processing.PROCESSORS, {'recording': factory}):
+        yield seen
+
+
+@pytest.fixture
+def service():
+    service = BatchProcessingService()
+    service.STATUS_CHECK_INTERVAL = 0
+    return service
+
+
+def make_job(service, user, count=5, batch_size=10, failing=()):
+    return service.create_job(
+        user_id=user.id,
+        name='Test batch',
+        items=[{'n': n, 'fail': n in failing} for n in range(count)],
+        processor_type='recording',
+        config=BatchConfig(
+            max_concurrent=1,
+            batch_size=batch_size,
+            retry_count=0,
+            retry_delay=0,
+            rate_limit_per_minute=100000,
+            enable_notifications=False,
+        ),
+    )
+
+
+def run_inline(service):
+    """Stand-in for the Celery chord: run the chunks, then the callback."""
+    def enqueue(job_id, chunks):
+        for item_pks in chunks:
+            service.process_chunk(job_id, item_pks)
+        service.finalize_job(job_id)
+    return patch.object(service, '_enqueue', side_effect=enqueue)
+
+
+class TestRateLimiters:
+    """Tests for RateLimiter / SharedRateLimiter."""
+
+    def test_local_bucket_reports_wait_and_times_out(self):
+        limiter = RateLimiter(rate=2, per_seconds=1)
+
+        assert limiter.acquire() and limiter.acquire()
+        assert 0 < limiter._take() <= 0.5
+        assert limiter.acquire(timeout=0.01) is False
+
+    def test_shared_bucket_uses_script_result(self):
+        script = MagicMock(return_value=[0, 0, b'0.25', b'1.0'])
+        limiter = SharedRateLimiter('provider:openai', rate=120)
+
+        with patch.object(rate_limiting, '_limit_script', return_value=script):
+            assert limiter._take() == 0.25
+
+        kwargs = script.call_args.kwargs
+        assert kwargs['keys'] == ['ratelimit:bucket:provider:openai']
+        assert kwargs['args'][1:] == ['gcra', 120, 60, 120, 1]
+
+    def test_shared_bucket_falls_back_to_local_state(self):
+        limiter = SharedRateLimiter('provider:local', rate=2, per_seconds=1)
+
+        assert limiter.acquire() and limiter.acquire()
+        assert 0 < limiter._take() <= 0.5
+
+
+@pytest.mark.django_db
+class TestBatchJobs:
+    """Tests for running, pausing and resuming jobs."""
+
+    def test_sync_job_checkpoints_every_item(self, service, user, calls):
+        job = make_job(service, user, count=5, batch_size=2)
+
+        result = service.execute_job(job.job_id)
+
+        row = GenerationBatch.objects.get(job_id=job.job_id)
+        assert result.success and result.successful_items == 5
+        assert row.status == BatchStatus.COMPLETED.value
+        assert (row.processed_items, row.total_tokens) == (5, 50)
+        assert sorted(calls) == [0, 1, 2, 3, 4]
+        assert list(row.items.order_by('position').values_list('output', flat=True)) == [0, 2, 4, 6, 8]
+
+    def test_partial_failures(self, service, user, calls):
+        job = make_job(service, user, count=4, failing={1, 3})
+
+        result = service.execute_job(job.job_id)
+
+        assert service.get_job(job.job_id).status == BatchStatus.PARTIAL
+        assert result.failed_items == 2
+        assert [e['error'] for e in result.errors] == ['provider error'] * 2
+
+    def test_pause_and_resume_run_each_item_once(self, service, user, calls):
+        job = make_job(service, user, count=6, batch_size=3)
+        checkpoint = service._checkpoint
+
+        def pause_after_two(batch_pk, item):
+            checkpoint(batch_pk, item)
+            if len(calls) == 2:
+                service.pause_job(job.job_id)
+
+        with patch.object(service, '_checkpoint', side_effect=pause_after_two):
+            service.execute_job(job.job_id)
+
+        assert service.get_job(job.job_id).status == BatchStatus.PAUSED
+        assert sorted(calls) == [0, 1]
+
+        with run_inline(service):
+            assert service.resume_job(job.job_id)
+
+        stored = service.get_job(job.job_id)
+        assert stored.status == BatchStatus.COMPLETED
+        assert sorted(calls) == [0, 1, 2, 3, 4, 5]
+        assert stored.processed_items == 6
+
+    def test_redelivered_chunk_skips_claimed_items(self, service, user, calls):
+        job = make_job(service, user, count=4)
+        service._transition(job.job_id, [BatchStatus.PENDING], BatchStatus.PROCESSING)
+        items = GenerationBatchItem.objects.filter(batch__job_id=job.job_id).order_by('position')
+        pks = list(items.values_list('pk', flat=True))
+        items.filter(position=0).update(status='processing', started_at=timezone.now())
+        items.filter(position=1).update(status='completed')
+
+        assert service.process_chunk(job.job_id, pks) == {'processed': 2}
+        assert sorted(calls) == [2, 3]
+
+    def test_cancelled_job_does_not_run(self, service, user, calls):
+        job = make_job(service, user, count=3)
+        service.cancel_job(job.job_id)
+
+        with pytest.raises(ValueError):
+            service.execute_job(job.job_id)
+        assert calls == []
+
+
+@pytest.mark.django_db
+class TestBatchDispatch:
+    """Tests for chunked dispatch, recovery and streaming results."""
+
+    def test_async_execution_enqueues_chunks_in_order(self, service, user, calls):
+        job = make_job(service, user, count=5, batch_size=2)
+
+        with patch.object(service, '_enqueue') as enqueue:
+            assert service.execute_job(job.job_id, async_execution=True) is None
+
+        pks = list(GenerationBatchItem.objects.filter(batch__job_id=job.job_id)
+                   .order_by('position').values_list('pk', flat=True))
+        enqueue.assert_called_once_with(job.job_id, [pks[0:2], pks[2:4], pks[4:5]])
+        assert service.get_job(job.job_id).status == BatchStatus.QUEUED
+        assert calls == []
+
+    def test_stalled_job_is_redispatched(self, service, user, calls):
+        job = make_job(service, user, count=3)
+        with patch.object(service, '_enqueue'):
+            service.execute_job(job.job_id, async_execution=True)
+        GenerationBatch.objects.filter(job_id=job.job_id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+        with run_inline(service):
+            assert service.recover_stalled(stale_after=60) == 1
+
+        assert service.get_job(job.job_id).status == BatchStatus.COMPLETED
+        assert sorted(calls) == [0, 1, 2]
+
+    def test_iter_results_streams_in_input_order(self, service, user, calls):
+        job = make_job(service, user, count=7, failing={3})
+        service.execute_job(job.job_id)
+
+        rows = list(service.iter_results(job.job_id, chunk_size=2))
+
+        assert [row['position'] for row in rows] == list(range(7))
+        assert rows[3]['status'] == 'failed' and rows[4]['output'] == 8
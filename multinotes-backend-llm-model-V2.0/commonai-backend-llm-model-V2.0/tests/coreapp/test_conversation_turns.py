@@ -0,0 +1,159 @@
+"""
+Tests for conversation turn storage.
+
+Tests cover:
+- Appending turns with per-group sequence numbers
+- Capped history reads
+- Migrating legacy JSON history
+- Group history endpoint returning every generation type
+"""
+
+import json
+
+import pytest
+from django.core.management import call_command
+
+from coreapp.models import ConversationTurn, GroupResponse, Prompt, PromptResponse
+from coreapp.services.conversation_turns import ConversationTurnStore, conversation_turns
+
+
+@pytest.mark.django_db
+class TestConversationTurnStore:
+    """Tests for ConversationTurnStore."""
+
+    def test_append_exchange_numbers_turns(self, group_response):
+        """Each exchange adds two turns with increasing sequence numbers."""
+        conversation_turns.append_exchange(group_response.id, 'Hi', 'Hello!')
+        last = conversation_turns.append_exchange(group_response.id, 'How are you?', 'Fine.')
+
+        group_response.refresh_from_db()
+        turns = list(ConversationTurn.objects.filter(group=group_response).values_list('sequence', 'role'))
+
+        assert last == 4
+        assert group_response.turn_count == 4
+        assert turns == [(1, 'user'), (2, 'assistant'), (3, 'user'), (4, 'assistant')]
+
+    def test_history_is_capped_and_ordered(self, group_response):
+        """History returns the newest turns, oldest first."""
+        store = ConversationTurnStore(history_limit=4)
+        for i in range(5):
+            store.append_exchange(group_response.id, f'q{i}', f'a{i}')
+        group_response.refresh_from_db()
+
+        history = store.get_history(group_response)
+
+        assert [t['content'] for t in history] == ['q3', 'a3', 'q4', 'a4']
+
+    def test_history_with_system_prompt(self, group_response):
+        conversation_turns.append_exchange(group_response.id, 'Hi', 'Hello!')
+        group_response.refresh_from_db()
+
+        history = conversation_turns.get_history(group_response, system_prompt='Be nice')
+
+        assert history[0] == {'role': 'system', 'content': 'Be nice'}
+        assert history[1:] == [
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Hello!'},
+        ]
+
+
+@pytest.mark.django_db
+class TestLegacyHistoryMigration:
+    """Tests for migrating GroupResponse.conversation_history."""
+
+    def test_blob_is_imported_on_first_read(self, group_response):
+        """Legacy JSON turns become rows; system turns are dropped."""
+        group_response.conversation_history = json.dumps([
+            {'role': 'system', 'content': 'You are a helpful assistant.'},
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'model', 'content': 'Hello!'},
+        ])
+        group_response.save()
+
+        history = conversation_turns.get_history(group_response)
+        group_response.refresh_from_db()
+
+        assert history == [
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Hello!'},
+        ]
+        assert group_response.turn_count == 2
+        assert group_response.conversation_history is None
+
+    def test_prompts_are_preferred_over_blob(self, user, group_response, category, llm_together):
+        """The full exchange is rebuilt from saved prompts and responses."""
+        for i in range(12):
+            promp = Prompt.objects.create(
+                user=user, group=group_response, category=category,
+                prompt_text=f'q{i}', response_type=2,
+            )
+            PromptResponse.objects.create(
+                user=user, prompt=promp, llm=llm_together, category=category,
+                response_text=f'a{i}', response_type=2,
+            )
+        group_response.conversation_history = json.dumps([{'role': 'user', 'content': 'q11'}])
+        group_response.save()
+
+        created = conversation_turns.import_legacy_history(group_response)
+        turns = ConversationTurn.objects.filter(group=group_response)
+
+        assert created == 24
+        assert turns.first().content == 'q0'
+        assert turns.last().content == 'a11'
+        assert turns.last().prompt.prompt_text == 'q11'
+
+    def test_import_runs_once(self, group_response):
+        group_response.conversation_history = json.dumps([{'role': 'user', 'content': 'Hi'}])
+        group_response.save()
+
+        assert conversation_turns.import_legacy_history(group_response) == 1
+        assert conversation_turns.import_legacy_history(group_response) == 0
+        assert ConversationTurn.objects.filter(group=group_response).count() == 1
+
+    def test_backfill_command(self, group_response):
+        group_response.conversation_history = json.dumps([
+            {'role': 'user', 'content': 'Hi'},
+            {'role': 'assistant', 'content': 'Hello!'},
+        ])
+        group_response.save()
+
+        call_command('backfill_conversation_turns', batch_size=1)
+        group_response.refresh_from_db()
+
+        assert group_response.turn_count == 2
+        assert group_response.conversation_history is None
+
+
+@pytest.mark.django_db
+class TestGroupHistoryView:
+    """Tests for the group history endpoint."""
+
+    def test_history_lists_every_generation_newest_first(self, auth_client, user, group_response, category,
+                                                          llm_together):
+        for i, response_type in enumerate((2, 4, 7)):
+            promp = Prompt.objects.create(
+                user=user, group=group_response, category=category,
+                prompt_text=f'q{i}', response_type=response_type,
+            )
+            PromptResponse.objects.create(
+                user=user, prompt=promp, llm=llm_together, category=category,
+                response_text=f'a{i}', response_type=response_type,
+            )
+        conversation_turns.append_exchange(group_response.id, 'q0', 'a0')
+
+        response = auth_client.get(f'/api/user/group_history/{group_response.id}/')
+
+        assert response.status_code == 200
+        assert [p['prompt_text'] for p in response.data] == ['q2', 'q1', 'q0']
+        assert [p['response_type'] for p in response.data] == [7, 4, 2]
+        assert response.data[0]['category'] == category.name
+        assert response.data[0]['responses']['response_text'] == 'a2'
+        assert {'prompt_image', 'prompt_audio'} <= set(response.data[0])
+
+    def test_other_users_group_is_hidden(self, auth_client, create_user, category, llm_together):
+        other = create_user(email='other@example.com', username='other', phone_number='555')
+        group = GroupResponse.objects.create(user=other, category=category, llm=llm_together, group_name='x')
+
+        response = auth_client.get(f'/api/user/group_history/{group.id}/')
+
+        assert response.status_code == 404
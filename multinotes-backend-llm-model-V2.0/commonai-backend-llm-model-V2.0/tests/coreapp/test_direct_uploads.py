@@ -0,0 +1,154 @@
+"""
+Tests for direct-to-S3 uploads.
+
+Tests cover:
+- Reserving quota when an upload is initiated
+- Completing against the size S3 reports (HEAD)
+- Releasing aborted and expired reservations
+- The initiate / complete / abort endpoints
+"""
+
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+from rest_framework import status
+
+from backend.exceptions import FileTooLargeError, StorageLimitExceededError, UploadFailedError
+from coreapp.models import StorageUsage, UploadSession, UserContent
+from coreapp.services.direct_uploads import DirectUploadService, MIN_PART_SIZE
+from planandsubscription.models import UserPlan
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def storage(user):
+    plan = UserPlan.objects.create(plan_name='Storage', amount=0, plan_for='storage', storage_size=100 * MB)
+    return StorageUsage.objects.create(
+        user=user,
+        plan=plan,
+        storage_limit=100 * MB,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        transactionId='trial',
+        payment_status='trial',
+        payment_mode='online',
+        plan_name=plan.plan_name,
+    )
+
+
+@pytest.fixture
+def s3():
+    """Stand-in for the awsservice multipart helpers."""
+    with patch('authentication.awsservice.create_multipart_upload', return_value='upload-1') as create, \
+            patch('authentication.awsservice.presign_upload_parts',
+                  side_effect=lambda key, upload_id, count, expires_in: [f'https://s3/{n}' for n in range(count)]), \
+            patch('authentication.awsservice.complete_multipart_upload', return_value=True) as complete, \
+            patch('authentication.awsservice.abort_multipart_upload', return_value=True) as abort, \
+            patch('authentication.awsservice.delete_file_from_s3') as delete, \
+            patch('authentication.awsservice.get_object_size') as head:
+        yield {'create': create, 'complete': complete, 'abort': abort, 'delete': delete, 'head': head}
+
+
+def usage(storage):
+    storage.refresh_from_db()
+    return storage.total_storage_used, storage.reserved_storage
+
+
+@pytest.mark.django_db
+class TestInitiate:
+    """Tests for DirectUploadService.initiate."""
+
+    def test_reserves_quota_and_presigns_parts(self, user, storage, s3):
+        session, urls = DirectUploadService(part_size=MIN_PART_SIZE).initiate(user, 'talk.mp4', 12 * MB, 'video/mp4')
+
+        assert usage(storage) == (0, 12 * MB)
+        assert session.part_count == 3 and len(urls) == 3
+        assert session.object_key.startswith('multinote/contents/') and session.object_key.endswith('talk.mp4')
+
+    def test_reservations_count_against_the_limit(self, user, storage, s3):
+        service = DirectUploadService()
+        service.initiate(user, 'a.mp4', 60 * MB)
+
+        with pytest.raises(StorageLimitExceededError):
+            service.initiate(user, 'b.mp4', 60 * MB)
+        assert usage(storage) == (0, 60 * MB)
+
+    def test_failed_start_gives_reservation_back(self, user, storage, s3):
+        s3['create'].return_value = None
+
+        with pytest.raises(UploadFailedError):
+            DirectUploadService().initiate(user, 'a.mp4', 10 * MB)
+        assert usage(storage) == (0, 0)
+        assert not UploadSession.objects.exists()
+
+
+@pytest.mark.django_db
+class TestComplete:
+    """Tests for completing and releasing uploads."""
+
+    def test_charges_the_size_s3_reports(self, user, storage, s3):
+        service = DirectUploadService()
+        session, _ = service.initiate(user, 'a.pdf', 10 * MB)
+        s3['head'].return_value = 8 * MB
+
+        content = service.complete(session, [{'PartNumber': 1, 'ETag': '"e1"'}])
+
+        assert usage(storage) == (8 * MB, 0)
+        assert content.fileSize == 8 * MB and content.file == session.object_key
+        assert service.complete(session, []) == content
+        assert s3['complete'].call_count == 1
+
+    def test_oversized_object_is_deleted(self, user, storage, s3):
+        service = DirectUploadService()
+        session, _ = service.initiate(user, 'a.pdf', 1 * MB)
+        s3['head'].return_value = 50 * MB
+
+        with pytest.raises(FileTooLargeError):
+            service.complete(session, [{'PartNumber': 1, 'ETag': '"e1"'}])
+        s3['delete'].assert_called_once_with(session.object_key)
+        assert usage(storage) == (0, 0)
+        assert not UserContent.objects.exists()
+
+    def test_expired_reservations_are_released(self, user, storage, s3):
+        service = DirectUploadService()
+        stale, _ = service.initiate(user, 'old.mp4', 10 * MB)
+        service.initiate(user, 'new.mp4', 5 * MB)
+        UploadSession.objects.filter(pk=stale.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        assert service.release_expired() == 1
+        assert usage(storage) == (0, 5 * MB)
+        s3['abort'].assert_called_once_with(stale.object_key, 'upload-1')
+
+
+@pytest.mark.django_db
+class TestDirectUploadView:
+    """Tests for the direct upload endpoints."""
+
+    def test_initiate_complete_abort(self, api_client, user, storage, s3):
+        api_client.force_authenticate(user=user)
+        s3['head'].return_value = 2 * MB
+
+        response = api_client.post('/api/user/initiate_upload/', {'fileName': 'a.pdf', 'fileSize': 2 * MB}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        upload = response.data['upload']
+
+        response = api_client.patch(f'/api/user/complete_upload/{upload}/',
+                                    {'parts': [{'PartNumber': 1, 'ETag': '"e1"'}]}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['fileSize'] == 2 * MB
+
+        other = api_client.post('/api/user/initiate_upload/', {'fileName': 'b.pdf', 'fileSize': MB}, format='json')
+        response = api_client.delete(f"/api/user/abort_upload/{other.data['upload']}/")
+        assert response.status_code == status.HTTP_200_OK
+        assert usage(storage) == (2 * MB, 0)
+
+    def test_quota_exceeded_is_rejected(self, api_client, user, storage, s3):
+        api_client.force_authenticate(user=user)
+
+        response = api_client.post('/api/user/initiate_upload/', {'fileName': 'a.mp4', 'fileSize': 500 * MB}, format='json')
+
+        assert response.status_code == status.HTTP_402_PAYMENT_REQUIRED
+        s3['create'].assert_not_called()
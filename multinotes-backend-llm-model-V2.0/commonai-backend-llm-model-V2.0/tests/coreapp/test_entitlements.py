@@ -0,0 +1,250 @@
+"""
+Tests for resolved entitlements.
+
+Tests cover:
+- Resolving plan, rate tier, balances and storage for users and clusters
+- The per-request memo and the shared cache
+- Invalidation on Subscription, StorageUsage, Cluster and ledger changes
+- Throttles, TextSubscriptionAuth and the ledger sharing one lookup
+- The dashboard token counters read from the snapshot
+"""
+
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import PermissionDenied
+
+from authentication.models import Cluster
+from backend.throttling import AIGenerationThrottle
+from coreapp.authenticaton import TextSubscriptionAuth
+from coreapp.models import StorageUsage
+from coreapp.services.entitlements import EntitlementService, entitlement_service, SCOPE_CLUSTER
+from coreapp.services.token_ledger import token_ledger
+from planandsubscription.models import Subscription, UserPlan
+
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def plan(db):
+    return UserPlan.objects.create(plan_name='Pro', amount=0, totalToken=100000, fileToken=100)
+
+
+def make_subscription(user, plan, balance=1000, status='active', **fields):
+    return Subscription.objects.create(
+        user=user,
+        plan=plan,
+        status=status,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        balanceToken=balance,
+        plan_name=plan.plan_name,
+        transactionId='txn',
+        payment_status='paid',
+        payment_mode='online',
+        **fields,
+    )
+
+
+def make_storage(user, plan, limit=1024):
+    return StorageUsage.objects.create(
+        user=user,
+        plan=plan,
+        storage_limit=limit,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        transactionId='trial',
+        payment_status='trial',
+        payment_mode='online',
+        plan_name=plan.plan_name,
+    )
+
+
+def fresh(user):
+    """The user as the next request would load it (no memo)."""
+    entitlement_service.forget(user)
+    return user
+
+
+@pytest.fixture
+def cluster_member(user_factory, plan):
+    owner = user_factory(email='owner@team.com', username='owner')
+    subscription = make_subscription(owner, plan, balance=50000)
+    storage = make_storage(owner, plan, limit=4096)
+    cluster = Cluster.objects.create(
+        plan=plan, storage_plan=plan, subscription=subscription, storage=storage,
+        cluster_name='Team', org_name='Team', email='owner@team.com', domain='team.com',
+    )
+    return user_factory(email='member@team.com', username='member', cluster=cluster)
+
+
+@pytest.mark.django_db
+class TestResolve:
+    """Tests for EntitlementService.resolve."""
+
+    def test_user_subscription_and_storage(self, user, plan):
+        subscription = make_subscription(user, plan)
+        storage = make_storage(user, plan)
+
+        entitlements = entitlement_service.for_user(user)
+
+        assert entitlements.subscription_id == subscription.pk
+        assert (entitlements.plan_name, entitlements.rate_tier) == ('Pro', 'pro')
+        assert entitlements.balance_token == 1000 and entitlements.can_generate()
+        assert (entitlements.storage_id, entitlements.storage_limit) == (storage.pk, 1024)
+
+    def test_without_subscription(self, user):
+        entitlements = entitlement_service.for_user(user)
+
+        assert entitlements.subscription_id is None
+        assert entitlements.rate_tier == 'free'
+        assert not entitlements.can_generate()
+
+    def test_trial_and_unknown_plans_throttle_as_free(self, user_factory, plan):
+        trial = make_subscription(user_factory(), plan, status='trial').user
+        starter = make_subscription(user_factory(), UserPlan.objects.create(plan_name='Starter', amount=0)).user
+
+        assert entitlement_service.for_user(trial).rate_tier == 'free'
+        assert entitlement_service.for_user(trial).can_generate()
+        assert entitlement_service.for_user(starter).rate_tier == 'free'
+
+    def test_cluster_members_share_the_cluster_subscription(self, cluster_member):
+        entitlements = entitlement_service.for_user(cluster_member)
+
+        assert entitlements.scope == SCOPE_CLUSTER
+        assert entitlements.balance_token == 50000
+        assert entitlements.storage_limit == 4096
+
+
+@pytest.mark.django_db
+class TestCaching:
+    """Tests for the memo, the shared cache and invalidation."""
+
+    def test_memo_then_cache_then_database(self, user, plan):
+        make_subscription(user, plan)
+        entitlement_service.for_user(user)
+
+        with CaptureQueriesContext(connection) as memo:
+            entitlement_service.for_user(user)
+        with CaptureQueriesContext(connection) as cached:
+            entitlement_service.for_user(fresh(user))
+
+        assert len(memo) == 0 and len(cached) == 0
+
+    def test_subscription_save_invalidates(self, user, plan, django_capture_on_commit_callbacks):
+        subscription = make_subscription(user, plan)
+        entitlement_service.for_user(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            subscription.balanceToken = 50
+            subscription.save()
+
+        assert entitlement_service.for_user(fresh(user)).balance_token == 50
+
+    def test_new_subscription_replaces_cached_absence(self, user, plan, django_capture_on_commit_callbacks):
+        assert entitlement_service.for_user(user).subscription_id is None
+
+        with django_capture_on_commit_callbacks(execute=True):
+            make_subscription(user, plan)
+
+        assert entitlement_service.for_user(fresh(user)).can_generate()
+
+    def test_storage_change_reaches_cluster_members(self, cluster_member, django_capture_on_commit_callbacks):
+        entitlement_service.for_user(cluster_member)
+        storage = cluster_member.cluster.storage
+
+        with django_capture_on_commit_callbacks(execute=True):
+            storage.storage_limit = 8192
+            storage.save()
+
+        assert entitlement_service.for_user(fresh(cluster_member)).storage_limit == 8192
+
+    def test_cluster_change_invalidates(self, cluster_member, django_capture_on_commit_callbacks):
+        entitlement_service.for_user(cluster_member)
+        cluster = cluster_member.cluster
+
+        with django_capture_on_commit_callbacks(execute=True):
+            cluster.subscription = None
+            cluster.save()
+
+        assert entitlement_service.for_user(fresh(cluster_member)).subscription_id is None
+
+    def test_ledger_deductions_invalidate(self, cluster_member, django_capture_on_commit_callbacks):
+        entitlement_service.for_user(cluster_member)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            token_ledger.consume(cluster_member, 500)
+
+        assert entitlement_service.for_user(cluster_member).balance_token == 49500
+
+    def test_ttl_setting(self, settings):
+        settings.ENTITLEMENTS_CACHE_TTL = 30
+
+        assert EntitlementService()._ttl() == 30
+        assert EntitlementService(ttl=5)._ttl() == 5
+
+
+@pytest.mark.django_db
+class TestSingleLookup:
+    """One generation request resolves entitlements once."""
+
+    def test_throttle_permission_and_ledger_share_one_lookup(self, user, plan):
+        subscription = make_subscription(user, plan)
+        request = Mock(user=user)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert TextSubscriptionAuth().has_permission(request, None)
+            AIGenerationThrottle().allow_request(request, None)
+            reservation = token_ledger.reserve(user, 200)
+
+        subscription_reads = [
+            q for q in queries
+            if q['sql'].lstrip().upper().startswith('SELECT') and 'planandsubscription_subscription' in q['sql']
+        ]
+        assert len(subscription_reads) == 1
+        assert reservation.subscription_id == subscription.pk
+
+    def test_permission_denied_on_low_balance(self, user, plan):
+        make_subscription(user, plan, balance=100)
+
+        with pytest.raises(PermissionDenied):
+            TextSubscriptionAuth().has_permission(Mock(user=user), None)
+
+
+@pytest.mark.django_db
+class TestDashboardCount:
+    """Tests for the dashboard token counters."""
+
+    def test_counters_come_from_own_subscription(self, authenticated_client, user, plan):
+        make_subscription(
+            user, plan, balance=800, usedToken=200, expireToken=50,
+            fileToken=40, usedFileToken=10, expireFileToken=5,
+        )
+
+        response = authenticated_client.get('/api/user/dashboard_count/')
+
+        assert response.status_code == 200
+        data = response.data['data']
+        assert (data['avialableToken'], data['usedToken'], data['expireToken']) == (800, 200, 50)
+        assert (data['availableFileToken'], data['usedFileToken'], data['expireFileToken']) == (40, 10, 5)
+
+    def test_cluster_members_see_only_the_shared_balance(self, api_client, cluster_member):
+        api_client.force_authenticate(cluster_member)
+
+        response = api_client.get('/api/user/dashboard_count/')
+
+        assert response.status_code == 200
+        data = response.data['data']
+        assert data['avialableToken'] == 50000
+        assert (data['usedToken'], data['expireToken'], data['availableFileToken']) == (0, 0, 0)
@@ -0,0 +1,190 @@
+"""
+Tests for the multi-model fan-out engine.
+
+Tests cover:
+- Merging several streams
+- Per-source timeouts and errors, with deadlines from when a source starts
+- Cancellation on consumer disconnect
+- Idle waiting without spinning
+- MultiModelService parallel runs
+"""
+
+import threading
+import time
+
+import pytest
+
+from coreapp.services.fanout import (
+    FanOut,
+    EVENT_ITEM,
+    EVENT_DONE,
+    EVENT_ERROR,
+    EVENT_TIMEOUT,
+)
+
+
+@pytest.fixture
+def engine():
+    engine = FanOut(max_workers=4)
+    yield engine
+    engine.executor.shutdown(wait=False)
+
+
+def slow_stream(items, delay):
+    def run():
+        for item in items:
+            time.sleep(delay)
+            yield item
+    return run
+
+
+class TestFanOutStream:
+    """Tests for FanOut.stream."""
+
+    def test_merges_all_sources(self, engine):
+        """Every item is delivered and every source finishes once."""
+        events = list(engine.stream({
+            'a': slow_stream(['a1', 'a2', 'a3'], 0.01),
+            'b': slow_stream(['b1', 'b2'], 0.015),
+        }))
+
+        items = [(e.key, e.value) for e in events if e.kind == EVENT_ITEM]
+        assert [v for k, v in items if k == 'a'] == ['a1', 'a2', 'a3']
+        assert [v for k, v in items if k == 'b'] == ['b1', 'b2']
+        assert sorted(e.key for e in events if e.kind == EVENT_DONE) == ['a', 'b']
+
+    def test_source_error_is_reported(self, engine):
+        """A failing source ends with an error event; others continue."""
+        def broken():
+            yield 'partial'
+            raise RuntimeError('upstream closed')
+
+        events = list(engine.stream({'ok': slow_stream(['x'], 0), 'bad': broken}))
+        error = [e for e in events if e.kind == EVENT_ERROR]
+
+        assert len(error) == 1
+        assert error[0].key == 'bad'
+        assert isinstance(error[0].error, RuntimeError)
+        assert any(e.key == 'ok' and e.kind == EVENT_DONE for e in events)
+
+    def test_timeout_cancels_slow_source(self, engine):
+        """A source still running at the deadline is timed out and closed."""
+        closed = threading.Event()
+
+        def endless():
+            try:
+                while True:
+                    time.sleep(0.01)
+                    yield 'tick'
+            finally:
+                closed.set()
+
+        events = list(engine.stream(
+            {'fast': slow_stream(['done'], 0), 'slow': endless}, timeout=0.2
+        ))
+
+        assert events[-1].key == 'slow'
+        assert events[-1].kind == EVENT_TIMEOUT
+        assert closed.wait(1)
+
+    def test_deadline_starts_when_source_runs(self):
+        """Sources queued behind a busy pool are not timed out before they run."""
+        engine = FanOut(max_workers=1)
+        try:
+            events = list(engine.stream({
+                'first': slow_stream(['a'], 0.15),
+                'queued': slow_stream(['b'], 0.15),
+            }, timeout=0.25))
+        finally:
+            engine.executor.shutdown(wait=False)
+
+        assert [e.kind for e in events if e.key == 'queued'] == [EVENT_ITEM, EVENT_DONE]
+        assert EVENT_TIMEOUT not in {e.kind for e in events}
+
+    def test_consumer_close_cancels_sources(self, engine):
+        """Closing the merged stream closes every running upstream."""
+        closed = []
+
+        def endless(name):
+            def run():
+                try:
+                    while True:
+                        time.sleep(0.01)
+                        yield name
+                finally:
+                    closed.append(name)
+            return run
+
+        stream = engine.stream({'a': endless('a'), 'b': endless('b')})
+        next(stream)
+        stream.close()
+
+        deadline = time.monotonic() + 1
+        while len(closed) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(closed) == ['a', 'b']
+
+    def test_idle_wait_does_not_spin(self, engine):
+        """Waiting on quiet upstreams uses almost no CPU."""
+        start = time.process_time()
+        list(engine.stream({'a': slow_stream(['x'], 0.3), 'b': slow_stream(['y'], 0.3)}))
+        cpu = time.process_time() - start
+
+        assert cpu < 0.1
+
+
+class TestFanOutGather:
+    """Tests for FanOut.gather."""
+
+    def test_returns_one_event_per_call(self, engine):
+        def boom():
+            raise ValueError('bad key')
+
+        events = {e.key: e for e in engine.gather({
+            'ok': lambda: 42,
+            'bad': boom,
+            'slow': lambda: time.sleep(1),
+        }, timeout=0.2)}
+
+        assert events['ok'].kind == EVENT_ITEM and events['ok'].value == 42
+        assert events['bad'].kind == EVENT_ERROR
+        assert events['slow'].kind == EVENT_TIMEOUT
+
+
+class TestMultiModelParallel:
+    """Tests for MultiModelService._run_parallel on the fan-out engine."""
+
+    def test_timeout_becomes_failed_response(self, engine):
+        from coreapp.services.multi_model_service import (
+            MultiModelService, ModelResponse, ModelProvider,
+        )
+
+        class FastAdapter:
+            def __init__(self, config):
+                self.config = config
+
+            def generate(self, prompt, system_prompt=None, max_tokens=None, temperature=0.7):
+                if self.config.provider == ModelProvider.ANTHROPIC:
+                    time.sleep(1)
+                return ModelResponse(
+                    model_id=self.config.model_id,
+                    model_name=self.config.display_name,
+                    provider=self.config.provider.value,
+                    response_text='ok',
+                )
+
+        service = MultiModelService(timeout=0.2, fan_out_engine=engine)
+        service.ADAPTERS = {
+            ModelProvider.OPENAI: FastAdapter,
+            ModelProvider.ANTHROPIC: FastAdapter,
+        }
+
+        responses = {
+            r.model_id: r for r in service._run_parallel(
+                ['gpt-4', 'claude-3-opus'], 'hi', None, None, 0.7
+            )
+        }
+
+        assert responses['gpt-4'].success
+        assert not responses['claude-3-opus'].success
+        assert responses['claude-3-opus'].error == 'Timeout'
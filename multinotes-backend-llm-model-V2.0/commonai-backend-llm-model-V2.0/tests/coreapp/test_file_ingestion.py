@@ -0,0 +1,198 @@
+"""
+Tests for the file ingestion pipeline.
+
+Tests cover:
+- Per-job workspaces and the extracted-text spool
+- A single failure email when the source cannot be fetched
+- Page, sheet and paragraph readers, including legacy .xls workbooks
+- Token-aware chunking
+- Parallel map with bounded read-ahead, and merging of partial results
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from coreapp.services.file_ingestion import (
+    FILE_TYPE_EXCEL, FILE_TYPE_PDF, IngestionError, IngestionWorkspace, MapReduceRunner, TokenChunker,
+    extract_blocks, iter_docx_paragraphs, iter_excel_rows, iter_pdf_pages,
+)
+
+
+class WordEncoding:
+    """One token per whitespace-separated word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return ' '.join(tokens)
+
+
+def chunker(max_tokens):
+    return TokenChunker(max_tokens=max_tokens, encoding=WordEncoding())
+
+
+class TestWorkspace:
+    """Tests for IngestionWorkspace."""
+
+    def test_jobs_get_separate_directories_that_are_removed(self):
+        with IngestionWorkspace(1, 10) as first, IngestionWorkspace(1, 11) as second:
+            assert first.path != second.path
+            assert list(first.spool(['page one', 'page two'])) == ['page one', 'page two']
+            assert first.read_spool(12) == 'page one\npag'
+
+        assert not first.path.exists() and not second.path.exists()
+
+    def test_download_failure_raises(self, user):
+        with IngestionWorkspace(user.id, 1) as workspace:
+            with pytest.raises(IngestionError):
+                extract_blocks(FILE_TYPE_PDF, 'uploads/missing.pdf', workspace, user)
+
+
+@pytest.mark.django_db
+class TestAiProcessTask:
+    """Tests for how aiprocess_data reports ingestion failures."""
+
+    def test_download_failure_sends_one_email(self, user):
+        from authentication.tasks import aiprocess_data
+        from coreapp.models import AiProcess
+
+        content = AiProcess.objects.create(user=user, url='uploads/missing.pdf', workflow='[]')
+
+        with patch('coreapp.services.file_ingestion.extract_blocks',
+                   side_effect=IngestionError('There is an error in file downloading.')), \
+                patch('coreapp.tasks.task_notifications.TaskProgressTracker'), \
+                patch('authentication.tasks.ai_process_text_email') as email:
+            aiprocess_data.apply(args=(user.id, content.id, FILE_TYPE_PDF))
+
+        email.assert_called_once_with(user.email, 'There is an error in file downloading.')
+        content.refresh_from_db()
+        assert content.url_output == 'There is an error in file downloading.'
+
+
+class TestReaders:
+    """Tests for the page and paragraph generators."""
+
+    def test_pdf_is_read_page_by_page(self, tmp_path):
+        import fitz
+
+        path = tmp_path / 'report.pdf'
+        with fitz.open() as doc:
+            for text in ('First page', 'Second page'):
+                doc.new_page().insert_text((72, 72), text)
+            doc.save(path)
+
+        assert [page.strip() for page in iter_pdf_pages(path)] == ['First page', 'Second page']
+
+    def test_docx_paragraphs_are_grouped(self, tmp_path):
+        from docx import Document as WordDocument
+
+        path = tmp_path / 'notes.docx'
+        doc = WordDocument()
+        for i in range(5):
+            doc.add_paragraph(f'Paragraph {i}')
+        doc.save(path)
+
+        blocks = list(iter_docx_paragraphs(path, paragraphs_per_block=2))
+
+        assert blocks == ['Paragraph 0\nParagraph 1', 'Paragraph 2\nParagraph 3', 'Paragraph 4']
+
+    def test_xlsx_rows_are_grouped(self, tmp_path):
+        from openpyxl import Workbook
+
+        path = tmp_path / 'sheet.xlsx'
+        workbook = Workbook()
+        workbook.active.title = 'Data'
+        for row in (['a', 1], [None, None], ['b', 2]):
+            workbook.active.append(row)
+        workbook.save(path)
+
+        assert list(iter_excel_rows(path, rows_per_block=2)) == ['Sheet: Data\na\t1', 'b\t2']
+
+    def test_xls_is_read_sheet_by_sheet_with_xlrd(self, tmp_path):
+        rows = [['a', 1.0], ['', ''], ['b', 2.0]]
+        sheet = SimpleNamespace(name='Legacy', nrows=len(rows), row_values=rows.__getitem__)
+        workbook = MagicMock(nsheets=1)
+        workbook.sheet_by_index.return_value = sheet
+
+        with patch('xlrd.open_workbook', return_value=workbook) as open_workbook:
+            blocks = list(iter_excel_rows(tmp_path / 'old.xls'))
+
+        assert blocks == ['Sheet: Legacy\na\t1.0\nb\t2.0']
+        assert open_workbook.call_args.kwargs == {'on_demand': True}
+        workbook.unload_sheet.assert_called_once_with(0)
+        workbook.release_resources.assert_called_once()
+
+    def test_excel_downloads_keep_their_extension(self, user):
+        with IngestionWorkspace(user.id, 1) as workspace:
+            with patch('coreapp.services.file_ingestion._download', side_effect=lambda url, path: path) as download:
+                extract_blocks(FILE_TYPE_EXCEL, 'uploads/old.XLS', workspace, user)
+                extract_blocks(FILE_TYPE_EXCEL, 'uploads/new.xlsx', workspace, user)
+
+        assert [call.args[1].name for call in download.call_args_list] == ['source.xls', 'source.xlsx']
+
+
+class TestTokenChunker:
+    """Tests for chunking by token count."""
+
+    def test_blocks_are_packed_and_long_blocks_split(self):
+        blocks = ['a b', 'c d', '  ', 'e f g', 'h i j k l m n']
+
+        assert list(chunker(5).chunks(blocks)) == ['a b\nc d', 'e f g', 'h i j k l', 'm n']
+
+
+class TestMapReduceRunner:
+    """Tests for parallel processing of chunks."""
+
+    def test_single_chunk_is_one_call(self):
+        calls = []
+
+        def process(text, prompt):
+            calls.append((text, prompt))
+            return f'summary of {text}'
+
+        result = MapReduceRunner(chunker(10)).run(['short text'], 'Summarize', process)
+
+        assert result == 'summary of short text'
+        assert calls == [('short text', 'Summarize')]
+
+    def test_partials_are_merged_in_order(self):
+        prompts = []
+
+        def process(text, prompt):
+            prompts.append(prompt)
+            time.sleep(0.01 if text == 'part1' else 0)
+            return text.replace('part', 'p') if prompt == 'Summarize' else text.replace('\n', '+')
+
+        runner = MapReduceRunner(chunker(10), max_workers=3)
+        result = runner.run([f'part{i}' for i in range(4)], 'Summarize', process)
+
+        assert result == 'p0+p1+p2+p3'
+        assert prompts.count('Summarize') == 4
+        assert prompts[-1] == runner.merge_prompt('Summarize')
+
+    def test_read_ahead_is_bounded(self):
+        lock = threading.Lock()
+        state = {'pulled': 0, 'done': 0, 'ahead': 0}
+
+        def chunks():
+            for i in range(20):
+                with lock:
+                    state['pulled'] += 1
+                    state['ahead'] = max(state['ahead'], state['pulled'] - state['done'])
+                yield f'chunk{i}'
+
+        def process(text, prompt):
+            time.sleep(0.005)
+            with lock:
+                state['done'] += 1
+            return text
+
+        results = MapReduceRunner(chunker(10), max_workers=2).map(chunks(), 'Summarize', process)
+
+        assert results == [f'chunk{i}' for i in range(20)]
+        assert state['ahead'] <= 4
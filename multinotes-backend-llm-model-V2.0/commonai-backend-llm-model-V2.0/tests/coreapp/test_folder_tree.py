@@ -0,0 +1,103 @@
+"""
+Tests for the folder tree index.
+
+Tests cover:
+- Closure rows kept current on create, move and delete
+- Subtree ids, breadcrumbs and subtree file sizes
+- Rebuilding the index for folders created before it
+- Nested serializer output from a constant number of queries
+"""
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from coreapp.models import Folder, FolderClosure, UserContent
+from coreapp.serializers import FolderSerializer
+from coreapp.services.folder_tree import folder_tree
+
+
+def make_tree(user, depth, title='level'):
+    """A chain of ``depth`` folders; returns them root first."""
+    chain, parent = [], None
+    for level in range(depth):
+        parent = Folder.objects.create(title=f'{title}{level}', user=user, parent_folder=parent)
+        chain.append(parent)
+    return chain
+
+
+@pytest.mark.django_db
+class TestMaintenance:
+    """Tests for keeping the closure table in sync."""
+
+    def test_create_move_and_delete(self, user):
+        a, b, c = make_tree(user, 3)
+        other = Folder.objects.create(title='other', user=user)
+
+        assert sorted(folder_tree.subtree_ids(a.id)) == [a.id, b.id, c.id]
+
+        b.parent_folder = other
+        b.save()
+
+        assert folder_tree.subtree_ids(a.id) == [a.id]
+        assert [crumb['id'] for crumb in folder_tree.breadcrumbs(c)] == [other.id, b.id, c.id]
+
+        other.delete()
+        assert not FolderClosure.objects.filter(descendant_id=c.id).exists()
+
+    def test_unindexed_folders_are_rebuilt_on_read(self, user):
+        a, b, c = make_tree(user, 3)
+        FolderClosure.objects.all().delete()
+
+        assert sorted(folder_tree.subtree_ids(a.id)) == [a.id, b.id, c.id]
+        assert FolderClosure.objects.get(ancestor=a, descendant=c).depth == 2
+
+    def test_breadcrumbs_and_sizes_rebuild_unindexed_folders(self, user):
+        a, b, c = make_tree(user, 3)
+        UserContent.objects.create(user=user, folder=c, fileName='f', file='k', fileSize=30)
+        FolderClosure.objects.all().delete()
+
+        assert [crumb['id'] for crumb in folder_tree.breadcrumbs(c)] == [a.id, b.id, c.id]
+        FolderClosure.objects.all().delete()
+        assert folder_tree.subtree_file_size(user, a.id) == 30
+
+    def test_child_of_unindexed_folder_gets_its_ancestors(self, user):
+        a, b = make_tree(user, 2)
+        FolderClosure.objects.all().delete()
+
+        c = Folder.objects.create(title='level2', user=user, parent_folder=b)
+
+        assert FolderClosure.objects.get(ancestor=a, descendant=c).depth == 2
+        assert [crumb['id'] for crumb in folder_tree.breadcrumbs(c)] == [a.id, b.id, c.id]
+
+
+@pytest.mark.django_db
+class TestQueries:
+    """Tests for constant-query reads."""
+
+    def test_subtree_file_size(self, user, create_user):
+        a, b, c = make_tree(user, 3)
+        for folder, size in ((a, 10), (c, 5)):
+            UserContent.objects.create(user=user, folder=folder, fileName='f', file='k', fileSize=size)
+        UserContent.objects.create(user=user, folder=c, fileName='gone', file='k', fileSize=99, is_delete=True)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert folder_tree.subtree_file_size(user, a.id) == 15
+        # The index check plus the aggregate
+        assert len(queries) == 2
+        assert folder_tree.subtree_file_size(user, b.id) == 5
+
+    def test_nested_serializer_uses_constant_queries(self, user):
+        roots = [make_tree(user, 4, title=f'r{i}-')[0] for i in range(3)]
+
+        with CaptureQueriesContext(connection) as queries:
+            data = FolderSerializer(Folder.objects.filter(id__in=[r.id for r in roots]).select_related('user'),
+                                    many=True).data
+
+        assert len(queries) <= 3
+        node = data[0]
+        for level in range(1, 4):
+            assert len(node['subfolders']) == 1
+            node = node['subfolders'][0]
+            assert node['title'] == f'r0-{level}'
+        assert node['subfolders'] == []
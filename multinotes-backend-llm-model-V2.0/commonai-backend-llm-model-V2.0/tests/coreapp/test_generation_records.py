@@ -0,0 +1,153 @@
+"""
+Tests for generation record persistence.
+
+Tests cover:
+- Ids allocated when a generation starts
+- Single-transaction finish (response, usage, ledger, conversation turns)
+- Dropping records of failed generations
+- Final stream frame sent before the records are completed
+- Records completed with an estimate when Gemini's token count fails
+"""
+
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.utils import timezone
+
+from coreapp import utils
+from coreapp.models import ConversationTurn, LLM_Tokens, Prompt, PromptResponse
+from coreapp.services.generation_records import generation_recorder
+from coreapp.services.token_ledger import token_ledger
+from planandsubscription.models import Subscription, UserPlan
+
+
+@pytest.fixture
+def subscription(user):
+    plan = UserPlan.objects.create(plan_name='Basic', amount=0, totalToken=1000)
+    return Subscription.objects.create(
+        user=user,
+        plan=plan,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        balanceToken=1000,
+        plan_name=plan.plan_name,
+        transactionId='txn',
+        payment_status='paid',
+        payment_mode='online',
+    )
+
+
+def openai_chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.mark.django_db
+class TestGenerationRecorder:
+    """Tests for GenerationRecorder."""
+
+    def test_start_allocates_ids(self, user, category, llm_openai):
+        record = generation_recorder.start(user, llm_openai.id, category.id, 2, prompt='Hi')
+
+        response = PromptResponse.objects.get(pk=record.response_id)
+        assert response.prompt_id == record.prompt_id
+        assert response.response_text is None
+        assert Prompt.objects.get(pk=record.prompt_id).title.startswith('prompt-')
+
+    def test_finish_writes_everything_once(self, user, subscription, category, llm_openai, group_response):
+        record = generation_recorder.start(
+            user, llm_openai.id, category.id, 2, prompt='Hi', group_id=group_response.id, conversation=True,
+        )
+        reservation = token_ledger.reserve(user, 200)
+
+        generation_recorder.finish(record, 'Hello!', 42, reservation)
+        generation_recorder.finish(record, 'Hello!', 42, reservation)
+        subscription.refresh_from_db()
+
+        response = PromptResponse.objects.get(pk=record.response_id)
+        assert (response.response_text, response.tokenUsed) == ('Hello!', 42)
+        assert LLM_Tokens.objects.filter(prompt_id=record.prompt_id).count() == 1
+        assert (subscription.balanceToken, subscription.usedToken) == (958, 42)
+        assert list(
+            ConversationTurn.objects.filter(group=group_response).values_list('role', 'content')
+        ) == [('user', 'Hi'), ('assistant', 'Hello!')]
+
+    def test_non_conversation_records_skip_turns(self, user, subscription, category, llm_openai, group_response):
+        record = generation_recorder.start(user, llm_openai.id, category.id, 7, prompt='code', group_id=group_response.id)
+
+        generation_recorder.finish(record, 'print(1)', 5)
+
+        assert not ConversationTurn.objects.filter(group=group_response).exists()
+
+    def test_abort_drops_rows_and_returns_hold(self, user, subscription, category, llm_openai):
+        record = generation_recorder.start(user, llm_openai.id, category.id, 2, prompt='Hi')
+        reservation = token_ledger.reserve(user, 300)
+
+        generation_recorder.abort(record, reservation)
+        subscription.refresh_from_db()
+
+        assert not Prompt.objects.filter(pk=record.prompt_id).exists()
+        assert not PromptResponse.objects.filter(pk=record.response_id).exists()
+        assert subscription.balanceToken == 1000
+
+
+@pytest.mark.django_db
+class TestGeneratorPersistence:
+    """Tests for the utils generators on the shared persistence stage."""
+
+    def test_finish_precedes_done_frame(self, monkeypatch, user, subscription, category, llm_openai):
+        stream = [openai_chunk('Hel'), openai_chunk('lo'), openai_chunk(usage=SimpleNamespace(total_tokens=9))]
+        monkeypatch.setattr(
+            utils.openAiClient.chat.completions, 'create', lambda **kwargs: iter(stream),
+        )
+
+        frames = utils.generateTextByOpenAI('Hi', 'gpt', 'gpt-4', user, category.id, llm_openai.id, False, None)
+        *chunks, done = [next(frames) for _ in range(3)]
+        done = json.loads(done)
+
+        # Saved and charged by the time the client sees DONE
+        response = PromptResponse.objects.get(pk=done['responseId'])
+        subscription.refresh_from_db()
+
+        assert response.prompt_id == done['promptId']
+        assert (response.response_text, response.tokenUsed) == ('Hello', 9)
+        assert subscription.usedToken == 9
+        with pytest.raises(StopIteration):
+            next(frames)
+
+    def test_failed_stream_leaves_no_records(self, monkeypatch, user, subscription, category, llm_openai):
+        def broken(**kwargs):
+            yield openai_chunk('Hel')
+            raise ConnectionError('provider dropped')
+
+        monkeypatch.setattr(utils.openAiClient.chat.completions, 'create', broken)
+
+        with pytest.raises(ConnectionError):
+            list(utils.generateTextByOpenAI('Hi', 'gpt', 'gpt-4', user, category.id, llm_openai.id, False, None))
+        subscription.refresh_from_db()
+
+        assert not Prompt.objects.filter(user=user).exists()
+        assert subscription.balanceToken == 1000
+
+    def test_gemini_count_failure_still_finishes(self, monkeypatch, user, subscription, category, llm_openai):
+        class FailingCountModel:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def generate_content(self, prompt, stream=False):
+                return iter([SimpleNamespace(text='Hello '), SimpleNamespace(text='there')])
+
+            def count_tokens(self, text):
+                raise ConnectionError('count unavailable')
+
+        monkeypatch.setattr(utils.genai, 'GenerativeModel', FailingCountModel)
+
+        frames = list(utils.textToCodeUsingGemini('Hi', 'gemini', 'gemini-pro', user, category.id,
+                                                  llm_openai.id, False, None))
+        done = json.loads(frames[-1])
+
+        response = PromptResponse.objects.get(pk=done['responseId'])
+        assert response.response_text == 'Hello there'
+        assert response.tokenUsed == utils.token_estimator.estimate_tokens('Hello there') > 0
@@ -0,0 +1,117 @@
+"""
+Tests for notification broadcast fan-out.
+
+Tests cover:
+- Splitting the audience into user id ranges
+- Bulk in-app inserts per chunk
+- Emails over one connection per chunk, with failures in the report
+- FCM multicast batching
+- Audience filters and the progress report
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.core import mail
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from backend import rate_limiting
+from coreapp.services.notification_service import (
+    BulkNotificationService,
+    Notification,
+    NotificationService,
+    NotificationType,
+)
+
+
+@pytest.fixture(autouse=True)
+def local_buckets():
+    with patch.object(rate_limiting, '_limit_script', return_value=None), \
+            patch.object(rate_limiting.rate_limiter, '_local', {}):
+        yield
+
+
+@pytest.fixture
+def service():
+    service = BulkNotificationService()
+    service.chunk_size = 2
+    return service
+
+
+@pytest.fixture
+def audience(user_factory):
+    return [
+        user_factory(email=f'member{n}@example.com', deviceToken=f'token-{n}')
+        for n in range(5)
+    ]
+
+
+@pytest.mark.django_db
+class TestBroadcast:
+    """Tests for BulkNotificationService.broadcast."""
+
+    def test_in_app_is_one_insert_per_chunk(self, service, audience):
+        with CaptureQueriesContext(connection) as queries:
+            broadcast = service.broadcast(NotificationType.MAINTENANCE, async_delivery=False)
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT') and 'notifications' in q['sql']
+                   and 'notification_broadcasts' not in q['sql']]
+        assert len(inserts) == broadcast.total_chunks
+        assert Notification.objects.filter(user__in=audience).count() == 5
+        report = service.get_report(broadcast.broadcast_id)
+        assert report['status'] == 'completed' and report['progress'] == 100.0
+        assert (report['processed_users'], report['in_app_created']) == (5, 5)
+
+    def test_emails_report_failures(self, service, audience):
+        build = NotificationService._build_email
+
+        def failing_build(self, user, *args):
+            if user.email == 'member3@example.com':
+                raise RuntimeError('bad address')
+            return build(self, user, *args)
+
+        with patch.object(NotificationService, '_build_email', failing_build):
+            broadcast = service.broadcast(
+                NotificationType.TOKEN_LOW, context={'tokens': 5}, channels=['email'], async_delivery=False,
+            )
+
+        assert len(mail.outbox) == 4
+        assert (broadcast.emails_sent, broadcast.emails_failed) == (4, 1)
+        assert broadcast.failures == [
+            {'channel': 'email', 'user_id': audience[3].id, 'error': 'bad address'}
+        ]
+
+    def test_push_uses_multicast_batches(self, service, audience):
+        service.chunk_size = 10
+
+        with patch('ticketandcategory.FCMManager.MULTICAST_SIZE', 2), \
+                patch('ticketandcategory.FCMManager.pushMulticast',
+                      side_effect=lambda tokens, title, body: {'success': len(tokens), 'failure': 0}) as push:
+            broadcast = service.broadcast(NotificationType.MAINTENANCE, channels=['push'], async_delivery=False)
+
+        assert [len(call.args[0]) for call in push.call_args_list] == [2, 2, 1]
+        assert broadcast.push_sent == 5
+
+    def test_user_filter_limits_audience(self, service, audience):
+        count = service.notify_all_users(
+            NotificationType.MAINTENANCE,
+            user_filter={'email__in': ['member0@example.com', 'member4@example.com']},
+            async_delivery=False,
+        )
+
+        assert count == 2
+        assert set(Notification.objects.values_list('user__email', flat=True)) == {
+            'member0@example.com', 'member4@example.com'
+        }
+
+    def test_async_broadcast_enqueues_id_ranges(self, service, audience):
+        with patch.object(service, '_enqueue') as enqueue:
+            broadcast = service.broadcast(NotificationType.MAINTENANCE)
+
+        broadcast_id, ranges = enqueue.call_args.args
+        assert broadcast_id == broadcast.broadcast_id
+        assert ranges[0][0] == audience[0].id and ranges[-1][1] > audience[-1].id
+        assert all(end - start == 2 for start, end in ranges)
+        assert broadcast.total_chunks == len(ranges) and broadcast.status == 'processing'
+        assert not Notification.objects.exists()
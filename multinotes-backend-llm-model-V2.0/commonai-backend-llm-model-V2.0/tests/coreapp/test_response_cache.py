@@ -0,0 +1,183 @@
+"""
+Tests for the LLM response cache.
+
+Tests cover:
+- Request fingerprints (normalisation, params, model)
+- Local LRU tier eviction and expiry
+- Per-user and global scopes with hit/miss counters
+- Opt-in caching in LLMService.generate
+- Streaming replay of cached text generations
+"""
+
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from django.core.cache import cache
+from django.utils import timezone
+
+from backend.cache_service import LRUCache, cache_service
+from backend.monitoring import metrics
+from coreapp import utils
+from coreapp.aigenerator import cachedTextGeneration
+from coreapp.models import PromptResponse
+from coreapp.services.llm_service import LLMService
+from planandsubscription.models import Subscription, UserPlan
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+    cache_service.llm_responses.clear()
+    yield
+    cache_service.llm_responses.clear()
+
+
+@pytest.fixture
+def subscription(user):
+    plan = UserPlan.objects.create(plan_name='Basic', amount=0, totalToken=1000)
+    return Subscription.objects.create(
+        user=user,
+        plan=plan,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        balanceToken=1000,
+        plan_name=plan.plan_name,
+        transactionId='txn',
+        payment_status='paid',
+        payment_mode='online',
+    )
+
+
+def counter_value(name):
+    key = metrics._make_key(name, {'cache': 'llm_response'})
+    return metrics._counters.get(key, {}).get('value', 0)
+
+
+class TestFingerprint:
+    """Tests for CacheService.llm_response_fingerprint."""
+
+    def test_formatting_noise_is_ignored(self):
+        a = cache_service.llm_response_fingerprint('gpt-4', 'Write a haiku\r\nabout tea  ', {'temperature': 0})
+        b = cache_service.llm_response_fingerprint('gpt-4', [{'role': 'user', 'content': ' Write a haiku\nabout tea'}], {'temperature': 0})
+
+        assert a == b
+
+    def test_model_and_params_are_part_of_the_key(self):
+        base = cache_service.llm_response_fingerprint('gpt-4', 'Hi', {'temperature': 0, 'max_tokens': 10})
+
+        assert base == cache_service.llm_response_fingerprint('gpt-4', 'Hi', {'max_tokens': 10, 'temperature': 0, 'top_p': None})
+        assert base != cache_service.llm_response_fingerprint('gpt-4o', 'Hi', {'temperature': 0, 'max_tokens': 10})
+        assert base != cache_service.llm_response_fingerprint('gpt-4', 'Hi', {'temperature': 1, 'max_tokens': 10})
+
+
+class TestLRUCache:
+    """Tests for the in-process tier."""
+
+    def test_evicts_least_recently_used(self):
+        lru = LRUCache(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+
+        assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+
+    def test_expired_entries_are_dropped(self):
+        lru = LRUCache()
+        lru.set('a', 1, 0)
+
+        assert lru.get('a') is None
+        assert len(lru) == 0
+
+
+class TestResponseCache:
+    """Tests for storing and scoping cached responses."""
+
+    def test_scopes_are_isolated(self):
+        cache_service.set_llm_response('fp', {'content': 'mine'}, user_id=1)
+
+        assert cache_service.get_llm_response('fp', user_id=1) == {'content': 'mine'}
+        assert cache_service.get_llm_response('fp', user_id=2) is None
+        assert cache_service.get_llm_response('fp') is None
+
+    def test_shared_tier_serves_other_workers(self):
+        cache_service.set_llm_response('fp', {'content': 'shared'})
+        cache_service.llm_responses.clear()
+
+        assert cache_service.get_llm_response('fp') == {'content': 'shared'}
+        assert len(cache_service.llm_responses) == 1
+
+    def test_hits_and_misses_are_counted(self):
+        hits, misses = counter_value('cache_hits_total'), counter_value('cache_misses_total')
+
+        cache_service.get_llm_response('fp')
+        cache_service.set_llm_response('fp', {'content': 'x'})
+        cache_service.get_llm_response('fp')
+
+        assert counter_value('cache_hits_total') == hits + 1
+        assert counter_value('cache_misses_total') == misses + 1
+
+
+class TestLLMServiceCache:
+    """Tests for the opt-in cache in LLMService.generate."""
+
+    def generate(self, service, **kwargs):
+        return service.generate('Hi', provider='openai', model='gpt-4', temperature=0, **kwargs)
+
+    def test_cached_only_when_opted_in(self):
+        service = LLMService()
+        provider = SimpleNamespace(
+            DEFAULT_MODEL='gpt-4',
+            generate=lambda **kwargs: {'content': 'Hello', 'model': 'gpt-4', 'tokens': 3, 'finish_reason': 'stop'},
+        )
+
+        with patch.object(service, 'get_provider', return_value=provider), \
+                patch.object(provider, 'generate', wraps=provider.generate) as upstream:
+            self.generate(service)
+            self.generate(service)
+            first = self.generate(service, cache_scope='global')
+            second = self.generate(service, cache_scope='global')
+
+        assert upstream.call_count == 3
+        assert (first['cached'], second['cached']) == (False, True)
+        assert second['content'] == 'Hello'
+
+
+def openai_chunk(content=None, usage=None):
+    choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content is not None else []
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+@pytest.mark.django_db
+class TestStreamingReplay:
+    """Tests for replaying cached text generations."""
+
+    def stream(self, user, category, llm_openai, scope='user'):
+        generator = utils.generateTextByOpenAI('Hi', 'GPT', 'gpt-4', user, category.id, llm_openai.id, False, None)
+        return list(cachedTextGeneration(generator, scope, 'Hi', 'GPT', 'gpt-4', user, category.id, llm_openai.id, False))
+
+    def test_hit_replays_without_calling_provider(self, monkeypatch, user, subscription, category, llm_openai):
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            return iter([openai_chunk('Hel'), openai_chunk('lo'), openai_chunk(usage=SimpleNamespace(total_tokens=9))])
+
+        monkeypatch.setattr(utils.openAiClient.chat.completions, 'create', create)
+
+        live = self.stream(user, category, llm_openai)
+        replayed = self.stream(user, category, llm_openai)
+        subscription.refresh_from_db()
+
+        assert len(calls) == 1
+        assert json.loads(replayed[-2])['text'] == 'Hello'
+        done = json.loads(replayed[-1])
+        assert done['text'] == 'DONE'
+        assert done['responseId'] != json.loads(live[-1])['responseId']
+
+        response = PromptResponse.objects.get(pk=done['responseId'])
+        assert (response.response_text, response.tokenUsed) == ('Hello', 0)
+        assert subscription.usedToken == 9
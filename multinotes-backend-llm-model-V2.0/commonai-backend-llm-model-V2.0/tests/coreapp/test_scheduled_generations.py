@@ -0,0 +1,223 @@
+"""
+Tests for the scheduled generation scheduler.
+
+Tests cover:
+- Compiled cron next-fire times against a minute-by-minute scan
+- Cron validation and timezone-aware fire times
+- Leasing due schedules so only one node claims each run
+- Recording a run, advancing next_run_at and releasing the lease
+- The scheduler heap and Celery dispatch
+"""
+
+import random
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.utils import timezone
+
+from coreapp.models import GenerationSchedule
+from coreapp.services.scheduled_generations import (
+    CronSchedule,
+    RepeatInterval,
+    ScheduledGenerationService,
+    ScheduleStatus,
+)
+
+UTC = dt_timezone.utc
+
+
+def scan(schedule, after):
+    """Reference next run: test every minute."""
+    dt = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    while not schedule.matches(dt):
+        dt += timedelta(minutes=1)
+    return dt
+
+
+class TestCronSchedule:
+    """Tests for CronSchedule / CompiledCron."""
+
+    @pytest.mark.parametrize('expression', [
+        '*/15 * * * *',
+        '0 9 * * *',
+        '30 8-17/2 * * 0-4',
+        '5,35 */6 * 1,6 *',
+        '0 12 15 * 2',
+        '0 0 31 * *',
+        '10-20/5 3 * * *',
+    ])
+    def test_next_run_matches_scan(self, expression):
+        schedule = CronSchedule.from_string(expression)
+        rng = random.Random(expression)
+
+        for _ in range(20):
+            after = datetime(2026, 1, 1, tzinfo=UTC) + timedelta(minutes=rng.randint(0, 500000))
+            assert schedule.next_run(after) == scan(schedule, after)
+
+    def test_rare_and_impossible_dates(self):
+        leap_day = CronSchedule.from_string('0 0 29 2 *')
+        assert leap_day.next_run(datetime(2026, 3, 1, tzinfo=UTC)) == datetime(2028, 2, 29, tzinfo=UTC)
+
+        with pytest.raises(ValueError):
+            CronSchedule.from_string('0 0 30 2 *').next_run(datetime(2026, 1, 1, tzinfo=UTC))
+
+    @pytest.mark.parametrize('expression', ['61 * * * *', 'x * * * *', '* * 0 * *', '*/0 * * * *', '* * *'])
+    def test_invalid_expressions(self, expression):
+        with pytest.raises(ValueError):
+            CronSchedule.from_string(expression)
+
+
+@pytest.fixture
+def service():
+    return ScheduledGenerationService(lease_seconds=60)
+
+
+def make_schedule(service, user, expression='0 9 * * *', **kwargs):
+    return service.create_schedule(
+        user_id=user.id,
+        name='Digest',
+        prompt_template='Summarize {{date}}',
+        schedule=expression,
+        repeat_interval=kwargs.pop('repeat_interval', RepeatInterval.DAILY),
+        **kwargs
+    )
+
+
+def make_due(schedule_id, minutes_ago=1):
+    GenerationSchedule.objects.filter(schedule_id=schedule_id).update(
+        next_run_at=timezone.now() - timedelta(minutes=minutes_ago)
+    )
+
+
+@pytest.mark.django_db
+class TestScheduleLeases:
+    """Tests for storing, claiming and recording schedules."""
+
+    def test_schedule_is_stored_with_timezone_fire_time(self, service, user):
+        schedule = make_schedule(service, user, timezone_str='America/New_York')
+
+        row = GenerationSchedule.objects.get(schedule_id=schedule.schedule_id)
+        local = row.next_run_at.astimezone(ZoneInfo('America/New_York'))
+        assert (local.hour, local.minute) == (9, 0)
+        stored = service.get_schedule(schedule.schedule_id)
+        assert stored.next_execution == schedule.next_execution
+        assert stored.generation_config == schedule.generation_config
+
+    def test_only_one_node_claims_a_due_run(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+
+        token_a, won_a = service.manager.claim_due('node-a', 60)
+        token_b, won_b = service.manager.claim_due('node-b', 60)
+
+        assert [s.schedule_id for s in won_a] == [schedule.schedule_id]
+        assert won_b == []
+        assert GenerationSchedule.objects.get(schedule_id=schedule.schedule_id).lease_owner == token_a
+
+    def test_expired_lease_is_reclaimed(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        service.manager.claim_due('node-a', 60)
+
+        later = timezone.now() + timedelta(seconds=61)
+        _, won = service.manager.claim_due('node-b', 60, now=later)
+
+        assert [s.schedule_id for s in won] == [schedule.schedule_id]
+
+    def test_paused_schedules_are_not_claimed(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        service.pause_schedule(schedule.schedule_id)
+
+        assert service.manager.claim_due('node-a', 60)[1] == []
+
+    def test_run_records_result_and_releases_lease(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        token, _ = service.manager.claim_due('node-a', 60)
+
+        with patch.object(service, '_generate', return_value=('prompt', {'text': 'done', 'cost': 0.01})):
+            result = service.run_claimed(schedule.schedule_id, token)
+
+        row = GenerationSchedule.objects.get(schedule_id=schedule.schedule_id)
+        assert result.status == 'success'
+        assert row.execution_count == 1 and row.lease_owner is None
+        assert row.next_run_at > timezone.now()
+        assert row.last_result['output'] == 'done'
+        assert service.get_execution_stats(schedule.schedule_id)['successful'] == 1
+
+    def test_one_time_schedule_completes(self, service, user):
+        schedule = make_schedule(service, user, repeat_interval=RepeatInterval.ONCE)
+
+        with patch.object(service, '_generate', return_value=('prompt', {'text': 'done'})):
+            service.execute_now(schedule.schedule_id)
+
+        stored = service.get_schedule(schedule.schedule_id)
+        assert stored.status == ScheduleStatus.COMPLETED and stored.next_execution is None
+
+    def test_lost_lease_does_not_overwrite(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        stale, _ = service.manager.claim_due('node-a', 60)
+        service.manager.claim_due('node-b', 60, now=timezone.now() + timedelta(seconds=61))
+
+        with patch.object(service, '_generate', return_value=('prompt', {'text': 'late'})) as generate:
+            assert service.run_claimed(schedule.schedule_id, stale) is None
+
+        assert not generate.called
+        assert GenerationSchedule.objects.get(schedule_id=schedule.schedule_id).execution_count == 0
+
+    def test_expired_lease_is_not_run(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        token, _ = service.manager.claim_due('node-a', 60)
+        GenerationSchedule.objects.filter(schedule_id=schedule.schedule_id).update(
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        with patch.object(service, '_generate', return_value=('prompt', {'text': 'late'})) as generate:
+            assert service.run_claimed(schedule.schedule_id, token) is None
+
+        assert not generate.called
+
+    def test_run_extends_the_lease(self, service, user):
+        schedule = make_schedule(service, user)
+        make_due(schedule.schedule_id)
+        token, _ = service.manager.claim_due('node-a', 60)
+        later = timezone.now() + timedelta(seconds=30)
+
+        assert service.manager.renew(schedule.schedule_id, token, 60, now=later)
+
+        row = GenerationSchedule.objects.get(schedule_id=schedule.schedule_id)
+        assert row.lease_expires_at == later + timedelta(seconds=60)
+
+
+@pytest.mark.django_db
+class TestSchedulerDispatch:
+    """Tests for the heap and dispatch to Celery."""
+
+    def test_heap_pops_due_in_fire_order(self, service, user):
+        first, second, later = (make_schedule(service, user) for _ in range(3))
+        make_due(second.schedule_id, minutes_ago=1)
+        make_due(first.schedule_id, minutes_ago=5)
+        now = timezone.now()
+
+        service._refresh_heap(now)
+
+        assert service._pop_due(now) == [first.schedule_id, second.schedule_id]
+        assert service._pop_due(now) == []
+
+    def test_dispatch_queues_one_task_per_claimed_schedule(self, service, user):
+        due = [make_schedule(service, user) for _ in range(3)]
+        make_schedule(service, user)
+        for schedule in due:
+            make_due(schedule.schedule_id)
+
+        with patch('coreapp.tasks.schedule_tasks.execute_scheduled_generation.delay') as delay:
+            dispatched = service.dispatch_due()
+
+        assert dispatched == 3
+        assert sorted(call.args[0] for call in delay.call_args_list) == sorted(s.schedule_id for s in due)
+        assert service.dispatch_due() == 0
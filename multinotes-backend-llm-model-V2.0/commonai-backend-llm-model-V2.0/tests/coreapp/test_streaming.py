@@ -0,0 +1,135 @@
+"""
+Tests for generation stream frame encoding.
+
+Tests cover:
+- Legacy cumulative frames
+- Delta frames and periodic sync frames
+- Stream mode negotiation
+"""
+
+import json
+import zlib
+
+import pytest
+from rest_framework.test import APIRequestFactory
+from rest_framework.request import Request
+from rest_framework.parsers import JSONParser
+
+from coreapp.streaming import (
+    GenerationStreamEncoder,
+    resolve_stream_mode,
+    STREAM_MODE_CUMULATIVE,
+    STREAM_MODE_DELTA,
+)
+
+
+FRAGMENTS = ['Hello', ', ', 'wor', 'ld', ' — ', 'ünïcode', '!']
+
+
+class TestCumulativeFrames:
+    """Tests for the legacy cumulative protocol."""
+
+    def test_frames_repeat_full_text(self):
+        """Each frame carries the whole text generated so far."""
+        frames = GenerationStreamEncoder('GPT-4')
+        sent = [json.loads(frames.chunk(f)) for f in FRAGMENTS]
+
+        assert sent[0] == {'model': 'GPT-4', 'text': 'Hello'}
+        assert sent[-1]['text'] == ''.join(FRAGMENTS)
+        assert frames.text == ''.join(FRAGMENTS)
+
+    def test_done_frame_matches_legacy_shape(self):
+        """Final frame keeps the legacy key order and DONE marker."""
+        frames = GenerationStreamEncoder('GPT-4')
+        frames.chunk('Hi')
+
+        done = frames.done(promptId=1, responseId=2, groupId=None)
+
+        assert done == json.dumps({
+            'model': 'GPT-4', 'promptId': 1, 'responseId': 2,
+            'groupId': None, 'text': 'DONE',
+        })
+
+    def test_unknown_mode_falls_back_to_cumulative(self):
+        """Unknown modes use the legacy protocol."""
+        frames = GenerationStreamEncoder('GPT-4', mode='bogus')
+        assert frames.mode == STREAM_MODE_CUMULATIVE
+
+
+class TestDeltaFrames:
+    """Tests for the delta protocol."""
+
+    def test_frames_carry_only_new_fragment(self):
+        """Delta frames are sequenced and reassemble into the full text."""
+        frames = GenerationStreamEncoder('GPT-4', STREAM_MODE_DELTA)
+        sent = [json.loads(frames.chunk(f)) for f in FRAGMENTS]
+
+        assert [f['seq'] for f in sent] == list(range(1, len(FRAGMENTS) + 1))
+        assert ''.join(f['delta'] for f in sent) == ''.join(FRAGMENTS)
+        assert all('text' not in f for f in sent)
+        assert frames.text == ''.join(FRAGMENTS)
+
+    def test_periodic_sync_frames(self):
+        """Every sync_interval frames carry offset and checksum."""
+        frames = GenerationStreamEncoder('GPT-4', STREAM_MODE_DELTA, sync_interval=3)
+        sent = [json.loads(frames.chunk(f)) for f in FRAGMENTS]
+
+        synced = [f for f in sent if 'crc32' in f]
+        assert [f['seq'] for f in synced] == [3, 6]
+
+        prefix = ''.join(FRAGMENTS[:6]).encode('utf-8')
+        assert synced[-1]['offset'] == len(prefix)
+        assert synced[-1]['crc32'] == zlib.crc32(prefix)
+
+    def test_done_frame_reports_final_checksum(self):
+        """Final frame lets the client verify the assembled text."""
+        frames = GenerationStreamEncoder('GPT-4', STREAM_MODE_DELTA)
+        for fragment in FRAGMENTS:
+            frames.chunk(fragment)
+
+        done = json.loads(frames.done(promptId=1, responseId=2, groupId=3))
+        full = ''.join(FRAGMENTS).encode('utf-8')
+
+        assert done['text'] == 'DONE'
+        assert done['seq'] == len(FRAGMENTS) + 1
+        assert done['promptId'] == 1
+        assert done['offset'] == len(full)
+        assert done['crc32'] == zlib.crc32(full)
+
+    def test_delta_bytes_grow_linearly(self):
+        """Delta mode sends far fewer bytes than cumulative for long answers."""
+        fragments = ['word '] * 2000
+        cumulative = GenerationStreamEncoder('GPT-4')
+        delta = GenerationStreamEncoder('GPT-4', STREAM_MODE_DELTA)
+
+        cumulative_bytes = sum(len(cumulative.chunk(f)) for f in fragments)
+        delta_bytes = sum(len(delta.chunk(f)) for f in fragments)
+
+        assert delta_bytes * 50 < cumulative_bytes
+
+
+class TestStreamModeNegotiation:
+    """Tests for resolve_stream_mode."""
+
+    factory = APIRequestFactory()
+
+    def _request(self, data=None, **headers):
+        django_request = self.factory.post(
+            '/api/user/dynamic_llm_generator/', data or {}, format='json', **headers
+        )
+        return Request(django_request, parsers=[JSONParser()])
+
+    def test_default_is_cumulative(self):
+        assert resolve_stream_mode(self._request()) == STREAM_MODE_CUMULATIVE
+
+    def test_body_parameter(self):
+        request = self._request({'streamMode': 'delta'})
+        assert resolve_stream_mode(request) == STREAM_MODE_DELTA
+
+    def test_header(self):
+        request = self._request(HTTP_X_STREAM_MODE='Delta')
+        assert resolve_stream_mode(request) == STREAM_MODE_DELTA
+
+    def test_invalid_value(self):
+        request = self._request({'streamMode': 'gzip'})
+        assert resolve_stream_mode(request) == STREAM_MODE_CUMULATIVE
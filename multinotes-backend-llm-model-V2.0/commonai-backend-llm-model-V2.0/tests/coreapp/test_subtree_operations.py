@@ -0,0 +1,101 @@
+"""
+Tests for bulk folder subtree operations.
+
+Tests cover:
+- Collecting a subtree's folders, files and documents
+- Sharing with bulk-created rows, skipping items already shared
+- Deleting with batched S3 deletes and one storage update
+- Handing large subtrees to a background job
+"""
+
+from unittest.mock import Mock, patch
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from coreapp.models import Document, Folder, Share, UserContent
+from coreapp.services import subtree_operations as ops_module
+from coreapp.services.subtree_operations import subtree_operations
+
+
+@pytest.fixture
+def tree(user, category):
+    """root -> (a -> b, deleted); one file in each live folder, a document in b."""
+    root = Folder.objects.create(title='root', user=user)
+    a = Folder.objects.create(title='a', user=user, parent_folder=root)
+    b = Folder.objects.create(title='b', user=user, parent_folder=a)
+    gone = Folder.objects.create(title='gone', user=user, parent_folder=root, is_delete=True)
+    for folder in (root, a, b):
+        UserContent.objects.create(user=user, folder=folder, fileName='f', file=f'uploads/{folder.title}', fileSize=10)
+    Document.objects.create(user=user, category=category, folder=b, doc_type='text', llm_model='gpt-4',
+                            responseId='1', title='doc', content='text', size=5)
+    return {'root': root, 'a': a, 'b': b, 'gone': gone}
+
+
+@pytest.mark.django_db
+class TestShare:
+    """Tests for bulk sharing."""
+
+    def test_subtree_is_shared_in_constant_queries(self, user, create_user, tree):
+        friend = create_user(email='friend@example.com', username='friend')
+        contents = subtree_operations.collect(user, tree['root'].id, include_deleted=False)
+
+        with CaptureQueriesContext(connection) as queries:
+            created = subtree_operations.share(user.id, friend.id, contents, 'can_view')
+
+        assert created == 7
+        assert len(queries) <= 4
+        shares = Share.objects.filter(share_to_user=friend)
+        assert shares.get(folder=tree['root']).main_folder_id is None
+        assert shares.get(folder=tree['b']).main_folder_id == tree['a'].id
+        assert not shares.filter(folder=tree['gone']).exists()
+        assert set(shares.values_list('access_type', flat=True)) == {'can_view'}
+
+    def test_resharing_only_adds_new_items(self, user, create_user, tree):
+        friend = create_user(email='friend@example.com', username='friend')
+        subtree_operations.share(user.id, friend.id, subtree_operations.collect(user, tree['root'].id))
+        UserContent.objects.create(user=user, folder=tree['a'], fileName='new', file='uploads/new', fileSize=1)
+
+        created = subtree_operations.share(user.id, friend.id, subtree_operations.collect(user, tree['root'].id))
+
+        assert created == 1
+
+
+@pytest.mark.django_db
+class TestDelete:
+    """Tests for bulk deletion."""
+
+    def test_s3_is_batched_and_storage_updated_once(self, user, tree, monkeypatch):
+        storage = Mock()
+        storage.filter.return_value.update = Mock()
+        delete_files = Mock(return_value=[])
+        monkeypatch.setattr(ops_module, 'S3_DELETE_BATCH', 2)
+        progress = []
+
+        with patch('authentication.awsservice.delete_files_from_s3', delete_files), \
+                patch('coreapp.models.StorageUsage.objects', storage):
+            summary = subtree_operations.delete(
+                user, subtree_operations.collect(user, tree['root'].id),
+                on_progress=lambda done, total: progress.append((done, total)),
+            )
+
+        assert [len(call.args[0]) for call in delete_files.call_args_list] == [2, 1]
+        assert storage.filter.return_value.update.call_count == 1
+        assert summary['freed_bytes'] == 35 and summary['folders'] == 4
+        assert not Folder.objects.filter(user=user).exists()
+        assert not UserContent.objects.filter(user=user).exists()
+        assert progress[-1][0] == progress[-1][1]
+
+    def test_large_subtree_is_deleted_in_background(self, api_client, user, tree, settings):
+        settings.SUBTREE_BACKGROUND_THRESHOLD = 3
+        api_client.force_authenticate(user=user)
+
+        with patch('coreapp.views_legacy.delete_folder_subtree.delay', return_value=Mock(id='task-1')) as delay:
+            response = api_client.delete(f"/api/user/delete_folder/{tree['root'].id}/")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['task_id'] == 'task-1'
+        delay.assert_called_once_with(user.id, tree['root'].id)
+        assert Folder.objects.get(id=tree['root'].id).is_delete
@@ -0,0 +1,138 @@
+"""
+Tests for the full-text index.
+
+Tests cover:
+- Tokenising documents and queries
+- Keeping the index current on save, soft delete and delete
+- BM25 ranking, prefix matching and per-user isolation
+- Term suggestions and highlighted snippets
+- Library search through SearchService
+"""
+
+import pytest
+
+from coreapp.models import Document, NoteBook, SearchDocument, SearchPosting
+from coreapp.services.generation_records import generation_recorder
+from coreapp.services.search_service import search_service
+from coreapp.services.text_index import (
+    DOC_DOCUMENT, DOC_NOTEBOOK, DOC_RESPONSE, parse_query, text_index, tokenize,
+)
+
+
+def make_document(user, category, title, content):
+    return Document.objects.create(
+        user=user, category=category, doc_type='text', llm_model='gpt-4', responseId='1',
+        title=title, content=content, size=len(content),
+    )
+
+
+class TestTokenizer:
+    """Tests for tokenize and parse_query."""
+
+    def test_tokenize_drops_stopwords_and_short_words(self):
+        assert tokenize('The Quarterly report, a 2024 Q3 summary!') == ['quarterly', 'report', '2024', 'q3', 'summary']
+
+    def test_last_word_is_a_prefix(self):
+        assert parse_query('quarterly rep') == (['quarterly'], 'rep')
+        assert parse_query('quarterly report ') == (['quarterly', 'report'], None)
+
+
+@pytest.mark.django_db
+class TestIndexMaintenance:
+    """Tests for signal-driven index updates."""
+
+    def test_save_update_and_delete(self, user, category):
+        document = make_document(user, category, 'Roadmap', 'launch plan for spring')
+        assert text_index.match_ids(user.id, 'spring', DOC_DOCUMENT) == [document.id]
+
+        document.content = 'launch plan for autumn'
+        document.save()
+        assert text_index.match_ids(user.id, 'spring ', DOC_DOCUMENT) == []
+        assert text_index.match_ids(user.id, 'autumn', DOC_DOCUMENT) == [document.id]
+
+        document.is_delete = True
+        document.save()
+        assert not SearchDocument.objects.filter(doc_type=DOC_DOCUMENT, doc_id=document.id).exists()
+
+        note = NoteBook.objects.create(user=user, label='Ideas', content='autumn garden')
+        note.delete()
+        assert not SearchPosting.objects.filter(doc_type=DOC_NOTEBOOK).exists()
+
+    def test_finished_generation_is_indexed(self, user, category, llm_openai):
+        record = generation_recorder.start(user, llm_openai.id, category.id, 2, prompt='Hi')
+        generation_recorder.finish(record, 'Photosynthesis converts light into energy', 0)
+
+        hits, total = text_index.search(user.id, 'photosynthesis')
+
+        assert total == 1
+        assert (hits[0].doc_type, hits[0].doc_id) == (DOC_RESPONSE, record.response_id)
+
+
+@pytest.mark.django_db
+class TestSearch:
+    """Tests for ranked search, prefix matching and suggestions."""
+
+    def test_bm25_prefers_focused_documents(self, user, category):
+        focused = make_document(user, category, 'Budget', 'budget budget forecast')
+        diluted = make_document(user, category, 'Notes', 'budget ' + 'misc words here ' * 30)
+        make_document(user, category, 'Other', 'unrelated text')
+
+        hits, total = text_index.search(user.id, 'budget ')
+
+        assert total == 2
+        assert [hit.doc_id for hit in hits] == [focused.id, diluted.id]
+
+    def test_users_are_isolated(self, create_user, category):
+        alice = create_user(email='alice@example.com', username='alice')
+        bob = create_user(email='bob@example.com', username='bob')
+        make_document(alice, category, 'Secret', 'confidential merger')
+
+        assert text_index.search(bob.id, 'merger')[1] == 0
+        assert text_index.match_ids(bob.id, 'merger', DOC_DOCUMENT) == []
+
+    def test_prefix_and_all_words_matching(self, user, category):
+        both = make_document(user, category, 'Q3', 'quarterly revenue report')
+        make_document(user, category, 'Q4', 'quarterly forecast')
+
+        assert text_index.match_ids(user.id, 'quarterly rev', DOC_DOCUMENT) == [both.id]
+        assert text_index.search(user.id, 'quarterly rev')[0][0].doc_id == both.id
+
+    def test_suggestions_rank_common_terms_first(self, user, category):
+        make_document(user, category, 'A', 'marketing plan')
+        make_document(user, category, 'B', 'marketing market')
+
+        assert text_index.suggest(user.id, 'mark') == ['marketing', 'market']
+        assert search_service.get_suggestions(user, 'new mark', limit=1) == ['new marketing']
+
+
+class TestHighlight:
+    """Tests for snippet highlighting."""
+
+    def test_marks_matches_and_escapes_html(self):
+        snippet = text_index.highlight('Use <b>budget</b> tools for budgeting', 'budget')
+
+        assert snippet == 'Use &lt;b&gt;<mark>budget</mark>&lt;/b&gt; tools for <mark>budgeting</mark>'
+
+    def test_window_is_centred_on_matches(self):
+        text = 'intro ' * 100 + 'the key finding is here ' + 'outro ' * 100
+
+        snippet = text_index.highlight(text, 'finding ', max_length=80)
+
+        assert '<mark>finding</mark>' in snippet
+        assert snippet.startswith('...') and snippet.endswith('...')
+
+
+@pytest.mark.django_db
+class TestLibrarySearch:
+    """Tests for SearchService.search_library."""
+
+    def test_results_have_snippets(self, user, category):
+        make_document(user, category, 'Trip', 'Packing list for the Lisbon trip')
+        NoteBook.objects.create(user=user, label='Lisbon', content='Cafes to visit')
+
+        results = search_service.search_library(user, 'lisbon', page_size=10)
+
+        assert results['total'] == 2
+        assert {r['type'] for r in results['results']} == {DOC_DOCUMENT, DOC_NOTEBOOK}
+        document = next(r for r in results['results'] if r['type'] == DOC_DOCUMENT)
+        assert document['snippet'] == 'Packing list for the <mark>Lisbon</mark> trip'
@@ -0,0 +1,192 @@
+"""
+Tests for the token ledger.
+
+Tests cover:
+- Atomic deductions for text and file tokens
+- Reserve / commit / release of generation budgets
+- Sweeping abandoned reservations
+- Parallel streams on one cluster subscription (no lost updates)
+"""
+
+import threading
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from authentication.models import Cluster
+from backend.exceptions import InsufficientTokensError
+from coreapp.services.token_ledger import TokenLedger, token_ledger, KIND_FILE
+from planandsubscription.models import Subscription, TokenReservation, UserPlan
+
+
+@pytest.fixture
+def plan(db):
+    return UserPlan.objects.create(plan_name='Team', amount=0, totalToken=100000, fileToken=100)
+
+
+def make_subscription(user, plan, balance=1000, files=10):
+    return Subscription.objects.create(
+        user=user,
+        plan=plan,
+        subscriptionExpiryDate=timezone.now() + timedelta(days=30),
+        subscriptionEndDate=timezone.now() + timedelta(days=30),
+        balanceToken=balance,
+        fileToken=files,
+        plan_name=plan.plan_name,
+        transactionId='txn',
+        payment_status='paid',
+        payment_mode='online',
+    )
+
+
+@pytest.fixture
+def subscription(create_user, plan):
+    return make_subscription(create_user(email='ledger@example.com', username='ledger'), plan)
+
+
+@pytest.fixture
+def cluster_members(create_user, plan):
+    """Cluster users sharing the owner's subscription."""
+    owner = create_user(email='owner@team.com', username='owner')
+    subscription = make_subscription(owner, plan, balance=100000)
+    cluster = Cluster.objects.create(
+        plan=plan, storage_plan=plan, subscription=subscription,
+        cluster_name='Team', org_name='Team', email='owner@team.com', domain='team.com',
+    )
+    members = [
+        create_user(email=f'member{i}@team.com', username=f'member{i}', cluster=cluster)
+        for i in range(8)
+    ]
+    return subscription, members
+
+
+@pytest.mark.django_db
+class TestConsume:
+    """Tests for TokenLedger.consume."""
+
+    def test_text_and_file_tokens(self, subscription):
+        token_ledger.consume(subscription.user, 120)
+        token_ledger.consume(subscription.user, 1, kind=KIND_FILE)
+        subscription.refresh_from_db()
+
+        assert (subscription.balanceToken, subscription.usedToken) == (880, 120)
+        assert (subscription.fileToken, subscription.usedFileToken) == (9, 1)
+
+    def test_strict_consume_keeps_balance(self, subscription):
+        with pytest.raises(InsufficientTokensError):
+            token_ledger.consume(subscription.user, 5000, strict=True)
+        subscription.refresh_from_db()
+
+        assert subscription.balanceToken == 1000
+
+    def test_cluster_user_spends_cluster_subscription(self, cluster_members):
+        subscription, members = cluster_members
+
+        token_ledger.consume(members[0], 10)
+        subscription.refresh_from_db()
+
+        assert subscription.balanceToken == 99990
+
+
+@pytest.mark.django_db
+class TestReservations:
+    """Tests for reserve / commit / release."""
+
+    def test_commit_refunds_unused_hold(self, subscription):
+        reservation = token_ledger.reserve(subscription.user, 500)
+        subscription.refresh_from_db()
+        assert subscription.balanceToken == 500
+
+        assert token_ledger.commit(reservation, 120)
+        subscription.refresh_from_db()
+
+        assert (subscription.balanceToken, subscription.usedToken) == (880, 120)
+        assert TokenReservation.objects.get(pk=reservation.pk).status == 'committed'
+
+    def test_commit_charges_overrun(self, subscription):
+        reservation = token_ledger.reserve(subscription.user, 100)
+        token_ledger.commit(reservation, 300)
+        subscription.refresh_from_db()
+
+        assert (subscription.balanceToken, subscription.usedToken) == (700, 300)
+
+    def test_release_returns_hold_once(self, subscription):
+        reservation = token_ledger.reserve(subscription.user, 400)
+
+        assert token_ledger.release(reservation)
+        assert not token_ledger.release(reservation)
+        subscription.refresh_from_db()
+
+        assert (subscription.balanceToken, subscription.usedToken) == (1000, 0)
+
+    def test_unaffordable_hold_falls_back_to_direct_charge(self, subscription):
+        reservation = token_ledger.reserve(subscription.user, 5000)
+        assert reservation.pk is None
+
+        token_ledger.commit(reservation, 50)
+        subscription.refresh_from_db()
+
+        assert subscription.balanceToken == 950
+
+    def test_strict_reserve_raises(self, subscription):
+        with pytest.raises(InsufficientTokensError):
+            token_ledger.reserve(subscription.user, 5000, strict=True)
+
+    def test_expired_hold_is_released_then_charged_on_late_commit(self, subscription):
+        reservation = TokenLedger(ttl=0).reserve(subscription.user, 300)
+        TokenReservation.objects.filter(pk=reservation.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        assert token_ledger.release_expired() == 1
+        subscription.refresh_from_db()
+        assert subscription.balanceToken == 1000
+
+        token_ledger.commit(reservation, 80)
+        subscription.refresh_from_db()
+        assert (subscription.balanceToken, subscription.usedToken) == (920, 80)
+
+
+@pytest.mark.slow
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentStreams:
+    """Stress test: parallel streams charging one cluster subscription."""
+
+    STREAMS = 8
+    ROUNDS = 25
+
+    def test_no_lost_updates(self, cluster_members):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            pytest.skip('in-memory SQLite fails concurrent writers instead of waiting')
+
+        subscription, members = cluster_members
+        start = threading.Barrier(self.STREAMS)
+        errors = []
+
+        def stream(member):
+            try:
+                start.wait()
+                for i in range(self.ROUNDS):
+                    if i % 2:
+                        token_ledger.consume(member, 7)
+                    else:
+                        reservation = token_ledger.reserve(member, 50)
+                        token_ledger.commit(reservation, 13)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=stream, args=(m,)) for m in members[:self.STREAMS]]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        subscription.refresh_from_db()
+        charged = self.STREAMS * (self.ROUNDS // 2 * 7 + (self.ROUNDS + 1) // 2 * 13)
+
+        assert errors == []
+        assert subscription.usedToken == charged
+        assert subscription.balanceToken == 100000 - charged
+        assert not TokenReservation.objects.filter(status='reserved').exists()
@@ -0,0 +1,153 @@
+"""
+Tests for the per-prompt topic index.
+
+Tests cover:
+- Extracting and storing topics for prompts in bulk
+- Scheduling extraction when responses change, and cleanup on delete
+- User topics and trends aggregated from the index without re-extraction
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.utils import timezone
+
+from coreapp.models import Prompt, PromptResponse, PromptTopic
+from coreapp.services.generation_records import generation_recorder
+from coreapp.services.topic_extraction import topic_analyzer, topic_extractor
+from coreapp.services.topic_index import topic_index
+
+PYTHON_TEXT = 'How do I deploy python django apps? python django docker docker deployment'
+DATABASE_TEXT = 'Tuning postgresql queries: postgresql indexes and sql query plans for sql'
+
+
+def make_prompt(user, category, llm, text, responses=(), created_at=None):
+    prompt = Prompt.objects.create(user=user, category=category, response_type=2, title='Prompt', prompt_text=text)
+    for response_text in responses:
+        PromptResponse.objects.create(
+            user=user, llm=llm, prompt=prompt, category=category, response_type=2, response_text=response_text,
+        )
+    if created_at:
+        Prompt.objects.filter(pk=prompt.pk).update(created_at=created_at)
+    return prompt
+
+
+def stored(prompt):
+    return set(PromptTopic.objects.filter(prompt=prompt).values_list('name', flat=True))
+
+
+@pytest.mark.django_db
+class TestIndexing:
+    """Tests for TopicIndex.index_prompts."""
+
+    def test_matches_live_extraction(self, user, category, llm_openai):
+        prompt = make_prompt(user, category, llm_openai, PYTHON_TEXT, ['Use python with django and docker.'])
+
+        written = topic_index.index_prompts([prompt.id])
+
+        expected = {t.name for t in topic_analyzer.analyze_conversation(prompt.id).topics}
+        assert stored(prompt) == expected
+        assert written == len(expected)
+        assert PromptTopic.objects.filter(prompt=prompt, name='Python', category='Programming').exists()
+
+    def test_reindex_replaces_and_skips_deleted(self, user, category, llm_openai):
+        prompt = make_prompt(user, category, llm_openai, PYTHON_TEXT)
+        topic_index.index_prompts([prompt.id])
+
+        Prompt.objects.filter(pk=prompt.pk).update(prompt_text=DATABASE_TEXT)
+        topic_index.index_prompts([prompt.id])
+        assert 'Postgresql' in stored(prompt) and 'Python' not in stored(prompt)
+
+        prompt.is_delete = True
+        prompt.save()
+        assert stored(prompt) == set()
+
+    def test_extraction_runs_through_map_func(self, user, category, llm_openai):
+        prompts = [make_prompt(user, category, llm_openai, text) for text in (PYTHON_TEXT, DATABASE_TEXT)]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            topic_index.index_prompts([p.id for p in prompts], map_func=executor.map)
+
+        assert 'Python' in stored(prompts[0]) and 'Postgresql' in stored(prompts[1])
+
+
+@pytest.mark.django_db
+class TestScheduling:
+    """Tests for signal- and recorder-driven extraction."""
+
+    def test_response_save_schedules_extraction(self, user, category, llm_openai, django_capture_on_commit_callbacks):
+        prompt = make_prompt(user, category, llm_openai, PYTHON_TEXT)
+
+        with patch('coreapp.tasks.topic_tasks.index_prompt_topics.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                PromptResponse.objects.create(
+                    user=user, llm=llm_openai, prompt=prompt, category=category, response_type=2, response_text='',
+                )
+            assert not delay.called
+
+            with django_capture_on_commit_callbacks(execute=True):
+                PromptResponse.objects.create(
+                    user=user, llm=llm_openai, prompt=prompt, category=category, response_type=2, response_text='Done',
+                )
+            delay.assert_called_once_with([prompt.id])
+
+    def test_finished_generation_schedules_extraction(self, user, category, llm_openai, django_capture_on_commit_callbacks):
+        with patch('coreapp.tasks.topic_tasks.index_prompt_topics.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                record = generation_recorder.start(user, llm_openai.id, category.id, 2, prompt='Hi')
+            assert not delay.called
+
+            with django_capture_on_commit_callbacks(execute=True):
+                generation_recorder.finish(record, 'Python django answer', 0)
+
+        delay.assert_called_once_with([record.prompt_id])
+
+
+@pytest.mark.django_db
+class TestQueries:
+    """Tests for user topics and trends read from the index."""
+
+    def test_user_topics_do_not_re_extract(self, user, category, llm_openai):
+        prompts = [
+            make_prompt(user, category, llm_openai, PYTHON_TEXT),
+            make_prompt(user, category, llm_openai, PYTHON_TEXT),
+            make_prompt(user, category, llm_openai, DATABASE_TEXT),
+        ]
+        topic_index.index_prompts([p.id for p in prompts])
+
+        with patch.object(topic_extractor, 'extract_from_conversation', side_effect=AssertionError):
+            summary = topic_analyzer.get_user_topics(user.id)
+
+        assert summary['total_conversations'] == 3
+        assert [t['name'] for t in summary['topics']][:3] == ['Django', 'Docker', 'Python']
+        assert summary['topics'][2] == {'name': 'Python', 'score': 1.0, 'frequency': 2, 'category': 'Programming'}
+        assert summary['categories'] == {'Programming': 2, 'Backend': 2, 'DevOps': 2, 'Database': 2}
+
+    def test_limit_keeps_newest_conversations(self, user, category, llm_openai):
+        old = make_prompt(user, category, llm_openai, DATABASE_TEXT, created_at=timezone.now() - timedelta(days=2))
+        new = make_prompt(user, category, llm_openai, PYTHON_TEXT)
+        topic_index.index_prompts([old.id, new.id])
+
+        summary = topic_analyzer.get_user_topics(user.id, limit=1)
+
+        assert summary['total_conversations'] == 1
+        assert 'Postgresql' not in {t['name'] for t in summary['topics']}
+
+    def test_weekly_trends(self, user, category, llm_openai):
+        now = timezone.now()
+        last_week = now - timedelta(days=7)
+        prompts = [
+            make_prompt(user, category, llm_openai, DATABASE_TEXT, created_at=last_week),
+            make_prompt(user, category, llm_openai, PYTHON_TEXT, created_at=now),
+            make_prompt(user, category, llm_openai, PYTHON_TEXT, created_at=now),
+        ]
+        topic_index.index_prompts([p.id for p in prompts])
+
+        trends = topic_analyzer.get_topic_trends(user.id, days=30, interval='week')
+
+        assert [t['conversation_count'] for t in trends] == [1, 2]
+        assert trends[0]['period'] == (last_week.date() - timedelta(days=last_week.weekday())).isoformat()
+        assert {'name': 'python', 'count': 2} in trends[1]['top_topics']
+        assert 'postgresql' in {t['name'] for t in trends[0]['top_topics']}
@@ -0,0 +1,238 @@
+"""
+Tests for the vector index.
+
+Tests cover:
+- float32 encoding of embeddings
+- Top-k cosine search against a brute-force ranking
+- Incremental upserts and removals
+- Per-user isolation and reloads after another worker's write
+- Reciprocal-rank fusion of text and semantic rankings
+- Embedding responses, documents and notebooks on save
+- Text, semantic and hybrid search through SearchService
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+
+from coreapp.models import ContentEmbedding, Document, NoteBook
+from coreapp.services.search_service import reciprocal_rank_fusion, search_index_service, search_service
+from coreapp.services.text_index import DOC_DOCUMENT, DOC_NOTEBOOK
+from coreapp.services.vector_index import (
+    UserVectorIndex, VectorIndex, decode_vector, encode_vector, normalize_vector,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache.clear()
+
+
+def random_vectors(count, dimensions=32, seed=7):
+    vectors = np.random.default_rng(seed).standard_normal((count, dimensions)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class TestEncoding:
+    """Tests for the stored vector format."""
+
+    def test_round_trip_is_normalised_float32(self):
+        blob = encode_vector([3.0, 4.0])
+
+        assert len(blob) == 8
+        assert decode_vector(blob).tolist() == pytest.approx([0.6, 0.8])
+
+
+class TestUserVectorIndex:
+    """Tests for the in-memory index."""
+
+    def test_top_k_matches_brute_force(self):
+        vectors = random_vectors(500)
+        index = UserVectorIndex(32, list(range(1000, 1500)), vectors)
+        query = normalize_vector(random_vectors(1, seed=1)[0])
+
+        results = index.search(query, k=10)
+        expected = np.argsort(vectors @ query)[::-1][:10] + 1000
+
+        assert [content_id for content_id, _ in results] == expected.tolist()
+        assert results[0][1] >= results[-1][1]
+
+    def test_incremental_updates(self):
+        vectors = random_vectors(40)
+        index = UserVectorIndex(32)
+        for content_id, vector in enumerate(vectors):
+            index.upsert(content_id, vector)
+
+        assert len(index) == 40
+        assert index.remove(0)
+        assert not index.remove(0)
+        index.upsert(5, vectors[7])
+
+        results = dict(index.search(vectors[7], k=40))
+        assert 0 not in results
+        assert results[5] == pytest.approx(1.0) and results[7] == pytest.approx(1.0)
+        assert index.search(vectors[39], k=1)[0][0] == 39
+
+    def test_min_similarity_and_dimension_mismatch(self):
+        index = UserVectorIndex(2, [1, 2], np.array([[1, 0], [0, 1]], dtype=np.float32))
+
+        assert index.search(np.array([1, 0], dtype=np.float32), k=5, min_similarity=0.5) == [(1, 1.0)]
+        assert index.search(np.ones(3, dtype=np.float32), k=5) == []
+
+
+@pytest.mark.django_db
+class TestVectorIndex:
+    """Tests for the ContentEmbedding-backed index."""
+
+    def test_users_are_isolated(self, create_user):
+        alice = create_user(email='alice@example.com', username='alice')
+        bob = create_user(email='bob@example.com', username='bob')
+        index = VectorIndex()
+
+        index.add(alice.id, DOC_DOCUMENT, 1, [1, 0, 0])
+        index.add(bob.id, DOC_DOCUMENT, 2, [1, 0, 0])
+
+        assert [key for key, _ in index.search(alice.id, [1, 0, 0], k=5)] == [(DOC_DOCUMENT, 1)]
+        assert ContentEmbedding.objects.get(doc_type=DOC_DOCUMENT, doc_id=1).dimensions == 3
+
+    def test_types_share_ids(self, user):
+        index = VectorIndex()
+        index.add(user.id, DOC_DOCUMENT, 1, [1, 0])
+        index.add(user.id, DOC_NOTEBOOK, 1, [0, 1])
+
+        assert index.search(user.id, [0, 1], k=1) == [((DOC_NOTEBOOK, 1), pytest.approx(1.0))]
+        assert index.remove(DOC_DOCUMENT, 1)
+        assert len(index.get_index(user.id)) == 1
+
+    def test_other_workers_pick_up_writes(self, user):
+        worker_a, worker_b = VectorIndex(), VectorIndex()
+        worker_a.add(user.id, DOC_DOCUMENT, 1, [1, 0])
+        assert worker_b.search(user.id, [0, 1], k=1)[0][0] == (DOC_DOCUMENT, 1)
+
+        worker_a.add(user.id, DOC_DOCUMENT, 2, [0, 1])
+        worker_a.remove(DOC_DOCUMENT, 1)
+
+        assert worker_b.search(user.id, [0, 1], k=5) == [((DOC_DOCUMENT, 2), pytest.approx(1.0))]
+        assert worker_a.search(user.id, [0, 1], k=5) == [((DOC_DOCUMENT, 2), pytest.approx(1.0))]
+
+    def test_stale_dimensions_are_skipped(self, user):
+        index = VectorIndex()
+        index.add(user.id, DOC_DOCUMENT, 1, [1, 0])
+        index.add(user.id, DOC_DOCUMENT, 2, [1, 0, 0])
+
+        assert index.get_index(user.id).dimensions == 3
+        assert [key for key, _ in index.search(user.id, [1, 0, 0], k=5)] == [(DOC_DOCUMENT, 2)]
+
+
+class TestReciprocalRankFusion:
+    """Tests for fusing rankings."""
+
+    def test_items_in_both_rankings_come_first(self):
+        text = [10, 11, 12, 13]
+        semantic = [20, 12, 21, 10]
+
+        fused = reciprocal_rank_fusion(text, semantic)
+
+        assert set(fused[:2]) == {10, 12}
+        assert set(fused) == {10, 11, 12, 13, 20, 21}
+
+
+# Embeddings keyed by topic word, so similarity is predictable
+TOPICS = ['garden', 'finance', 'travel']
+
+
+def fake_embedding(text, *args, **kwargs):
+    text = text.lower()
+    return [1.0 if topic in text else 0.0 for topic in TOPICS] + [0.01]
+
+
+def make_document(user, category, title, content):
+    return Document.objects.create(
+        user=user, category=category, doc_type='text', llm_model='gpt-4', responseId='1',
+        title=title, content=content, size=len(content),
+    )
+
+
+@pytest.fixture
+def embeddings():
+    """Run embedding tasks inline with fake embeddings."""
+    def run_inline(doc_type, doc_ids):
+        return search_index_service.index_many(doc_type, doc_ids)
+
+    with override_settings(SEMANTIC_SEARCH_ENABLED=True), \
+            patch('coreapp.services.llm_service.llm_service.get_embedding', side_effect=fake_embedding), \
+            patch('coreapp.tasks.search_tasks.index_content_embeddings.delay', side_effect=run_inline):
+        yield
+
+
+@pytest.mark.django_db
+class TestIndexMaintenance:
+    """Tests for signal-driven embedding updates."""
+
+    def test_save_update_and_delete(self, user, category, embeddings, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            document = make_document(user, category, 'Plan', 'spring garden layout')
+        stored = ContentEmbedding.objects.get(doc_type=DOC_DOCUMENT, doc_id=document.id)
+        assert stored.user_id == user.id
+
+        with django_capture_on_commit_callbacks(execute=True):
+            document.content = 'finance review'
+            document.save()
+        assert search_service._semantic_search('finance', user, [DOC_DOCUMENT]) == [(DOC_DOCUMENT, document.id)]
+
+        with django_capture_on_commit_callbacks(execute=True):
+            document.is_delete = True
+            document.save()
+        assert not ContentEmbedding.objects.filter(doc_id=document.id).exists()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            note = NoteBook.objects.create(user=user, label='Trip', content='travel ideas')
+        note.delete()
+        assert not ContentEmbedding.objects.exists()
+
+    def test_disabled_setting_skips_embedding(self, user, category, django_capture_on_commit_callbacks):
+        with patch('coreapp.tasks.search_tasks.index_content_embeddings.delay') as delay:
+            with django_capture_on_commit_callbacks(execute=True):
+                make_document(user, category, 'Plan', 'spring garden layout')
+
+        assert not delay.called
+
+
+@pytest.mark.django_db
+class TestSearch:
+    """Tests for SearchService.search over the indexed content."""
+
+    def test_semantic_search_reads_embeddings(self, user, category, embeddings, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            garden = make_document(user, category, 'Beds', 'Raised garden beds')
+            NoteBook.objects.create(user=user, label='Money', content='finance notes')
+
+        results = search_service.search(user, 'my garden', search_type='semantic')
+
+        assert [(r['type'], r['id']) for r in results['results']] == [(DOC_DOCUMENT, garden.id)]
+        assert results['results'][0]['title'] == 'Beds'
+
+    def test_hybrid_search_fuses_both_rankings(self, user, category, embeddings, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            worded = make_document(user, category, 'Beds', 'Raised beds for the garden')
+            note = NoteBook.objects.create(user=user, label='Budget', content='finance plan')
+
+        results = search_service.search(user, 'raised finance', search_type='hybrid')
+
+        assert {(r['type'], r['id']) for r in results['results']} == {
+            (DOC_DOCUMENT, worded.id), (DOC_NOTEBOOK, note.id),
+        }
+
+    def test_text_search_applies_filters(self, user, category):
+        make_document(user, category, 'Trip', 'Lisbon travel plan')
+        note = NoteBook.objects.create(user=user, label='Lisbon', content='Cafes')
+
+        results = search_service.search(user, 'lisbon', filters={'content_type': DOC_NOTEBOOK}, search_type='text')
+        assert [(r['type'], r['id']) for r in results['results']] == [(DOC_NOTEBOOK, note.id)]
+
+        # Semantic search falls back to text search while it is disabled
+        assert search_service.search(user, 'lisbon', search_type='semantic')['total'] == 2
+        assert {item['title'] for item in search_service.quick_search(user, 'lisb')} == {'Trip', 'Lisbon'}
@@ -0,0 +1,192 @@
+"""
+Tests for webhook dispatch and delivery.
+
+Tests cover:
+- The event -> webhook subscription index kept in sync with ``events``
+- Backfilling the index for webhooks registered before it
+- Dispatch with one bulk insert for the deliveries
+- Pooled delivery with a per-endpoint concurrency limit
+- Jittered exponential backoff and permanent failure
+- Retrying only due deliveries, oldest first
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from coreapp.services.webhook_service import (
+    WebhookDelivery,
+    WebhookDeliveryStatus,
+    WebhookEventType,
+    WebhookService,
+    WebhookSubscription,
+)
+
+
+class FakeSession:
+    """Records requests and the peak number in flight per URL."""
+
+    def __init__(self, status_code=200, error=None, delay=0.0):
+        self.status_code = status_code
+        self.error = error
+        self.delay = delay
+        self.urls = []
+        self.in_flight = defaultdict(int)
+        self.peak = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        with self._lock:
+            self.urls.append(url)
+            self.in_flight[url] += 1
+            self.peak[url] = max(self.peak[url], self.in_flight[url])
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight[url] -= 1
+        if self.error:
+            raise self.error
+        return MagicMock(status_code=self.status_code, text='ok')
+
+
+@pytest.fixture
+def service():
+    service = WebhookService()
+    service.concurrency = 8
+    service.endpoint_concurrency = 2
+    service._session = FakeSession()
+    return service
+
+
+def register(service, user, events, url='https://hooks.example.com/a'):
+    return service.register_webhook(user=user, name='hook', url=url, events=events)
+
+
+@pytest.mark.django_db
+class TestWebhookDispatch:
+    """Tests for subscriptions and dispatch."""
+
+    def test_subscriptions_follow_events(self, service, user):
+        webhook = register(service, user, ['note.created', 'note.deleted'])
+        service.update_webhook(webhook.id, user, events=['note.created', 'payment.failed'])
+
+        events = set(WebhookSubscription.objects.filter(webhook=webhook).values_list('event_type', flat=True))
+        assert events == {'note.created', 'payment.failed'}
+
+        service.delete_webhook(webhook.id, user)
+        assert not WebhookSubscription.objects.filter(webhook=webhook).exists()
+
+    def test_backfill_indexes_existing_webhooks(self, service, user):
+        webhook = register(service, user, ['note.created', '*'])
+        WebhookSubscription.objects.all().delete()
+        assert service.subscribed_webhooks('note.created') == []
+
+        call_command('backfill_webhook_subscriptions', stdout=StringIO())
+
+        assert service.subscribed_webhooks('note.created') == [webhook]
+        assert WebhookSubscription.objects.filter(webhook=webhook).count() == 2
+
+    def test_dispatch_matches_event_wildcard_and_user(self, service, user, user_factory):
+        other = user_factory(email='other@example.com', username='other')
+        match = register(service, user, ['note.created'])
+        wildcard = register(service, user, ['*'], url='https://hooks.example.com/b')
+        register(service, user, ['payment.failed'])
+        register(service, other, ['note.created'])
+
+        webhooks = service.subscribed_webhooks('note.created', user_id=user.id)
+
+        assert {w.id for w in webhooks} == {match.id, wildcard.id}
+
+    def test_dispatch_bulk_creates_deliveries(self, service, user):
+        for n in range(5):
+            register(service, user, ['note.created'], url=f'https://hooks.example.com/{n}')
+
+        with patch('coreapp.tasks.webhook_tasks.deliver_webhook_batch.delay') as delay:
+            with CaptureQueriesContext(connection) as queries:
+                count = service.dispatch(WebhookEventType.NOTE_CREATED, user_id=user.id, payload={'id': 1})
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT')]
+        assert count == 5 and len(inserts) == 1
+        assert delay.call_count == 5
+        assert WebhookDelivery.objects.filter(status=WebhookDeliveryStatus.PENDING.value).count() == 5
+
+
+@pytest.mark.django_db
+class TestWebhookDelivery:
+    """Tests for pooled delivery and retries."""
+
+    def make_deliveries(self, service, webhook, count):
+        return WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(webhook=webhook, event_type='note.created', payload={'n': n})
+            for n in range(count)
+        ])
+
+    def test_batch_respects_endpoint_concurrency(self, service, user):
+        service._session = FakeSession(delay=0.02)
+        a = register(service, user, ['note.created'], url='https://hooks.example.com/a')
+        b = register(service, user, ['note.created'], url='https://hooks.example.com/b')
+        deliveries = self.make_deliveries(service, a, 6) + self.make_deliveries(service, b, 6)
+
+        assert all(service.deliver_batch(deliveries))
+
+        assert service._session.peak == {a.url: 2, b.url: 2}
+        a.refresh_from_db()
+        assert (a.total_deliveries, a.successful_deliveries) == (6, 6)
+        assert WebhookDelivery.objects.filter(status=WebhookDeliveryStatus.SUCCESS.value).count() == 12
+
+    def test_failure_schedules_jittered_backoff(self, service, user):
+        service._session = FakeSession(error=requests.ConnectionError('refused'))
+        webhook = register(service, user, ['note.created'])
+        delivery, = self.make_deliveries(service, webhook, 1)
+
+        before = timezone.now()
+        assert service._deliver(delivery) is False
+
+        delivery.refresh_from_db()
+        assert delivery.status == WebhookDeliveryStatus.RETRYING.value
+        delay = (delivery.next_retry_at - before).total_seconds()
+        assert service.RETRY_BASE_DELAY / 2 <= delay <= service.RETRY_BASE_DELAY + 1
+
+    def test_backoff_grows_and_is_capped(self, service):
+        for attempt in range(1, 12):
+            delay = min(service.RETRY_MAX_DELAY, service.RETRY_BASE_DELAY * 2 ** (attempt - 1))
+            assert delay / 2 <= service.retry_delay(attempt) <= delay
+
+    def test_last_attempt_fails_permanently(self, service, user):
+        service._session = FakeSession(status_code=500)
+        webhook = register(service, user, ['note.created'])
+        delivery, = self.make_deliveries(service, webhook, 1)
+        WebhookDelivery.objects.filter(id=delivery.id).update(attempt_count=4)
+        delivery.refresh_from_db()
+
+        service._deliver(delivery)
+
+        webhook.refresh_from_db()
+        assert WebhookDelivery.objects.get(id=delivery.id).status == WebhookDeliveryStatus.FAILED.value
+        assert (webhook.total_deliveries, webhook.failed_deliveries) == (1, 1)
+
+    def test_retries_only_due_deliveries(self, service, user):
+        webhook = register(service, user, ['note.created'])
+        due, later = self.make_deliveries(service, webhook, 2)
+        now = timezone.now()
+        WebhookDelivery.objects.filter(id=due.id).update(
+            status=WebhookDeliveryStatus.RETRYING.value, next_retry_at=now - timedelta(seconds=5), attempt_count=1,
+        )
+        WebhookDelivery.objects.filter(id=later.id).update(
+            status=WebhookDeliveryStatus.RETRYING.value, next_retry_at=now + timedelta(hours=1), attempt_count=1,
+        )
+
+        assert service.process_pending_retries() == 1
+
+        assert WebhookDelivery.objects.get(id=due.id).status == WebhookDeliveryStatus.SUCCESS.value
+        assert WebhookDelivery.objects.get(id=later.id).status == WebhookDeliveryStatus.RETRYING.value
+        assert service.process_pending_retries() == 0
@@ -0,0 +1,119 @@
+"""
+Tests for the encryption keyring.
+
+Tests cover:
+- Deriving each key version once per process
+- Versioned ciphertext and reading legacy (unversioned) ciphertext
+- Bulk decryption of a column
+- Lazy rotation to a new key version
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from backend import crypto
+from backend.crypto import (
+    decrypt_aes_gcm,
+    decrypt_column,
+    decrypt_many,
+    encrypt_aes_gcm,
+    key_rotator,
+    key_version,
+    keyring,
+)
+
+
+@pytest.fixture(autouse=True)
+def fresh_keyring():
+    keyring.clear()
+    yield
+    keyring.clear()
+
+
+@pytest.fixture
+def new_version(settings):
+    settings.ENCRYPTION_KEYS = {2: 'rotated-secret'}
+    keyring.clear()
+    return 2
+
+
+def encrypt_as(settings, version, plaintexts):
+    settings.ENCRYPTION_KEY_VERSION = version
+    try:
+        return [encrypt_aes_gcm(plaintext) for plaintext in plaintexts]
+    finally:
+        settings.ENCRYPTION_KEY_VERSION = None
+
+
+class TestKeyring:
+    """Tests for Keyring and the AES-GCM helpers."""
+
+    def test_key_is_derived_once(self):
+        with patch.object(crypto, '_derive_key', wraps=crypto._derive_key) as derive:
+            values = [encrypt_aes_gcm(f'secret-{n}') for n in range(20)]
+            assert [decrypt_aes_gcm(v) for v in values] == [f'secret-{n}' for n in range(20)]
+
+        assert derive.call_count == 1
+
+    def test_ciphertext_carries_version(self):
+        value = encrypt_aes_gcm('sk-abc')
+
+        assert value.startswith('v1:') and key_version(value) == 1
+
+    def test_legacy_ciphertext_is_version_one(self):
+        legacy = key_rotator._encrypt_with_key('sk-old', keyring.key(1))
+
+        assert key_version(legacy) == 1
+        assert decrypt_aes_gcm(legacy) == 'sk-old'
+
+    def test_old_versions_stay_readable(self, settings, new_version):
+        old, = encrypt_as(settings, 1, ['sk-abc'])
+        new = encrypt_aes_gcm('sk-abc')
+
+        assert key_version(new) == 2
+        assert decrypt_many([old, new]) == ['sk-abc', 'sk-abc']
+        assert key_rotator.needs_rotation(old) and not key_rotator.needs_rotation(new)
+
+    def test_decrypt_many_passes_through_empty_and_plaintext(self):
+        values = [None, '', encrypt_aes_gcm('x'), 'not-encrypted']
+
+        assert decrypt_many(values) == [None, '', 'x', 'not-encrypted']
+        with pytest.raises(Exception):
+            decrypt_many(values, strict=True)
+
+
+@pytest.mark.django_db
+class TestColumns:
+    """Tests for column decryption and rotation."""
+
+    def make_rows(self, user, values):
+        from coreapp.services.notification_service import Notification
+
+        return [
+            Notification.objects.create(user=user, notification_type='test', title='t', message=value)
+            for value in values
+        ]
+
+    def test_decrypt_column(self, user):
+        from coreapp.services.notification_service import Notification
+
+        rows = self.make_rows(user, [encrypt_aes_gcm(f'm{n}') for n in range(3)])
+
+        assert decrypt_column(Notification.objects.all(), 'message') == {
+            row.pk: f'm{n}' for n, row in enumerate(rows)
+        }
+
+    def test_rotate_moves_only_stale_rows(self, settings, user, new_version):
+        from coreapp.services.notification_service import Notification
+
+        stale = encrypt_as(settings, 1, [f'm{n}' for n in range(3)])
+        current = encrypt_aes_gcm('fresh')
+        rows = self.make_rows(user, stale + [current])
+
+        assert key_rotator.rotate(Notification, 'message', batch_size=2) == (3, 0)
+
+        stored = dict(Notification.objects.values_list('pk', 'message'))
+        assert all(key_version(value) == 2 for value in stored.values())
+        assert stored[rows[3].pk] == current
+        assert decrypt_many(stored[row.pk] for row in rows) == ['m0', 'm1', 'm2', 'fresh']
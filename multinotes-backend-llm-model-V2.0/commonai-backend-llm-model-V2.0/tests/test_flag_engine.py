@@ -0,0 +1,129 @@
+"""
+Tests for the in-process feature flag engine.
+
+Tests cover:
+- Compiling flag rows and overrides into a snapshot
+- Evaluation by flag type, status and schedule
+- Deterministic percentage and variant buckets
+- Bulk evaluation sharing one plan lookup
+"""
+
+import hashlib
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+from django.utils import timezone
+
+from backend.flag_engine import FlagSnapshot, bucket
+
+
+def row(key, flag_type='boolean', status='active', flag_id=None, **fields):
+    return {
+        'id': flag_id or abs(hash(key)) % 10000,
+        'key': key,
+        'flag_type': flag_type,
+        'status': status,
+        'default_value': fields.pop('default_value', False),
+        'config': fields.pop('config', {}),
+        **fields,
+    }
+
+
+def user(user_id, email=''):
+    return SimpleNamespace(id=user_id, email=email)
+
+
+class TestEvaluation:
+    """Tests for FlagSnapshot.is_enabled and get_variant."""
+
+    def test_boolean_and_status(self):
+        snapshot = FlagSnapshot.build([
+            row('on', default_value=True),
+            row('off', default_value=True, status='inactive'),
+        ], [])
+
+        assert snapshot.is_enabled('on')
+        assert not snapshot.is_enabled('off')
+        assert snapshot.is_enabled('missing', default=True)
+
+    def test_scheduled_flags_respect_their_window(self):
+        now = timezone.now()
+        snapshot = FlagSnapshot.build([
+            row('live', status='scheduled', default_value=True, start_date=now - timedelta(days=1)),
+            row('later', status='scheduled', default_value=True, start_date=now + timedelta(days=1)),
+        ], [])
+
+        assert snapshot.evaluate_all() == {'live': True}
+        assert not snapshot.is_enabled('later')
+
+    def test_user_list_and_overrides(self):
+        snapshot = FlagSnapshot.build(
+            [row('beta', 'user_list', flag_id=1, config={'user_ids': [1], 'user_emails': ['b@x.com']})],
+            [(1, 3, True, ''), (1, 1, False, '')],
+        )
+
+        assert not snapshot.is_enabled('beta', user=user(1))
+        assert snapshot.is_enabled('beta', user=user(2, 'b@x.com'))
+        assert snapshot.is_enabled('beta', user=user(3))
+        assert not snapshot.is_enabled('beta', user=user(4))
+
+    def test_percentage_matches_existing_buckets(self):
+        snapshot = FlagSnapshot.build([row('rollout', 'percentage', config={'percentage': 30})], [])
+
+        for user_id in range(200):
+            legacy = int(hashlib.md5(f"rollout:{user_id}".encode()).hexdigest(), 16) % 100
+            assert bucket('rollout', user_id) == legacy
+            assert snapshot.is_enabled('rollout', user=user(user_id)) == (legacy < 30)
+
+    def test_anonymous_identifier_is_deterministic(self):
+        snapshot = FlagSnapshot.build([row('rollout', 'percentage', config={'percentage': 50})], [])
+        context = {'identifier': 'session-abc'}
+
+        results = {snapshot.is_enabled('rollout', context=context) for _ in range(20)}
+
+        assert results == {bucket('rollout', 'session-abc') < 50}
+
+    def test_variants_follow_weights_and_overrides(self):
+        config = {'variants': ['control', 'a', 'b'], 'weights': [50, 25, 25]}
+        snapshot = FlagSnapshot.build([row('checkout', 'ab_test', flag_id=9, config=config)], [(9, 5, True, 'b')])
+
+        variants = [snapshot.get_variant('checkout', user=user(i)) for i in range(1000)]
+
+        assert snapshot.get_variant('checkout', user=user(5)) == 'b'
+        assert 400 < variants.count('control') < 600
+        assert snapshot.is_enabled('checkout', user=user(7)) == (variants[7] != 'control')
+        assert snapshot.get_variant('missing', user=user(1), default='x') == 'x'
+
+
+class TestEvaluateAll:
+    """Tests for FlagSnapshot.evaluate_all."""
+
+    def test_subscription_flags_share_one_plan_lookup(self):
+        plan_lookup = Mock(return_value='Pro Monthly')
+        snapshot = FlagSnapshot.build([
+            row('export', 'subscription', config={'plans': ['pro', 'enterprise']}),
+            row('teams', 'subscription', config={'plans': ['enterprise']}),
+            row('archived', status='archived', default_value=True),
+        ], [], plan_lookup=plan_lookup)
+
+        flags = snapshot.evaluate_all(user(1))
+
+        assert flags == {'export': True, 'teams': False}
+        plan_lookup.assert_called_once()
+
+    def test_plan_lookup_failure_disables(self):
+        snapshot = FlagSnapshot.build(
+            [row('export', 'subscription', config={'plans': ['pro']})],
+            [],
+            plan_lookup=Mock(side_effect=RuntimeError('down')),
+        )
+
+        assert snapshot.evaluate_all(user(1)) == {'export': False}
+
+    def test_snapshot_is_immutable(self):
+        snapshot = FlagSnapshot.build([row('on')], [])
+
+        with pytest.raises(TypeError):
+            snapshot.flags['new'] = None
@@ -0,0 +1,76 @@
+"""
+Tests for the buffered log writer.
+
+Tests cover:
+- Appending without database writes, flushing in batches
+- Dropping (and counting) rows when the buffer is full
+- APIUsageLog.log_request queues instead of saving
+- Response size counting for regular and streaming responses
+"""
+
+from unittest.mock import patch
+
+import pytest
+from django.db import connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test.utils import CaptureQueriesContext
+
+from backend.log_writer import BufferedLogWriter, measure_response
+from coreapp.models_analytics import APIUsageLog
+
+
+def usage_log(user, i=0):
+    return APIUsageLog(user=user, endpoint='/api/user/get_contents/', method='GET', request_id=str(i))
+
+
+@pytest.mark.django_db
+class TestBufferedLogWriter:
+    """Tests for BufferedLogWriter."""
+
+    def test_append_is_free_and_flush_is_batched(self, user):
+        writer = BufferedLogWriter(max_size=100, batch_size=4, background=False)
+
+        with CaptureQueriesContext(connection) as appends:
+            for i in range(10):
+                writer.append(usage_log(user, i))
+        with CaptureQueriesContext(connection) as flush:
+            written = writer.flush()
+
+        assert len(appends) == 0
+        assert written == 10 and writer.pending() == 0
+        assert APIUsageLog.objects.count() == 10
+        assert len([q for q in flush if q['sql'].startswith('INSERT')]) == 3
+
+    def test_full_buffer_drops_and_counts(self, user):
+        writer = BufferedLogWriter(max_size=3, batch_size=10, background=False)
+
+        accepted = [writer.append(usage_log(user, i)) for i in range(5)]
+
+        assert accepted == [True, True, True, False, False]
+        assert writer.stats()['dropped'] == 2
+        writer.flush()
+        assert APIUsageLog.objects.count() == 3
+
+    def test_log_request_is_queued(self, user):
+        with patch('backend.log_writer.log_writer.append') as append:
+            entry = APIUsageLog.log_request(user, '/api/x/', 'POST', status_code=201)
+
+        append.assert_called_once_with(entry)
+        assert entry.pk is None
+
+
+class TestMeasureResponse:
+    """Tests for measure_response."""
+
+    def test_regular_response(self):
+        sizes = []
+        measure_response(HttpResponse(b'hello'), sizes.append)
+        assert sizes == [5]
+
+    def test_streaming_response_counted_as_sent(self):
+        sizes = []
+        response = measure_response(StreamingHttpResponse(iter([b'ab', b'cde'])), sizes.append)
+
+        assert sizes == []
+        assert b''.join(response.streaming_content) == b'abcde'
+        assert sizes == [5]
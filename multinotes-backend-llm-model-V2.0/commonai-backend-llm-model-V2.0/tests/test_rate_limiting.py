@@ -0,0 +1,205 @@
+"""
+Tests for the shared rate-limit engine.
+
+Tests cover:
+- Sliding windows weighting the previous window, and their retry times
+- GCRA bursts and spacing
+- Batched checks that consume nothing unless every limit allows
+- The Redis script protocol and the in-process fallback
+- Throttles, API keys and abuse detection built on the engine
+"""
+
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend import rate_limiting
+from backend.abuse_detection import AbuseDetectionService
+from backend.api_keys import APIKeyService
+from backend.rate_limiting import GCRA, Limit, RateLimitEngine, parse_rate
+from backend.throttling import LoginThrottle, PaymentThrottle, clear_throttle, get_throttle_status
+
+
+@pytest.fixture
+def clock():
+    """Frozen engine clock; advance with clock.now += seconds."""
+    clock = SimpleNamespace(now=1000.0)
+    with patch.object(rate_limiting.time, 'time', lambda: clock.now):
+        yield clock
+
+
+@pytest.fixture
+def engine():
+    return RateLimitEngine(use_redis=False)
+
+
+@pytest.fixture(autouse=True)
+def local_limits():
+    with patch.object(rate_limiting, '_limit_script', return_value=None), \
+            patch.object(rate_limiting.rate_limiter, '_local', {}):
+        yield
+
+
+class TestSlidingWindow:
+    """Tests for the sliding-window algorithm."""
+
+    def test_counts_up_to_the_limit(self, engine, clock):
+        limit = Limit('user:1', 3, 10)
+
+        decisions = [engine.check(limit) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions] == [2, 1, 0, 0]
+        # Allowed once the previous window's weight drops to 2 of 3
+        assert decisions[-1].retry_after == pytest.approx(10 + 10 / 3)
+
+    def test_previous_window_is_weighted(self, engine, clock):
+        limit = Limit('user:1', 3, 10)
+        for _ in range(3):
+            engine.check(limit)
+
+        clock.now = 1012  # 3 * 0.8 = 2.4 still counted
+        refused = engine.check(limit)
+        clock.now += refused.retry_after + 1e-6
+
+        assert not refused.allowed
+        assert refused.retry_after == pytest.approx(4 / 3)
+        assert engine.check(limit).allowed
+
+    def test_state_expires_after_two_windows(self, engine, clock):
+        limit = Limit('user:1', 1, 10)
+        engine.check(limit)
+
+        clock.now += 20
+
+        assert engine.check(limit).allowed
+        assert engine.check(limit).allowed is False
+
+
+class TestGCRA:
+    """Tests for the GCRA token bucket."""
+
+    def test_burst_then_spacing(self, engine, clock):
+        limit = Limit('provider:openai', 2, 1, algorithm=GCRA)
+
+        first, second, third = (engine.check(limit) for _ in range(3))
+
+        assert (first.allowed, second.allowed, third.allowed) == (True, True, False)
+        assert third.retry_after == pytest.approx(0.5)
+        clock.now += 0.5
+        assert engine.check(limit).allowed
+
+    def test_custom_burst(self, engine, clock):
+        limit = Limit('provider:openai', 60, 60, algorithm=GCRA, burst=1)
+
+        assert engine.check(limit).allowed
+        assert engine.check(limit).retry_after == pytest.approx(1)
+
+
+class TestEngine:
+    """Tests for batching, peeking and backends."""
+
+    def test_batch_consumes_nothing_unless_all_allow(self, engine, clock):
+        strict, loose = Limit('login:ip', 1, 60), Limit('login:ip:hour', 5, 3600)
+
+        assert all(d.allowed for d in engine.check_many([strict, loose]))
+        refused = engine.check_many([strict, loose])
+
+        assert [d.allowed for d in refused] == [False, True]
+        assert engine.peek(loose).remaining == 4
+
+    def test_peek_and_reset(self, engine, clock):
+        limit = Limit('user:1', 5, 60)
+        engine.check(limit)
+
+        assert engine.peek(limit).remaining == 4
+        assert engine.peek(limit).remaining == 4
+        engine.reset('user:1')
+        assert engine.peek(limit).remaining == 5
+
+    def test_parse_rate(self):
+        assert parse_rate('60/minute') == (60, 60)
+        assert parse_rate('5/m') == (5, 60)
+        assert Limit.from_rate('k', '1000/day').period == 86400
+        with pytest.raises(ValueError):
+            parse_rate('often')
+
+    def test_redis_script_protocol(self, clock):
+        script = MagicMock(return_value=[1, 4, b'0', b'120'])
+
+        with patch.object(rate_limiting, '_limit_script', return_value=script):
+            decision = RateLimitEngine().check(Limit('user:1', 5, 60))
+
+        assert (decision.allowed, decision.remaining, decision.reset_after) == (True, 4, 120.0)
+        assert script.call_args.kwargs == {
+            'keys': ['ratelimit:user:1'],
+            'args': [1000.0, 'sliding_window', 5, 60, 5, 1],
+        }
+
+    def test_falls_back_to_local_when_redis_fails(self, clock):
+        script = MagicMock(side_effect=ConnectionError('down'))
+        engine = RateLimitEngine()
+
+        with patch.object(rate_limiting, '_limit_script', return_value=script):
+            decisions = [engine.check(Limit('user:1', 1, 60)) for _ in range(2)]
+
+        assert [d.allowed for d in decisions] == [True, False]
+
+    def test_local_checks_are_atomic(self, engine):
+        limit = Limit('user:1', 100, 60)
+        allowed = []
+
+        def hammer():
+            allowed.extend(engine.check(limit).allowed for _ in range(50))
+
+        threads = [threading.Thread(target=hammer) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert allowed.count(True) == 100
+
+
+class TestConsumers:
+    """Throttles, API keys and abuse detection on the engine."""
+
+    def test_login_throttle_checks_both_windows(self, clock):
+        request = SimpleNamespace(user=None, META={'REMOTE_ADDR': '10.0.0.1'})
+        throttle = LoginThrottle()
+
+        results = [throttle.allow_request(request, None) for _ in range(6)]
+
+        assert results == [True] * 5 + [False]
+        assert throttle.wait() > 0
+        assert len(throttle.decisions) == 2
+
+    def test_throttle_status_and_clear(self, clock):
+        user = SimpleNamespace(id=7, is_authenticated=True)
+        request = SimpleNamespace(user=user)
+        for _ in range(3):
+            assert PaymentThrottle().allow_request(request, None)
+
+        assert get_throttle_status(user)['payment']['remaining'] == 7
+        clear_throttle(user, 'payment')
+        assert get_throttle_status(user)['payment']['remaining'] == 10
+
+    def test_api_key_limit_counts_atomically(self, clock):
+        api_key = SimpleNamespace(id=3, rate_limit=2)
+        service = APIKeyService()
+
+        results = [service.check_rate_limit(api_key) for _ in range(3)]
+
+        assert [r[0] for r in results] == [True, True, False]
+        assert results[0][1] == 1
+        assert results[2][2] > 0
+
+    def test_abuse_detection_limits(self, clock):
+        service = AbuseDetectionService()
+
+        results = [service.check_rate_limit('10.0.0.1', 'password_reset') for _ in range(4)]
+
+        assert [r[0] for r in results] == [True, True, True, False]
+        assert service.check_rate_limit('10.0.0.1', 'unknown') == (True, -1)
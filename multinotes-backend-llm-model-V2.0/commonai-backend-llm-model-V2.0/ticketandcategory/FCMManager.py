@@ -53,6 +53,34 @@ def pushMessage(deviceToken, title, body):
         return None
 
 
+# Most registration ids FCM accepts in one multicast request
+MULTICAST_SIZE = 500
+
+
+# Send one notification to many devices, MULTICAST_SIZE tokens per request
+def pushMulticast(deviceTokens, title, body):
+    sent, failed = 0, 0
+    for start in range(0, len(deviceTokens), MULTICAST_SIZE):
+        batch = deviceTokens[start:start + MULTICAST_SIZE]
+        if fcm is None:
+            failed += len(batch)
+            continue
+        try:
+            result = fcm.notify_multiple_devices(
+                registration_ids=batch,
+                message_title=title,
+                message_body=body,
+                message_icon="https://multinotes.ai/favicon.svg",
+                timeout=5,
+            )
+            sent += result.get('success', 0)
+            failed += result.get('failure', 0)
+        except Exception as e:
+            print(f"FCM multicast failed: {e}")
+            failed += len(batch)
+    return {'success': sent, 'failure': failed}
+
+
 # class TestNotification(APIView):
 #     # def pushMessage(device_token, title, body):
 #     def post(self, request):